@@ -0,0 +1,16 @@
+#!/usr/bin/env bash
+#
+# Clear a golden-snapshot builder's identity (machine-id, ssh host keys,
+# cloud-init state, logs) so clones don't collide. Run last, right before
+# power-off. Prints CLEAN_OK.
+set -uo pipefail
+cloud-init clean --logs --seed 2>/dev/null || true
+truncate -s 0 /etc/machine-id 2>/dev/null || true
+rm -f /var/lib/dbus/machine-id 2>/dev/null || true
+rm -f /etc/ssh/ssh_host_* 2>/dev/null || true
+rm -rf /var/lib/cloud/instances/* /var/lib/cloud/instance 2>/dev/null || true
+rm -f /root/.bash_history 2>/dev/null || true
+find /var/log -type f -exec truncate -s 0 {} \; 2>/dev/null || true
+rm -f /root/.ssh/authorized_keys 2>/dev/null || true   # DO re-injects the create-time key on clone
+sync
+echo "CLEAN_OK"
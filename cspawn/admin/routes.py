@@ -6,11 +6,13 @@ from datetime import datetime, timezone
 from functools import wraps
 from operator import is_
 from subprocess import DEVNULL
+from urllib.parse import urlsplit
 
 import docker
 from flask import Response, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 
+from cspawn.cs_docker.clusterview import cluster_view_cache
 from cspawn.init import cast_app
 from cspawn.models import Class, CodeHost, ClassProto, NodeOp, User, db
 
@@ -45,16 +47,15 @@ def admin_required(f):
 @admin_bp.route("/")
 @admin_required
 def index():
-    # Sync DB against live Swarm state before counting so the dashboard reflects
-    # reality rather than a stale snapshot (e.g. hosts mid-reschedule onto a new
-    # node read as "not running"). One reconciliation pass only — the dashboard
-    # must stay responsive, so we do NOT run the convergence loop here; that's
-    # what the cron'd `cspawnctl host dbsync --converge` is for. A docker/SSH
-    # hiccup must never 500 the page, so failures are swallowed.
+    # Host rows are kept current by the host watcher (and `Refresh now`); the
+    # Swarm side comes from the cached cluster view, so loading the dashboard
+    # costs no Docker calls while the view is fresh. A docker/SSH hiccup must
+    # never 500 the page, so a failed rebuild only flashes.
+    cluster_view = None
     try:
-        ca.csm.sync(check_ready=True)
+        cluster_view = cluster_view_cache(ca).get()
     except Exception as e:
-        flash(f"Host state sync failed; counts may be stale: {e}", "warning")
+        flash(f"Could not read the Swarm; node counts unavailable: {e}", "warning")
 
     # Gather dashboard stats
     num_code_hosts = CodeHost.query.count()
@@ -68,11 +69,37 @@ def index():
             "num_running_hosts": num_running_hosts,
             "num_users": num_users,
             "num_classes": num_classes,
+            "cluster_view": cluster_view,
         }
     )
     return render_template("admin/index.html", **context)
 
 
+def _local_path(target):
+    """`target` if it is a path on this site, else None (never an off-site URL)."""
+    if not target or not target.startswith("/") or target.startswith("//") or "\\" in target:
+        return None
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc:
+        return None
+    return target
+
+
+@admin_bp.route("/cluster/refresh", methods=["POST"])
+@admin_required
+def refresh_cluster():
+    """Refresh now: reconcile host rows with Swarm and rebuild the cluster view."""
+    cache = cluster_view_cache(ca)
+    cache.invalidate()
+    try:
+        ca.csm.sync(check_ready=True)
+        cache.refresh()
+        flash("Cluster state refreshed.", "success")
+    except Exception as e:
+        flash(f"Refresh failed: {e}", "danger")
+    return redirect(_local_path(request.form.get("next")) or url_for("admin.index"))
+
+
 @admin_bp.route("/hosts")
 @admin_required
 def list_code_hosts():
@@ -93,6 +120,7 @@ def sync_code_hosts():
     """
     try:
         ca.csm.sync(check_ready=True)
+        cluster_view_cache(ca).invalidate()
         flash("Code hosts synchronized with Docker.", "success")
     except Exception as e:
         flash(f"Sync failed: {e}", "danger")
@@ -455,43 +483,20 @@ def _cspawnctl_path() -> str:
 @admin_required
 def list_nodes():
     """List all swarm nodes with host counts, tiers, and recent operations."""
-    from cspawn.cli.node import count_hosts_per_node
     from cspawn.cs_docker.tiers import load_tiers
 
-    docker_uri = ca.app_config.get("DOCKER_URI")
     node_rows = []
+    cluster_view = None
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
-        host_counts = count_hosts_per_node(client)
-        for n in client.nodes.list():
-            spec = n.attrs.get("Spec", {})
-            desc = n.attrs.get("Description", {})
-            status = n.attrs.get("Status", {})
-            ms = n.attrs.get("ManagerStatus") or {}
-            labels = spec.get("Labels") or {}
-            hostname = desc.get("Hostname", "")
-            role = (spec.get("Role") or "worker").lower()
-            is_leader = bool(ms.get("Leader"))
-            short = hostname.split(".")[0]
-            node_rows.append({
-                "hostname": hostname,
-                "short": short,
-                "ip": status.get("Addr", ""),
-                "role": "leader" if is_leader else role,
-                "tier": labels.get("cs.tier", ""),
-                "capacity": labels.get("cs.capacity", ""),
-                "host_count": host_counts.get(short, 0),
-                "availability": spec.get("Availability", ""),
-                "is_manager": role == "manager",
-                "is_leader": is_leader,
-            })
-        client.close()
+        cluster_view = cluster_view_cache(ca).get()
+        node_rows = cluster_view.node_rows()
     except Exception as e:
         flash(f"Could not connect to Docker: {e}", "danger")
 
     tiers = load_tiers(ca.app_config)
     recent_ops = NodeOp.query.order_by(NodeOp.created_at.desc()).limit(20).all()
-    return render_template("admin/nodes.html", node_rows=node_rows, tiers=tiers, recent_ops=recent_ops)
+    return render_template("admin/nodes.html", node_rows=node_rows, tiers=tiers, recent_ops=recent_ops,
+                           cluster_view=cluster_view)
 
 
 # ---------------------------------------------------------------------------
@@ -548,32 +553,24 @@ def nodes_remove():
         flash("No FQDN provided.", "danger")
         return redirect(url_for("admin.list_nodes"))
 
-    # Re-query Docker to confirm node is not manager/leader
-    docker_uri = ca.app_config.get("DOCKER_URI")
+    # Refuse managers/leaders, and nodes the Swarm does not know. Removal is
+    # destructive, so check a freshly built view, never a cached one (a node
+    # may have been promoted since); the rebuild also refreshes the pages.
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
-        short = fqdn.split(".")[0]
-        for n in client.nodes.list():
-            desc = n.attrs.get("Description", {})
-            hostname = desc.get("Hostname", "")
-            if hostname == fqdn or hostname.split(".")[0] == short:
-                spec = n.attrs.get("Spec", {})
-                role = (spec.get("Role") or "worker").lower()
-                ms = n.attrs.get("ManagerStatus") or {}
-                is_leader = bool(ms.get("Leader"))
-                if role == "manager" or is_leader:
-                    client.close()
-                    flash(
-                        f"Cannot remove {fqdn}: node is a swarm manager/leader. "
-                        "Demote it first.",
-                        "danger",
-                    )
-                    return redirect(url_for("admin.list_nodes"))
-                break
-        client.close()
+        node_view = cluster_view_cache(ca).refresh().node(fqdn)
     except Exception as e:
         flash(f"Could not validate node against Docker: {e}", "danger")
         return redirect(url_for("admin.list_nodes"))
+    if node_view is None:
+        flash(f"Cannot remove {fqdn}: no such node in the swarm.", "danger")
+        return redirect(url_for("admin.list_nodes"))
+    if node_view.is_manager or node_view.is_leader:
+        flash(
+            f"Cannot remove {fqdn}: node is a swarm manager/leader. "
+            "Demote it first.",
+            "danger",
+        )
+        return redirect(url_for("admin.list_nodes"))
 
     op = NodeOp(
         kind="remove",
@@ -47,6 +47,56 @@ def fork(ctx, repo_url, class_id, username):
     click.echo(sr.html_url)
 
 
+@github.command()
+@click.option("--class", "class_id", type=int, help="Fork for every student enrolled in this class.")
+@click.option("--due", is_flag=True,
+              help="Fork for every class whose purge window is open or opens within --lead-hours.")
+@click.option("--lead-hours", type=float, default=24.0, show_default=True,
+              help="With --due: how far ahead of a class's purge window to start forking.")
+@click.option("--min-interval", type=float, default=2.0, show_default=True,
+              help="Minimum seconds between forks.")
+@click.option("--reserve", type=int, default=500, show_default=True,
+              help="Stop when fewer than this many GitHub API requests remain.")
+@click.option("-n", "--dry-run", is_flag=True, help="Show what would be forked, without forking.")
+@click.pass_context
+def prefork(ctx, class_id, due, lead_hours, min_interval, reserve, dry_run):
+    """Fork student repos ahead of time so host starts skip the fork.
+
+    Forks the class prototype repo for each enrolled student who does not have
+    one yet and caches the result; new_cs() then only looks it up. Safe to
+    re-run: students already forked are skipped. With --due it is run from
+    cron for classes about to start.
+    """
+    from datetime import timedelta
+
+    from cspawn.cs_github.prefork import ForkBudget, prefork_class, prefork_due
+
+    if bool(class_id) == bool(due):
+        raise click.UsageError("Provide exactly one of --class or --due")
+
+    app = get_app(ctx)
+    with app.app_context():
+        org = budget = None
+        if not dry_run:
+            org = GithubOrg.new_org(app)
+            budget = ForkBudget(org.gh, min_interval_s=min_interval, reserve=reserve)
+
+        if class_id:
+            clazz = Class.query.get(class_id)
+            if not clazz:
+                raise click.ClickException(f"Class ID {class_id} not found")
+            report = prefork_class(app, clazz, org=org, budget=budget, dry_run=dry_run)
+        else:
+            report = prefork_due(app, lead=timedelta(hours=lead_hours), org=org,
+                                 budget=budget, dry_run=dry_run)
+
+    for username, err in report.failed:
+        click.echo(f"  failed {username}: {err}")
+    if dry_run and report.pending:
+        click.echo("Would fork for: " + ", ".join(report.pending))
+    click.echo(report.summary())
+
+
 @github.command(name="rm")
 @click.option("--repo", "repo_url", help="Upstream repo URL or owner/name")
 @click.option("--class", "class_id", type=int, help="Class ID to use its prototype repo")
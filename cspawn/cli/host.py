@@ -10,6 +10,7 @@ from cspawn.init import cast_app
 from .root import cli
 from .util import get_app, get_logger
 from docker.errors import NotFound
+from sqlalchemy import or_
 from typing import cast
 
 @cli.group()
@@ -131,14 +132,11 @@ def stop(ctx, service_name, all, no_push):
 
     with app.app_context():
         if all:
+            rows = []
             for s in app.csm.list():
                 ch = s.rec
                 if ch:
-                    result = app.csm.stop_host(ch, push=not no_push)
-                    if result.push_error:
-                        print(f"Stopping {s.name} (push failed: {result.push_error})")
-                    else:
-                        print(f"Stopping {s.name}")
+                    rows.append(ch)
                 else:
                     logger.warning(f"No CodeHost record for {s.name}; stopping without push")
                     print(f"Stopping {s.name} (no DB record — push skipped)")
@@ -146,6 +144,11 @@ def stop(ctx, service_name, all, no_push):
                         s.stop()
                     except Exception as e:
                         print(f"Failed to stop {s.name}: {e}")
+            for result in app.csm.stop_hosts(rows, push=not no_push):
+                if result.push_error:
+                    print(f"Stopping {result.service_name} (push failed: {result.push_error})")
+                else:
+                    print(f"Stopping {result.service_name}")
             print("All services stopped successfully")
         elif service_name:
             ch = CodeHost.query.filter_by(service_name=service_name).first()
@@ -202,18 +205,23 @@ def reap(ctx, dry_run: bool):
     with app.app_context():
         app.csm.sync(check_ready=True)
 
-        for ch in CodeHost.query.all():
-            if ch.is_mia:
-                print(ch.service_name + ": ", end=" ")
-                if dry_run:
-                    print("MIA (would delete)")
-                else:
-                    app.db.session.delete(ch)
-                    print(f"Deleted {ch.service_name}")
+        for ch in CodeHost.query.filter(CodeHost.is_mia).all():
+            print(ch.service_name + ": ", end=" ")
+            if dry_run:
+                print("MIA (would delete)")
+            else:
+                app.db.session.delete(ch)
+                print(f"Deleted {ch.service_name}")
 
         if not dry_run:
             app.db.session.commit()
 
+            from cspawn.cs_docker.ports import release_orphaned_ports
+
+            n = release_orphaned_ports()
+            if n:
+                print(f"Released {n} orphaned port lease(s)")
+
 
 
 
@@ -233,31 +241,30 @@ def purge(ctx, dry_run: bool, no_push: bool):
     with app.app_context():
         app.csm.sync(check_ready=True)
 
-        for ch in CodeHost.query.all():
-            ch = cast(CodeHost, ch)
+        hosts = CodeHost.query.filter(or_(CodeHost.is_mia, CodeHost.is_quiescent)).all()
 
-            if ch.is_mia or ch.is_quiescent:
+        if dry_run:
+            action = "stop and delete" if no_push else "push, stop and delete"
+            for ch in hosts:
                 print(ch.service_name + ": ", end=" ")
+                print(f"Would {action}: {ch.service_name}")
+        else:
+            # Push, stop, and delete via the shared bulk choke point, several
+            # hosts at a time. Each step is independently best-effort inside
+            # stop_hosts() — a push or stop failure never aborts the purge,
+            # and the DB record is still removed so the orphan doesn't linger.
+            for result in app.csm.stop_hosts(hosts, push=not no_push):
+                print(result.service_name + ": ", end=" ")
 
-                if not dry_run:
-                    # Push, stop, and delete via the shared choke point. Each
-                    # step is independently best-effort inside stop_host() —
-                    # a push or stop failure never aborts the purge, and the
-                    # DB record is still removed so the orphan doesn't linger.
-                    result = app.csm.stop_host(ch, push=not no_push)
+                if result.pushed:
+                    print("(pushed)", end=" ")
+                elif result.push_error:
+                    print(f"(push failed: {result.push_error})", end=" ")
 
-                    if result.pushed:
-                        print("(pushed)", end=" ")
-                    elif result.push_error:
-                        print(f"(push failed: {result.push_error})", end=" ")
+                if result.stop_error:
+                    print(f"(stop failed: {result.stop_error})", end=" ")
 
-                    if result.stop_error:
-                        print(f"(stop failed: {result.stop_error})", end=" ")
-
-                    print(f"Stopped and deleted:   {ch.service_name}")
-                else:
-                    action = "stop and delete" if no_push else "push, stop and delete"
-                    print(f"Would {action}: {ch.service_name}")
+                print(f"Stopped and deleted:   {result.service_name}")
 
         if not dry_run:
             app.db.session.commit()
@@ -280,9 +287,16 @@ def dbsync(ctx, converge: bool, deadline_s: float, max_passes: int):
     (ready or MIA) or the deadline expires — intended to be cron'd so the DB
     self-heals after bursts of host creation or node rebalancing.
     """
+    from cspawn.cs_docker.watcher import watcher_alive
+
     app = get_app(ctx)
     with app.app_context():
-        if converge:
+        if converge and watcher_alive(app.app_config):
+            # The event watcher is already converging rows as Swarm reports
+            # changes; one pass is enough to catch anything it missed.
+            click.echo("Host watcher is live; running a single sync pass.")
+            app.csm.sync(check_ready=True)
+        elif converge:
             summary = app.csm.sync_converge(deadline_s=deadline_s, max_passes=max_passes)
             click.echo(
                 f"Converged in {summary['passes']} pass(es): "
@@ -294,6 +308,154 @@ def dbsync(ctx, converge: bool, deadline_s: float, max_passes: int):
             app.csm.sync(check_ready=True)
 
 
+@host.command()
+@click.option("--resync-interval", "resync_interval_s", type=float, default=300.0, show_default=True,
+              help="Seconds between safety-net full syncs.")
+@click.option("--pending-interval", "pending_interval_s", type=float, default=3.0, show_default=True,
+              help="Seconds between re-reads of services still starting up.")
+@click.pass_context
+def watch(ctx, resync_interval_s: float, pending_interval_s: float):
+    """Track host state from the Swarm event stream (long-running).
+
+    Applies service and node events to the code_host table as they happen,
+    following newly created services until they settle, and probes starting
+    hosts for readiness, with a periodic full sync as a safety net. Runs until interrupted; supervisord keeps it up in
+    the production container.
+    """
+    from cspawn.cs_docker.readiness import ReadinessTracker
+    from cspawn.cs_docker.watcher import HostStateWatcher
+
+    app = cast_app(get_app(ctx))
+    watcher = HostStateWatcher(
+        app,
+        resync_interval_s=resync_interval_s,
+        pending_interval_s=pending_interval_s,
+        readiness=ReadinessTracker.from_config(app.app_config, app.csm.readiness_prober()),
+    )
+    click.echo("Watching Swarm events; Ctrl-C to stop.")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    click.echo(f"Stopped after {watcher.events_handled} event(s).")
+
+
+@host.command("start-worker")
+@click.option("-w", "--workers", type=int, default=4, show_default=True,
+              help="Number of host starts to run concurrently.")
+@click.option("--poll-interval", "poll_interval_s", type=float, default=1.0, show_default=True,
+              help="Seconds to wait between checks of an empty queue.")
+@click.pass_context
+def start_worker(ctx, workers: int, poll_interval_s: float):
+    """Run queued host starts (long-running).
+
+    The web app queues a StartJob when a student clicks Start; this worker
+    claims queued jobs and runs the fork / create / pin stages. Several
+    workers may run against the same database. Runs until interrupted;
+    supervisord keeps it up in the production container.
+    """
+    from cspawn.cs_docker.startjobs import StartWorkerPool
+
+    app = cast_app(get_app(ctx))
+    pool = StartWorkerPool(app, workers=workers, poll_interval_s=poll_interval_s)
+    click.echo(f"Running start jobs with {workers} worker(s); Ctrl-C to stop.")
+    try:
+        pool.run()
+    except KeyboardInterrupt:
+        pool.stop()
+    click.echo(f"Stopped after {pool.jobs_run} job(s).")
+
+
+@host.command()
+@click.option("--refill", is_flag=True, help="Create/remove standbys to match the target sizes.")
+@click.option("-n", "--dry-run", is_flag=True, help="With --refill: show what would change.")
+@click.option("--days", type=int, default=7, show_default=True,
+              help="Window for the warm vs cold start latency report.")
+@click.pass_context
+def standby(ctx, refill: bool, dry_run: bool, days: int):
+    """Show (or --refill) the warm standby pool and start latency.
+
+    Standbys are pre-started services per class prototype that new_cs claims
+    instead of starting a host cold; see STANDBY_ENABLED. Without --refill,
+    lists the pool, the target sizes, and claim vs cold-start latency.
+    """
+    from datetime import datetime, timedelta, timezone
+
+    from tabulate import tabulate
+
+    from cspawn.cs_docker.standby import STANDBY_PROTO_LABEL, StandbyPool, latency_report, pinned_node
+
+    app = cast_app(get_app(ctx))
+    with app.app_context():
+        pool = app.csm.standby or StandbyPool(app.csm)
+        if app.csm.standby is None:
+            click.echo("Note: STANDBY_ENABLED is off; new_cs will not claim standbys.")
+            if refill and not dry_run:
+                return
+
+        if refill:
+            result = pool.refill(dry_run=dry_run)
+            verb = "Would create" if dry_run else "Created"
+            for pid, node, name in result.created:
+                click.echo(f"{verb} standby for proto {pid} on {node}" + (f": {name}" if name else ""))
+            for name in result.removed:
+                click.echo(("Would remove " if dry_run else "Removed ") + name)
+            for err in result.errors:
+                click.echo(f"  error: {err}")
+            click.echo(result.summary())
+            return
+
+        targets = pool.target_sizes()
+        with app.csm._docker_sem:
+            services = pool.list_raw()
+        rows = [[s.name, s.attrs["Spec"]["Labels"].get(STANDBY_PROTO_LABEL), pinned_node(s) or "?"]
+                for s in services]
+        click.echo(tabulate(rows, headers=["Standby", "Proto", "Node"]) if rows else "No standby services.")
+        click.echo("Targets: " + (", ".join(f"proto {k}: {v}" for k, v in sorted(targets.items())) or "none"))
+
+        report = latency_report(datetime.now(timezone.utc) - timedelta(days=days))
+        if report:
+            click.echo(tabulate(
+                [[path, r["count"], f"{r['p50_s']:.1f}", f"{r['p90_s']:.1f}"] for path, r in report.items()],
+                headers=["Start", "Jobs", "p50 s", "p90 s"],
+            ))
+        else:
+            click.echo(f"No completed start jobs in the last {days} day(s).")
+
+
+@host.command()
+@click.option("--probe", is_flag=True, help="Take one lease (a ping) to measure the current queue wait.")
+@click.pass_context
+def limiter(ctx, probe: bool):
+    """Show the Docker API limiter: leases held cluster-wide and queue waits.
+
+    Every process shares DOCKER_SSH_CONCURRENCY leases per sshd (see
+    cspawn.cs_docker.limiter). Queue-wait figures are for this process, so
+    use --probe to sample the wait right now.
+    """
+    from tabulate import tabulate
+
+    from cspawn.cs_docker.limiter import AdvisoryLockLimiter, limiter_kind, limiter_stats
+
+    app = cast_app(get_app(ctx))
+    with app.app_context():
+        lim = app.csm._docker_sem
+        click.echo(f"Limiter: {limiter_kind(app.app_config)}, {lim.slots} lease(s) for {lim.key}, "
+                   f"timeout {lim.timeout_s:.0f}s")
+        if isinstance(lim, AdvisoryLockLimiter):
+            holders = lim.holders()
+            click.echo(tabulate(holders, headers=["Slot", "Backend pid"]) if holders else "No leases held.")
+
+        if probe:
+            app.csm.client.ping()
+
+        stats = limiter_stats()
+        if stats:
+            cols = ["acquired", "waited", "timeouts", "wait_p50_s", "wait_p95_s", "wait_max_s"]
+            click.echo(tabulate([[k] + [v[c] for c in cols] for k, v in stats.items()],
+                                headers=["Host"] + cols))
+
+
 @host.command()
 @click.argument("username")
 @click.option("-n", "--dry-run", is_flag=True, help="Show what would be done, without making any changes.")
@@ -315,10 +477,11 @@ def sync(ctx, username: str, dry_run: bool):
 @click.option("-a", "--all", "all_hosts", is_flag=True, help="Push every host to GitHub.")
 @click.option("--branch", default=None, help="Branch to push.")
 @click.option("--timeout", "timeout_s", default=90, show_default=True, type=int,
-              help="Per-host timeout in seconds for --all (the docker-over-SSH "
-                   "round-trips can stall under node SSH rate-limiting).")
+              help="Per-host push timeout in seconds for --all.")
+@click.option("-j", "--jobs", type=int, default=None,
+              help="Pushes to run at once for --all (default PUSH_CONCURRENCY).")
 @click.pass_context
-def push(ctx, username, all_hosts, branch, timeout_s):
+def push(ctx, username, all_hosts, branch, timeout_s, jobs):
     """Push local changes from a user's code host to GitHub (or all hosts with --all)."""
     app = get_app(ctx)
     from cspawn.cs_github.repo import CodeHostRepo
@@ -326,10 +489,10 @@ def push(ctx, username, all_hosts, branch, timeout_s):
     with app.app_context():
         if all_hosts:
             # Don't filter by DB state — it drifts (a "shutdown" row is often a
-            # live 1/1 service). Collect every non-MIA host's name up front.
-            names = [ch.service_name for ch in CodeHost.query.order_by(CodeHost.service_name).all()
-                     if not ch.is_mia]
-            _push_all(ctx, names, branch, timeout_s)
+            # live 1/1 service). Push every non-MIA host.
+            hosts = (CodeHost.query.filter(~CodeHost.is_mia)
+                     .order_by(CodeHost.service_name).all())
+            _push_all(app, hosts, branch, timeout_s, jobs)
             return
 
         if not username:
@@ -344,61 +507,35 @@ def push(ctx, username, all_hosts, branch, timeout_s):
             raise
 
 
-def _push_all(ctx, names, branch, timeout_s):
-    """Push every host, one isolated subprocess per host.
+def _push_all(app, hosts, branch, timeout_s, jobs=None):
+    """Push every host concurrently, one multiplexed SSH connection per node.
 
-    Each push must be its own process: the docker-over-SSH client caches a
-    persistent connection on app.csm, and when the swarm-manager SSH tunnel
-    drops (node SSH rate-limiting), that broken pipe poisons every subsequent
-    in-process call — so an in-process loop fails the whole batch after the
-    first drop. A fresh `cspawnctl host push <name>` per host gets a fresh
-    connection, is hard-killable on timeout, and one host's failure can't
-    cascade. Failures/timeouts are retried once, then reported.
+    Placement comes from one Swarm snapshot, so a dropped manager tunnel
+    cannot fail the rest of the batch, and each host has its own timeout
+    and one retry. See `cspawn.cs_github.fleetpush`.
     """
-    import subprocess
-    import sys
-
-    deploy = ctx.obj.get("deploy") if isinstance(ctx.obj, dict) else None
-    base = [sys.argv[0]]
-    if deploy:
-        base += ["-d", deploy]
-    base += ["host", "push"]
-    if branch:
-        base += ["--branch", branch]
-
-    print(f"Pushing {len(names)} hosts to GitHub "
-          f"(isolated process, {timeout_s}s timeout, 1 retry each)...")
-
-    ok, failed = 0, []
-    for name in names:
-        result = None
-        for attempt in (1, 2):
-            try:
-                proc = subprocess.run(base + [name], capture_output=True, text=True,
-                                      timeout=timeout_s)
-                if proc.returncode == 0:
-                    result = ("ok", None)
-                    break
-                tail = (proc.stderr or proc.stdout or "").strip().splitlines()
-                result = ("fail", tail[-1] if tail else f"exit {proc.returncode}")
-            except subprocess.TimeoutExpired:
-                result = ("timeout", f"timed out after {timeout_s}s")
-            if attempt == 1:
-                print(f"  … {name}: {result[1]} — retrying")
-        status, detail = result
-        if status == "ok":
-            ok += 1
-            print(f"  ✓ {name}")
-        elif status == "timeout":
-            failed.append((name, detail))
-            print(f"  ⏱ {name}: {detail}")
+    from cspawn.cs_github.fleetpush import push_hosts
+
+    print(f"Pushing {len(hosts)} hosts to GitHub "
+          f"({timeout_s}s timeout, 1 retry each)...")
+
+    def _report(result):
+        if result.ok:
+            print(f"  ✓ {result.service_name}")
+        elif result.timed_out:
+            print(f"  ⏱ {result.service_name}: {result.error}")
         else:
-            failed.append((name, detail))
-            print(f"  ✗ {name}: {detail}")
+            print(f"  ✗ {result.service_name}: {result.error}")
+
+    t0 = time.monotonic()
+    results = push_hosts(app, hosts, branch=branch, timeout=timeout_s, concurrency=jobs,
+                         on_result=_report)
+    failed = [r for r in results if not r.ok]
 
-    print(f"\nPush complete: {ok} succeeded, {len(failed)} failed.")
-    for name, detail in failed:
-        print(f"  failed: {name}: {detail}")
+    print(f"\nPush complete: {len(results) - len(failed)} succeeded, {len(failed)} failed "
+          f"in {time.monotonic() - t0:.0f}s.")
+    for r in failed:
+        print(f"  failed: {r.service_name}: {r.error}")
     if failed:
         print("\nRe-run `host push --all` to retry failures "
               "(already-pushed hosts return instantly).")
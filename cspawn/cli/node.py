@@ -1,5 +1,6 @@
 import base64
 import re
+import shlex
 import hashlib
 import socket
 import time
@@ -16,6 +17,18 @@ import paramiko
 from .root import cli
 from .util import get_config, get_logger
 from cspawn.util.config import find_parent_dir
+from cspawn.cs_docker.limiter import docker_client
+from cspawn.cs_docker.placement import pin_constraints
+from cspawn.cs_docker.golden import DEFAULT_GOLDEN_CLOUD_INIT, MANIFEST_PATH, GoldenManifest, select_snapshot
+from cspawn.cs_docker.prepull import (
+    DEFAULT_CONCURRENCY,
+    PullProgress,
+    inspect_script,
+    parse_inspect,
+    parse_mirrors,
+    plan_waves,
+    pull_script,
+)
 from cspawn.cs_docker.tiers import Tier, load_tiers, default_tier, tier_by_name
 
 # Suppress Paramiko's verbose host key logging
@@ -50,13 +63,20 @@ def rm(rm):
 # Shared helpers — used by both CLI commands and cspawn/cs_docker/autoscale.py
 # ---------------------------------------------------------------------------
 
-def count_hosts_per_node(client: docker.DockerClient) -> dict[str, int]:
+def count_hosts_per_node(client: docker.DockerClient, snapshot=None) -> dict[str, int]:
     """Return {short_node_name: running_host_count} for all swarm nodes.
 
     Counts running tasks for services labeled jtl.codeserver=true.
     Shared between the 'hosts' command, 'contract' candidate selection,
     and the autoscale control loop (autoscale.py).
+
+    If a `SwarmSnapshot` is passed the counts come from it with no further
+    Docker calls; otherwise the services are listed and their tasks fetched
+    one service at a time.
     """
+    if snapshot is not None:
+        return snapshot.running_hosts_per_node()
+
     from collections import defaultdict
 
     node_name_map: dict[str, str] = {}
@@ -91,48 +111,35 @@ _running_hosts_by_node = count_hosts_per_node
 @node.command(name="hosts")
 @click.option("-s", "--summary", is_flag=True,
               help="Only show the count of hosts per node, not the full list.")
+@click.option("--refresh", is_flag=True,
+              help="Rebuild the cluster view from Swarm instead of using a recent one.")
 @click.pass_context
-def hosts(ctx, summary):
+def hosts(ctx, summary, refresh):
     """List running code-server hosts grouped by the swarm node they run on.
 
-    Placement is read live from Swarm (where each task actually runs), so it
-    reflects reschedules/drains rather than possibly-stale DB node_name values.
+    Placement comes from Swarm (where each task actually runs), so it reflects
+    reschedules/drains rather than possibly-stale DB node_name values. It is
+    read through the shared cluster view, so it can be up to
+    CLUSTER_VIEW_TTL_S old; --refresh reads Swarm now.
     """
-    from collections import defaultdict
+    from cspawn.cs_docker.clusterview import ClusterViewCache
 
     cfg = get_config()
     docker_uri = cfg.get("DOCKER_URI")
     if not docker_uri:
         raise click.ClickException("Missing required config: DOCKER_URI")
+
+    # A background refresh would die with this process, so anything past the
+    # TTL is rebuilt before printing.
+    cache = ClusterViewCache(cfg, client_factory=lambda: docker_client(cfg, docker_uri), max_stale_s=0)
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        view = cache.get(refresh=refresh)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
-    # node id -> short hostname
-    node_name = {}
-    for n in client.nodes.list():
-        hn = n.attrs.get("Description", {}).get("Hostname", "") or n.id
-        node_name[n.id] = hn.split(".")[0]
-
-    # Use _running_hosts_by_node for counts; build per_node with usernames for listing
-    running_counts = _running_hosts_by_node(client)
-
-    per_node = defaultdict(list)
-    for svc in client.services.list(filters={"label": "jtl.codeserver=true"}):
-        labels = svc.attrs.get("Spec", {}).get("Labels", {})
-        uname = labels.get("jtl.codeserver.username") or svc.name
-        # A service can be removed between list() and tasks() — skip it rather
-        # than letting a 404 abort the whole listing.
-        try:
-            tasks = svc.tasks(filters={"desired-state": "running"})
-        except Exception:
-            continue
-        for t in tasks:
-            if (t.get("Status", {}) or {}).get("State") != "running":
-                continue
-            nid = t.get("NodeID")
-            per_node[node_name.get(nid, nid or "?")].append(uname)
+    per_node = {n.short: n.hosts for n in view.nodes if n.hosts}
+    if view.unplaced:
+        per_node["?"] = view.unplaced
 
     total = sum(len(v) for v in per_node.values())
     if summary:
@@ -146,6 +153,7 @@ def hosts(ctx, summary):
             for u in sorted(per_node[node]):
                 click.echo(f"  {u}")
         click.echo(f"\nTotal: {total} hosts on {len(per_node)} node(s)")
+    click.echo(f"(cluster view as of {view.age_s():.0f}s ago)", err=True)
 
 
 def _service_constraints(svc) -> list[str]:
@@ -166,10 +174,7 @@ def _pin_service_to_node(svc, node_fqdn: str) -> None:
     which recreates the container on the target node. The /workspace data is
     on a shared NFS mount, so it travels with the user automatically.
     """
-    kept = [c for c in _service_constraints(svc)
-            if not c.replace(" ", "").startswith("node.hostname==")]
-    kept.append(f"node.hostname=={node_fqdn}")
-    svc.update(constraints=kept)
+    svc.update(constraints=pin_constraints(_service_constraints(svc), node_fqdn))
 
 
 def _unpin_services_from_node(client, node_fqdn: str, *, log=None, dry_run: bool = False) -> int:
@@ -317,7 +322,7 @@ def rebalance(ctx, dry_run, no_push, max_moves):
     if not docker_uri:
         raise click.ClickException("Missing required config: DOCKER_URI")
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -481,6 +486,65 @@ def plan_rebalance(per_node: dict[str, list], eligible: list[str],
     return moves
 
 
+@node.command()
+@click.option("-N", "--dry-run", is_flag=True,
+              help="Show the planned moves without changing anything.")
+@click.option("--no-push", is_flag=True,
+              help="Skip the safety git-push to GitHub before moving each host.")
+@click.option("--max-moves", type=int, default=None,
+              help="Cap the number of hosts moved (default AUTOSCALE_REPACK_MAX_MOVES).")
+@click.pass_context
+def repack(ctx, dry_run, no_push, max_moves):
+    """Empty sparse nodes by moving their idle hosts onto fuller nodes.
+
+    The opposite of `rebalance`: a node whose hosts are all quiescent and
+    fill at most AUTOSCALE_REPACK_SPARSE_FRACTION of its slots has them moved
+    to fuller nodes, so autoscale can remove it once its cooldown passes.
+    Nodes carrying hosts of classes that have not started are left alone.
+    The autoscale cycle does this on its own with AUTOSCALE_REPACK=true.
+    """
+    from datetime import datetime, timezone
+
+    from tabulate import tabulate
+
+    from cspawn.cli.util import get_app
+    from cspawn.cs_docker.autoscale import gather_cluster_state, protected_node_fqdns
+    from cspawn.cs_docker.repack import apply_repack, gather_repack_hosts, plan_repack
+    from cspawn.cs_docker.snapshot import SwarmSnapshot
+
+    cfg = get_config()
+    docker_uri = cfg.get("DOCKER_URI")
+    if not docker_uri:
+        raise click.ClickException("Missing required config: DOCKER_URI")
+    try:
+        client = docker_client(cfg, docker_uri)
+    except Exception as e:
+        raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
+    app = get_app(ctx)
+
+    now = datetime.now(timezone.utc)
+    node_dicts, _, _, class_rows, host_rows, _ = gather_cluster_state(app, client, cfg)
+    snap = SwarmSnapshot.build(client, label="jtl.codeserver=true")
+    plan = plan_repack(node_dicts, gather_repack_hosts(app, snap), cfg,
+                       protected_node_fqdns(node_dicts, class_rows, host_rows, now), max_moves=max_moves)
+
+    if not plan.moves:
+        click.echo("No sparse nodes with only idle hosts to empty.")
+        return
+    click.echo(tabulate([(h.username, h.node, target.split(".")[0]) for h, target in plan.moves],
+                        headers=["Host", "From", "To"], tablefmt="github"))
+    saving = f", saving ${plan.saving_hourly:.3f}/h" if plan.saving_hourly is not None else ""
+    click.echo(f"\nEmpties {len(plan.emptied)} node(s): {', '.join(plan.emptied)}{saving}")
+
+    if dry_run:
+        click.echo("Dry run — nothing changed.")
+        return
+    result = apply_repack(app, snap, plan, dry_run=False, push=not no_push)
+    for err in result.errors:
+        click.echo(f"  {err}")
+    click.echo(f"Repack complete: {result.moved} moved, {len(result.failed)} failed.")
+
+
 def _compute_fingerprint(pub_key_str: str) -> str:
     """Compute MD5 fingerprint for an OpenSSH public key string."""
     try:
@@ -733,7 +797,8 @@ def _major(v: str | None) -> int | None:
 
 
 def _verify_node_provisioning(ip: str, key_path: Path, *, expected_docker_version: str | None,
-                              ssh_checks: int = 3, retry_delay: float = 2.0, log=None) -> list[str]:
+                              ssh_checks: int = 3, retry_delay: float = 2.0, log=None,
+                              manifest: GoldenManifest | None = None) -> list[str]:
     """Hard-fail verification that a just-joined node was actually provisioned.
 
     Distinct from (and run after) `_wait_for_cloud_init`'s best-effort wait:
@@ -750,7 +815,9 @@ def _verify_node_provisioning(ip: str, key_path: Path, *, expected_docker_versio
           when the node's docker major version (parsed via the shared
           `_major()` helper) doesn't match the expected major. Docker Swarm
           only requires major-version compatibility, so a patch/minor-only
-          difference passes.
+          difference passes. When the node booted from a golden snapshot
+          whose `manifest` records a docker version with the expected
+          major, the check is already satisfied and is not run.
       (c) `cloud-init status` — appends a failure with the actual status text
           when the output doesn't contain `"status: done"`.
 
@@ -780,7 +847,12 @@ def _verify_node_provisioning(ip: str, key_path: Path, *, expected_docker_versio
     # Check (b): docker --version's major matches the expected pin's major
     # (skipped when unknown). Swarm only requires major-version compatibility,
     # so a patch/minor difference is not a failure.
-    if expected_docker_version is not None:
+    if (expected_docker_version is not None and manifest is not None
+            and _major(manifest.docker_version) == _major(expected_docker_version)):
+        if log:
+            log.info(f"[expand] verify: docker {manifest.docker_version} baked into "
+                     f"{manifest.snapshot_name or 'golden snapshot'}; skipping docker --version")
+    elif expected_docker_version is not None:
         try:
             _code, out, err = _ssh_exec(ip, "root", key_path, "docker --version")
             docker_version_output = (out or err or "").strip()
@@ -963,46 +1035,182 @@ def _get_prepull_images(cfg: dict) -> list[str]:
     return result
 
 
+class _SshSession:
+    """One SSH connection to `host`, shared by several commands.
+
+    Each `run`/`stream` opens its own channel on the same transport, so a
+    multi-step job (inspect, then pull) pays for one handshake and one UFW
+    rate-limit slot instead of one per command.
+    """
+
+    def __init__(self, host: str, username: str, key_path: Path, *, connect_timeout: int = 15):
+        self.host = host
+        self._ssh = paramiko.SSHClient()
+        self._ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        pkey = paramiko.RSAKey.from_private_key_file(str(key_path))
+        self._ssh.connect(host, username=username, pkey=pkey, look_for_keys=False, timeout=connect_timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._ssh.close()
+
+    def run(self, cmd: str, *, command_timeout: float | None = None) -> tuple[int, str, str]:
+        _stdin, stdout, stderr = self._ssh.exec_command(cmd)
+        if command_timeout is not None:
+            stdout.channel.settimeout(command_timeout)
+        out = stdout.read().decode()
+        err = stderr.read().decode()
+        return stdout.channel.recv_exit_status(), out, err
+
+    def stream(self, cmd: str, on_line, *, idle_timeout: float | None = None) -> int:
+        """Run `cmd`, calling `on_line` with each output line (stderr merged) as it arrives.
+
+        `idle_timeout` bounds the wait for the *next* line, not the whole
+        command; a wedged command raises `socket.timeout`.
+        """
+        _stdin, stdout, _stderr = self._ssh.exec_command(cmd)
+        stdout.channel.set_combine_stderr(True)
+        if idle_timeout is not None:
+            stdout.channel.settimeout(idle_timeout)
+        for line in iter(stdout.readline, ""):
+            on_line(line.rstrip("\n"))
+        return stdout.channel.recv_exit_status()
+
+
+def _prepull_options(cfg: dict) -> dict:
+    """`_prepull_images` keyword arguments from config."""
+    from cspawn.util.config import cfg_int
+
+    return {
+        "timeout": cfg.get("NODE_PREPULL_TIMEOUT_S", 300),
+        "concurrency": cfg_int(cfg, "NODE_PREPULL_CONCURRENCY", DEFAULT_CONCURRENCY),
+        "mirrors": parse_mirrors(cfg.get("NODE_PREPULL_MIRRORS")),
+    }
+
+
 def _prepull_images(ip: str, key_path: Path, images: list[str], *, timeout: float = 300.0,
-                     log=None) -> dict[str, bool]:
-    """Best-effort pre-pull of `images` onto the node at `ip`, over SSH.
-
-    For each image, runs `docker pull <image>` on the node itself via
-    `_ssh_exec(..., command_timeout=timeout)` — the spawner has SSH+key
-    access to nodes but ships no local `docker` CLI, so this mirrors the
-    node-local `ssh <node> docker ...` pattern `CodeHostRepo.push()` already
-    uses for the identical reason. Every code-server image is public on
-    ghcr, so no registry auth is involved.
-
-    Any per-image failure, non-zero exit, or timeout is caught, logged as a
-    WARNING naming the image, and the loop continues to the next image —
-    this never raises and never aborts the batch over one bad image. The
-    caller (`expand()`/`apply_plan()`) activates the node regardless of the
-    outcome here — pre-pull is best-effort, not a hard gate.
+                    concurrency: int = DEFAULT_CONCURRENCY, mirrors: dict[str, str] | None = None,
+                    log=None) -> dict[str, bool]:
+    """Best-effort pre-pull of `images` onto the node at `ip`, over one SSH session.
+
+    The spawner has SSH+key access to nodes but ships no local `docker` CLI,
+    so this mirrors the node-local `ssh <node> docker ...` pattern
+    `CodeHostRepo.push()` already uses for the identical reason. Every
+    code-server image is public on ghcr, so no registry auth is involved.
+
+    On a single connection (`_SshSession`) it first reads each image's layer
+    digests (`docker manifest inspect -v`), then runs a node-side script
+    (`cspawn.cs_docker.prepull.pull_script`) that pulls in layer-ordered
+    waves, at most `concurrency` at a time, each pull bounded by `timeout`.
+    Images whose registry has an entry in `mirrors` are pulled from the
+    mirror first, falling back to the origin. Per-image progress is logged
+    as it streams in, which is what lands in a `NodeOp`'s log.
+
+    Any per-image failure or timeout is logged as a WARNING naming the image
+    and never aborts the other pulls; a session failure marks every image
+    not yet reported as failed. This never raises. The caller
+    (`expand()`/`apply_plan()`) activates the node regardless of the outcome
+    here — pre-pull is best-effort, not a hard gate.
 
     Returns `{image: success}` so callers/tests can inspect per-image
     outcome without depending on log-scraping.
     """
+    if not images:
+        return {}
+    progress = PullProgress()
+
+    def on_line(line: str) -> None:
+        msg = progress.feed(line)
+        if msg and log:
+            log.info(f"[prepull] {ip} {msg}")
+
+    try:
+        with _SshSession(ip, "root", key_path) as session:
+            try:
+                _code, out, _err = session.run(inspect_script(images), command_timeout=60)
+                progress.layers = parse_inspect(out)
+            except Exception as e:
+                if log:
+                    log.warning(f"[prepull] Could not inspect image layers on {ip} ({e}); pulling unordered")
+            waves = plan_waves(images, progress.layers)
+            if log:
+                log.info(f"[prepull] {ip}: pulling {len(images)} image(s) in {len(waves)} wave(s), "
+                         f"{concurrency} at a time" + (f" via mirrors {mirrors}" if mirrors else ""))
+            session.stream(
+                pull_script(waves, concurrency=concurrency, timeout=timeout, mirrors=mirrors),
+                on_line, idle_timeout=timeout + 30,
+            )
+    except Exception as e:
+        if log:
+            log.warning(f"[prepull] Pre-pull session on {ip} failed/timed out: {e}")
+
     results: dict[str, bool] = {}
     for image in images:
-        try:
-            code, out, err = _ssh_exec(
-                ip, "root", key_path, f"docker pull {image}", command_timeout=timeout,
-            )
-            success = code == 0
-            results[image] = success
-            if not success and log:
-                log.warning(
-                    f"[expand] docker pull {image} on {ip} exited {code}: "
-                    f"{(err or out or '').strip()}"
-                )
-        except Exception as e:
-            results[image] = False
-            if log:
-                log.warning(f"[expand] docker pull {image} on {ip} failed/timed out: {e}")
+        results[image] = progress.results.get(image, False)
+        if not results[image] and log:
+            detail = progress.details.get(image) or "no result reported"
+            log.warning(f"[expand] docker pull {image} on {ip} failed: {detail}")
     return results
 
 
+def _resolve_node_image(cfg: dict, mgr: digitalocean.Manager, manager_client: docker.DockerClient, *,
+                        do_image: str, do_region: str, log=None) -> tuple[str, str | None]:
+    """Choose the image a new node boots from: `(image, golden snapshot name or None)`.
+
+    With ``NODE_GOLDEN_SNAPSHOT`` on (the default), returns the id of the
+    newest golden snapshot in `do_region` whose docker major matches the
+    manager's (`cspawn.cs_docker.golden.select_snapshot`). Falls back to
+    `do_image` (``DO_IMAGE``), the pre-snapshot path, when the feature is off,
+    nothing qualifies, or DigitalOcean can't be listed. Never raises.
+    """
+    from cspawn.util.config import cfg_bool
+
+    if not cfg_bool(cfg, "NODE_GOLDEN_SNAPSHOT", True):
+        return do_image, None
+    try:
+        snap = select_snapshot(
+            mgr.get_droplet_snapshots(),
+            docker_version=_manager_docker_version(manager_client),
+            region=do_region,
+        )
+    except Exception as e:
+        if log:
+            log.warning(f"[expand] Could not list golden snapshots ({e}); using DO_IMAGE={do_image}")
+        return do_image, None
+    if snap is None:
+        if log:
+            log.info(f"[expand] No compatible golden snapshot in {do_region}; using DO_IMAGE={do_image}")
+        return do_image, None
+    if log:
+        log.info(f"[expand] Booting from golden snapshot {snap.name} (id={snap.id})")
+    return str(snap.id), snap.name
+
+
+def _golden_cloud_init(cfg: dict) -> str:
+    return cfg.get("DO_GOLDEN_CLOUD_INIT") or DEFAULT_GOLDEN_CLOUD_INIT
+
+
+def _read_golden_manifest(ip: str, key_path: Path, *, log=None) -> GoldenManifest | None:
+    """Read the golden manifest baked into the node at `ip`; `None` if it has none.
+
+    Snapshots built by `scripts/build-golden-node-snapshot.sh` carry no
+    manifest, so `None` is the normal answer for them. Never raises.
+    """
+    try:
+        code, out, _err = _ssh_exec(ip, "root", key_path, f"cat {MANIFEST_PATH}")
+    except Exception as e:
+        if log:
+            log.warning(f"[expand] Could not read golden manifest on {ip}: {e}")
+        return None
+    manifest = GoldenManifest.from_json(out) if code == 0 else None
+    if manifest is not None and log:
+        log.info(f"[expand] Node {ip} has golden manifest: docker {manifest.docker_version}, "
+                 f"{len(manifest.images)} baked image(s)")
+    return manifest
+
+
 def _resolve_ip(hostname: str) -> str | None:
     try:
         return socket.gethostbyname(hostname)
@@ -1714,11 +1922,16 @@ def _resolve_cloud_init_path(cfg: dict) -> Path | None:
 def _create_droplet(ctx, *, mgr: digitalocean.Manager, manager_client: docker.DockerClient, name_template: str,
                     do_token: str, do_region: str, do_size: str, do_image: str, project_selector: str | None,
                     desired_serial: int | None, docker_uri: str, do_tag: str | None = None,
-                    tier: "Tier | None" = None, node_op_id: str | None = None) -> tuple[digitalocean.Droplet, str, str, str]:
+                    tier: "Tier | None" = None, node_op_id: str | None = None,
+                    cloud_init: str | None = None) -> tuple[digitalocean.Droplet, str, str, str]:
     """Create droplet for next or specific serial. Idempotent if desired_serial provided.
 
     When ``tier`` is provided it takes precedence over ``do_size`` for the droplet slug.
 
+    ``cloud_init`` names a file under ``config/cloud-init`` to use instead of
+    the configured ``DO_CLOUD_INIT``; callers booting from a golden snapshot
+    pass the slimmer ``DO_GOLDEN_CLOUD_INIT`` (see `_resolve_node_image`).
+
     Cloud-init user-data is resolved via `_resolve_cloud_init_path` *before* any
     DigitalOcean side effect (SSH-key upload, `droplet.create()`): if
     ``DO_CLOUD_INIT``/``DO_CLOUD_INIT_FILE`` is configured but the resolved file is
@@ -1791,7 +2004,7 @@ def _create_droplet(ctx, *, mgr: digitalocean.Manager, manager_client: docker.Do
         # fail with zero side effects, not just before droplet.create(). Unset
         # is an explicit operator opt-out and proceeds with user_data=None.
         user_data = None
-        cip = _resolve_cloud_init_path(config)
+        cip = _resolve_cloud_init_path({"DO_CLOUD_INIT": cloud_init} if cloud_init else config)
         if cip is None:
             log.info("[expand] No CLOUD_INIT_FILE configured; proceeding without user-data")
         else:
@@ -2287,7 +2500,7 @@ def expand_info(ctx, show_all: bool):
 
     # Docker client
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -2459,7 +2672,7 @@ def _sync_domain_records(ctx) -> None:
 
     # Connect to docker
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -2594,7 +2807,7 @@ def expand_purge(ctx, dry_run: bool):
 
     # Connect to docker
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -2831,7 +3044,7 @@ def stop_node(ctx, force: bool, dry_run: bool, node_spec: str):
         # unreschedulable. Never blocks the force-destroy escape hatch.
         if docker_uri:
             try:
-                _mc = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+                _mc = docker_client(cfg, docker_uri)
                 n = _unpin_services_from_node(_mc, fqdn, log=log)
                 if n:
                     log.info(f"[stop] Cleared {n} node pin(s) before force-destroying {fqdn}")
@@ -2849,7 +3062,7 @@ def stop_node(ctx, force: bool, dry_run: bool, node_spec: str):
     if not docker_uri:
         raise click.ClickException("Missing DOCKER_URI in configuration for graceful stop")
     try:
-        manager_client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        manager_client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -2917,7 +3130,7 @@ def expand(ctx, project_selector: str | None, create_only: bool, create_serial:
     if not docker_uri:
         raise click.ClickException("Missing DOCKER_URI in configuration")
     try:
-        manager_client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        manager_client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -2944,7 +3157,11 @@ def expand(ctx, project_selector: str | None, create_only: bool, create_serial:
     last_fqdn = None
 
     # CREATE
+    golden_name = None
     if do_all or create_only or create_serial is not None:
+        do_image, golden_name = _resolve_node_image(
+            cfg, mgr, manager_client, do_image=do_image, do_region=do_region, log=log,
+        )
         droplet, ip, fqdn, shortname = _create_droplet(
             ctx,
             mgr=mgr,
@@ -2960,6 +3177,7 @@ def expand(ctx, project_selector: str | None, create_only: bool, create_serial:
             do_tag=do_tag,
             tier=tier,
             node_op_id=node_op_id,
+            cloud_init=_golden_cloud_init(cfg) if golden_name else None,
         )
         last_ip, last_shortname, last_fqdn = ip, shortname, fqdn
 
@@ -3024,11 +3242,14 @@ def expand(ctx, project_selector: str | None, create_only: bool, create_serial:
 
         log.info("[expand] Verifying node provisioning (SSH, docker version, cloud-init)")
         verify_key_path, _ = _ensure_priv_key()
+        # Only nodes this run booted from a golden snapshot can carry a manifest.
+        manifest = _read_golden_manifest(last_ip, verify_key_path, log=log) if golden_name else None
         expected_docker_version = _manager_docker_version(manager_client) or _expected_docker_version(cfg)
         failures = _verify_node_provisioning(
             last_ip, verify_key_path,
             expected_docker_version=expected_docker_version,
             log=log,
+            manifest=manifest,
         )
         if failures:
             for failure in failures:
@@ -3076,9 +3297,11 @@ def expand(ctx, project_selector: str | None, create_only: bool, create_serial:
         except Exception as e:
             log.warning(f"[expand] Failed to resolve pre-pull image list: {e}")
             images = []
+        if manifest is not None:
+            images = manifest.missing_images(images)
         _prepull_images(
             last_ip, verify_key_path, images,
-            timeout=cfg.get("NODE_PREPULL_TIMEOUT_S", 300), log=log,
+            log=log, **_prepull_options(cfg),
         )
         activate_node_obj = node_obj or _find_swarm_node(manager_client, last_fqdn, last_shortname)
         if activate_node_obj is not None:
@@ -3136,7 +3359,7 @@ def label_backfill(ctx, do_apply: bool):
 
     # Connect to swarm manager
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager: {e}")
 
@@ -3341,7 +3564,7 @@ def contract_node(ctx, dry_run: bool, force_drain: bool):
         raise click.ClickException("Missing DOCKER_URI or DO_NAMES in configuration")
 
     try:
-        client = docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        client = docker_client(cfg, docker_uri)
     except Exception as e:
         raise click.ClickException(f"Failed to connect to docker manager at {docker_uri}: {e}")
 
@@ -3380,7 +3603,7 @@ def contract_node(ctx, dry_run: bool, force_drain: bool):
     ctx.invoke(stop_node, force=False, dry_run=False, node_spec=fqdn)
 
 
-@node.command(name="autoscale")
+@node.group(name="autoscale", invoke_without_command=True)
 @click.option(
     "-N", "--dry-run",
     is_flag=True,
@@ -3409,12 +3632,358 @@ def autoscale_cmd(ctx, dry_run: bool, force: bool, up_only):
     (it also bypasses the scale-down cooldown). AUTOSCALE_DRY_RUN still
     applies, so pair --force with a config where AUTOSCALE_DRY_RUN=false
     (or run --dry-run first) to control whether mutations actually occur.
+
+    `autoscale simulate` replays a trace through the planner instead.
     """
+    if ctx.invoked_subcommand is not None:
+        return
     from cspawn.cs_docker.autoscale import run_autoscale
     result = run_autoscale(ctx, dry_run=dry_run, force=force, up_only=up_only)
+    for line in result.timings_summary():
+        click.echo(line)
     click.echo(result.summary())
 
 
+def _parse_sweep(values: tuple[str, ...]) -> list[dict]:
+    """``("A=1,2", "B=x")`` -> one override dict per combination."""
+    runs: list[dict] = [{}]
+    for spec in values:
+        key, sep, raw = spec.partition("=")
+        if not sep or not key:
+            raise click.BadParameter(f"expected KEY=V1[,V2...], got {spec!r}", param_hint="--set")
+        runs = [{**run, key.strip(): v.strip()} for run in runs for v in raw.split(",")]
+    return runs
+
+
+@autoscale_cmd.command(name="simulate")
+@click.option("--trace", "trace_path", type=click.Path(exists=True, dir_okay=False),
+              help="Replay this trace JSON (see cspawn/cs_docker/simulate.py).")
+@click.option("--synthetic", is_flag=True,
+              help="Generate the trace from class schedules instead of recorded starts.")
+@click.option("--days", type=int, default=7, show_default=True,
+              help="Days of recorded history to replay, or of schedule to generate.")
+@click.option("--set", "overrides", multiple=True, metavar="KEY=V1[,V2...]",
+              help="Override a config knob; comma-separated values run one simulation each. Repeatable.")
+@click.option("--interval", type=int, default=2, show_default=True, help="Minutes between autoscale cycles.")
+@click.option("--save-trace", type=click.Path(dir_okay=False), help="Write the trace used to this file.")
+@click.pass_context
+def autoscale_simulate(ctx, trace_path, synthetic: bool, days: int, overrides, interval: int, save_trace):
+    """Replay a demand trace through the autoscale planner and report cost, waits and flaps.
+
+    Without --trace, the trace comes from the database: the last --days of
+    recorded host starts (default), or --synthetic sessions generated from
+    class schedules for the next --days. Nothing is changed anywhere.
+
+    Example: --set AUTOSCALE_HEADROOM=0,2,4 --set AUTOSCALE_SCALEDOWN_COOLDOWN_MIN=15,30
+    """
+    from datetime import datetime, timedelta, timezone
+
+    from tabulate import tabulate
+
+    from cspawn.cs_docker.simulate import Trace, recorded_trace, simulate, synthetic_trace
+
+    cfg = get_config()
+    runs = _parse_sweep(overrides)
+
+    if trace_path:
+        trace = Trace.from_json(Path(trace_path).read_text())
+    else:
+        from cspawn.cli.util import get_app
+        from cspawn.cs_docker.autoscale import gather_demand_history
+        from cspawn.util.config import cfg_int
+
+        now = datetime.now(timezone.utc)
+        history_days = days + cfg_int(cfg, "AUTOSCALE_FORECAST_HISTORY_DAYS", 56)
+        classes, arrivals, durations = gather_demand_history(get_app(ctx), cfg, now, history_days=history_days)
+        session_min = cfg_int(cfg, "AUTOSCALE_FORECAST_SESSION_MIN", 120)
+        if synthetic:
+            trace = synthetic_trace(classes, start=now, end=now + timedelta(days=days),
+                                    session_min=session_min, provision_s=durations or None)
+        else:
+            trace = recorded_trace(classes, arrivals, durations, start=now - timedelta(days=days), end=now,
+                                   session_min=session_min)
+    if save_trace:
+        Path(save_trace).write_text(trace.to_json())
+
+    click.echo(f"Trace {trace.start:%Y-%m-%d %H:%M} .. {trace.end:%Y-%m-%d %H:%M}: {len(trace.hosts)} host(s), "
+               f"{len(trace.classes)} class(es), {len(trace.provision_s)} provisioning latency sample(s)")
+    rows = []
+    for run in runs:
+        result = simulate(trace, {**dict(cfg.items()), **run}, interval_min=interval)
+        rows.append([
+            " ".join(f"{k}={v}" for k, v in run.items()) or "(current config)",
+            " ".join(f"{k}={v:.1f}" for k, v in sorted(result.node_hours.items())),
+            f"{result.waited}/{len(result.waits_s)}",
+            f"{result.wait_percentile(50) / 60:.1f}",
+            f"{result.wait_percentile(95) / 60:.1f}",
+            result.unserved,
+            f"{result.adds}/{result.removes}",
+            result.flaps,
+        ])
+    click.echo(tabulate(rows, headers=["Config", "Node-hours", "Waited", "Wait p50 min", "Wait p95 min",
+                                       "Unserved", "Adds/removes", "Flaps"]))
+
+
+# ---------------------------------------------------------------------------
+# forecast — schedule-driven demand forecast (see cspawn/cs_docker/forecast.py)
+# ---------------------------------------------------------------------------
+
+@node.group(name="forecast")
+def forecast_group():
+    """Inspect and backtest the autoscaler's demand forecast."""
+
+
+@forecast_group.command(name="show")
+@click.option("--hours", type=int, default=4, show_default=True, help="How far ahead to show.")
+@click.pass_context
+def forecast_show(ctx, hours: int):
+    """Print the forecast demand series from now, and the lead time applied to it."""
+    from datetime import datetime, timezone
+
+    from cspawn.cli.util import get_app
+    from cspawn.cs_docker.autoscale import gather_demand_history
+    from cspawn.cs_docker.forecast import build_forecast
+
+    cfg = get_config()
+    now = datetime.now(timezone.utc)
+    classes, arrivals, durations = gather_demand_history(get_app(ctx), cfg, now)
+    fc = build_forecast(classes, arrivals, durations, cfg, now)
+    horizon = now.timestamp() + hours * 3600
+    rows = [[t.strftime("%a %H:%M"), v] for t, v in fc.series if v and t.timestamp() <= horizon]
+    source = f"median of {len(durations)} expand op(s)" if durations else "AUTOSCALE_FORECAST_LEAD_MIN"
+    click.echo(f"{len(classes)} scheduled class(es), {len(arrivals)} recorded start(s), "
+               f"lead time {int(fc.lead.total_seconds() // 60)} min ({source})")
+    if not rows:
+        click.echo(f"No demand forecast in the next {hours} hour(s).")
+        return
+    from tabulate import tabulate
+    click.echo(tabulate(rows, headers=["Time (UTC)", "Hosts"]))
+    click.echo(f"\nestimate_demand would now see a forecast peak of {fc.peak(now)}.")
+
+
+@forecast_group.command(name="backtest")
+@click.option("--days", type=int, default=28, show_default=True, help="How many past days to replay.")
+@click.option("-v", "--verbose", is_flag=True, help="Print one row per session.")
+@click.pass_context
+def forecast_backtest(ctx, days: int, verbose: bool):
+    """Replay recorded sessions: forecast each from earlier history, compare with what happened."""
+    from datetime import datetime, timedelta, timezone
+
+    from tabulate import tabulate
+
+    from cspawn.cli.util import get_app
+    from cspawn.cs_docker.autoscale import gather_demand_history
+    from cspawn.util.config import cfg_int
+    from cspawn.cs_docker.forecast import backtest, backtest_summary
+
+    cfg = get_config()
+    now = datetime.now(timezone.utc)
+    # Sessions early in the window learn from history before it.
+    history_days = days + cfg_int(cfg, "AUTOSCALE_FORECAST_HISTORY_DAYS", 56)
+    classes, arrivals, _ = gather_demand_history(get_app(ctx), cfg, now, history_days=history_days)
+    rows = backtest(classes, arrivals, cfg, start=now - timedelta(days=days), end=now)
+    if verbose and rows:
+        click.echo(tabulate(
+            [[r.session.strftime("%Y-%m-%d %H:%M"), r.class_id, r.learned_from, r.predicted, r.actual, r.baseline]
+             for r in rows],
+            headers=["Session (UTC)", "Class", "Learned from", "Predicted", "Actual", "Flat"],
+        ))
+        click.echo()
+    summary = backtest_summary(rows)
+    if not summary["sessions"]:
+        click.echo(f"No scheduled sessions in the last {days} day(s).")
+        return
+    click.echo(
+        f"{summary['sessions']} session(s): MAE {summary['mae']:.1f} hosts (flat {summary['baseline_mae']:.1f}), "
+        f"bias {summary['bias']:+.1f}, under-forecast {summary['under']}"
+    )
+
+
+# ---------------------------------------------------------------------------
+# snapshot — golden node snapshots (see cspawn/cs_docker/golden.py)
+# ---------------------------------------------------------------------------
+
+def _run_golden_script(ip: str, key_path: Path, script: str, *, ok_marker: str, env: dict | None = None,
+                       timeout: float = 1800, log=None) -> None:
+    """Run ``config/golden/<script>`` on the builder as root; raise unless it prints `ok_marker`."""
+    text = (Path(find_parent_dir()) / "config" / "golden" / script).read_text()
+    prefix = " ".join(f"{k}={shlex.quote(v)}" for k, v in (env or {}).items())
+    if log:
+        log.info(f"[snapshot] Running {script} on {ip}")
+    code, out, err = _ssh_exec(ip, "root", key_path, f"{prefix} bash -c {shlex.quote(text)}".strip(),
+                               connect_timeout=20, command_timeout=timeout)
+    if code != 0 or ok_marker not in out:
+        tail = "\n".join((err or out or "").strip().splitlines()[-20:])
+        raise click.ClickException(f"[snapshot] {script} failed on {ip} (exit {code}):\n{tail}")
+
+
+def _build_golden_snapshot(cfg: dict, *, docker_version: str, images: list[str],
+                           log) -> tuple[str, str | None, GoldenManifest]:
+    """Build a golden snapshot; returns ``(snapshot name, snapshot id, manifest)``.
+
+    Creates a throwaway builder droplet from ``GOLDEN_BASE_IMAGE``, runs
+    ``config/golden/provision-node.sh`` (docker-ce pinned to
+    `docker_version` and held), pulls `images`, writes the digest manifest to
+    ``MANIFEST_PATH``, runs ``config/golden/clean-node.sh``, then powers off
+    and snapshots. The builder is destroyed on the way out, success or not.
+
+    An image that fails to pull is left out of the manifest, so nodes booted
+    from the snapshot still pre-pull it.
+    """
+    from datetime import datetime, timezone
+
+    from cspawn.cs_docker.golden import snapshot_name
+
+    do_token = cfg.get("DO_TOKEN")
+    do_region = cfg.get("DO_REGION") or cfg.get("DO_REGIOIN") or "sfo3"
+    now = datetime.now(timezone.utc)
+    name = snapshot_name(docker_version, now)
+    builder_name = f"golden-node-builder-{now:%Y%m%d-%H%M%S}"
+
+    mgr = digitalocean.Manager(token=do_token)
+    priv_key_path, pub_key_path = _ensure_priv_key()
+    ssh_keys = _collect_do_ssh_keys(mgr, do_token, pub_key_path, builder_name, log)
+    # Deliberately untagged: the builder must never look like a swarm node to
+    # tag-filtered listings (node info, purge).
+    droplet = digitalocean.Droplet(
+        token=do_token,
+        name=builder_name,
+        region=do_region,
+        image=cfg.get("GOLDEN_BASE_IMAGE") or "ubuntu-22-04-x64",
+        size_slug=cfg.get("GOLDEN_BUILDER_SIZE") or "s-2vcpu-4gb-amd",
+        ssh_keys=list(ssh_keys or []),
+        backups=False,
+        ipv6=False,
+    )
+    log.info(f"[snapshot] Creating builder droplet {builder_name} in {do_region}")
+    droplet.create()
+    try:
+        ip = _wait_for_droplet_active(mgr, droplet, log=log)
+        _wait_for_ssh(ip, log=log, key_path=priv_key_path)
+        _run_golden_script(ip, priv_key_path, "provision-node.sh", ok_marker="PROVISION_OK",
+                           env={"DOCKER_VERSION": docker_version}, log=log)
+
+        pulled = _prepull_images(ip, priv_key_path, images, log=log, **_prepull_options(cfg))
+        digests: dict[str, str] = {}
+        for image in (i for i, ok in pulled.items() if ok):
+            code, out, _err = _ssh_exec(
+                ip, "root", priv_key_path,
+                f"docker image inspect --format '{{{{index .RepoDigests 0}}}}' {shlex.quote(image)}",
+            )
+            if code == 0 and out.strip():
+                digests[image] = out.strip()
+        manifest = GoldenManifest(docker_version=docker_version, images=digests,
+                                  snapshot_name=name, built_at=now.isoformat())
+        code, _out, err = _ssh_exec(
+            ip, "root", priv_key_path,
+            f"mkdir -p {Path(MANIFEST_PATH).parent} && printf '%s\\n' {shlex.quote(manifest.to_json())} > {MANIFEST_PATH}",
+        )
+        if code != 0:
+            raise click.ClickException(f"[snapshot] Could not write {MANIFEST_PATH} on {ip}: {err}")
+        log.info(f"[snapshot] Baked {len(digests)}/{len(images)} image(s); manifest written")
+
+        _run_golden_script(ip, priv_key_path, "clean-node.sh", ok_marker="CLEAN_OK", timeout=600, log=log)
+
+        log.info(f"[snapshot] Powering off {builder_name}")
+        droplet.power_off(return_dict=False).wait(update_every_seconds=5, repeat=60)
+        log.info(f"[snapshot] Snapshotting {builder_name} as {name} (this takes several minutes)")
+        if not droplet.take_snapshot(name, return_dict=False).wait(update_every_seconds=15, repeat=240):
+            raise click.ClickException(f"[snapshot] Snapshot action for {name} did not complete")
+        snap_id = next((str(s.id) for s in mgr.get_droplet_snapshots() if s.name == name), None)
+    finally:
+        try:
+            droplet.destroy()
+            log.info(f"[snapshot] Destroyed builder droplet {builder_name}")
+        except Exception as e:
+            log.warning(f"[snapshot] Failed to destroy builder {builder_name} ({e}); destroy it manually")
+    return name, snap_id, manifest
+
+
+@node.group(name="snapshot")
+def snapshot_group():
+    """Build and list golden node snapshots."""
+    pass
+
+
+@snapshot_group.command(name="build")
+@click.option("--docker-version", "docker_version", required=False,
+              help="docker-ce X.Y.Z to bake (default: the swarm manager's live version)")
+@click.option("--keep", type=int, default=None,
+              help="After a successful build, delete all but the newest N golden snapshots")
+@click.option("-N", "--dry-run", is_flag=True, help="Only print what would be built")
+@click.pass_context
+def snapshot_build(ctx, docker_version: str | None, keep: int | None, dry_run: bool):
+    """Build a golden snapshot: docker pinned and held, every class image pulled.
+
+    New nodes (expand and autoscale) boot from the newest compatible golden
+    snapshot automatically; see docs/golden-node-snapshot.md.
+    """
+    from cspawn.cs_docker.golden import golden_snapshots
+    from cspawn.cli.util import get_app
+
+    log = get_logger(ctx)
+    cfg = get_config()
+    if not cfg.get("DO_TOKEN"):
+        raise click.ClickException("Missing DO_TOKEN in configuration")
+
+    if not docker_version:
+        docker_version = _manager_docker_version(docker_client(cfg, cfg.get("DOCKER_URI")))
+    if not docker_version or _major(docker_version) is None:
+        raise click.ClickException(
+            "Could not determine the docker version to bake; pass --docker-version X.Y.Z"
+        )
+
+    app = get_app(ctx)
+    with app.app_context():
+        images = _get_prepull_images(cfg)
+
+    click.echo(f"docker-ce {docker_version}, {len(images)} image(s):")
+    for image in images:
+        click.echo(f"  {image}")
+    if dry_run:
+        return
+
+    name, snap_id, manifest = _build_golden_snapshot(cfg, docker_version=docker_version,
+                                                     images=images, log=log)
+    click.echo(f"Built {name} (id={snap_id or '?'}) with {len(manifest.images)} baked image(s)")
+
+    if keep is not None and keep > 0:
+        mgr = digitalocean.Manager(token=cfg.get("DO_TOKEN"))
+        for old in golden_snapshots(mgr.get_droplet_snapshots())[keep:]:
+            try:
+                old.destroy()
+                click.echo(f"Deleted old snapshot {old.name} (id={old.id})")
+            except Exception as e:
+                log.warning(f"[snapshot] Failed to delete {old.name}: {e}")
+
+
+@snapshot_group.command(name="list")
+@click.pass_context
+def snapshot_list(ctx):
+    """List golden snapshots, marking the one new nodes would boot from."""
+    from tabulate import tabulate
+
+    from cspawn.cs_docker.golden import golden_snapshots, parse_snapshot_name
+
+    cfg = get_config()
+    do_region = cfg.get("DO_REGION") or cfg.get("DO_REGIOIN") or "sfo3"
+    snaps = golden_snapshots(digitalocean.Manager(token=cfg.get("DO_TOKEN")).get_droplet_snapshots())
+    if not snaps:
+        click.echo("No golden snapshots; new nodes boot from DO_IMAGE.")
+        return
+    manager_version = _manager_docker_version(docker_client(cfg, cfg.get("DOCKER_URI")))
+    chosen = select_snapshot(snaps, docker_version=manager_version, region=do_region)
+    rows = [
+        ["*" if s is chosen else "", s.name, s.id, parse_snapshot_name(s.name),
+         ",".join(getattr(s, "regions", None) or []), getattr(s, "size_gigabytes", "")]
+        for s in snaps
+    ]
+    click.echo(tabulate(rows, headers=["", "Name", "ID", "Docker", "Regions", "GB"]))
+    click.echo(f"\nManager docker-ce: {manager_version or 'unknown'}; region: {do_region}")
+    if chosen is None:
+        click.echo("No compatible snapshot; new nodes boot from DO_IMAGE.")
+
+
 # ---------------------------------------------------------------------------
 # op-run — detached subprocess worker for admin-triggered node operations
 # ---------------------------------------------------------------------------
@@ -23,7 +23,7 @@ def summary(ctx):
     - Additional status columns: Mod (modified_ago), Quiet (is_quiescent), MIA (is_mia), Purge (is_purgeable)
     """
     from tabulate import tabulate
-    from cspawn.models import CodeHost
+    from cspawn.models import CodeHost, db
     from datetime import datetime, timezone
 
     def format_time_ago(delta):
@@ -48,8 +48,11 @@ def summary(ctx):
     app = get_app(ctx)
 
     with app.app_context():
-        # Query all CodeHost records that have telemetry data
-        code_hosts = CodeHost.query.filter(
+        # Query all CodeHost records that have telemetry data, with the
+        # status columns computed by the database.
+        code_hosts = db.session.query(
+            CodeHost, CodeHost.modified_ago, CodeHost.is_quiescent, CodeHost.is_mia, CodeHost.is_purgeable
+        ).filter(
             CodeHost.last_heartbeat.isnot(None)
         ).order_by(CodeHost.last_heartbeat.desc()).all()
 
@@ -61,7 +64,7 @@ def summary(ctx):
         table_data = []
         now = datetime.now(timezone.utc)
         
-        for host in code_hosts:
+        for host, modified_ago, is_quiescent, is_mia, is_purgeable in code_hosts:
             # Format memory usage in MB
             memory_mb = round(host.memory_usage / 1024 / 1024) if host.memory_usage else None
             
@@ -82,7 +85,7 @@ def summary(ctx):
                 utilization_ago = format_time_ago(utilization_delta)
             
             # Format modified_ago as abbreviated time
-            modified_ago_formatted = f"{host.modified_ago}m" if host.modified_ago is not None else 'N/A'
+            modified_ago_formatted = f"{modified_ago}m" if modified_ago is not None else 'N/A'
             
             table_data.append([
                 host.service_name or 'N/A',
@@ -95,9 +98,9 @@ def summary(ctx):
                 heartbeat_ago or 'N/A',
                 utilization_ago or 'N/A',
                 modified_ago_formatted,
-                '✅' if host.is_quiescent else '',
-                '✅' if host.is_mia else '',
-                '✅' if host.is_purgeable else ''
+                '✅' if is_quiescent else '',
+                '✅' if is_mia else '',
+                '✅' if is_purgeable else ''
             ])
 
         # Define headers
@@ -125,16 +128,91 @@ def summary(ctx):
 @telem.command()
 @click.pass_context
 def count(ctx):
-    """Count the number of telemetry records."""
+    """Count telemetry history samples by resolution."""
+    from sqlalchemy import func
+
+    from cspawn.models import TelemetrySample, db
+
     app = get_app(ctx)
-    count = len(app.csm.keyrate)
-    print(f"Total telemetry records: {count}")
+    with app.app_context():
+        rows = (
+            db.session.query(TelemetrySample.resolution, func.count(TelemetrySample.id))
+            .group_by(TelemetrySample.resolution)
+            .order_by(TelemetrySample.resolution)
+            .all()
+        )
+    for resolution, n in rows:
+        print(f"{_resolution_label(resolution):>4}: {n}")
+    print(f"Total telemetry records: {sum(n for _, n in rows)}")
 
 
 @telem.command()
+@click.confirmation_option(prompt="Delete all telemetry history?")
 @click.pass_context
 def purge(ctx):
-    """Purge all telemetry data."""
+    """Purge all telemetry history."""
+    from cspawn.models import TelemetrySample, db
+
     app = get_app(ctx)
-    app.csm.keyrate.delete_all()
-    print("All telemetry data purged successfully")
+    with app.app_context():
+        deleted = TelemetrySample.query.delete(synchronize_session=False)
+        db.session.commit()
+    print(f"Purged {deleted} telemetry records")
+
+
+@telem.command()
+@click.pass_context
+def rollup(ctx):
+    """Roll telemetry history up into 1m/15m/1h buckets and apply retention.
+
+    Run from cron every few minutes; safe to repeat.
+    """
+    from cspawn.telem_history import apply_retention, rollup_telemetry
+
+    app = get_app(ctx)
+    with app.app_context():
+        written = rollup_telemetry(app.app_config)
+        deleted = apply_retention(app.app_config)
+    rolled = ", ".join(f"{_resolution_label(r)}={n}" for r, n in written.items())
+    print(f"Rolled up {rolled}; deleted {deleted} expired")
+
+
+@telem.command()
+@click.argument("username")
+@click.option("--hours", type=float, default=2.0, show_default=True, help="How far back to look.")
+@click.option("--resolution", type=click.Choice(["raw", "1m", "15m", "1h"]), default=None,
+              help="Sample resolution (default: finest still retained).")
+@click.pass_context
+def history(ctx, username, hours, resolution):
+    """Show USERNAME's telemetry history."""
+    from datetime import datetime, timedelta, timezone
+
+    from tabulate import tabulate
+
+    from cspawn.telem_history import series
+
+    labels = {"raw": 0, "1m": 60, "15m": 900, "1h": 3600}
+    app = get_app(ctx)
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    with app.app_context():
+        points = series(app.app_config, username, since,
+                        resolution=labels[resolution] if resolution else None)
+    if not points:
+        print(f"No telemetry history for {username} in the last {hours:g}h.")
+        return
+
+    def _mb(b):
+        return round(b / 1024 / 1024) if b is not None else None
+
+    def _r(x):
+        return round(x, 3) if x is not None else None
+
+    print(tabulate(
+        [[p.ts.strftime("%Y-%m-%d %H:%M:%S"), _resolution_label(p.resolution), p.n, _mb(p.memory_avg),
+          _mb(p.memory_max), _r(p.activity_avg), _r(p.activity_max), p.last_edit or ""] for p in points],
+        headers=["Time (UTC)", "Res", "N", "Mem avg (MB)", "Mem max (MB)", "Act avg", "Act max", "Last edit"],
+    ))
+
+
+def _resolution_label(resolution: int) -> str:
+    return {0: "raw", 60: "1m", 900: "15m", 3600: "1h"}.get(resolution, f"{resolution}s")
@@ -164,11 +164,15 @@ def _percentile(values, pct):
     return s[k]
 
 
-def _start_one(app, user_id, proto_id, class_id, wait, timeout):
-    """Start a single host. Runs in its own thread with its own app context."""
+def _start_one(app, user_id, proto_id, class_id):
+    """Start a single host. Runs in its own thread with its own app context.
+
+    Readiness is not polled here; `start` probes every new host together once
+    the creates are done.
+    """
     import time
 
-    result = {"username": None, "ok": False, "err": None,
+    result = {"username": None, "ok": False, "err": None, "t0": None, "public_url": None,
               "create_s": None, "ready_s": None, "node_name": None}
     with app.app_context():
         try:
@@ -184,27 +188,16 @@ def _start_one(app, user_id, proto_id, class_id, wait, timeout):
                 return result
 
             t0 = time.monotonic()
+            result["t0"] = t0
             s, ch = app.csm.new_cs(user=user, proto=proto, class_=class_)
             if not s:
                 result["err"] = "new_cs returned no service"
                 return result
             result["create_s"] = round(time.monotonic() - t0, 2)
-
-            # Release the DB connection back to the pool before the long
-            # readiness poll — otherwise 20 worker threads each hold a session
-            # for the full timeout and exhaust the SQLAlchemy QueuePool.
-            db.session.remove()
-
-            if wait:
-                deadline = time.monotonic() + timeout
-                while time.monotonic() < deadline:
-                    if s.is_ready:
-                        result["ready_s"] = round(time.monotonic() - t0, 2)
-                        break
-                    time.sleep(2)
+            result["public_url"] = s.public_url
 
             s.sync_to_db()
-            ch = CodeHost.query.filter_by(service_name=username).first()
+            ch = CodeHost.query.filter_by(user_id=user.id).first()
             result["node_name"] = ch.node_name if ch else None
             result["ok"] = True
         except Exception as e:  # surface, don't swallow
@@ -246,7 +239,7 @@ def start(ctx, concurrency, no_wait, timeout):
     results = []
     with ThreadPoolExecutor(max_workers=concurrency) as ex:
         futures = [
-            ex.submit(_start_one, app, uid, proto_id, class_id, not no_wait, timeout)
+            ex.submit(_start_one, app, uid, proto_id, class_id)
             for uid in user_ids
         ]
         for fut in as_completed(futures):
@@ -255,14 +248,33 @@ def start(ctx, concurrency, no_wait, timeout):
             click.echo(
                 f"  {r['username']}: "
                 f"{'ok' if r['ok'] else 'FAIL'} "
-                f"create={r['create_s']}s ready={r['ready_s']}s "
+                f"create={r['create_s']}s "
                 f"node={r['node_name'] or '-'}"
                 + (f" ({r['err']})" if r['err'] else "")
             )
 
+    if not no_wait:
+        _wait_ready(app, results, timeout)
+
     _print_metrics(results)
 
 
+def _wait_ready(app, results, timeout):
+    """Probe all newly created hosts together until ready or `timeout`.
+
+    Fills in each result's ``ready_s`` (seconds from its create call).
+    """
+    created = [r for r in results if r["public_url"]]
+    if not created:
+        return
+    click.echo(f"Waiting up to {timeout}s for {len(created)} host(s) to become ready...")
+    ready_at = app.csm.readiness_prober().wait_all([r["public_url"] for r in created], timeout_s=timeout)
+    for r in created:
+        if r["public_url"] in ready_at:
+            r["ready_s"] = round(ready_at[r["public_url"]] - r["t0"], 2)
+    click.echo(f"  {len(ready_at)}/{len(created)} ready")
+
+
 def _print_metrics(results):
     """Print latency, node distribution, and failures from start results."""
     from tabulate import tabulate
@@ -32,6 +32,15 @@ allows the scale-down cooldown to work correctly across separate cron processes
 
     {"empty_since": {"swarm3.dojtl.net": "2026-06-26T10:00:00+00:00"}}
 
+With ``AUTOSCALE_FORECAST`` on, ``run_autoscale`` also passes a
+``DemandForecast`` (``cspawn/cs_docker/forecast.py``) built from class
+schedules and past host starts, and demand covers what the forecast expects
+within one provisioning lead time.
+
+Because the layer is pure, ``cspawn/cs_docker/simulate.py`` can replay a
+demand trace through it offline (``cspawnctl node autoscale simulate``) to
+measure a policy change before it ships.
+
 Config keys read by the pure layer (all with safe defaults):
   AUTOSCALE_HEADROOM              int   default 2
   AUTOSCALE_ROSTER_FRACTION       float default 0.8
@@ -39,24 +48,38 @@ Config keys read by the pure layer (all with safe defaults):
   AUTOSCALE_MAX_REMOVE_PER_CYCLE  int   default 1
   AUTOSCALE_SCALEDOWN_COOLDOWN_MIN int  default 30
   AUTOSCALE_MIN_WORKER_NODES      int   default 1
+  AUTOSCALE_CONSOLIDATE           bool  default false — replace idle nodes with one cheaper, larger node
+  AUTOSCALE_CONSOLIDATE_MAX_NODES int   default 4    — most idle nodes one consolidation replaces
+  AUTOSCALE_CONSOLIDATE_MIN_SAVING_HOURLY float default 0.01 — smallest saving (USD/h) worth a new droplet
+
+Scale-up picks the cheapest mix of ``NODE_TIERS`` that covers the deficit
+(``solve_tier_mix``); tier prices come from each tier's ``price_hourly``.
 
 Additional config keys read by the orchestrator layer:
   AUTOSCALE_ENABLED     bool  default false  — kill-switch; set to "true" to enable
   AUTOSCALE_DRY_RUN     bool  default true   — global dry-run; "false" allows mutations
+  AUTOSCALE_PARALLEL_ADDS int default 4      — scale-up nodes provisioned concurrently
+  AUTOSCALE_FORECAST    bool  default false  — add the schedule forecast to demand
+  AUTOSCALE_REPACK      bool  default false  — empty sparse nodes in quiet cycles (repack.py)
   DATA_DIR              str   default /tmp   — directory for sidecar state file + lock
 """
 from __future__ import annotations
 
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from math import ceil
 from typing import TYPE_CHECKING
 
-from cspawn.cs_docker.tiers import load_tiers, node_capacity
+from cspawn.cs_docker.tiers import Tier, load_tiers, node_capacity
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
 
 if TYPE_CHECKING:
-    pass  # no runtime imports of I/O-heavy modules
+    from cspawn.cs_docker.forecast import DemandForecast
 
 __all__ = [
     "NodeView",
@@ -67,43 +90,21 @@ __all__ = [
     "assess_cluster",
     "estimate_demand",
     "compute_deficit",
+    "solve_tier_mix",
     "plan_scale_up",
     "plan_scale_down",
+    "plan_consolidation",
+    "protected_node_fqdns",
     "build_plan",
     # Orchestrator (I/O layer)
     "gather_cluster_state",
+    "gather_demand_history",
     "apply_reaper_zones",
     "apply_plan",
     "run_autoscale",
 ]
 
 
-# ---------------------------------------------------------------------------
-# Config helpers
-# ---------------------------------------------------------------------------
-
-def _cfg_int(cfg, key: str, default: int) -> int:
-    """Read an integer config key; return *default* if absent or un-parseable."""
-    raw = cfg.get(key)
-    if raw is not None:
-        try:
-            return int(raw)
-        except (TypeError, ValueError):
-            pass
-    return default
-
-
-def _cfg_float(cfg, key: str, default: float) -> float:
-    """Read a float config key; return *default* if absent or un-parseable."""
-    raw = cfg.get(key)
-    if raw is not None:
-        try:
-            return float(raw)
-        except (TypeError, ValueError):
-            pass
-    return default
-
-
 # ---------------------------------------------------------------------------
 # Dataclasses
 # ---------------------------------------------------------------------------
@@ -151,15 +152,42 @@ class ScalePlan:
     remove_nodes: list[str] = field(default_factory=list)  # fqdns to remove
     purge_first: bool = False   # always True when remove_nodes is non-empty
     reason: str = ""
+    # tier name -> nodes to add, from solve_tier_mix. When set it is the
+    # authoritative add list (it may include middle tiers); add_large and
+    # add_small then count only the largest and smallest tier.
+    add_tiers: dict[str, int] = field(default_factory=dict)
+    # A consolidation replaces remove_nodes with the (cheaper) add_tiers:
+    # the adds run first, and the removes only if every add succeeded.
+    consolidate: bool = False
+    cost_delta_hourly: float | None = None  # None when any tier involved has no price
+
+    @property
+    def add_count(self) -> int:
+        return sum(self.add_tiers.values()) if self.add_tiers else self.add_large + self.add_small
+
+    def nodes_to_add(self, tiers: list[Tier]) -> list[Tier]:
+        """The tiers to provision, one entry per node, largest first."""
+        by_capacity = sorted(tiers, key=lambda t: t.capacity)
+        if not self.add_tiers:
+            return [by_capacity[-1]] * self.add_large + [by_capacity[0]] * self.add_small
+        return [t for t in reversed(by_capacity) for _ in range(self.add_tiers.get(t.name, 0))]
 
     def summary(self) -> str:
         """Return a single-line structured log string suitable for journald/logfmt."""
+        extra = ""
+        if self.add_tiers:
+            extra += "add_tiers=" + ",".join(f"{k}:{v}" for k, v in self.add_tiers.items() if v) + " "
+        if self.consolidate:
+            extra += "consolidate=True "
+        if self.cost_delta_hourly is not None:
+            extra += f"cost_delta_hourly={self.cost_delta_hourly:+.3f} "
         return (
             f"autoscale plan="
             f"add_large={self.add_large} "
             f"add_small={self.add_small} "
             f"remove={len(self.remove_nodes)} "
             f"purge_first={self.purge_first} "
+            f"{extra}"
             f'reason="{self.reason}"'
         )
 
@@ -178,6 +206,10 @@ class ApplyResult:
     dry_run: bool = False
     errors: list[str] = field(default_factory=list)
     would_remove: list[str] = field(default_factory=list)
+    # fqdn -> {stage: seconds} for each scale-up node that ran, in stage order
+    # (create, configure, join, verify, prepull, activate); a node that failed
+    # stops at the stage that failed.
+    stage_timings: dict[str, dict[str, float]] = field(default_factory=dict)
 
     def summary(self) -> str:
         """Return a single-line structured log string suitable for journald/logfmt."""
@@ -191,8 +223,28 @@ class ApplyResult:
         )
         if self.dry_run and self.would_remove:
             base += f" would_remove={','.join(self.would_remove)}"
+        if self.stage_timings:
+            slowest = max(sum(t.values()) for t in self.stage_timings.values())
+            base += f" scale_up_s={slowest:.1f}"
         return base
 
+    def timings_summary(self) -> list[str]:
+        """One logfmt line per scale-up node with its per-stage durations."""
+        return [
+            f"autoscale node={fqdn} " + " ".join(f"{stage}_s={secs:.1f}" for stage, secs in t.items())
+            for fqdn, t in sorted(self.stage_timings.items())
+        ]
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    """Record the wall time of the enclosed block as ``timings[stage]``, even on error."""
+    t0 = time.monotonic()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.monotonic() - t0, 3)
+
 
 # ---------------------------------------------------------------------------
 # Pure functions
@@ -276,7 +328,14 @@ def assess_cluster(
     return ClusterState(nodes=views, pending_hosts=pending)
 
 
-def estimate_demand(classes: list[dict], hosts: list[dict], cfg) -> int:
+def estimate_demand(
+    classes: list[dict],
+    hosts: list[dict],
+    cfg,
+    *,
+    forecast: "DemandForecast | None" = None,
+    now: datetime | None = None,
+) -> int:
     """Estimate the total number of host slots needed right now.
 
     This is the demand-signal seam. The caller (``gather_cluster_state``)
@@ -289,7 +348,8 @@ def estimate_demand(classes: list[dict], hosts: list[dict], cfg) -> int:
         prescale    = sum(ceil(len(c['students']) * ROSTER_FRACTION)
                           for c in classes
                           if purge_after <= now < purge_by)
-        demand      = max(live_load + pending, prescale) + HEADROOM
+        forecast    = forecast.peak(now), if a forecast is given
+        demand      = max(live_load + pending, prescale, forecast) + HEADROOM
 
     The prescale term counts only classes inside their active purge window
     (``purge_after <= now < purge_by``).  Classes in the protected zone
@@ -297,14 +357,19 @@ def estimate_demand(classes: list[dict], hosts: list[dict], cfg) -> int:
     zero prescale.  ``Class.running`` and ``stops_at`` are no longer used as
     scaling inputs.
 
+    The forecast term (``cspawn.cs_docker.forecast``) is the largest demand
+    predicted between now and one provisioning lead time from now, so
+    ``build_plan`` orders nodes early enough for them to be ready when a
+    scheduled class's students arrive.
+
     Config keys:
         AUTOSCALE_HEADROOM          (int,   default 2)
         AUTOSCALE_ROSTER_FRACTION   (float, default 0.8)
     """
-    headroom = _cfg_int(cfg, "AUTOSCALE_HEADROOM", 2)
-    roster_fraction = _cfg_float(cfg, "AUTOSCALE_ROSTER_FRACTION", 0.8)
+    headroom = cfg_int(cfg, "AUTOSCALE_HEADROOM", 2)
+    roster_fraction = cfg_float(cfg, "AUTOSCALE_ROSTER_FRACTION", 0.8)
 
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
 
     live_load = sum(
         1 for h in hosts
@@ -336,7 +401,9 @@ def estimate_demand(classes: list[dict], hosts: list[dict], cfg) -> int:
             student_count = len(c.get("students") or [])
             prescale += ceil(student_count * roster_fraction)
 
-    return max(live_load + pending, prescale) + headroom
+    predicted = forecast.peak(now) if forecast is not None else 0
+
+    return max(live_load + pending, prescale, predicted) + headroom
 
 
 def compute_deficit(state: ClusterState, demand: int, cfg) -> int:
@@ -347,21 +414,54 @@ def compute_deficit(state: ClusterState, demand: int, cfg) -> int:
     return max(0, demand - state.total_capacity)
 
 
-def plan_scale_up(deficit: int, cfg) -> tuple[int, int]:
-    """Greedy bin-pack to cover *deficit* host slots.
+def solve_tier_mix(deficit: int, tiers: list[Tier], max_add: int) -> dict[str, int]:
+    """Exact cheapest mix of new nodes, over every tier, covering *deficit* slots.
 
-    Uses ``load_tiers(cfg)`` to resolve large and small tier capacities.
-    If only one tier exists, both roles use the same tier.
+    A DP over ``(nodes added, capacity added)`` keeps the cheapest way to
+    reach each state with at most *max_add* nodes, then picks the best
+    final state by, in order:
 
-    Algorithm:
-        add_large = deficit // cap_large
-        rem       = deficit %  cap_large
-        if rem == 0:           add_small = 0
-        elif rem <= cap_small: add_small = 1
-        else:                  add_large += 1  (one more large is cheaper than two nodes)
+      1. uncovered deficit (when *max_add* nodes cannot cover it all, cover
+         as much as possible);
+      2. hourly cost, when every tier has ``price_hourly`` (without full
+         prices the costs are not comparable and this key is skipped);
+      3. number of nodes;
+      4. capacity added (least overshoot).
+
+    Without prices this reproduces the old largest-plus-one-small rule for
+    two tiers. Returns ``{tier name: count}`` with zero counts omitted.
+    """
+    if deficit <= 0 or max_add <= 0 or not tiers:
+        return {}
+    priced = all(t.price_hourly is not None for t in tiers)
+
+    # layer[capacity] = (cost, counts) for exactly n nodes
+    layer: dict[int, tuple[float, tuple[int, ...]]] = {0: (0.0, (0,) * len(tiers))}
+    best_key, best_counts = None, None
+    for n in range(1, max_add + 1):
+        nxt: dict[int, tuple[float, tuple[int, ...]]] = {}
+        for cap, (cost, counts) in layer.items():
+            for i, t in enumerate(tiers):
+                c2 = cap + t.capacity
+                cost2 = round(cost + (t.price_hourly or 0.0), 6)
+                if c2 not in nxt or cost2 < nxt[c2][0]:
+                    nxt[c2] = (cost2, counts[:i] + (counts[i] + 1,) + counts[i + 1:])
+        for cap, (cost, counts) in nxt.items():
+            key = (max(0, deficit - cap), cost if priced else 0.0, n, cap)
+            if best_key is None or key < best_key:
+                best_key, best_counts = key, counts
+        layer = nxt
+
+    return {t.name: c for t, c in zip(tiers, best_counts) if c}
+
+
+def plan_scale_up(deficit: int, cfg) -> tuple[int, int]:
+    """Two-tier view of ``solve_tier_mix``: ``(add_large, add_small)``.
 
-    Result is clamped so ``add_large + add_small <= AUTOSCALE_MAX_ADD_PER_CYCLE``.
-    ``add_small`` is reduced first; ``add_large`` is reduced last.
+    Solves over every tier in ``load_tiers(cfg)`` with at most
+    ``AUTOSCALE_MAX_ADD_PER_CYCLE`` nodes, and returns the counts for the
+    largest and smallest tier. ``build_plan`` keeps the full mix (which may
+    use middle tiers) in ``ScalePlan.add_tiers``.
 
     Returns:
         ``(add_large, add_small)``
@@ -370,36 +470,44 @@ def plan_scale_up(deficit: int, cfg) -> tuple[int, int]:
         return (0, 0)
 
     tiers = load_tiers(cfg)
-    # Sort ascending by capacity so index 0 = smallest, -1 = largest
-    sorted_tiers = sorted(tiers, key=lambda t: t.capacity)
-    cap_large = sorted_tiers[-1].capacity
-    cap_small = sorted_tiers[0].capacity
-
-    add_large = deficit // cap_large
-    rem = deficit % cap_large
-
-    if rem == 0:
-        add_small = 0
-    elif rem <= cap_small:
-        add_small = 1
-    else:
-        # Remainder can't be covered by one small node; add another large
-        add_large += 1
-        add_small = 0
-
-    max_add = _cfg_int(cfg, "AUTOSCALE_MAX_ADD_PER_CYCLE", 2)
-    total = add_large + add_small
-    if total > max_add:
-        # Reduce add_small first, then add_large
-        excess = total - max_add
-        reduce_small = min(add_small, excess)
-        add_small -= reduce_small
-        excess -= reduce_small
-        add_large = max(0, add_large - excess)
+    return _large_small(_scale_up_mix(deficit, tiers, cfg), tiers)
+
+
+def _scale_up_mix(deficit: int, tiers: list[Tier], cfg) -> dict[str, int]:
+    """The cheapest tier mix covering *deficit*, within ``AUTOSCALE_MAX_ADD_PER_CYCLE`` nodes."""
+    return solve_tier_mix(deficit, tiers, cfg_int(cfg, "AUTOSCALE_MAX_ADD_PER_CYCLE", 2))
+
 
+def _large_small(mix: dict[str, int], tiers: list[Tier]) -> tuple[int, int]:
+    """``(large, small)``: the counts of *mix* in the largest and smallest tier."""
+    sorted_tiers = sorted(tiers, key=lambda t: t.capacity)
+    add_large = mix.get(sorted_tiers[-1].name, 0)
+    add_small = mix.get(sorted_tiers[0].name, 0) if len(sorted_tiers) > 1 else 0
     return (add_large, add_small)
 
 
+def _mix_cost(mix: dict[str, int], tiers: list[Tier]) -> float | None:
+    by_name = {t.name: t for t in tiers}
+    prices = [by_name[k].price_hourly for k in mix]
+    if any(p is None for p in prices):
+        return None
+    return sum(by_name[k].price_hourly * v for k, v in mix.items())
+
+
+def _node_tier(node: NodeView, tiers: list[Tier]) -> Tier | None:
+    """The tier a node was created as: by its size-slug label, else by unique capacity."""
+    for t in tiers:
+        if node.size_slug and t.slug == node.size_slug:
+            return t
+    matches = [t for t in tiers if t.capacity == node.capacity]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _nodes_cost(nodes: list[NodeView], tiers: list[Tier]) -> float | None:
+    prices = [(_node_tier(n, tiers) or Tier("", "", 0)).price_hourly for n in nodes]
+    return None if any(p is None for p in prices) else sum(prices)
+
+
 def plan_scale_down(
     state: ClusterState,
     demand: int,
@@ -421,13 +529,15 @@ def plan_scale_down(
       - Removing it would still leave ``excess_capacity > candidate.capacity +
         AUTOSCALE_HEADROOM`` (dead-band guard).
       - Removing it would still leave ``>= AUTOSCALE_MIN_WORKER_NODES`` workers.
+      - Removing it would still leave capacity for *demand*, so a node is not
+        removed just before a forecast class needs it.
 
     Candidates are sorted by serial (descending, i.e. highest serial removed first).
     At most ``AUTOSCALE_MAX_REMOVE_PER_CYCLE`` nodes are returned.
 
     Args:
         state:                  Current cluster snapshot.
-        demand:                 Estimated demand (used implicitly via excess_capacity dead-band).
+        demand:                 Estimated demand; capacity after removals must still cover it.
         cfg:                    App config.
         now:                    Current UTC datetime (injected for testability).
         empty_since:            ``{fqdn: datetime_became_empty}`` — tracked by the orchestrator.
@@ -435,16 +545,54 @@ def plan_scale_down(
                                 because they carry (or may carry) hosts for protected-zone
                                 classes (``now < purge_after``).
     """
-    cooldown_min = _cfg_int(cfg, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN", 30)
-    min_workers = _cfg_int(cfg, "AUTOSCALE_MIN_WORKER_NODES", 1)
-    max_remove = _cfg_int(cfg, "AUTOSCALE_MAX_REMOVE_PER_CYCLE", 1)
-    headroom = _cfg_int(cfg, "AUTOSCALE_HEADROOM", 2)
-
-    _protected = protected_node_fqdns or frozenset()
+    min_workers = cfg_int(cfg, "AUTOSCALE_MIN_WORKER_NODES", 1)
+    max_remove = cfg_int(cfg, "AUTOSCALE_MAX_REMOVE_PER_CYCLE", 1)
+    headroom = cfg_int(cfg, "AUTOSCALE_HEADROOM", 2)
 
     # Count total workers (non-managers) before removal
     total_workers = sum(1 for n in state.nodes if not n.is_manager)
 
+    selected: list[NodeView] = []
+    remaining_excess = state.excess_capacity
+    remaining_capacity = state.total_capacity
+    workers_left = total_workers
+
+    for node in _idle_workers(state, cfg, now, empty_since, protected_node_fqdns):
+        if len(selected) >= max_remove:
+            break
+
+        # Dead-band guard: removing this node must still leave headroom
+        if remaining_excess <= node.capacity + headroom:
+            continue
+
+        # Min-worker guard
+        if workers_left - 1 < min_workers:
+            continue
+
+        # Demand guard: never remove capacity that demand (which includes any
+        # forecast within the lead time) still needs
+        if remaining_capacity - node.capacity < demand:
+            continue
+
+        selected.append(node)
+        remaining_excess -= node.capacity
+        remaining_capacity -= node.capacity
+        workers_left -= 1
+
+    return selected
+
+
+def _idle_workers(
+    state: ClusterState,
+    cfg,
+    now: datetime,
+    empty_since: dict[str, datetime],
+    protected_node_fqdns: "frozenset[str] | None",
+) -> list[NodeView]:
+    """Empty, cooled-down, unprotected workers, highest serial first: what may be removed."""
+    cooldown_min = cfg_int(cfg, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN", 30)
+    _protected = protected_node_fqdns or frozenset()
+
     # Build candidates sorted by serial descending (highest serial first)
     candidates = sorted(
         (n for n in state.nodes if not n.is_manager and not n.is_leader and n.running_hosts == 0),
@@ -452,14 +600,8 @@ def plan_scale_down(
         reverse=True,
     )
 
-    selected: list[NodeView] = []
-    remaining_excess = state.excess_capacity
-    workers_left = total_workers
-
+    idle = []
     for node in candidates:
-        if len(selected) >= max_remove:
-            break
-
         # Protected-zone guard: skip nodes associated with protected classes
         if node.fqdn in _protected:
             continue
@@ -475,19 +617,98 @@ def plan_scale_down(
         if elapsed_min < cooldown_min:
             continue
 
-        # Dead-band guard: removing this node must still leave headroom
-        if remaining_excess <= node.capacity + headroom:
-            continue
+        idle.append(node)
+    return idle
 
-        # Min-worker guard
-        if workers_left - 1 < min_workers:
-            continue
 
-        selected.append(node)
-        remaining_excess -= node.capacity
-        workers_left -= 1
+def plan_consolidation(
+    state: ClusterState,
+    demand: int,
+    cfg,
+    now: datetime,
+    empty_since: dict[str, datetime],
+    protected_node_fqdns: "frozenset[str] | None" = None,
+) -> "tuple[list[NodeView], Tier, float] | None":
+    """Find idle nodes that one cheaper, larger node could replace.
+
+    Considers every set of two to ``AUTOSCALE_CONSOLIDATE_MAX_NODES`` idle
+    workers (the nodes ``plan_scale_down`` may remove) and every tier
+    larger than each of them. A replacement qualifies when it saves at
+    least ``AUTOSCALE_CONSOLIDATE_MIN_SAVING_HOURLY`` per hour over the
+    nodes it replaces (a smaller saving does not pay for provisioning a
+    droplet) and the cluster still covers *demand* with the dead-band
+    headroom. Only idle nodes are touched, so no
+    running host moves.
+
+    Needs ``AUTOSCALE_CONSOLIDATE=true`` and a ``price_hourly`` on every
+    tier involved. Returns ``(nodes to remove, tier to add, hourly saving)``
+    for the largest saving, or ``None``.
+    """
+    from itertools import combinations
 
-    return selected
+    if not cfg_bool(cfg, "AUTOSCALE_CONSOLIDATE", False):
+        return None
+    max_nodes = cfg_int(cfg, "AUTOSCALE_CONSOLIDATE_MAX_NODES", 4)
+    min_saving = cfg_float(cfg, "AUTOSCALE_CONSOLIDATE_MIN_SAVING_HOURLY", 0.01)
+    headroom = cfg_int(cfg, "AUTOSCALE_HEADROOM", 2)
+    tiers = load_tiers(cfg)
+    priced = [t for t in tiers if t.price_hourly is not None]
+
+    idle = [n for n in _idle_workers(state, cfg, now, empty_since, protected_node_fqdns)
+            if _nodes_cost([n], tiers) is not None]
+    best = None
+    for k in range(2, min(max_nodes, len(idle)) + 1):
+        for group in combinations(idle, k):
+            removed_cap = sum(n.capacity for n in group)
+            removed_cost = _nodes_cost(list(group), tiers)
+            for tier in priced:
+                if tier.capacity <= max(n.capacity for n in group):
+                    continue
+                capacity_after = state.total_capacity - removed_cap + tier.capacity
+                if capacity_after < demand or capacity_after - state.total_load <= headroom:
+                    continue
+                saving = round(removed_cost - tier.price_hourly, 6)
+                if saving > 0 and saving >= min_saving and (best is None or (saving, -k) > (best[2], -len(best[0]))):
+                    best = (list(group), tier, saving)
+    return best
+
+
+def protected_node_fqdns(
+    node_dicts: list[dict],
+    class_rows: list[dict],
+    host_rows: list[dict],
+    now: datetime,
+) -> frozenset[str]:
+    """Fqdns of nodes carrying hosts of classes in their protected zone (``now < purge_after``).
+
+    These must not be emptied or removed even if they look idle: the class has
+    not started yet and its hosts may still be starting. ``node_name`` on a
+    host row may be a short name or an fqdn; both map to the node's fqdn.
+    """
+    short_to_fqdn: dict[str, str] = {}
+    for attrs in node_dicts:
+        desc = attrs.get("Description") or {}
+        hostname = desc.get("Hostname") or ""
+        if hostname:
+            short_to_fqdn[hostname.split(".")[0]] = hostname
+
+    protected_class_ids: set = set()
+    for cr in class_rows:
+        pa = cr.get("purge_after")
+        if pa is None:
+            continue
+        if isinstance(pa, str):
+            pa = datetime.fromisoformat(pa)
+        if pa.tzinfo is None:
+            pa = pa.replace(tzinfo=timezone.utc)
+        if now < pa and cr.get("id") is not None:
+            protected_class_ids.add(cr["id"])
+
+    return frozenset(
+        short_to_fqdn.get(hr["node_name"].split(".")[0], "")
+        for hr in host_rows
+        if hr.get("class_id") in protected_class_ids and hr.get("node_name")
+    ) - frozenset([""])
 
 
 def build_plan(
@@ -500,11 +721,17 @@ def build_plan(
 ) -> ScalePlan:
     """Decide what the orchestrator should do this cycle.
 
-    Priority (never both up and down in one cycle):
-      1. If ``compute_deficit > 0`` → scale up (no removes).
-      2. Elif ``plan_scale_down`` returns candidates → scale down (no adds).
+    Priority (never both up and down in one cycle, except a consolidation):
+      1. If ``compute_deficit > 0`` → scale up (no removes), with the
+         cheapest tier mix from ``solve_tier_mix``.
+      2. Elif ``plan_scale_down`` returns candidates, or
+         ``plan_consolidation`` finds idle nodes one cheaper, larger node can
+         replace → whichever saves more per hour (removals win when prices
+         are unknown). A consolidation adds the larger node, then removes.
       3. Else → hold (within dead-band).
 
+    ``cost_delta_hourly`` is set whenever every tier involved has a price.
+
     Args:
         state:                  Current cluster snapshot.
         demand:                 Estimated demand from ``estimate_demand``.
@@ -515,21 +742,45 @@ def build_plan(
                                 (nodes carrying hosts for protected-zone classes).
 
     Returns:
-        A ``ScalePlan`` with either adds, removes, or neither.
+        A ``ScalePlan`` with adds, removes, a consolidation, or neither.
     """
     deficit = compute_deficit(state, demand, cfg)
+    tiers = load_tiers(cfg)
 
     if deficit > 0:
-        add_large, add_small = plan_scale_up(deficit, cfg)
+        mix = _scale_up_mix(deficit, tiers, cfg)
+        add_large, add_small = _large_small(mix, tiers)
+        reason = f"scale-up: deficit={deficit} add_large={add_large} add_small={add_small}"
+        if sum(mix.values()) != add_large + add_small:
+            reason += " add_tiers=" + ",".join(f"{k}:{v}" for k, v in mix.items())
+        cost = _mix_cost(mix, tiers)
         return ScalePlan(
             add_large=add_large,
             add_small=add_small,
             remove_nodes=[],
             purge_first=False,
-            reason=f"scale-up: deficit={deficit} add_large={add_large} add_small={add_small}",
+            reason=reason,
+            add_tiers=mix,
+            cost_delta_hourly=round(cost, 6) if cost is not None else None,
         )
 
     removals = plan_scale_down(state, demand, cfg, now, empty_since, protected_node_fqdns)
+    removal_saving = _nodes_cost(removals, tiers) if removals else None
+    consolidation = plan_consolidation(state, demand, cfg, now, empty_since, protected_node_fqdns)
+    if consolidation and (not removals or (removal_saving is not None and consolidation[2] > removal_saving)):
+        group, tier, saving = consolidation
+        add_large, add_small = _large_small({tier.name: 1}, tiers)
+        return ScalePlan(
+            add_large=add_large,
+            add_small=add_small,
+            remove_nodes=[n.fqdn for n in group],
+            purge_first=True,
+            reason=f"consolidate: replacing {[n.fqdn for n in group]} with one {tier.name}",
+            add_tiers={tier.name: 1},
+            consolidate=True,
+            cost_delta_hourly=-saving,
+        )
+
     if removals:
         return ScalePlan(
             add_large=0,
@@ -537,6 +788,7 @@ def build_plan(
             remove_nodes=[n.fqdn for n in removals],
             purge_first=True,
             reason=f"scale-down: removing {[n.fqdn for n in removals]}",
+            cost_delta_hourly=-removal_saving if removal_saving is not None else None,
         )
 
     return ScalePlan(
@@ -559,14 +811,6 @@ def build_plan(
 # Never call these functions from the pure section above.
 
 
-def _cfg_bool(cfg, key: str, default: bool) -> bool:
-    """Read a boolean config key ('true'/'1'/'yes' → True, else → False)."""
-    raw = cfg.get(key)
-    if raw is None:
-        return default
-    return str(raw).strip().lower() in ("true", "1", "yes")
-
-
 def _load_empty_since_sidecar(data_dir: str) -> "dict[str, datetime]":
     """Load the empty_since dict from the JSON sidecar file.
 
@@ -647,26 +891,41 @@ def gather_cluster_state(
         empty_since      – ``{fqdn: datetime_became_empty}`` tracking across cycles
     """
     from cspawn.cli.node import count_hosts_per_node
+    from cspawn.cs_docker.snapshot import SwarmSnapshot
 
     # --- Docker reads (no app context needed) ---
-    host_counts: dict[str, int] = count_hosts_per_node(manager_client)
-    node_dicts: list[dict] = [n.attrs for n in manager_client.nodes.list()]
+    snap = SwarmSnapshot.build(manager_client, label="jtl.codeserver=true")
+    host_counts: dict[str, int] = count_hosts_per_node(manager_client, snapshot=snap)
+    node_dicts: list[dict] = [n.attrs for n in snap.nodes.values()]
 
     # --- DB reads (inside app context) ---
     with app.app_context():
-        from cspawn.models import CodeHost, Class
+        from sqlalchemy import or_
 
+        from cspawn.models import CodeHost, Class, db
+
+        # The MIA/purgeable flags are computed by the database (hybrid
+        # expressions on CodeHost); only these five columns are read.
         host_rows: list[dict] = [
             {
-                "is_mia": bool(getattr(h, "is_mia", False)),
-                "is_purgeable": bool(getattr(h, "is_purgeable", False)),
-                "app_state": getattr(h, "app_state", None),
-                "node_name": getattr(h, "node_name", None),
-                "class_id": getattr(h, "class_id", None),
+                "is_mia": bool(is_mia),
+                "is_purgeable": bool(is_purgeable),
+                "app_state": app_state,
+                "node_name": node_name,
+                "class_id": class_id,
             }
-            for h in CodeHost.query.all()
+            for is_mia, is_purgeable, app_state, node_name, class_id in db.session.query(
+                CodeHost.is_mia, CodeHost.is_purgeable, CodeHost.app_state,
+                CodeHost.node_name, CodeHost.class_id,
+            )
         ]
 
+        # Count pending hosts: not yet ready, not MIA
+        pending_count: int = CodeHost.query.filter(
+            ~CodeHost.is_mia,
+            or_(CodeHost.app_state.is_(None), CodeHost.app_state != "ready"),
+        ).count()
+
         class_rows: list[dict] = [
             {
                 "id": getattr(c, "id", None),
@@ -680,12 +939,6 @@ def gather_cluster_state(
             ).all()
         ]
 
-    # Count pending hosts: not yet ready, not MIA
-    pending_count = sum(
-        1 for h in host_rows
-        if h.get("app_state") not in ("ready",) and not h.get("is_mia")
-    )
-
     # --- Build empty_since dict ---
     # Build mapping of short_hostname → fqdn from node_dicts
     short_to_fqdn: dict[str, str] = {}
@@ -721,6 +974,79 @@ def gather_cluster_state(
     return (node_dicts, host_counts, pending_count, class_rows, host_rows, empty_since)
 
 
+def gather_demand_history(
+    app, cfg, now: datetime, *, history_days: int | None = None,
+) -> "tuple[list[dict], list[dict], list[float]]":
+    """Read what ``forecast.build_forecast`` learns from; read-only.
+
+    Returns
+    -------
+    tuple of:
+        classes      – scheduled classes (a ``recurrence_rule`` set, not
+                       ended before the history window) with id, start_date, end_date, recurrence_rule,
+                       timezone and students
+        arrivals     – ``{class_id, user_id, at}`` host starts within
+                       `history_days` (default
+                       ``AUTOSCALE_FORECAST_HISTORY_DAYS``), from live
+                       ``CodeHost`` rows and ``StartJob`` history (which
+                       outlives the hosts it started)
+        durations_s  – wall time of the last 10 successful ``expand`` node
+                       ops, the measured provisioning lead time
+    """
+    from datetime import timedelta
+
+    if history_days is None:
+        history_days = cfg_int(cfg, "AUTOSCALE_FORECAST_HISTORY_DAYS", 56)
+    since = now - timedelta(days=history_days)
+
+    def _utc(dt):
+        return dt if dt is None or dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+    with app.app_context():
+        from cspawn.models import Class, CodeHost, NodeOp, StartJob
+
+        classes = [
+            {
+                "id": c.id,
+                "start_date": c.start_date,
+                "end_date": c.end_date,
+                "recurrence_rule": c.recurrence_rule,
+                "timezone": c.timezone,
+                "students": len(c.students),
+            }
+            for c in Class.query.filter(
+                Class.recurrence_rule.isnot(None),
+                Class.recurrence_rule != "",
+                (Class.end_date.is_(None)) | (Class.end_date >= since),
+            ).all()
+        ]
+
+        # CodeHost.created_at is naive UTC; StartJob.created_at is aware.
+        arrivals = []
+        for model, cutoff in ((CodeHost, since.replace(tzinfo=None)), (StartJob, since)):
+            rows = (
+                model.query.with_entities(model.class_id, model.user_id, model.created_at)
+                .filter(model.class_id.isnot(None), model.created_at >= cutoff)
+                .all()
+            )
+            arrivals.extend({"class_id": c, "user_id": u, "at": _utc(at)} for c, u, at in rows)
+
+        ops = (
+            NodeOp.query.filter(
+                NodeOp.kind == "expand",
+                NodeOp.status == "done",
+                NodeOp.started_at.isnot(None),
+                NodeOp.finished_at.isnot(None),
+            )
+            .order_by(NodeOp.finished_at.desc())
+            .limit(10)
+            .all()
+        )
+        durations_s = [(_utc(op.finished_at) - _utc(op.started_at)).total_seconds() for op in ops]
+
+    return classes, arrivals, durations_s
+
+
 def apply_reaper_zones(app, class_rows, host_rows, now: datetime, *, dry_run: bool) -> dict:
     """Classify class resources by zone and apply appropriate reaping actions.
 
@@ -819,22 +1145,23 @@ def apply_reaper_zones(app, class_rows, host_rows, now: datetime, *, dry_run: bo
 
                 # Re-fetch from DB immediately before destructive action
                 hosts = CodeHost.query.filter_by(class_id=cls_id).all()
-                for ch in hosts:
-                    svc_name = ch.service_name or ch.service_id or f"id:{ch.id}"
-                    if dry_run:
+                if dry_run:
+                    for ch in hosts:
+                        svc_name = ch.service_name or ch.service_id or f"id:{ch.id}"
                         log.info("[reaper] dry-run: would force-remove host %s (dormant)", svc_name)
-                        continue
-                    # stop_host() is itself best-effort and never raises (push,
-                    # stop, and delete are each individually isolated inside
-                    # it, including its own commit), so one bad host here
-                    # can't abort the rest of this class's cleanup.
-                    result = app.csm.stop_host(ch)
-                    if result.push_error:
-                        log.warning("[reaper] push failed for host %s: %s", svc_name, result.push_error)
-                    if result.stop_error:
-                        log.warning("[reaper] stop failed for host %s: %s", svc_name, result.stop_error)
-                    if not result.deleted:
-                        log.warning("[reaper] db delete failed for host %s", svc_name)
+                else:
+                    # stop_hosts() works through the class concurrently and is
+                    # best-effort per host and per step (push, stop, and the
+                    # shared delete commit), and never raises, so one bad
+                    # host here can't abort the rest of this class's cleanup.
+                    for result in app.csm.stop_hosts(hosts):
+                        svc_name = result.service_name
+                        if result.push_error:
+                            log.warning("[reaper] push failed for host %s: %s", svc_name, result.push_error)
+                        if result.stop_error:
+                            log.warning("[reaper] stop failed for host %s: %s", svc_name, result.stop_error)
+                        if not result.deleted:
+                            log.warning("[reaper] db delete failed for host %s", svc_name)
 
                 # Clear purge window and target_nodes on the Class row
                 cls_obj = Class.query.get(cls_id)
@@ -864,6 +1191,8 @@ def apply_reaper_zones(app, class_rows, host_rows, now: datetime, *, dry_run: bo
 
                 # Re-fetch from DB immediately before destructive action
                 hosts = CodeHost.query.filter_by(class_id=cls_id).all()
+                idle_hosts = []
+                idle_by_name: dict[str, float] = {}
                 for ch in hosts:
                     # Compute idle duration from updated_at
                     updated = ch.updated_at
@@ -882,10 +1211,14 @@ def apply_reaper_zones(app, class_rows, host_rows, now: datetime, *, dry_run: bo
                             svc_name, idle_minutes,
                         )
                         continue
-                    # stop_host() is itself best-effort and never raises
-                    # (including its own commit for the delete step), so one
-                    # bad host here can't abort the rest of this class's pass.
-                    result = app.csm.stop_host(ch)
+                    idle_hosts.append(ch)
+                    idle_by_name[ch.service_name] = idle_minutes
+
+                # stop_hosts() is best-effort per host and never raises
+                # (including the shared commit for the delete step), so one
+                # bad host here can't abort the rest of this class's pass.
+                for result in app.csm.stop_hosts(idle_hosts):
+                    svc_name = result.service_name
                     if result.push_error:
                         log.warning("[reaper] push failed for idle host %s: %s", svc_name, result.push_error)
                     if result.stop_error:
@@ -893,7 +1226,7 @@ def apply_reaper_zones(app, class_rows, host_rows, now: datetime, *, dry_run: bo
                     if result.deleted:
                         log.info(
                             "[reaper] stopped and deleted idle host %s (idle=%.1f min)",
-                            svc_name, idle_minutes,
+                            svc_name, idle_by_name.get(svc_name, 0.0),
                         )
                     else:
                         log.warning("[reaper] db delete failed for host %s", svc_name)
@@ -916,15 +1249,24 @@ def apply_plan(
     This is the only function that mutates infrastructure (Docker Swarm /
     DigitalOcean).
 
+    Scale-up nodes are provisioned concurrently, up to
+    ``AUTOSCALE_PARALLEL_ADDS`` (default 4) at a time, each running its own
+    create -> configure -> join -> verify -> pre-pull -> activate pipeline.
+    Serials are reserved up front from ``_get_next_serial`` so concurrent
+    pipelines never pick the same name. Per-node, per-stage durations are
+    recorded in ``ApplyResult.stage_timings``.
+
     Each scale-up node is put through the same post-join provisioning
     verification (``_verify_node_provisioning``) as the manual ``node
     expand`` CLI path. Unlike ``expand`` (which aborts the whole command on
     a verification failure), a single bad node here does not abort the
     batch: on failure the node is drained (best-effort), the failure is
     recorded in ``ApplyResult.errors`` without incrementing ``result.added``,
-    and the loop continues to the next planned node. A systemic failure
-    (e.g. ``click.ClickException`` from a bad DO token, or any other
-    unhandled exception) still ``break``s the scale-up loop, unchanged.
+    and the other pipelines carry on. A systemic failure (e.g.
+    ``click.ClickException`` from a bad DO token, or any other unhandled
+    exception) is recorded the same way and stops pipelines that have not
+    started yet; ones already in flight run to completion rather than leave
+    a half-provisioned node behind.
 
     Parameters
     ----------
@@ -955,7 +1297,7 @@ def apply_plan(
 
     if dry_run:
         # Surface what the plan WOULD do, even though nothing is mutated.
-        result.added = plan.add_large + plan.add_small
+        result.added = plan.add_count
         result.removed = len(plan.remove_nodes)
         result.purged = plan.purge_first
         result.would_remove = list(plan.remove_nodes)
@@ -965,7 +1307,7 @@ def apply_plan(
     errors: list[str] = []
 
     # --- Scale-up path ---
-    if plan.add_large + plan.add_small > 0:
+    if plan.add_count > 0:
         import click as _click
         from cspawn.cli.node import (
             _create_droplet,
@@ -982,14 +1324,13 @@ def apply_plan(
             _activate_swarm_node,
             _get_prepull_images,
             _prepull_images,
+            _prepull_options,
+            _resolve_node_image,
+            _golden_cloud_init,
+            _read_golden_manifest,
         )
         from cspawn.cs_docker.tiers import load_tiers
 
-        tiers = load_tiers(cfg)
-        sorted_tiers = sorted(tiers, key=lambda t: t.capacity)
-        tier_small = sorted_tiers[0]
-        tier_large = sorted_tiers[-1]
-
         do_token = cfg.get("DO_TOKEN")
         do_region = cfg.get("DO_REGION") or cfg.get("DO_REGIOIN") or "sfo3"
         do_image = cfg.get("DO_IMAGE", "docker-20-04")
@@ -1001,12 +1342,10 @@ def apply_plan(
         import digitalocean as _do
         _mgr = mgr or _do.Manager(token=do_token)
 
-        import docker as _docker
-        _client = manager_client or _docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        from .limiter import docker_client
+        _client = manager_client or docker_client(cfg, docker_uri)
 
-        nodes_to_add: list = (
-            [tier_large] * plan.add_large + [tier_small] * plan.add_small
-        )
+        nodes_to_add = plan.nodes_to_add(load_tiers(cfg))
 
         # Resolve the pre-pull image set ONCE for the whole batch (it doesn't
         # change across nodes in a single scale-up run) -- unlike
@@ -1027,25 +1366,51 @@ def apply_plan(
             configured_raw = cfg.get("NODE_PREPULL_IMAGES") or ""
             prepull_images = list(dict.fromkeys(configured_raw.replace(",", " ").split()))
 
-        for tier in nodes_to_add:
+        # Like the image list, the boot image is resolved once per batch: the
+        # newest compatible golden snapshot, else DO_IMAGE.
+        do_image, golden_name = _resolve_node_image(
+            cfg, _mgr, _client, do_image=do_image, do_region=do_region, log=log,
+        )
+        cloud_init = _golden_cloud_init(cfg) if golden_name else None
+
+        # Serials are reserved here, once, for the whole batch: each node's
+        # hostname only shows up in the swarm after it joins, so pipelines
+        # that each asked `_get_next_serial` would all get the same answer.
+        first_serial, _, _ = _get_next_serial(_client, name_template)
+        abort = threading.Event()
+
+        def _provision(tier, serial: int) -> tuple[bool, str | None, dict[str, float]]:
+            """One node's create -> join -> verify -> pre-pull -> activate pipeline.
+
+            Returns ``(added, error, timings)``. Errors stay with the node; a
+            systemic one (``ClickException`` or anything unexpected) also sets
+            ``abort`` so pipelines that have not started yet are skipped.
+            """
+            timings: dict[str, float] = {}
+            if abort.is_set():
+                return False, None, timings
             try:
-                droplet, ip, fqdn, shortname = _create_droplet(
-                    ctx,
-                    mgr=_mgr,
-                    manager_client=_client,
-                    name_template=name_template,
-                    do_token=do_token,
-                    do_region=do_region,
-                    do_size=tier.slug,
-                    do_image=do_image,
-                    project_selector=project_selector,
-                    desired_serial=None,
-                    docker_uri=docker_uri,
-                    do_tag=do_tag,
-                    tier=tier,
-                )
-                _configure_node(ctx, fqdn, desired_shortname=shortname)
-                _join_swarm(ctx, fqdn, _client, docker_uri, tier=tier)
+                with ctx.scope(cleanup=False), _timed(timings, "create"):
+                    droplet, ip, fqdn, shortname = _create_droplet(
+                        ctx,
+                        mgr=_mgr,
+                        manager_client=_client,
+                        name_template=name_template,
+                        do_token=do_token,
+                        do_region=do_region,
+                        do_size=tier.slug,
+                        do_image=do_image,
+                        project_selector=project_selector,
+                        desired_serial=serial,
+                        docker_uri=docker_uri,
+                        do_tag=do_tag,
+                        tier=tier,
+                        cloud_init=cloud_init,
+                    )
+                with ctx.scope(cleanup=False), _timed(timings, "configure"):
+                    _configure_node(ctx, fqdn, desired_shortname=shortname)
+                with ctx.scope(cleanup=False), _timed(timings, "join"):
+                    _join_swarm(ctx, fqdn, _client, docker_uri, tier=tier)
 
                 # Drain immediately post-join, before verification runs: matches
                 # expand()'s identical early-drain wiring (see
@@ -1067,24 +1432,26 @@ def apply_plan(
                         "[autoscale] Best-effort pre-verify drain of %s failed: %s", shortname, drain_exc
                     )
 
-                verify_key_path, _ = _ensure_priv_key()
-                expected_docker_version = _manager_docker_version(_client) or _expected_docker_version(cfg)
-                verify_failures = _verify_node_provisioning(
-                    ip, verify_key_path,
-                    expected_docker_version=expected_docker_version,
-                    log=log,
-                )
+                with _timed(timings, "verify"):
+                    verify_key_path, _ = _ensure_priv_key()
+                    manifest = _read_golden_manifest(ip, verify_key_path, log=log) if golden_name else None
+                    expected_docker_version = _manager_docker_version(_client) or _expected_docker_version(cfg)
+                    verify_failures = _verify_node_provisioning(
+                        ip, verify_key_path,
+                        expected_docker_version=expected_docker_version,
+                        log=log,
+                        manifest=manifest,
+                    )
                 if verify_failures:
                     msg = (
                         f"scale-up error for tier={tier.name}: node {fqdn} failed "
                         f"post-join provisioning verification: {'; '.join(verify_failures)}"
                     )
                     log.error("[autoscale] %s", msg)
-                    errors.append(msg)
                     # Best-effort: drain a node we just determined is defective so
                     # Swarm stops scheduling work onto it. A single bad node must
-                    # not abort the rest of the batch, so we continue rather than
-                    # break (unlike the ClickException/generic-exception branches
+                    # not abort the rest of the batch, so we do not set ``abort``
+                    # (unlike the ClickException/generic-exception branches
                     # below, which indicate a systemic problem). This is a second
                     # attempt at the same drain done above: a harmless idempotent
                     # no-op in the common case, and a fallback for when the
@@ -1101,7 +1468,7 @@ def apply_plan(
                         log.warning(
                             "[autoscale] Best-effort drain of %s failed: %s", shortname, drain_exc
                         )
-                    continue
+                    return False, msg, timings
 
                 # Purely diagnostic: warn if the node's docker-ce major has
                 # drifted from the manager's (e.g. a stale golden snapshot).
@@ -1118,31 +1485,53 @@ def apply_plan(
                 # blocks activation; activation itself retries loudly (see
                 # _activate_swarm_node) since a warmed-but-still-drained node
                 # is silently-wasted capacity.
-                _prepull_images(
-                    ip, verify_key_path, prepull_images,
-                    timeout=cfg.get("NODE_PREPULL_TIMEOUT_S", 300), log=log,
-                )
-                activate_node_obj = node_obj or _find_swarm_node(_client, fqdn, shortname)
-                if activate_node_obj is not None:
-                    _activate_swarm_node(_client, activate_node_obj, log=log)
-                else:
-                    log.warning(
-                        "[autoscale] Could not find swarm node %s to activate", shortname
+                with _timed(timings, "prepull"):
+                    _prepull_images(
+                        ip, verify_key_path,
+                        manifest.missing_images(prepull_images) if manifest else prepull_images,
+                        log=log, **_prepull_options(cfg),
                     )
+                with _timed(timings, "activate"):
+                    activate_node_obj = node_obj or _find_swarm_node(_client, fqdn, shortname)
+                    if activate_node_obj is not None:
+                        _activate_swarm_node(_client, activate_node_obj, log=log)
+                    else:
+                        log.warning(
+                            "[autoscale] Could not find swarm node %s to activate", shortname
+                        )
 
-                result.added += 1
                 log.info("[autoscale] scale-up: added node %s (tier=%s)", fqdn, tier.name)
+                return True, None, timings
             except _click.ClickException as exc:
-                msg = f"scale-up error for tier={tier.name}: {exc.format_message()}"
-                log.error("[autoscale] %s", msg)
-                errors.append(msg)
                 # Docker version mismatch or fatal config error — stop adding
-                break
+                msg = f"scale-up error for tier={tier.name}: {exc.format_message()}"
             except Exception as exc:
                 msg = f"scale-up error for tier={tier.name}: {exc}"
-                log.error("[autoscale] %s", msg)
-                errors.append(msg)
-                break
+            log.error("[autoscale] %s", msg)
+            abort.set()
+            return False, msg, timings
+
+        workers = max(1, min(cfg_int(cfg, "AUTOSCALE_PARALLEL_ADDS", 4), len(nodes_to_add)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autoscale-add") as pool:
+            futures = {
+                pool.submit(_provision, tier, first_serial + i): name_template.format(serial=first_serial + i)
+                for i, tier in enumerate(nodes_to_add)
+            }
+            for fut in as_completed(futures):
+                added, msg, timings = fut.result()
+                if added:
+                    result.added += 1
+                if msg:
+                    errors.append(msg)
+                if timings:
+                    result.stage_timings[futures[fut]] = timings
+
+
+    # A consolidation removes nodes only once their replacement is in.
+    if plan.consolidate and result.added < plan.add_count:
+        log.warning("[autoscale] consolidation: replacement node not added; keeping %s", plan.remove_nodes)
+        errors.append("consolidation skipped: replacement node was not added")
+        plan.remove_nodes = []
 
     # --- Scale-down path ---
     if plan.remove_nodes:
@@ -1162,9 +1551,9 @@ def apply_plan(
         import digitalocean as _do
         _mgr = mgr or _do.Manager(token=cfg.get("DO_TOKEN"))
 
-        import docker as _docker
+        from .limiter import docker_client
         docker_uri = cfg.get("DOCKER_URI", "")
-        _client = manager_client or _docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+        _client = manager_client or docker_client(cfg, docker_uri)
 
         for fqdn in plan.remove_nodes:
             short = fqdn.split(".")[0]
@@ -1220,7 +1609,8 @@ def run_autoscale(
     5. Assess cluster → build plan.
     6. Apply ``up_only`` / down-only filter.
     7. Structured log line.
-    8. Apply plan.
+    8. Apply plan; in a quiet cycle, repack idle hosts off sparse nodes
+       (``cspawn/cs_docker/repack.py``, behind ``AUTOSCALE_REPACK``).
     9. Persist ``empty_since`` sidecar.
     10. Release lock (in ``finally``).
 
@@ -1262,7 +1652,7 @@ def run_autoscale(
     cfg = _get_config()
 
     # 1. Kill-switch (bypassable with force= for one-off manual runs)
-    if not _cfg_bool(cfg, "AUTOSCALE_ENABLED", False):
+    if not cfg_bool(cfg, "AUTOSCALE_ENABLED", False):
         if force:
             log.warning(
                 "[autoscale] AUTOSCALE_ENABLED=false but force=True; "
@@ -1273,7 +1663,7 @@ def run_autoscale(
             return ApplyResult()
 
     # 2. Config dry-run override
-    if _cfg_bool(cfg, "AUTOSCALE_DRY_RUN", True):
+    if cfg_bool(cfg, "AUTOSCALE_DRY_RUN", True):
         dry_run = True
 
     data_dir = cfg.get("DATA_DIR", "/tmp")
@@ -1297,9 +1687,9 @@ def run_autoscale(
 
         _manager_client = manager_client
         if _manager_client is None:
-            import docker as _docker
+            from .limiter import docker_client
             docker_uri = cfg.get("DOCKER_URI", "")
-            _manager_client = _docker.DockerClient(base_url=docker_uri, use_ssh_client=True)
+            _manager_client = docker_client(cfg, docker_uri)
 
         # 4. Gather cluster state
         node_dicts, host_counts, pending_count, class_rows, host_rows, empty_since = (
@@ -1316,60 +1706,49 @@ def run_autoscale(
 
         # 5. Assess and build plan
         state = assess_cluster(node_dicts, host_counts, pending_count, cfg)
-        demand = estimate_demand(class_rows, host_rows, cfg)
+        forecast = None
+        if cfg_bool(cfg, "AUTOSCALE_FORECAST", False):
+            from .forecast import build_forecast
+            try:
+                forecast = build_forecast(*gather_demand_history(_app, cfg, now), cfg, now)
+                log.info(
+                    "[autoscale] forecast peak=%d within lead=%dm",
+                    forecast.peak(now),
+                    forecast.lead.total_seconds() // 60,
+                )
+            except Exception as e:
+                log.warning("[autoscale] demand forecast unavailable, using live demand only: %s", e)
+        demand = estimate_demand(class_rows, host_rows, cfg, forecast=forecast, now=now)
 
         # When force=True, bypass cooldown by pretending all empty nodes were empty
         # long enough to satisfy the cooldown.
         effective_empty_since = empty_since
         if force:
-            cooldown_min = _cfg_int(cfg, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN", 30)
+            cooldown_min = cfg_int(cfg, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN", 30)
             from datetime import timedelta
             effective_empty_since = {
                 fqdn: min(ts, now - timedelta(minutes=cooldown_min + 1))
                 for fqdn, ts in empty_since.items()
             }
 
-        # Compute protected-zone node fqdns: nodes carrying hosts for classes
-        # where now < purge_after.  These must not be selected for scale-down
-        # even if they appear empty of running tasks (hosts may still be starting).
-        # host_rows contain node_name (short hostname); map to fqdn via node_dicts.
-        short_to_fqdn: dict[str, str] = {}
-        for attrs in node_dicts:
-            desc = attrs.get("Description") or {}
-            hostname = desc.get("Hostname") or ""
-            if hostname:
-                short = hostname.split(".")[0]
-                short_to_fqdn[short] = hostname
-
-        protected_class_ids: set = set()
-        for cr in class_rows:
-            pa = cr.get("purge_after")
-            if pa is None:
-                continue
-            if isinstance(pa, str):
-                pa = datetime.fromisoformat(pa)
-            if pa.tzinfo is None:
-                pa = pa.replace(tzinfo=timezone.utc)
-            if now < pa:
-                if cr.get("id") is not None:
-                    protected_class_ids.add(cr["id"])
-
-        protected_node_fqdns: frozenset[str] = frozenset(
-            short_to_fqdn.get(hr.get("node_name", ""), "")
-            for hr in host_rows
-            if hr.get("class_id") in protected_class_ids
-            and hr.get("node_name") is not None
-        ) - frozenset([""])
-
-        plan = build_plan(state, demand, cfg, now, effective_empty_since, protected_node_fqdns)
+        # Nodes carrying hosts of protected-zone classes are never scaled down.
+        protected = protected_node_fqdns(node_dicts, class_rows, host_rows, now)
+
+        plan = build_plan(state, demand, cfg, now, effective_empty_since, protected)
 
         # 6. up_only / down-only filter
-        if up_only is True:
+        # A consolidation is neither: it adds and removes together, so either
+        # filter holds it back rather than run half of it.
+        if up_only is not None and plan.consolidate:
+            plan = ScalePlan(add_large=0, add_small=0, remove_nodes=[], purge_first=False,
+                             reason=f"hold: consolidation filtered ({plan.reason})")
+        elif up_only is True:
             plan.remove_nodes = []
             plan.purge_first = False
         elif up_only is False:
             plan.add_large = 0
             plan.add_small = 0
+            plan.add_tiers = {}
 
         # Obtain DO manager for scale-down
         import digitalocean as _do
@@ -1398,6 +1777,19 @@ def run_autoscale(
             mgr=do_mgr,
         )
 
+        # 8b. Repack: in a quiet cycle (a hold, nothing pending), move idle
+        #     hosts off sparse nodes so a later cycle can remove them.
+        if plan.add_count == 0 and not plan.remove_nodes and state.pending_hosts == 0 and up_only is not True:
+            from .repack import run_repack_cycle
+            try:
+                run_repack_cycle(
+                    _app, _manager_client, cfg,
+                    node_dicts=node_dicts, protected=protected, empty_since=empty_since,
+                    now=now, dry_run=dry_run,
+                )
+            except Exception as e:
+                log.warning("[autoscale] repack failed: %s", e)
+
         # 9. Persist empty_since sidecar
         _save_empty_since_sidecar(data_dir, empty_since)
 
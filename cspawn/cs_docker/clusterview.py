@@ -0,0 +1,301 @@
+"""
+cspawn/cs_docker/clusterview.py — Cached view of the Swarm for the admin pages and CLI.
+
+Rendering the admin Nodes page used to open a Docker client and read the whole
+Swarm, and the dashboard ran a full ``csm.sync`` on every load. The cluster
+changes far more slowly than admins click, so those reads now go through
+`ClusterViewCache`:
+
+- A `ClusterView` is one `SwarmSnapshot` reduced to what the pages show:
+  every node (role, tier, capacity, availability) with the usernames of the
+  hosts running on it, and the time it was built.
+- `ClusterViewCache.get` returns the cached view while it is younger than
+  ``CLUSTER_VIEW_TTL_S``. A view older than that, but younger than
+  ``CLUSTER_VIEW_MAX_STALE_S``, is still returned, and a background thread
+  rebuilds it. Anything older, or no view at all, is rebuilt before returning.
+- With ``DATA_DIR`` configured, the view is also kept in
+  ``DATA_DIR/.cluster_view.json``. Every gunicorn worker and ``cspawnctl node
+  hosts`` share one view, and whichever process builds it first saves the
+  others a Swarm read.
+- `invalidate_cluster_view` (the admin "Refresh now" button, host syncs, node
+  events seen by the host watcher) marks every process's view stale, so the
+  next `get` rebuilds it.
+
+Config keys:
+  CLUSTER_VIEW_TTL_S        float default 30  — age at which a view is refreshed
+  CLUSTER_VIEW_MAX_STALE_S  float default 300 — oldest view served while refreshing
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from cspawn.util.config import cfg_float
+from .snapshot import CODESERVER_LABEL, SwarmSnapshot
+
+logger = logging.getLogger("cspawn.docker")
+
+CLUSTER_VIEW_FILE = ".cluster_view.json"
+
+
+@dataclass
+class NodeView:
+    """One Swarm node, as the admin pages show it."""
+
+    hostname: str
+    short: str
+    ip: str
+    role: str              # "leader", "manager" or "worker"
+    tier: str
+    capacity: str
+    availability: str
+    state: str
+    is_manager: bool
+    is_leader: bool
+    hosts: list[str] = field(default_factory=list)  # usernames of running hosts
+    host_count: int = 0
+
+    def row(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class ClusterView:
+    nodes: list[NodeView]
+    built_at: float        # time.time()
+    unplaced: list[str] = field(default_factory=list)  # hosts whose node is not in the Swarm
+
+    @property
+    def total_hosts(self) -> int:
+        return sum(n.host_count for n in self.nodes) + len(self.unplaced)
+
+    def age_s(self, now: Optional[float] = None) -> float:
+        return (now if now is not None else time.time()) - self.built_at
+
+    def node(self, fqdn: str) -> Optional[NodeView]:
+        """The node with hostname `fqdn`, matched on the short name too."""
+        short = fqdn.split(".")[0]
+        for n in self.nodes:
+            if n.hostname == fqdn or n.short == short:
+                return n
+        return None
+
+    def node_rows(self) -> list[dict]:
+        return [n.row() for n in self.nodes]
+
+    def to_dict(self) -> dict:
+        return {"built_at": self.built_at, "nodes": self.node_rows(), "unplaced": list(self.unplaced)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ClusterView":
+        return cls(nodes=[NodeView(**n) for n in d["nodes"]], built_at=float(d["built_at"]),
+                   unplaced=list(d.get("unplaced", [])))
+
+    @classmethod
+    def from_snapshot(cls, snap: SwarmSnapshot, host_counts: dict[str, int],
+                      built_at: Optional[float] = None) -> "ClusterView":
+        """Reduce `snap`; `host_counts` is ``count_hosts_per_node`` over the same snapshot."""
+        hosts_by_node: dict[str, list[str]] = {}
+        unplaced: list[str] = []
+        for svc_id, svc in snap.services.items():
+            labels = (svc.attrs.get("Spec", {}) or {}).get("Labels", {}) or {}
+            uname = labels.get("jtl.codeserver.username") or svc.name
+            for t in snap.tasks_for(svc_id):
+                if t.get("DesiredState") != "running" or (t.get("Status", {}) or {}).get("State") != "running":
+                    continue
+                hn = snap.node_name(t.get("NodeID"))
+                if hn:
+                    hosts_by_node.setdefault(hn.split(".")[0], []).append(uname)
+                else:
+                    unplaced.append(uname)
+
+        nodes = []
+        for n in snap.nodes.values():
+            spec = n.attrs.get("Spec", {}) or {}
+            desc = n.attrs.get("Description", {}) or {}
+            status = n.attrs.get("Status", {}) or {}
+            ms = n.attrs.get("ManagerStatus") or {}
+            labels = spec.get("Labels") or {}
+            hostname = desc.get("Hostname", "")
+            role = (spec.get("Role") or "worker").lower()
+            is_leader = bool(ms.get("Leader"))
+            short = hostname.split(".")[0]
+            nodes.append(NodeView(
+                hostname=hostname,
+                short=short,
+                ip=status.get("Addr", ""),
+                role="leader" if is_leader else role,
+                tier=labels.get("cs.tier", ""),
+                capacity=labels.get("cs.capacity", ""),
+                availability=spec.get("Availability", ""),
+                state=status.get("State", ""),
+                is_manager=role == "manager",
+                is_leader=is_leader,
+                hosts=sorted(hosts_by_node.get(short, [])),
+                host_count=host_counts.get(short, 0),
+            ))
+        nodes.sort(key=lambda v: v.hostname)
+        return cls(nodes=nodes, built_at=built_at if built_at is not None else time.time(),
+                   unplaced=sorted(unplaced))
+
+
+def _view_path(cfg) -> Optional[Path]:
+    data_dir = cfg.get("DATA_DIR")
+    return Path(data_dir) / CLUSTER_VIEW_FILE if data_dir else None
+
+
+def _read_file(cfg) -> Optional[dict]:
+    p = _view_path(cfg)
+    if p is None:
+        return None
+    try:
+        return json.loads(p.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_file(cfg, payload: dict) -> None:
+    """Atomically replace the shared view file (same idiom as the empty_since sidecar)."""
+    p = _view_path(cfg)
+    if p is None:
+        return
+    try:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=".cluster_view.", suffix=".tmp")
+    except OSError as e:
+        logger.debug("cluster view: cannot write %s: %s", p, e)
+        return
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp, p)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def invalidate_cluster_view(cfg, now: Optional[float] = None) -> None:
+    """Mark the shared view stale for every process (no-op without ``DATA_DIR``)."""
+    _write_file(cfg, {"invalidated_at": now if now is not None else time.time()})
+
+
+class ClusterViewCache:
+    """Serve `ClusterView`s, rebuilding them from the Swarm only when they are too old.
+
+    Args:
+        cfg: App config (``DOCKER_URI``, ``DATA_DIR``, TTLs).
+        client_factory: Builds the Docker client for a rebuild. Defaults to
+            a rate-limited SSH client for ``DOCKER_URI``.
+        max_stale_s: Overrides ``CLUSTER_VIEW_MAX_STALE_S``. Short-lived
+            processes pass 0, since a background refresh would not outlive them.
+        clock: Wall clock, injectable for tests.
+    """
+
+    def __init__(self, cfg, *, client_factory: Optional[Callable[[], Any]] = None,
+                 max_stale_s: Optional[float] = None, clock: Callable[[], float] = time.time) -> None:
+        self.cfg = cfg
+        self.ttl_s = cfg_float(cfg, "CLUSTER_VIEW_TTL_S", 30.0)
+        if max_stale_s is None:
+            max_stale_s = cfg_float(cfg, "CLUSTER_VIEW_MAX_STALE_S", 300.0)
+        self.max_stale_s = max(self.ttl_s, max_stale_s)
+        self._client_factory = client_factory or self._default_client
+        self._clock = clock
+        self._view: Optional[ClusterView] = None
+        self._invalidated_at = 0.0
+        self._build_lock = threading.Lock()
+        self._refreshing = threading.Event()
+
+    def _default_client(self):
+        from .limiter import docker_client
+
+        return docker_client(self.cfg, self.cfg.get("DOCKER_URI"))
+
+    def _current(self) -> Optional[ClusterView]:
+        """The newest valid view, from memory or the shared file."""
+        d = _read_file(self.cfg)
+        if d is not None:
+            if "invalidated_at" in d:
+                self._invalidated_at = max(self._invalidated_at, float(d["invalidated_at"]))
+            elif self._view is None or float(d.get("built_at", 0)) > self._view.built_at:
+                try:
+                    self._view = ClusterView.from_dict(d)
+                except (KeyError, TypeError, ValueError):
+                    pass
+        if self._view is not None and self._view.built_at < self._invalidated_at:
+            self._view = None
+        return self._view
+
+    def get(self, *, refresh: bool = False) -> ClusterView:
+        """The cluster view; see the module docstring for when it is rebuilt.
+
+        Raises whatever the Docker client raises when a rebuild is needed
+        and fails.
+        """
+        if refresh:
+            return self.refresh()
+        view = self._current()
+        if view is not None:
+            age = view.age_s(self._clock())
+            if age <= self.ttl_s:
+                return view
+            if age <= self.max_stale_s:
+                self._refresh_async()
+                return view
+        return self.refresh()
+
+    def refresh(self) -> ClusterView:
+        """Rebuild the view from the Swarm now and share it."""
+        from cspawn.cli.node import count_hosts_per_node
+
+        with self._build_lock:
+            client = self._client_factory()
+            try:
+                snap = SwarmSnapshot.build(client, label=CODESERVER_LABEL)
+                view = ClusterView.from_snapshot(snap, count_hosts_per_node(client, snapshot=snap),
+                                                 built_at=self._clock())
+            finally:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            self._view = view
+            _write_file(self.cfg, view.to_dict())
+        return view
+
+    def _refresh_async(self) -> None:
+        if self._refreshing.is_set():
+            return
+        self._refreshing.set()
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("cluster view: background refresh failed: %s", e)
+            finally:
+                self._refreshing.clear()
+
+        threading.Thread(target=_run, name="cluster-view", daemon=True).start()
+
+    def invalidate(self) -> None:
+        """Drop this process's view and mark every other process's stale."""
+        self._view = None
+        self._invalidated_at = self._clock()
+        invalidate_cluster_view(self.cfg, now=self._invalidated_at)
+
+
+def cluster_view_cache(app) -> ClusterViewCache:
+    """The app's `ClusterViewCache`, created on first use."""
+    cache = getattr(app, "cluster_view", None)
+    if cache is None:
+        cache = app.cluster_view = ClusterViewCache(app.app_config)
+    return cache
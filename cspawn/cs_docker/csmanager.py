@@ -5,6 +5,8 @@ import socket
 import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -14,12 +16,19 @@ from xml.sax import handler
 
 import paramiko
 import pytz
-import requests
 from slugify import slugify
+from sqlalchemy import or_
 
 import docker
+from cspawn.cs_docker.limiter import docker_client, limiter_for
 from cspawn.cs_docker.manager import ServicesManager, logger
+from cspawn.cs_docker.ports import lease_ports, reserve_ports
 from cspawn.cs_docker.proc import Container, Service
+from cspawn.cs_docker.readiness import ReadinessProber, default_prober
+from cspawn.cs_docker.snapshot import SwarmSnapshot
+from cspawn.cs_docker.placement import BinPacker, pin_constraints
+from cspawn.cs_docker.standby import StandbyPool, pinned_node
+from cspawn.cs_github.prefork import get_or_fork
 from cspawn.cs_github.repo import CodeHostRepo, GithubOrg, StudentRepo
 from cspawn.models import CodeHost, HostState, User, db
 from cspawn.util.auth import basic_auth_hash, random_string
@@ -49,6 +58,29 @@ class StopResult:
     skipped_push_mia: bool = False
 
 
+@dataclass
+class SyncStats:
+    """Row counts and per-phase timings for one `CodeServerManager.sync()` pass."""
+
+    in_swarm: int = 0
+    in_db: int = 0
+    mia: int = 0
+    updated: int = 0
+    inserted: int = 0
+    skipped: int = 0
+    snapshot_s: float = 0.0
+    probe_s: float = 0.0
+    prepare_s: float = 0.0
+    apply_s: float = 0.0
+    total_s: float = 0.0
+
+    def summary(self) -> str:
+        return (f"{self.in_swarm} in swarm, {self.in_db} in db; "
+                f"{self.mia} marked MIA, {self.updated} updated, {self.inserted} inserted, "
+                f"{self.skipped} skipped; snapshot {self.snapshot_s:.2f}s, probe {self.probe_s:.2f}s, "
+                f"prepare {self.prepare_s:.2f}s, apply {self.apply_s:.2f}s, total {self.total_s:.2f}s")
+
+
 class CSMService(Service):
     """
     A service class for managing Code Server instances.
@@ -91,26 +123,13 @@ class CSMService(Service):
         if code_host:
             for key, value in kwargs.items():
                 setattr(code_host, key, value)
-                db.session.commit()
 
             db.session.commit()
 
     @property
     def is_ready(self):
         """Check if the server is ready by making a request to it."""
-        logger.setLevel(logging.DEBUG)
-        try:
-            response = requests.get(self.public_url, timeout=10)
-            logger.debug("Response from %s: %s", self.public_url, response.status_code)
-            return response.status_code in [200, 302]
-        except requests.exceptions.SSLError:
-            logger.debug("SSL error encountered when connecting to %s", self.public_url)
-            return False
-        except requests.exceptions.RequestException as e:
-            logger.debug("Error checking server status to %s: %s", self.public_url, e)
-            return False
-        
-
+        return default_prober().probe(self.public_url)
 
     @property
     def is_running(self):
@@ -135,16 +154,23 @@ class CSMService(Service):
 
         return is_ready
 
-    def sync_to_db(self, check_ready=False) -> CodeHost:
-        """Sync the service to the database."""
+    def sync_to_db(self, check_ready=False, ready: Optional[bool] = None) -> CodeHost:
+        """Sync the service to the database.
+
+        Args:
+            check_ready: Probe the public URL and mark the host READY if it answers.
+            ready: A probe result the caller already has (from a batch probe);
+                used instead of probing again.
+        """
 
         ch = CodeHost.query.filter_by(service_id=self.id).first()
 
         m = self.to_model()
 
-        if check_ready:
-            if self.is_ready:
-                m.app_state = HostState.READY.value
+        if ready is None and check_ready:
+            ready = self.is_ready
+        if ready:
+            m.app_state = HostState.READY.value
 
         if ch:
             for key, value in m.__dict__.items():
@@ -170,15 +196,41 @@ class CSMService(Service):
 
         """
 
+        return CodeHost(**self.model_kwargs(no_container=no_container))
+
+    def model_kwargs(self, no_container=False, users: Optional[Dict[str, int]] = None,
+                     class_ids: Optional[set] = None) -> Dict[str, Any]:
+        """Return the CodeHost column values for this service.
+
+        Args:
+            no_container: See `to_model`.
+            users: Prefetched ``{username: user id}``. When given (as `sync`
+                does for a whole pass), no per-host user query is made; a
+                username missing from it maps to the root user (id 0).
+            class_ids: Prefetched set of existing class ids, likewise.
+        """
+
         username = self.labels.get("jtl.codeserver.username")
-        user: User = User.query.filter_by(username=username).first()
+        if users is not None:
+            user_id = users.get(username, 0)
+        else:
+            user: User = User.query.filter_by(username=username).first()
 
-        if not user:
-            user = User.query.get(0)  # Get the root user
+            if not user:
+                user = User.query.get(0)  # Get the root user
+            user_id = user.id
 
         c: Container = None
+        placement = None
 
-        if not no_container:
+        if not no_container and self.snapshot is not None:
+            # Resolve placement from the attached SwarmSnapshot: no per-task
+            # nodes.get() and no SSH inspect on the container's node.
+            placement = self.placement
+            if placement is None:
+                logger.error("CodeHost.to_model(): No container found for service %s", self.name)
+
+        elif not no_container:
 
             try:
 
@@ -196,13 +248,29 @@ class CSMService(Service):
                 )
                 c = None
 
+        if placement is not None:
+            container_id = placement.container_id
+            container_name = placement.container_name
+            node_id = placement.node_id
+            node_name = placement.node_name
+        elif c is not None:
+            container_id = c.id
+            container_name = c.name
+            node_id = c.node.id
+            node_name = c.node.attrs["Description"]["Hostname"]
+        else:
+            container_id = container_name = node_id = node_name = None
+
         # Get class_id from labels and validate it exists in database
         class_id = self.labels.get("jtl.codeserver.class_id")
         if class_id and class_id != "-1":
             try:
                 class_id = int(class_id)
                 # Check if the class exists in the database
-                class_exists = db.session.query(db.exists().where(Class.id == class_id)).scalar()
+                if class_ids is not None:
+                    class_exists = class_id in class_ids
+                else:
+                    class_exists = db.session.query(db.exists().where(Class.id == class_id)).scalar()
                 if not class_exists:
                     logger.error(f"Class with ID {class_id} does not exist, setting to None")
                     class_id = None
@@ -215,15 +283,15 @@ class CSMService(Service):
 
 
         model_kwargs = dict(
-            user_id=user.id,
+            user_id=user_id,
             service_id=self.id,
             service_name=self.name,
-            container_id=c.id if c else None,
-            container_name=c.name if c else None,
+            container_id=container_id,
+            container_name=container_name,
             class_id=class_id,
             state=self.status,
-            node_id=c.node.id if c else None,
-            node_name=c.node.attrs["Description"]["Hostname"] if c else None,
+            node_id=node_id,
+            node_name=node_name,
             public_url=self.public_url,
             password=self.labels.get("jtl.codeserver.password"),
             labels=json.dumps(self.labels),
@@ -238,7 +306,7 @@ class CSMService(Service):
         # be flagged this way, so `app_state` is only ever added to the kwargs
         # here — never unconditionally — to avoid clobbering an existing row's
         # `app_state` (e.g. "ready") back to None on a routine resync.
-        if c is None and not no_container and self.node_missing:
+        if container_id is None and not no_container and self.node_missing:
             logger.error(
                 "CodeHost.to_model(): service %s has no live container and "
                 "its task's node no longer exists in the Swarm; marking MIA",
@@ -247,7 +315,7 @@ class CSMService(Service):
             model_kwargs["state"] = HostState.MIA.value
             model_kwargs["app_state"] = HostState.MIA.value
 
-        return CodeHost(**model_kwargs)
+        return model_kwargs
 
 
 def hostname_type(hostname):
@@ -275,9 +343,9 @@ def hostname_type(hostname):
 
 def _truthy(value, default: bool) -> bool:
     """Coerce a config value to bool ('true'/'1'/'yes' -> True), mirroring
-    `cs_docker/autoscale.py`'s existing `_cfg_bool()` idiom.
+    `cspawn.util.config.cfg_bool()`.
 
-    Unlike `_cfg_bool` (which reads `cfg.get(key)` itself), this takes an
+    Unlike `cfg_bool` (which reads `cfg.get(key)` itself), this takes an
     already-fetched value: `self.config` (a `cspawn.util.config.Config`)
     supports `getattr(config, KEY, default)`, but that default only fires
     when the attribute is *absent* -- a present-but-string config value
@@ -500,7 +568,7 @@ class CodeServerManager(ServicesManager):
 
    
         try:
-            c = DockerClient(base_url=self.docker_uri, use_ssh_client=True, timeout=10)
+            c = docker_client(self.config, self.docker_uri, timeout=10)
            
         except Exception as e:
             logger.error("Error connecting to Docker daemon at %s: %s", self.docker_uri, e)
@@ -514,43 +582,39 @@ class CodeServerManager(ServicesManager):
             hostname_f=_hostname_f,
         )
 
-        # Limit concurrent SSH connections to the Docker swarm manager.
-        # BoundedSemaphore prevents sshd MaxStartups from dropping connections
-        # when many threads call Docker-touching methods simultaneously.
+        # Limit concurrent SSH connections to the Docker swarm manager, across
+        # every process that talks to it (see cspawn.cs_docker.limiter), so
+        # sshd MaxStartups does not drop connections when many threads and
+        # processes call Docker-touching methods simultaneously. The client
+        # above takes a lease per request; the methods below hold one for a
+        # whole operation, and the lease is re-entrant within a thread.
         #
-        # Deadlock-avoidance pattern: public methods (list, get, get_by_username,
-        # new_cs) acquire this semaphore exactly once. _list_raw and any
-        # _*_raw helpers are semaphore-free so they can be called safely from
-        # within a block that already holds the semaphore (e.g., the 409
-        # recovery path inside _new_cs_inner, which runs while new_cs holds
-        # the semaphore).  Never call a semaphore-guarded public method from
-        # inside another guarded method — use the _raw variant instead.
-        concurrency = int(self.config.get("DOCKER_SSH_CONCURRENCY", 4))
-        self._docker_sem = threading.BoundedSemaphore(concurrency)
-
-    def get_unused_port(self, n=1, extra_ports=[]):
-        import random
-
-        """Find an unused port in the range 25000-30000."""
-
-        if n == 1:
-            public_urls = {urlparse(ch.public_url).port for ch in CodeHost.query.all() if ch.public_url}
-            public_urls.update(extra_ports)
-
-            while True:
-                port = random.randint(25000, 30000)
-                if port not in public_urls:
-                    return port
-                
-        else:
-            ports = []
-            while len(ports) < n:
-                port = self.get_unused_port(extra_ports=ports)
-                if port not in ports:
-                    ports.append(port)
-            
-            return ports
-    
+        # Deadlock-avoidance pattern: public methods (list, get, get_by_username)
+        # acquire this semaphore exactly once. _list_raw and any _*_raw helpers
+        # are semaphore-free so they can be called safely from within a block
+        # that already holds the semaphore. Never call a semaphore-guarded
+        # public method from inside another guarded method — use the _raw
+        # variant instead. new_cs holds no lease of its own (see there).
+        self._docker_sem = limiter_for(self.config, self.docker_uri)
+
+        # Per-node client pool tuning (see cspawn.cs_docker.pool).
+        self.node_clients.max_idle_s = float(self.config.get("NODE_CLIENT_MAX_IDLE_S", 300))
+        self.node_clients.max_age_s = float(self.config.get("NODE_CLIENT_MAX_AGE_S", 1800))
+        self.node_clients.health_interval_s = float(
+            self.config.get("NODE_CLIENT_HEALTH_INTERVAL_S", 30)
+        )
+
+        # Warm standby services claimed by new_cs (see cspawn.cs_docker.standby).
+        self.standby = StandbyPool(self) if StandbyPool.enabled(self.config) else None
+
+        # Packs new hosts onto the fullest node with room (see cspawn.cs_docker.placement).
+        self.placer = BinPacker(self) if BinPacker.enabled(self.config) else None
+
+    def get_unused_port(self, n=1, user_id=None):
+        """Lease `n` ports in the range 25000-30000 to `user_id` (see cspawn.cs_docker.ports)."""
+
+        ports = lease_ports(user_id, n)
+        return ports[0] if n == 1 else ports
 
     def make_user_dir(self, username):
         """
@@ -601,33 +665,49 @@ class CodeServerManager(ServicesManager):
 
         return user_dir
 
-    def new_cs(self, user: User, proto: ClassProto, class_: Class):
+    def new_cs(self, user: User, proto: ClassProto, class_: Class, *, progress=None):
         """
         Create a new Code Server instance.
 
-        Acquires the SSH semaphore and delegates to _new_cs_inner. The inner
-        method uses _list_raw / _get_by_username_raw for any Docker calls on
-        the 409-recovery path so the semaphore is never acquired twice.
+        Forks the student repo (or finds the prefork), then delegates to
+        _new_cs_inner. No Docker lease is held across the start; each Docker
+        request takes its own, so a slow fork, user dir or pin wait never
+        keeps other processes from the manager's sshd.
 
         Args:
             user (User): User instance.
             proto (ClassProto): Class prototype.
             class_ (Class): Class instance.
+            progress: Optional ``progress(stage)`` callback, called as each
+                stage (fork, user_dir, claim, place, create, pin, record)
+                begins. Used by the start-job worker to report status to the UI.
 
         Returns:
             tuple[CSMService, CodeHost]: New Code Server instance and DB record.
         """
-        self._docker_sem.acquire()
-        try:
-            return self._new_cs_inner(user, proto, class_)
-        finally:
-            self._docker_sem.release()
+        if progress:
+            progress("fork")
+        # A lookup when `cspawnctl github prefork` forked ahead of time.
+        student_repo = get_or_fork(self.app, user, proto.repo_uri)
+
+        # No operation-wide lease here: a start spends most of its time in
+        # make_user_dir's SSH call, placement and the pin wait, and with the
+        # lease cluster-wide, a few start-worker threads holding one each
+        # would starve every other process. Each Docker request still takes
+        # its own lease through the limited client.
+        return self._new_cs_inner(user, proto, class_, student_repo=student_repo, progress=progress)
+
+    def _open_node_client(self, base_url: str) -> DockerClient:
+        """Per-node clients count against that node's sshd limit."""
+        return docker_client(self.config, base_url)
 
     def _get_by_username_raw(self, username):
         """
-        Look up a running service by username without acquiring the semaphore.
+        Look up a running service by username without taking an operation lease.
 
-        Safe to call from inside a semaphore-guarded block (e.g. _new_cs_inner).
+        The listing takes its own per-request lease through the limited
+        client, as every Docker call does. Use this where no lease should be
+        held across the lookup, e.g. in new_cs.
         """
         username = slugify(username)
         for service in self._list_raw():
@@ -635,21 +715,27 @@ class CodeServerManager(ServicesManager):
                 return service
         return None
 
-    def _new_cs_inner(self, user: User, proto: ClassProto, class_: Class):
+    def _new_cs_inner(self, user: User, proto: ClassProto, class_: Class, *,
+                      student_repo: Optional[StudentRepo] = None, progress=None):
         """
-        Body of new_cs — called with the SSH semaphore already held.
+        Body of new_cs: build the container definition, make the user dir,
+        then claim a standby or create (and pin) the service, and record it.
 
-        All Docker-touching calls inside here use _list_raw / _get_by_username_raw
-        (not the public semaphore-guarded wrappers) to prevent reentrant deadlock.
+        No Docker lease is held here. Each Docker request, including those
+        from the standby pool and the placer, takes its own lease through the
+        limited client.
+        `student_repo` is the fork new_cs already made; if omitted it is forked here.
         """
 
         username = user.username
+        progress = progress or (lambda stage: None)
 
         assert isinstance(proto, ClassProto)
 
-
-        gorg = GithubOrg.new_org(self.app)
-        student_repo = gorg.fork(proto.repo_uri, username)
+        if student_repo is None:
+            progress("fork")
+            gorg = GithubOrg.new_org(self.app)
+            student_repo = gorg.fork(proto.repo_uri, username)
 
         container_def = define_cs_container(
             config=self.config,
@@ -659,10 +745,10 @@ class CodeServerManager(ServicesManager):
             hostname_template=self.config.HOSTNAME_TEMPLATE,
             repo=student_repo,
             syllabus=proto.syllabus_path,
-            available_ports=self.get_unused_port(2),
+            available_ports=self.get_unused_port(2, user_id=user.id),
         )
 
-        existing_ch = CodeHost.query.filter_by(service_name=username).first()
+        existing_ch = CodeHost.query.filter_by(user_id=user.id).first()
         if existing_ch:
             logger.info("CodeHost record for %s already exists", username)
             return super().get(existing_ch.service_id), existing_ch
@@ -672,6 +758,7 @@ class CodeServerManager(ServicesManager):
         # Only attempt to create a user directory if USER_DIRS is configured.
         # In dev (USER_DIRS empty), skip to avoid unnecessary SSH (Paramiko) connections.
         if self.config.USER_DIRS:
+            progress("user_dir")
             self.make_user_dir(username)
         else:
             logger.debug("USER_DIRS not set; skipping remote user dir creation for %s", username)
@@ -686,8 +773,33 @@ class CodeServerManager(ServicesManager):
         node_fqdn = None
 
         try:
-            logger.debug("Running container")
-            s: CSMService = self.run(**container_def)
+            # A warm standby already sits on a node with the image; claiming
+            # it skips scheduling and image pull. Dev (published ports) always
+            # starts cold.
+            s = None
+            standby = getattr(self, "standby", None)
+            if standby is not None and not container_def.get("ports"):
+                progress("claim")
+                s = standby.claim(proto, container_def)
+                if s is not None:
+                    node_fqdn = pinned_node(s.o)
+                    standby.refill_async(self.app)
+
+            if s is None:
+                # Bin-packing: choose the node here and create the service
+                # already pinned to it, instead of letting Swarm spread it.
+                target = None
+                placer = getattr(self, "placer", None)
+                if placer is not None and _truthy(getattr(self.config, "PIN_HOSTS_TO_NODE", True), True):
+                    progress("place")
+                    target = placer.pick()
+                    if target:
+                        container_def["constraints"] = pin_constraints(container_def.get("constraints"), target)
+
+                logger.debug("Running container")
+                progress("create")
+                s: CSMService = self.run(**container_def)
+                node_fqdn = target
 
             # Sprint 014, Approach B: pin the newly created host to the node
             # Swarm's own scheduler just placed it on, so Swarm can never
@@ -702,7 +814,8 @@ class CodeServerManager(ServicesManager):
             # handler, which exists solely for `self.run()`'s own
             # 409-already-exists race and would misinterpret a pin failure
             # as "service already exists".
-            if _truthy(getattr(self.config, "PIN_HOSTS_TO_NODE", True), True):
+            if node_fqdn is None and _truthy(getattr(self.config, "PIN_HOSTS_TO_NODE", True), True):
+                progress("pin")
                 try:
                     from cspawn.cli.node import _pin_service_to_node, _resolve_task_node_fqdn
 
@@ -725,9 +838,8 @@ class CodeServerManager(ServicesManager):
         except docker.errors.APIError as e:
             if e.response.status_code == 409:
                 logger.error("Container for %s already exists: %s", username, e)
-                # Use the raw (non-semaphore) lookup: we already hold the
-                # semaphore from new_cs, so calling public get_by_username
-                # here would deadlock.
+                # The raw lookup keeps new_cs free of an operation-wide
+                # lease; the listing leases per request like everything else.
                 s = self._get_by_username_raw(username)
                 if not s:
                     logger.error("Error getting existing container for username %s ", username)
@@ -739,6 +851,7 @@ class CodeServerManager(ServicesManager):
                 return None, None
 
         logger.debug("Committing model")
+        progress("record")
         ch: CodeHost = s.to_model(no_container=True)
         ch.proto_id = proto.id
         # Populate node_name immediately from the resolved placement (rather
@@ -806,10 +919,77 @@ class CodeServerManager(ServicesManager):
         Returns:
             A populated `StopResult` describing what happened at each step.
         """
+        result, repo = self._prepare_stop(code_host, push=push)
+        self._push_and_stop(result, repo, code_host, branch=branch)
+        self._delete_hosts([code_host], [result])
+        return result
+
+    def stop_hosts(self, code_hosts, *, push: bool = True, branch: str = "master",
+                   concurrency: Optional[int] = None, per_node: Optional[int] = None) -> List[StopResult]:
+        """Push, stop, and delete many CodeHosts at once — the bulk form of
+        `stop_host()`, for purge, the reaper, and `remove_all()`.
+
+        Pushes and service stops run on up to `concurrency` threads
+        (``STOP_CONCURRENCY``, default 8), with at most `per_node`
+        (``STOP_PER_NODE``, default 2) for hosts on any one node, whose sshd
+        carries each push's ``docker exec``. Swarm calls still queue on the
+        Docker API limiter. Once every host is stopped, all the rows are
+        deleted in one transaction; if that commit fails they are deleted
+        one at a time, so one bad row cannot keep the others.
+
+        The per-step guarantees of `stop_host()` hold for every host, and
+        this method never raises. Call it inside an app context; each
+        worker thread opens its own.
+
+        Returns:
+            One `StopResult` per host, in the order given.
+        """
+        code_hosts = list(code_hosts)
+        if not code_hosts:
+            return []
+        concurrency = concurrency or int(self.config.get("STOP_CONCURRENCY", 8))
+        per_node = per_node or int(self.config.get("STOP_PER_NODE", 2))
+
+        # Rows and their relationships are read here, in the caller's
+        # session; the workers only see the prepared values.
+        jobs = []
+        node_sems: Dict[str, threading.BoundedSemaphore] = {}
+        for ch in code_hosts:
+            result, repo = self._prepare_stop(ch, push=push)
+            node = ch.node_name or ch.node_id
+            if node and node not in node_sems:
+                node_sems[node] = threading.BoundedSemaphore(per_node)
+            jobs.append((result, repo, ch.service_id, node_sems.get(node) if node else None))
+
+        def _run(job):
+            result, repo, service_id, node_sem = job
+            with self.app.app_context(), (node_sem or nullcontext()):
+                self._push_and_stop(result, repo, service_id, branch=branch)
+
+        t0 = time.monotonic()
+        workers = max(1, min(concurrency, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stop-host") as pool:
+            list(pool.map(_run, jobs))
+
+        results = [job[0] for job in jobs]
+        self._delete_hosts(code_hosts, results)
+        logger.info(
+            "stop_hosts: %d host(s) in %.1fs on %d thread(s): %d pushed, %d push error(s), "
+            "%d stop error(s), %d deleted",
+            len(results), time.monotonic() - t0, workers,
+            sum(r.pushed for r in results), sum(bool(r.push_error) for r in results),
+            sum(bool(r.stop_error) for r in results), sum(r.deleted for r in results),
+        )
+        return results
+
+    def _prepare_stop(self, code_host: CodeHost, *, push: bool):
+        """The host's `StopResult` and, when it should be pushed, its `CodeHostRepo`.
+
+        MIA hosts are skipped cleanly (`skipped_push_mia`, INFO log).
+        """
         service_name = code_host.service_name
         result = StopResult(service_name=service_name)
-
-        # 1. Push — best-effort, skipped cleanly for MIA hosts.
+        repo = None
         if push:
             if code_host.is_mia:
                 result.skipped_push_mia = True
@@ -818,16 +998,30 @@ class CodeServerManager(ServicesManager):
                 )
             else:
                 try:
-                    CodeHostRepo(code_host, self.app).push(branch=branch)
-                    result.pushed = True
+                    repo = CodeHostRepo(code_host, self.app)
                 except Exception as e:
                     result.push_error = str(e)
                     logger.error("Push failed for %s: %s", service_name, e)
+        return result, repo
+
+    def _push_and_stop(self, result: StopResult, repo: Optional[CodeHostRepo],
+                       target, *, branch: str) -> None:
+        """Steps 1 and 2 of `stop_host()`; `target` is the row or its service id."""
+        service_name = result.service_name
+
+        # 1. Push — best-effort.
+        if repo is not None:
+            try:
+                repo.push(branch=branch)
+                result.pushed = True
+            except Exception as e:
+                result.push_error = str(e)
+                logger.error("Push failed for %s: %s", service_name, e)
 
         # 2. Stop the live Swarm service — best-effort. A missing service is
         #    treated as an already-successful stop.
         try:
-            service = self.get(code_host)
+            service = self.get(target)
             if service is not None:
                 service.stop()
             result.stopped = True
@@ -835,16 +1029,27 @@ class CodeServerManager(ServicesManager):
             result.stop_error = str(e)
             logger.error("Stop failed for %s: %s", service_name, e)
 
-        # 3. Delete the CodeHost DB row — best-effort, with rollback on failure.
+    def _delete_hosts(self, code_hosts: List[CodeHost], results: List[StopResult]) -> None:
+        """Step 3: delete the rows in one commit, rolling back on failure.
+
+        If a multi-row commit fails, retries the rows one at a time.
+        """
         try:
-            db.session.delete(code_host)
+            for ch in code_hosts:
+                db.session.delete(ch)
             db.session.commit()
-            result.deleted = True
         except Exception as e:
             db.session.rollback()
-            logger.error("DB delete failed for %s: %s", service_name, e)
-
-        return result
+            if len(code_hosts) == 1:
+                logger.error("DB delete failed for %s: %s", results[0].service_name, e)
+                return
+            logger.warning("Deleting %d host rows in one commit failed, retrying one at a time: %s",
+                           len(code_hosts), e)
+            for ch, result in zip(code_hosts, results):
+                self._delete_hosts([ch], [result])
+            return
+        for result in results:
+            result.deleted = True
 
     def _list_raw(self, filters: Optional[Dict[str, Any]] = {"label": "jtl.codeserver"}) -> List[CSMService]:
         """
@@ -883,52 +1088,200 @@ class CodeServerManager(ServicesManager):
 
         return CodeHost.query.all()
 
-    def sync(self, check_ready=False):
-        """Sync the database with the Docker API."""
+    def swarm_snapshot(self) -> SwarmSnapshot:
+        """Capture all code host services, their tasks and the Swarm's nodes.
 
-        in_db = {ch.service_id for ch in CodeHost.query.all()}
-        in_swarm = {s.id for s in self.list()}
+        Three manager calls in total, under the SSH semaphore, regardless of
+        how many hosts there are. See `cspawn.cs_docker.snapshot`.
+        """
+        self._docker_sem.acquire()
+        try:
+            return SwarmSnapshot.build(self.client)
+        finally:
+            self._docker_sem.release()
 
-        not_in_db = in_swarm - in_db
-        not_in_swarm = in_db - in_swarm
+    def readiness_prober(self) -> ReadinessProber:
+        """The manager's shared `ReadinessProber` (built on first use)."""
+        prober = getattr(self, "_prober", None)
+        if prober is None:
+            prober = self._prober = ReadinessProber.from_config(self.config)
+        return prober
+
+    def from_snapshot(self, snapshot: SwarmSnapshot, service_id: str) -> Optional[CSMService]:
+        """Return the service with `service_id` bound to `snapshot`, or None."""
+        raw = snapshot.services.get(service_id)
+        if raw is None:
+            return None
+        return self.service_class(self, raw, snapshot=snapshot)
+
+    def sync(self, check_ready=False, snapshot: Optional[SwarmSnapshot] = None) -> "SyncStats":
+        """Sync the database with the Docker API.
+
+        All placement and state is read from a single `SwarmSnapshot` (built
+        here unless the caller passes one), so a pass costs three manager calls
+        instead of several per host.
+
+        The pass is a diff-and-apply: the desired CodeHost columns are computed
+        for every host that needs it (users and classes are prefetched in one
+        query each), then MIA marks, updates and inserts are written with bulk
+        statements in one transaction. If that transaction fails (e.g. a row
+        inserted concurrently by `new_cs`), it is rolled back and the hosts are
+        written one at a time, so one bad row cannot leave the rest stale.
+        """
+
+        stats = SyncStats()
+        t0 = time.monotonic()
+        if snapshot is None:
+            snapshot = self.swarm_snapshot()
+        stats.snapshot_s = time.monotonic() - t0
+
+        rows = {r.service_id: r for r in db.session.query(
+            CodeHost.id, CodeHost.service_id, CodeHost.service_name, CodeHost.state, CodeHost.app_state)}
+        in_swarm = snapshot.service_ids
+        stats.in_swarm, stats.in_db = len(in_swarm), len(rows)
 
         # Mark the missing services as missing in action
-        logger.info(f"Services in db but not in swarm: {len(not_in_swarm)}")
-        for service_id in not_in_swarm:
-            ch = CodeHost.query.filter_by(service_id=service_id).first()
-            if ch:
-                ch.state = HostState.MIA.value  # "Missing in Action"
-                ch.app_state = HostState.MIA.value
+        not_in_swarm = [sid for sid, r in rows.items() if sid not in in_swarm
+                        and (r.state != HostState.MIA.value or r.app_state != HostState.MIA.value)]
+
+        # Hosts to refresh: rows not yet running+ready (and not MIA), plus
+        # services with no row at all.
+        to_sync = []
+        for sid, r in rows.items():
+            if sid not in in_swarm or r.state == HostState.MIA.value:
+                continue
+            if r.state == HostState.RUNNING.value and r.app_state == HostState.READY.value:
+                continue
+            s = self.from_snapshot(snapshot, sid)
+            if s is None:
+                logger.warning("Skipping host %s during sync: not in snapshot", r.service_name)
+                continue
+            to_sync.append(s)
+        for sid in in_swarm - rows.keys():
+            s = self.from_snapshot(snapshot, sid)
+            if s is not None:
+                to_sync.append(s)
+
+        ready = {}
+        if check_ready and to_sync:
+            t = time.monotonic()
+            ready = self.readiness_prober().probe_all([s.public_url for s in to_sync])
+            stats.probe_s = time.monotonic() - t
+
+        t = time.monotonic()
+        usernames = {s.labels.get("jtl.codeserver.username") for s in to_sync} - {None}
+        users = dict(db.session.query(User.username, User.id).filter(User.username.in_(usernames))) \
+            if usernames else {}
+        root_exists = db.session.query(db.exists().where(User.id == 0)).scalar()
+        class_ids = set()
+        for s in to_sync:
+            try:
+                class_ids.add(int(s.labels.get("jtl.codeserver.class_id")))
+            except (TypeError, ValueError):
+                pass
+        class_ids = {cid for (cid,) in db.session.query(Class.id).filter(Class.id.in_(class_ids))} \
+            if class_ids else set()
+
+        desired = {}
+        for s in to_sync:
+            if s.labels.get("jtl.codeserver.username") not in users and not root_exists:
+                logger.warning("Skipping host %s during sync: no user %s and no root user",
+                               s.name, s.labels.get("jtl.codeserver.username"))
+                stats.skipped += 1
+                continue
+            try:
+                kw = s.model_kwargs(users=users, class_ids=class_ids)
+            except Exception as e:
+                logger.warning("Skipping host %s during sync: %s", s.name, e)
+                stats.skipped += 1
+                continue
+            if ready.get(s.public_url):
+                kw["app_state"] = HostState.READY.value
+            desired[s.id] = kw
+        stats.prepare_s = time.monotonic() - t
+
+        updates = [dict(kw, id=rows[sid].id) for sid, kw in desired.items() if sid in rows]
+        inserts = [kw for sid, kw in desired.items() if sid not in rows]
+
+        t = time.monotonic()
+        try:
+            if not_in_swarm:
+                CodeHost.query.filter(CodeHost.service_id.in_(not_in_swarm)).update(
+                    {"state": HostState.MIA.value, "app_state": HostState.MIA.value},
+                    synchronize_session=False,
+                )
+            if updates:
+                db.session.bulk_update_mappings(CodeHost, updates)
+            if inserts:
+                db.session.bulk_insert_mappings(CodeHost, inserts)
             db.session.commit()
+            stats.mia, stats.updated, stats.inserted = len(not_in_swarm), len(updates), len(inserts)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Bulk sync failed (%s); applying host by host", e)
+            self._apply_one_by_one(not_in_swarm, rows, desired, stats)
+        stats.apply_s = time.monotonic() - t
 
-        # Get the CodeHosts records that have state != 'running' or 'app_state' != 'ready'
-        not_ready_hosts = CodeHost.query.filter(
-            (CodeHost.state != HostState.RUNNING.value) | (CodeHost.app_state != HostState.READY.value)
-        ).all()
+        try:
+            self._reserve_published_ports(snapshot)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Could not lease ports published by running hosts: %s", e)
 
-        # Update remaining services. Isolate per-host failures: a single
-        # unreachable host or a transient SSH/docker drop must not abort the
-        # whole sync (which would leave the rest of the DB stale and crash
-        # callers like `host purge`).
-        logger.info(f"Syncing not-ready hosts: {len(not_ready_hosts)}")
-        for ch in not_ready_hosts:
-            if ch.state == HostState.MIA.value:
-                continue
+        stats.total_s = time.monotonic() - t0
+        logger.info("Sync finished: %s", stats.summary())
+        return stats
+
+    def _reserve_published_ports(self, snapshot: SwarmSnapshot) -> int:
+        """Lease the ports each service publishes (dev) to its owner.
+
+        Covers hosts started before port leases existed: their VNC port is in
+        the service spec only, so the v011 backfill could not see it. Costs
+        no query when nothing is published (production proxies via Caddy).
+        """
+        by_username: Dict[str, List[int]] = {}
+        for svc in snapshot.services.values():
+            spec = svc.attrs.get("Spec") or {}
+            username = (spec.get("Labels") or {}).get("jtl.codeserver.username")
+            published = [p.get("PublishedPort") for p in (spec.get("EndpointSpec") or {}).get("Ports") or []]
+            published = [int(p) for p in published if p]
+            if username and published:
+                by_username.setdefault(username, []).extend(published)
+        if not by_username:
+            return 0
+
+        users = dict(db.session.query(User.username, User.id).filter(User.username.in_(by_username)))
+        held = {port: users[name] for name, ports in by_username.items() if name in users for port in ports}
+        return reserve_ports(held)
+
+    def _apply_one_by_one(self, not_in_swarm, rows, desired, stats: "SyncStats") -> None:
+        """Fallback for `sync`: write each change in its own transaction."""
+        for sid in not_in_swarm:
             try:
-                s: CSMService = self.get(ch.service_id)
-                logger.info("Syncing service %s", s.name)
-                s.sync_to_db(check_ready=check_ready)
+                CodeHost.query.filter_by(service_id=sid).update(
+                    {"state": HostState.MIA.value, "app_state": HostState.MIA.value},
+                    synchronize_session=False,
+                )
+                db.session.commit()
+                stats.mia += 1
             except Exception as e:
-                logger.warning("Skipping host %s during sync: %s", ch.service_name, e)
+                db.session.rollback()
+                logger.warning("Could not mark %s MIA: %s", sid, e)
 
-        logger.info(f"Syncing not-in-db hosts: {len(not_in_db)}")
-        # Create the missing services
-        for service_id in not_in_db:
+        for sid, kw in desired.items():
             try:
-                s: CSMService = self.get(service_id)
-                s.sync_to_db(check_ready=check_ready)
+                if sid in rows:
+                    CodeHost.query.filter_by(id=rows[sid].id).update(kw, synchronize_session=False)
+                    db.session.commit()
+                    stats.updated += 1
+                else:
+                    db.session.add(CodeHost(**kw))
+                    db.session.commit()
+                    stats.inserted += 1
             except Exception as e:
-                logger.warning("Skipping service %s during sync: %s", service_id, e)
+                db.session.rollback()
+                stats.skipped += 1
+                logger.warning("Skipping host %s during sync: %s", kw.get("service_name", sid), e)
 
     def unsettled_hosts(self) -> list:
         """Return CodeHost rows that are NOT in a terminal/known state.
@@ -938,15 +1291,10 @@ class CodeServerManager(ServicesManager):
         STARTING, or container-RUNNING-but-app-not-READY — is still converging
         and is worth re-syncing. This is the set `sync_converge` keeps chasing.
         """
-        rows = CodeHost.query.all()
-        unsettled = []
-        for ch in rows:
-            if ch.is_mia:
-                continue
-            if ch.app_state == HostState.READY.value:
-                continue
-            unsettled.append(ch)
-        return unsettled
+        return CodeHost.query.filter(
+            ~CodeHost.is_mia,
+            or_(CodeHost.app_state.is_(None), CodeHost.app_state != HostState.READY.value),
+        ).all()
 
     def sync_converge(self, *, max_passes: int = 8, deadline_s: float = 90.0,
                       initial_delay: float = 2.0, max_delay: float = 12.0):
@@ -1001,20 +1349,18 @@ class CodeServerManager(ServicesManager):
         }
 
     def remove_all(self, *, push: bool = True) -> List[StopResult]:
-        """Stop and remove every CodeHost row via `stop_host()`.
+        """Stop and remove every CodeHost row via `stop_hosts()`.
 
         Args:
-            push: Forwarded to `stop_host()` for every row; set False to
-                skip pushing student work before removal.
+            push: Forwarded to `stop_hosts()`; set False to skip pushing
+                student work before removal.
 
         Returns:
             One `StopResult` per `CodeHost` row processed.
         """
-        results = []
-        for ch in CodeHost.query.all():
-            logger.info("Removing code host %s (id=%s)", ch.service_name, ch.id)
-            results.append(self.stop_host(ch, push=push))
-        return results
+        hosts = CodeHost.query.all()
+        logger.info("Removing %d code host(s)", len(hosts))
+        return self.stop_hosts(hosts, push=push)
 
     def get_by_hostname(self, username):
         """
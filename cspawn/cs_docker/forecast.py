@@ -0,0 +1,287 @@
+"""
+cspawn/cs_docker/forecast.py — Demand forecasting from class schedules and start history.
+
+`estimate_demand` only sees the present: the hosts that exist now, plus a flat
+share of each roster while a class is inside its purge window. A new node takes
+10-20 minutes to come up, so a class that starts at 9:00 every Tuesday gets its
+capacity late every Tuesday.
+
+This module predicts demand instead:
+
+- `session_starts` expands a class's ``recurrence_rule`` (an RFC 5545 RRULE)
+  into session start times. DTSTART is ``start_date`` in the class's own
+  timezone, so sessions keep their wall-clock time across DST changes. Classes
+  without a rule have no sessions and are left to the purge-window prescale.
+- `learn_curve` lines past host starts up with past sessions to get a class's
+  arrival curve: the share of its roster with a host N minutes from the session
+  start, averaged over sessions.
+- `forecast_demand` adds up the curves of upcoming sessions into a
+  time-indexed demand series. A class with no history yet gets the flat
+  ``AUTOSCALE_ROSTER_FRACTION`` from the start of each session.
+- `DemandForecast.peak` is what `estimate_demand` reads: the largest forecast
+  demand between now and now plus the lead time. The lead time is how long
+  recent node provisioning took, so capacity is ordered early enough to be
+  ready when the students arrive.
+- `backtest` replays recorded history. For each past session it forecasts
+  from only what was known beforehand and compares that with what happened.
+
+This module is pure: it takes class and arrival dicts (see
+``autoscale.gather_demand_history``) and returns data. Config keys:
+
+  AUTOSCALE_FORECAST              bool  default false — feed the forecast to estimate_demand
+  AUTOSCALE_FORECAST_LEAD_MIN     int   default 15    — lead time when none has been measured
+  AUTOSCALE_FORECAST_SESSION_MIN  int   default 120   — how long a session's forecast lasts
+  AUTOSCALE_FORECAST_HISTORY_DAYS int   default 56    — how far back curves are learned from
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from math import ceil
+from statistics import median
+from typing import Iterable, Optional
+
+BUCKET_MIN = 5
+PRE_MIN = 30  # curves start this many minutes before the session does
+HORIZON_MIN = 240
+
+
+def _aware(dt) -> Optional[datetime]:
+    if dt is None:
+        return None
+    if isinstance(dt, str):
+        dt = datetime.fromisoformat(dt)
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def _roster(c: dict) -> int:
+    students = c.get("students")
+    return students if isinstance(students, int) else len(students or [])
+
+
+def _settings(cfg) -> dict:
+    from cspawn.util.config import cfg_float, cfg_int
+
+    return {
+        "lead_min": cfg_int(cfg, "AUTOSCALE_FORECAST_LEAD_MIN", 15),
+        "session_min": cfg_int(cfg, "AUTOSCALE_FORECAST_SESSION_MIN", 120),
+        "history_days": cfg_int(cfg, "AUTOSCALE_FORECAST_HISTORY_DAYS", 56),
+        "default_fraction": cfg_float(cfg, "AUTOSCALE_ROSTER_FRACTION", 0.8),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Schedules
+# ---------------------------------------------------------------------------
+
+def session_starts(c: dict, *, after: datetime, before: datetime) -> list[datetime]:
+    """UTC start times of `c`'s sessions in ``[after, before]``; ``[]`` if it has no usable rule."""
+    from zoneinfo import ZoneInfo
+
+    from dateutil.rrule import rrulestr
+
+    rule = (c.get("recurrence_rule") or "").strip()
+    start = _aware(c.get("start_date"))
+    if not rule or start is None:
+        return []
+    try:
+        tz = ZoneInfo(c.get("timezone") or "UTC")
+    except (ValueError, KeyError):
+        tz = timezone.utc
+    end = _aware(c.get("end_date"))
+    if end is not None:
+        before = min(before, end)
+    try:
+        rr = rrulestr(rule, dtstart=start.astimezone(tz))
+        return [d.astimezone(timezone.utc) for d in rr.between(after, before, inc=True)]
+    except (ValueError, TypeError):
+        return []
+
+
+# ---------------------------------------------------------------------------
+# Arrival curves
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ArrivalCurve:
+    """Share of a roster with a host, by minutes from session start.
+
+    ``fractions[i]`` covers offsets ``[-pre_min + i*bucket_min, -pre_min +
+    (i+1)*bucket_min)``; the last value holds for the rest of the session.
+    """
+    fractions: list[float]
+    sessions: int = 0
+    bucket_min: int = BUCKET_MIN
+    pre_min: int = PRE_MIN
+
+    def at(self, offset_min: float) -> float:
+        if offset_min < -self.pre_min or not self.fractions:
+            return 0.0
+        i = int((offset_min + self.pre_min) // self.bucket_min)
+        return self.fractions[min(i, len(self.fractions) - 1)]
+
+    @classmethod
+    def flat(cls, fraction: float, session_min: int) -> "ArrivalCurve":
+        """No history: nothing before the session starts, `fraction` from then on."""
+        n_pre = PRE_MIN // BUCKET_MIN
+        return cls([0.0] * n_pre + [fraction] * (session_min // BUCKET_MIN))
+
+
+def learn_curve(starts: Iterable[datetime], arrivals: list[dict], roster: int, *,
+                session_min: int) -> Optional[ArrivalCurve]:
+    """Average arrival curve over the sessions at `starts`; ``None`` without sessions or roster.
+
+    A student counts from their first host start in the session window. Sessions
+    with no starts at all (holidays, cancellations) are skipped, unless every
+    session was like that, in which case the curve is zero.
+    """
+    starts = list(starts)
+    if not starts or roster <= 0:
+        return None
+    n = (PRE_MIN + session_min) // BUCKET_MIN
+    observed: list[list[float]] = []
+    for s in starts:
+        lo, hi = s - timedelta(minutes=PRE_MIN), s + timedelta(minutes=session_min)
+        first: dict = {}
+        for a in arrivals:
+            at = a["at"]
+            if lo <= at < hi and (a["user_id"] not in first or at < first[a["user_id"]]):
+                first[a["user_id"]] = at
+        if not first:
+            continue
+        offsets = sorted((at - lo).total_seconds() / 60 for at in first.values())
+        observed.append([min(1.0, sum(1 for o in offsets if o < (i + 1) * BUCKET_MIN) / roster)
+                         for i in range(n)])
+    if not observed:
+        return ArrivalCurve([0.0] * n, sessions=len(starts))
+    return ArrivalCurve([sum(col) / len(observed) for col in zip(*observed)], sessions=len(observed))
+
+
+def learn_curves(classes: list[dict], arrivals: list[dict], *, since: datetime, now: datetime,
+                 session_min: int) -> dict:
+    """``{class id: ArrivalCurve}`` from sessions that started and finished in ``[since, now]``."""
+    by_class: dict = {}
+    for a in arrivals:
+        by_class.setdefault(a["class_id"], []).append(a)
+    curves = {}
+    for c in classes:
+        starts = session_starts(c, after=since, before=now - timedelta(minutes=session_min))
+        curve = learn_curve(starts, by_class.get(c["id"], []), _roster(c), session_min=session_min)
+        if curve is not None:
+            curves[c["id"]] = curve
+    return curves
+
+
+# ---------------------------------------------------------------------------
+# Forecast
+# ---------------------------------------------------------------------------
+
+@dataclass
+class DemandForecast:
+    """Forecast host demand at ``step_min`` intervals, and the lead time to act on it."""
+    series: list[tuple[datetime, int]] = field(default_factory=list)
+    lead: timedelta = timedelta(minutes=15)
+    step_min: int = BUCKET_MIN
+
+    def peak(self, now: datetime) -> int:
+        """Largest forecast demand from now until a node ordered now would be ready."""
+        lo, hi = now - timedelta(minutes=self.step_min), now + self.lead
+        return max((v for t, v in self.series if lo < t <= hi), default=0)
+
+
+def forecast_demand(classes: list[dict], curves: dict, *, start: datetime, horizon_min: int = HORIZON_MIN,
+                    session_min: int, default_fraction: float) -> list[tuple[datetime, int]]:
+    """Forecast demand every `BUCKET_MIN` minutes over ``[start, start + horizon_min]``."""
+    points = [start + timedelta(minutes=m) for m in range(0, horizon_min + 1, BUCKET_MIN)]
+    totals = [0] * len(points)
+    for c in classes:
+        roster = _roster(c)
+        if roster <= 0:
+            continue
+        curve = curves.get(c.get("id")) or ArrivalCurve.flat(default_fraction, session_min)
+        sessions = session_starts(
+            c, after=start - timedelta(minutes=session_min), before=points[-1] + timedelta(minutes=PRE_MIN),
+        )
+        for s in sessions:
+            for i, t in enumerate(points):
+                offset = (t - s).total_seconds() / 60
+                if -PRE_MIN <= offset < session_min:
+                    totals[i] += ceil(roster * curve.at(offset) - 1e-9)
+    return list(zip(points, totals))
+
+
+def lead_time(durations_s: Iterable[float], default_min: int) -> timedelta:
+    """Median of measured provisioning durations, else `default_min`."""
+    durations = [d for d in durations_s if d and d > 0]
+    return timedelta(seconds=median(durations)) if durations else timedelta(minutes=default_min)
+
+
+def build_forecast(classes: list[dict], arrivals: list[dict], durations_s: Iterable[float], cfg,
+                   now: datetime) -> DemandForecast:
+    """Learn curves from history and forecast from `now`; the entry point for the autoscaler."""
+    s = _settings(cfg)
+    curves = learn_curves(classes, arrivals, since=now - timedelta(days=s["history_days"]), now=now,
+                          session_min=s["session_min"])
+    lead = lead_time(durations_s, s["lead_min"])
+    horizon = max(HORIZON_MIN, int(lead.total_seconds() // 60) + BUCKET_MIN)
+    series = forecast_demand(classes, curves, start=now, horizon_min=horizon,
+                             session_min=s["session_min"], default_fraction=s["default_fraction"])
+    return DemandForecast(series=series, lead=lead)
+
+
+# ---------------------------------------------------------------------------
+# Backtest
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BacktestRow:
+    class_id: int
+    session: datetime
+    learned_from: int  # past sessions behind the curve; 0 means the flat default was used
+    predicted: int     # forecast peak for the session
+    actual: int        # students who started a host in the session window
+    baseline: int      # the flat roster share, for comparison
+
+
+def backtest(classes: list[dict], arrivals: list[dict], cfg, *, start: datetime, end: datetime) -> list[BacktestRow]:
+    """Forecast every session in ``[start, end]`` from the history before it; compare with what happened."""
+    s = _settings(cfg)
+    session_min = s["session_min"]
+    by_class: dict = {}
+    for a in arrivals:
+        by_class.setdefault(a["class_id"], []).append(a)
+    rows = []
+    for c in classes:
+        roster = _roster(c)
+        history = by_class.get(c["id"], [])
+        for sess in session_starts(c, after=start, before=end - timedelta(minutes=session_min)):
+            cutoff = sess - timedelta(minutes=PRE_MIN)
+            known = [a for a in history if a["at"] < cutoff]
+            past = session_starts(c, after=sess - timedelta(days=s["history_days"]),
+                                  before=cutoff - timedelta(minutes=session_min))
+            curve = learn_curve(past, known, roster, session_min=session_min)
+            flat = ArrivalCurve.flat(s["default_fraction"], session_min)
+            lo, hi = cutoff, sess + timedelta(minutes=session_min)
+            rows.append(BacktestRow(
+                class_id=c["id"],
+                session=sess,
+                learned_from=curve.sessions if curve else 0,
+                predicted=ceil(roster * max((curve or flat).fractions, default=0.0) - 1e-9),
+                actual=len({a["user_id"] for a in history if lo <= a["at"] < hi}),
+                baseline=ceil(roster * s["default_fraction"] - 1e-9),
+            ))
+    return sorted(rows, key=lambda r: r.session)
+
+
+def backtest_summary(rows: list[BacktestRow]) -> dict:
+    """Mean absolute error and bias of the forecast and of the flat baseline."""
+    if not rows:
+        return {"sessions": 0}
+    n = len(rows)
+    return {
+        "sessions": n,
+        "mae": sum(abs(r.predicted - r.actual) for r in rows) / n,
+        "bias": sum(r.predicted - r.actual for r in rows) / n,
+        "under": sum(1 for r in rows if r.predicted < r.actual),
+        "baseline_mae": sum(abs(r.baseline - r.actual) for r in rows) / n,
+    }
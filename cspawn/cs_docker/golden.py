@@ -0,0 +1,112 @@
+"""
+cspawn/cs_docker/golden.py — Golden node snapshots: naming, selection, manifest.
+
+A golden snapshot is a DigitalOcean droplet snapshot of a worker node with
+docker-ce pinned (and held) and every class image already pulled. Nodes booted
+from one skip the docker install, the package installs in cloud-init, and most
+of the image pre-pull, which together dominate time-to-capacity.
+
+``cspawnctl node snapshot build`` produces them (see ``cspawn/cli/node.py``);
+``scripts/build-golden-node-snapshot.sh`` makes the same kind of snapshot,
+without images. Both name them ``swarm-node-golden-docker<X.Y.Z>-<stamp>``, so
+the docker version a snapshot carries is readable from its name alone.
+
+The build writes a manifest to ``MANIFEST_PATH`` on the node before
+snapshotting, recording the docker version and the digest of each baked
+image. Provisioning reads it back over SSH to skip checks and pulls the
+snapshot already satisfies. Snapshots from the shell script have no manifest
+and are provisioned as before.
+
+This module is pure: it takes snapshot objects (anything with ``name``,
+``id``, ``created_at`` and ``regions``) and returns data. Config keys:
+
+  NODE_GOLDEN_SNAPSHOT    bool  default true  — boot new nodes from the newest
+                                                compatible snapshot
+  DO_GOLDEN_CLOUD_INIT    str   default swarm-node-init-golden.yaml
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+GOLDEN_PREFIX = "swarm-node-golden"
+MANIFEST_PATH = "/etc/cspawn/golden-manifest.json"
+DEFAULT_GOLDEN_CLOUD_INIT = "swarm-node-init-golden.yaml"
+
+_NAME_RE = re.compile(rf"^{GOLDEN_PREFIX}-docker(\d+\.\d+\.\d+)-(\d{{8}}-\d{{6}})$")
+
+
+@dataclass
+class GoldenManifest:
+    """What a golden snapshot was built with."""
+    docker_version: str
+    images: dict[str, str] = field(default_factory=dict)  # image uri -> repo digest
+    snapshot_name: str = ""
+    built_at: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> Optional["GoldenManifest"]:
+        """Parse a manifest; ``None`` if `text` is not one."""
+        try:
+            data = json.loads(text)
+            return cls(
+                docker_version=str(data["docker_version"]),
+                images={str(k): str(v) for k, v in (data.get("images") or {}).items()},
+                snapshot_name=str(data.get("snapshot_name") or ""),
+                built_at=str(data.get("built_at") or ""),
+            )
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def missing_images(self, images: Iterable[str]) -> list[str]:
+        """The subset of `images` not baked into the snapshot, order kept."""
+        return [i for i in images if i not in self.images]
+
+
+def snapshot_name(docker_version: str, now: Optional[datetime] = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    return f"{GOLDEN_PREFIX}-docker{docker_version}-{now:%Y%m%d-%H%M%S}"
+
+
+def parse_snapshot_name(name: str) -> Optional[str]:
+    """Return the docker version a golden snapshot name carries, else ``None``."""
+    m = _NAME_RE.match(name or "")
+    return m.group(1) if m else None
+
+
+def _major(version: Optional[str]) -> Optional[int]:
+    m = re.search(r"(\d+)\.\d+\.\d+", str(version or ""))
+    return int(m.group(1)) if m else None
+
+
+def golden_snapshots(snapshots: Iterable) -> list:
+    """Golden snapshots among `snapshots`, newest first."""
+    golden = [s for s in snapshots if parse_snapshot_name(getattr(s, "name", "")) is not None]
+    # The stamp in the name sorts the same as created_at and is always present.
+    return sorted(golden, key=lambda s: _NAME_RE.match(s.name).group(2), reverse=True)
+
+
+def select_snapshot(snapshots: Iterable, *, docker_version: Optional[str], region: str):
+    """Pick the newest golden snapshot compatible with the swarm manager.
+
+    Compatible means available in `region` and baked with the same docker
+    major as `docker_version` (Swarm only needs the major to match; the
+    golden cloud-init re-pins a patch difference). Returns ``None`` when the
+    manager's version is unknown or nothing qualifies, and the caller falls
+    back to ``DO_IMAGE``.
+    """
+    want = _major(docker_version)
+    if want is None:
+        return None
+    for snap in golden_snapshots(snapshots):
+        if region not in (getattr(snap, "regions", None) or []):
+            continue
+        if _major(parse_snapshot_name(snap.name)) == want:
+            return snap
+    return None
@@ -0,0 +1,367 @@
+"""
+cspawn/cs_docker/limiter.py — Cluster-wide limit on concurrent Docker-over-SSH calls.
+
+Every Docker call to the swarm manager runs through an ``ssh`` session to its
+sshd. Gunicorn workers, the start worker, cron `cspawnctl` runs and detached
+`node op-run` processes all share that one sshd, and past ``MaxStartups``
+concurrent handshakes it starts dropping connections. A
+`threading.BoundedSemaphore` per process (the old ``_docker_sem``) cannot see
+the other processes.
+
+`DockerApiLimiter` is a semaphore with ``slots`` leases per target host,
+shared by every process:
+
+- `AdvisoryLockLimiter` (PostgreSQL, the production database) holds a lease
+  as a session-level advisory lock ``(hash(host), slot)`` on a dedicated
+  connection. A process that dies drops its connection, and Postgres frees
+  the lease, so nothing needs cleaning up.
+- `LocalLimiter` (SQLite, tests) falls back to an in-process semaphore.
+
+Leases are re-entrant per thread. `CodeServerManager` takes one around a
+whole operation (the deadlock-avoidance pattern described in its
+``__init__``), and the clients built by `docker_client()` take one per HTTP
+request. A request made while the thread already holds a lease reuses it
+rather than queueing behind itself.
+
+Every acquire records how long it waited. `limiter_stats()` returns the
+per-process figures, and `AdvisoryLockLimiter.holders()` shows the leases
+held across the cluster; `cspawnctl host limiter` prints both.
+
+Config:
+    DOCKER_SSH_CONCURRENCY  leases per sshd, cluster-wide (default 4)
+    DOCKER_LIMITER          auto | advisory | local (default auto: advisory
+                            when DATABASE_URI is PostgreSQL)
+    DOCKER_LIMIT_TIMEOUT_S  give up waiting for a lease after this (default 120)
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from cspawn.util.exceptions import DockerException
+
+logger = logging.getLogger("cspawn.docker")
+
+DEFAULT_SLOTS = 4
+DEFAULT_TIMEOUT_S = 120.0
+# Log any wait at least this long; a healthy cluster waits milliseconds.
+WARN_WAIT_S = 5.0
+
+
+class DockerApiBusy(DockerException):
+    """Raised when no Docker API lease frees up within the timeout."""
+
+
+@dataclass
+class LimiterStats:
+    """Queue-wait figures for one limiter, in this process."""
+
+    acquired: int = 0
+    waited: int = 0  # acquisitions that found every slot taken
+    timeouts: int = 0
+    in_use: int = 0
+    wait_total_s: float = 0.0
+    wait_max_s: float = 0.0
+    recent: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def record(self, wait_s: float, contended: bool) -> None:
+        self.acquired += 1
+        self.waited += int(contended)
+        self.wait_total_s += wait_s
+        self.wait_max_s = max(self.wait_max_s, wait_s)
+        self.recent.append(wait_s)
+
+    def as_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 4) if recent else None
+
+        return {
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "in_use": self.in_use,
+            "wait_mean_s": round(self.wait_total_s / self.acquired, 4) if self.acquired else None,
+            "wait_p50_s": pct(0.50),
+            "wait_p95_s": pct(0.95),
+            "wait_max_s": round(self.wait_max_s, 4),
+        }
+
+
+class DockerApiLimiter:
+    """Semaphore-like limiter; subclasses supply how a slot is taken.
+
+    Supports ``acquire()``/``release()`` and ``with``, like the
+    `threading.BoundedSemaphore` it replaces.
+    """
+
+    def __init__(self, key: str, slots: int = DEFAULT_SLOTS, *, timeout_s: float = DEFAULT_TIMEOUT_S) -> None:
+        self.key = key
+        self.slots = max(1, int(slots))
+        self.timeout_s = timeout_s
+        self.stats = LimiterStats()
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    # Subclass hooks --------------------------------------------------------
+
+    def _take(self, deadline: float):
+        """Block until a slot is held (return a token) or `deadline` passes (None)."""
+        raise NotImplementedError
+
+    def _give(self, token) -> None:
+        raise NotImplementedError
+
+    # Semaphore interface ---------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            return True
+
+        t0 = time.monotonic()
+        token = self._take(t0 + (self.timeout_s if timeout is None else timeout))
+        wait = time.monotonic() - t0
+        if token is None:
+            with self._stats_lock:
+                self.stats.timeouts += 1
+            raise DockerApiBusy(f"No Docker API lease for {self.key} after {wait:.1f}s ({self.slots} slots)")
+
+        self._local.depth = 1
+        self._local.token = token
+        with self._stats_lock:
+            self.stats.record(wait, token.contended)
+            self.stats.in_use += 1
+        if wait >= WARN_WAIT_S:
+            logger.warning("Waited %.1fs for a Docker API lease on %s", wait, self.key)
+        return True
+
+    def release(self) -> None:
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            raise ValueError("DockerApiLimiter released too many times")
+        self._local.depth = depth - 1
+        if depth > 1:
+            return
+        token, self._local.token = self._local.token, None
+        with self._stats_lock:
+            self.stats.in_use -= 1
+        self._give(token)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class LocalLimiter(DockerApiLimiter):
+    """Per-process limiter; what ``_docker_sem`` used to be."""
+
+    def __init__(self, key: str, slots: int = DEFAULT_SLOTS, **kwargs) -> None:
+        super().__init__(key, slots, **kwargs)
+        self._sem = threading.BoundedSemaphore(self.slots)
+
+    def _take(self, deadline: float):
+        if self._sem.acquire(blocking=False):
+            return _Token(None, None, contended=False)
+        if self._sem.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return _Token(None, None, contended=True)
+        return None
+
+    def _give(self, token) -> None:
+        self._sem.release()
+
+
+@dataclass
+class _Token:
+    conn: Any
+    slot: Optional[int]
+    contended: bool = False
+
+
+def _lock_class(key: str) -> int:
+    """Stable signed 32-bit advisory lock class id for `key`."""
+    h = zlib.crc32(f"cspawn.docker:{key}".encode())
+    return h - (1 << 32) if h >= (1 << 31) else h
+
+
+class AdvisoryLockLimiter(DockerApiLimiter):
+    """Cluster-wide limiter: a lease is ``pg_try_advisory_lock(class, slot)``.
+
+    Args:
+        engine: SQLAlchemy engine for the shared PostgreSQL database. Each
+            held lease pins one of its connections, so size its pool to at
+            least `slots`; `limiter_for` builds a dedicated one.
+        poll_s: Initial wait between attempts while every slot is taken;
+            doubles (with jitter) up to `max_poll_s`.
+    """
+
+    def __init__(self, key: str, engine, slots: int = DEFAULT_SLOTS, *,
+                 poll_s: float = 0.05, max_poll_s: float = 1.0, **kwargs) -> None:
+        super().__init__(key, slots, **kwargs)
+        self.engine = engine
+        self.lock_class = _lock_class(key)
+        self.poll_s = poll_s
+        self.max_poll_s = max_poll_s
+
+    def _try_slots(self, conn) -> Optional[int]:
+        import sqlalchemy as sa
+
+        for slot in random.sample(range(self.slots), self.slots):
+            if conn.execute(sa.text("SELECT pg_try_advisory_lock(:c, :s)"),
+                            {"c": self.lock_class, "s": slot}).scalar():
+                return slot
+        return None
+
+    def _take(self, deadline: float):
+        conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            delay = self.poll_s
+            contended = False
+            while True:
+                slot = self._try_slots(conn)
+                if slot is not None:
+                    return _Token(conn, slot, contended=contended)
+                contended = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    conn.close()
+                    return None
+                time.sleep(min(remaining, delay * random.uniform(0.5, 1.5)))
+                delay = min(delay * 2, self.max_poll_s)
+        except Exception:
+            conn.invalidate()
+            conn.close()
+            raise
+
+    def _give(self, token) -> None:
+        import sqlalchemy as sa
+
+        try:
+            token.conn.execute(sa.text("SELECT pg_advisory_unlock(:c, :s)"),
+                               {"c": self.lock_class, "s": token.slot})
+        except Exception as e:
+            # Dropping the connection releases the lock server-side.
+            logger.warning("Could not release Docker API lease %s/%s: %s", self.key, token.slot, e)
+            token.conn.invalidate()
+        finally:
+            token.conn.close()
+
+    def holders(self) -> list:
+        """Leases currently held cluster-wide, as ``[(slot, backend pid)]``."""
+        import sqlalchemy as sa
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(sa.text(
+                "SELECT objid, pid FROM pg_locks "
+                "WHERE locktype = 'advisory' AND granted AND objsubid = 2 AND classid::bigint = :c "
+                "ORDER BY objid"), {"c": self.lock_class & 0xFFFFFFFF}).all()
+        return [(int(slot), int(pid)) for slot, pid in rows]
+
+
+# Process-wide registry -----------------------------------------------------
+
+_limiters: Dict[tuple, DockerApiLimiter] = {}
+_engines: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _cfg_get(cfg, key, default=None):
+    try:
+        v = cfg.get(key, default)
+    except Exception:
+        return default
+    return default if v in (None, "") else v
+
+
+def limiter_kind(cfg) -> str:
+    kind = str(_cfg_get(cfg, "DOCKER_LIMITER", "auto")).lower()
+    if kind == "auto":
+        db_uri = str(_cfg_get(cfg, "DATABASE_URI", ""))
+        return "advisory" if db_uri.startswith("postgres") else "local"
+    return kind
+
+
+def host_key(base_url: Optional[str]) -> str:
+    """The limiter key for a Docker base URL: the sshd's host name."""
+    if not base_url:
+        return "local"
+    return urlparse(base_url).hostname or base_url
+
+
+def limiter_for(cfg, base_url: Optional[str] = None) -> DockerApiLimiter:
+    """The shared limiter for the sshd behind `base_url` (default DOCKER_URI)."""
+    key = host_key(base_url or _cfg_get(cfg, "DOCKER_URI"))
+    kind = limiter_kind(cfg)
+    slots = int(_cfg_get(cfg, "DOCKER_SSH_CONCURRENCY", DEFAULT_SLOTS))
+    timeout_s = float(_cfg_get(cfg, "DOCKER_LIMIT_TIMEOUT_S", DEFAULT_TIMEOUT_S))
+
+    with _registry_lock:
+        limiter = _limiters.get((kind, key))
+        if limiter is not None:
+            return limiter
+        if kind == "advisory":
+            db_uri = _cfg_get(cfg, "DATABASE_URI")
+            engine = _engines.get(db_uri)
+            if engine is None:
+                import sqlalchemy as sa
+
+                engine = _engines[db_uri] = sa.create_engine(
+                    db_uri, pool_size=slots, max_overflow=slots, pool_timeout=timeout_s,
+                    pool_pre_ping=True)
+            limiter = AdvisoryLockLimiter(key, engine, slots, timeout_s=timeout_s)
+        else:
+            limiter = LocalLimiter(key, slots, timeout_s=timeout_s)
+        _limiters[(kind, key)] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """``{host: stats}`` for every limiter used in this process."""
+    with _registry_lock:
+        limiters = list(_limiters.values())
+    return {lim.key: lim.stats.as_dict() for lim in limiters}
+
+
+def limit_client(client, limiter: DockerApiLimiter):
+    """Route every HTTP request of a docker-py client through `limiter`.
+
+    `docker.APIClient` is a `requests.Session`, so wrapping its ``send``
+    covers every API call, including those made by the high-level models.
+    """
+    api = client.api
+    send = api.send
+
+    def limited_send(request, **kwargs):
+        with limiter:
+            return send(request, **kwargs)
+
+    api.send = limited_send
+    return client
+
+
+def docker_client(cfg, base_url: Optional[str] = None, **kwargs):
+    """Build a rate-limited ``docker.DockerClient`` over SSH.
+
+    Use this instead of ``docker.DockerClient(base_url=..., use_ssh_client=True)``
+    so the connection counts against the shared limit. The constructor
+    itself queries the daemon version, so it runs under a lease too.
+    """
+    import docker
+
+    base_url = base_url or _cfg_get(cfg, "DOCKER_URI")
+    limiter = limiter_for(cfg, base_url)
+    with limiter:
+        client = docker.DockerClient(base_url=base_url, use_ssh_client=True, **kwargs)
+    return limit_client(client, limiter)
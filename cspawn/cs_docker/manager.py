@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 
 import docker
 
+from .pool import NodeClientPool
 from .proc import Container, Service
 
 logger = logging.getLogger("cspawn.docker")
@@ -98,6 +99,11 @@ class DockerManager:
 class ContainersManager(DockerManager):
     """Manages Docker Containers with a consistent interface."""
 
+    # Set when this manager lives in a ServicesManager's NodeClientPool; the
+    # pool then owns stale-tunnel detection and rebuilding for get().
+    pool: Optional[NodeClientPool] = None
+    pool_key: Optional[str] = None
+
     def run(
         self,
         image: str,
@@ -151,8 +157,14 @@ class ContainersManager(DockerManager):
         tunnel went half-open (e.g. a transient network blip dropped it), the
         first call raises a connection error but the underlying ssh subprocess
         can be re-established, so retry once with a freshly closed/reopened
-        connection before giving up.
+        connection before giving up. A pooled manager delegates this to the
+        pool, which replaces the whole entry so other callers don't reuse it.
         """
+        if self.pool is not None:
+            return self.pool.call(
+                self.pool_key,
+                lambda cm: Container(cm, cm.client.containers.get(name_or_id)),
+            )
         try:
             container = self.client.containers.get(name_or_id)
         except (ConnectionError, OSError):
@@ -232,26 +244,45 @@ class ServicesManager(DockerManager):
 
         self.hostname_f = hostname_f or (lambda x: x)
 
+        # One long-lived SSH-tunneled client per node, shared by every
+        # container lookup (Service.containers/stats, HostS3Sync,
+        # CodeHostRepo) instead of a new tunnel per call.
+        self.node_clients: NodeClientPool[ContainersManager] = NodeClientPool(
+            self._open_node_manager,
+            closer=self._close_node_manager,
+            pinger=lambda cm: cm.client.ping(),
+        )
 
-    def _node_manager(self, node_name):
-        """Return a ContainersManager for a specific node."""
-        import docker
-
-        all_nodes = self.client.nodes.list()
-
-        if len(all_nodes) == 1:
-             # Only one node in the swarm, so we can use the local client
-            return ContainersManager(self.client)
-            
+    def _open_node_manager(self, node_name) -> ContainersManager:
+        """Build a ContainersManager for a node. Pool factory; may raise."""
+        if len(self.client.nodes.list()) == 1:
+            # Only one node in the swarm, so we can use the local client
+            cm = ContainersManager(self.client)
         else:
             node_host = self.hostname_f(node_name)
-            base_url=f"ssh://root@{node_host}"
-            try:
+            base_url = f"ssh://root@{node_host}"
+            cm = ContainersManager(self._open_node_client(base_url))
+        cm.pool = self.node_clients
+        cm.pool_key = node_name
+        return cm
+
+    def _open_node_client(self, base_url: str) -> docker.DockerClient:
+        """Build the Docker client for one node; subclasses may rate-limit it."""
+        return docker.DockerClient(base_url=base_url, use_ssh_client=True)
+
+    def _close_node_manager(self, cm: ContainersManager) -> None:
+        # Never close the manager's own client, which the single-node case shares.
+        if cm.client is not self.client:
+            cm.client.close()
 
-                return ContainersManager(docker.DockerClient(base_url=base_url, use_ssh_client=True))
-            except Exception as e:
-                logger.error(f"Failed to create Docker client for {node_name}, base_url: {base_url}, error: {e}")
-                return None
+    def _node_manager(self, node_name):
+        """Return a ContainersManager for a specific node, from the pool."""
+        try:
+            return self.node_clients.get(node_name)
+        except Exception as e:
+            logger.error(f"Failed to create Docker client for {node_name}, "
+                         f"base_url: ssh://root@{self.hostname_f(node_name)}, error: {e}")
+            return None
 
     @property
     def nodes(self):
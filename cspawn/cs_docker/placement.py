@@ -0,0 +1,243 @@
+"""
+cspawn/cs_docker/placement.py — Bin-packing placement for new code hosts.
+
+Left to itself, Swarm's spread strategy puts each new host on the node with
+the fewest tasks. Hosts end up scattered one or two to a node, so after a class
+no node is ever empty and `autoscale.plan_scale_down` has nothing to remove.
+
+`BinPacker.pick` chooses the node in the spawner instead. It packs each host
+onto the fullest node that still has room for it:
+
+- **Room** is live headroom, not just the static ``cs.capacity`` label. A
+  node has room when it has a free slot, when its memory (``MemoryBytes``
+  from the Swarm node description) minus what its hosts use minus
+  ``PLACEMENT_MEMORY_RESERVE_MB`` covers one more host, and when its CPUs
+  (``NanoCPUs``) cover one more ``PLACEMENT_HOST_CPUS``. A host's memory use
+  is its telemetry ``CodeHost.memory_usage``; a host with no report yet
+  counts as the typical host (`host_memory_estimate`).
+- **Fullest** means the highest fill once the host is added: memory used
+  over memory, or slots used over slots, whichever is higher. Filling by
+  fraction packs small and large nodes alike.
+- **Pinning**: ``new_cs`` creates the service with the ``node.hostname==``
+  constraint already set (`pin_constraints`, the same rule
+  ``_pin_service_to_node`` uses), so Swarm never spreads it elsewhere and no
+  task is rescheduled.
+- **In flight**: a pick is counted against its node for
+  ``PLACEMENT_PENDING_S`` seconds, so concurrent starts do not all land on
+  the last free slot of one node before Swarm reports their tasks.
+- **Load reads**: the Swarm listings and memory reports behind the rooms are
+  reused for ``PLACEMENT_LOAD_TTL_S`` seconds, so a burst of starts reads
+  the cluster once rather than once per host. Picks made in that window
+  are counted through the in-flight reservations.
+
+When no node fits, or anything goes wrong, `pick` returns ``None`` and the
+host is placed by Swarm and pinned afterwards, as before.
+
+Config keys:
+  PLACEMENT_BINPACK            bool  default false — place new hosts with BinPacker
+  PLACEMENT_HOST_MEMORY_MB     int   default 1536  — memory of a host with no stats yet
+  PLACEMENT_MEMORY_RESERVE_MB  int   default 1024  — memory kept free on every node
+  PLACEMENT_HOST_CPUS          float default 0.5   — CPUs each host is assumed to need
+  PLACEMENT_PENDING_S          float default 60    — how long a pick reserves its slot
+  PLACEMENT_LOAD_TTL_S         float default 5     — how long one read of cluster load is reused
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from statistics import median
+from typing import Callable, Optional
+
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
+
+from .autoscale import capacity_for_node
+from .snapshot import SwarmSnapshot
+
+logger = logging.getLogger("cspawn.docker")
+
+MB = 1024 * 1024
+
+# Fewer samples than this and the configured default is a better guess.
+MIN_MEMORY_SAMPLES = 5
+
+
+def pin_constraints(constraints, node_fqdn: str) -> list[str]:
+    """`constraints` with any ``node.hostname==`` pin replaced by one to `node_fqdn`."""
+    kept = [c for c in constraints or [] if not c.replace(" ", "").startswith("node.hostname==")]
+    kept.append(f"node.hostname=={node_fqdn}")
+    return kept
+
+
+@dataclass
+class NodeRoom:
+    """One worker node's load, as placement sees it."""
+
+    fqdn: str
+    slots: int             # cs.capacity
+    hosts: int             # running hosts plus in-flight picks
+    mem_total: int = 0     # bytes; 0 when Swarm does not report it
+    mem_used: int = 0      # bytes
+    cpus: float = 0.0      # 0 when Swarm does not report it
+
+    def fits(self, mem: int, cpus_per_host: float, reserve: int) -> bool:
+        if self.hosts + 1 > self.slots:
+            return False
+        if self.mem_total and self.mem_used + mem + reserve > self.mem_total:
+            return False
+        if self.cpus and (self.hosts + 1) * cpus_per_host > self.cpus:
+            return False
+        return True
+
+    def fill_after(self, mem: int) -> float:
+        """Fraction of the node in use once one more host of `mem` bytes is on it."""
+        fill = (self.hosts + 1) / self.slots if self.slots else 1.0
+        if self.mem_total:
+            fill = max(fill, (self.mem_used + mem) / self.mem_total)
+        return fill
+
+
+def host_memory_estimate(samples: list[int], default: int) -> int:
+    """Typical host memory in bytes: the median report, or `default` with too few."""
+    samples = [s for s in samples if s]
+    return int(median(samples)) if len(samples) >= MIN_MEMORY_SAMPLES else default
+
+
+def node_rooms(
+    node_attrs: list[dict],
+    host_counts: dict[str, int],
+    memory_by_node: dict[str, list[int]],
+    cfg,
+    *,
+    host_mem: int,
+) -> list[NodeRoom]:
+    """Build a `NodeRoom` for every active, ready worker.
+
+    `host_counts` is ``{short name: hosts}``; `memory_by_node` is ``{short
+    name: [memory_usage of its hosts]}``. A node with more hosts than reports
+    counts `host_mem` for each missing one; extra reports (rows for hosts that
+    have since gone) are ignored, largest kept.
+    """
+    rooms = []
+    for attrs in node_attrs:
+        spec = attrs.get("Spec", {}) or {}
+        if (spec.get("Role") or "").lower() != "worker":
+            continue
+        if spec.get("Availability", "active") != "active":
+            continue
+        if ((attrs.get("Status") or {}).get("State")) not in (None, "ready"):
+            continue
+        desc = attrs.get("Description") or {}
+        hostname = desc.get("Hostname") or ""
+        if not hostname:
+            continue
+        short = hostname.split(".")[0]
+        hosts = host_counts.get(short, 0)
+        known = sorted((m for m in memory_by_node.get(short, []) if m), reverse=True)[:hosts]
+        resources = desc.get("Resources") or {}
+        rooms.append(NodeRoom(
+            fqdn=hostname,
+            slots=capacity_for_node(attrs, cfg),
+            hosts=hosts,
+            mem_total=int(resources.get("MemoryBytes") or 0),
+            mem_used=sum(known) + host_mem * (hosts - len(known)),
+            cpus=(resources.get("NanoCPUs") or 0) / 1e9,
+        ))
+    return rooms
+
+
+def choose_node(rooms: list[NodeRoom], *, mem: int, cpus_per_host: float, reserve: int) -> Optional[str]:
+    """The fullest node that still fits one more host, or ``None``.
+
+    Ties go to the node with more hosts, then to the lower name, so the
+    choice is stable.
+    """
+    fitting = [r for r in rooms if r.fits(mem, cpus_per_host, reserve)]
+    if not fitting:
+        return None
+    best = min(fitting, key=lambda r: (-r.fill_after(mem), -r.hosts, r.fqdn))
+    return best.fqdn
+
+
+class BinPacker:
+    """Chooses the node for each new host in `CodeServerManager.new_cs`."""
+
+    def __init__(self, csm, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.csm = csm
+        self.config = csm.config
+        self.default_mem = cfg_int(self.config, "PLACEMENT_HOST_MEMORY_MB", 1536) * MB
+        self.reserve = cfg_int(self.config, "PLACEMENT_MEMORY_RESERVE_MB", 1024) * MB
+        self.cpus_per_host = cfg_float(self.config, "PLACEMENT_HOST_CPUS", 0.5)
+        self.pending_s = cfg_float(self.config, "PLACEMENT_PENDING_S", 60.0)
+        self.load_ttl_s = cfg_float(self.config, "PLACEMENT_LOAD_TTL_S", 5.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: list[tuple[float, str, int]] = []  # (expires, fqdn, bytes)
+        self._load_lock = threading.Lock()
+        self._load: Optional[tuple[float, list[dict], dict[str, int], dict[str, list[int]]]] = None
+
+    @staticmethod
+    def enabled(config) -> bool:
+        return cfg_bool(config, "PLACEMENT_BINPACK", False)
+
+    def _memory_samples(self) -> dict[str, list[int]]:
+        """``{short node name: [memory_usage]}`` from the CodeHost table."""
+        from cspawn.models import CodeHost
+
+        by_node: dict[str, list[int]] = defaultdict(list)
+        rows = CodeHost.query.with_entities(CodeHost.node_name, CodeHost.memory_usage).filter(
+            CodeHost.node_name.isnot(None), CodeHost.memory_usage.isnot(None)
+        )
+        for node_name, mem in rows:
+            by_node[node_name.split(".")[0]].append(mem)
+        return by_node
+
+    def _cluster_load(self) -> tuple[list[dict], dict[str, int], dict[str, list[int]]]:
+        """``(node attrs, hosts per node, memory reports per node)``, read at most once per TTL.
+
+        Concurrent callers wait for one read rather than each making their own.
+        """
+        with self._load_lock:
+            if self._load is not None and self._clock() - self._load[0] < self.load_ttl_s:
+                return self._load[1:]
+            snap = SwarmSnapshot.build(self.csm.client)
+            counts = snap.running_hosts_per_node()
+            standby = getattr(self.csm, "standby", None)
+            if standby is not None:
+                from .standby import STANDBY_LABEL
+
+                for short, n in SwarmSnapshot.build(self.csm.client, label=STANDBY_LABEL).running_hosts_per_node().items():
+                    counts[short] = counts.get(short, 0) + n
+            samples = self._memory_samples()
+            self._load = (self._clock(), [n.attrs for n in snap.nodes.values()], counts, samples)
+            return self._load[1:]
+
+    def pick(self) -> Optional[str]:
+        """Reserve and return the fqdn of the node for the next host; ``None`` to leave it to Swarm.
+
+        Never raises.
+        """
+        try:
+            node_attrs, counts, samples = self._cluster_load()
+        except Exception as e:
+            logger.warning("placement: could not read cluster load: %s", e)
+            return None
+
+        host_mem = host_memory_estimate([m for ms in samples.values() for m in ms], self.default_mem)
+        with self._lock:
+            now = self._clock()
+            self._pending = [p for p in self._pending if p[0] > now]
+            rooms = node_rooms(node_attrs, counts, samples, self.config, host_mem=host_mem)
+            for _, fqdn, mem in self._pending:
+                for r in rooms:
+                    if r.fqdn == fqdn:
+                        r.hosts += 1
+                        r.mem_used += mem
+            fqdn = choose_node(rooms, mem=host_mem, cpus_per_host=self.cpus_per_host, reserve=self.reserve)
+            if fqdn is None:
+                logger.info("placement: no node has room for another host; leaving it to Swarm")
+                return None
+            self._pending.append((now + self.pending_s, fqdn, host_mem))
+        return fqdn
@@ -0,0 +1,249 @@
+"""
+cspawn/cs_docker/pool.py — Keyed pool of long-lived per-node Docker clients.
+
+Every per-node Docker client is an `ssh` subprocess tunnel. Building one per
+container inspect costs a full SSH handshake (plus an `info()` round-trip) and,
+under load, trips sshd's MaxStartups. `NodeClientPool` keeps one entry per
+node and hands the same entry to every caller:
+
+- **Health check** — an entry that has not been used for `health_interval_s`
+  is pinged before it is handed out; a failed ping rebuilds it.
+- **Idle eviction** — entries unused for `max_idle_s` are closed.
+- **Max-age recycling** — entries older than `max_age_s` are closed and
+  rebuilt on next use, so a tunnel never lives forever.
+- **Stale-tunnel rebuild** — `call()` runs an operation against the entry and,
+  on a connection-level error (broken pipe, reset, half-open tunnel), discards
+  the entry, builds a fresh one and retries exactly once.
+
+The pool is thread-safe. Construction of a new entry happens outside the pool
+lock so one slow SSH handshake never blocks callers for other nodes.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from docker.errors import APIError
+
+logger = logging.getLogger("cspawn.docker")
+
+T = TypeVar("T")
+
+# Errors that mean "this tunnel is dead", as opposed to an API error from a
+# healthy daemon (e.g. docker.errors.NotFound), which must propagate as-is.
+# APIError derives from requests' HTTPError, itself an OSError, so it has to
+# be excluded explicitly.
+STALE_ERRORS = (ConnectionError, OSError)
+
+
+@dataclass
+class _Entry(Generic[T]):
+    value: T
+    created: float
+    last_used: float
+    last_checked: float
+    uses: int = 0
+
+
+@dataclass
+class PoolStats:
+    """Counters for observing pool behaviour (logged by callers, shown in CLI)."""
+
+    created: int = 0
+    reused: int = 0
+    evicted_idle: int = 0
+    recycled_age: int = 0
+    rebuilt_stale: int = 0
+    failed_health: int = 0
+    size: int = 0
+    keys: list = field(default_factory=list)
+
+
+class NodeClientPool(Generic[T]):
+    """Thread-safe, keyed pool of per-node client objects.
+
+    Args:
+        factory: ``factory(key) -> value``; builds a new entry (e.g. opens an
+            SSH-tunneled Docker client for node ``key``). May raise; the error
+            propagates to the caller of `get()`.
+        closer: ``closer(value)``; releases an entry. Errors are swallowed.
+        pinger: ``pinger(value)``; raises (or returns False) if the entry is
+            unhealthy. None disables health checks.
+        max_idle_s: Close entries not used for this long.
+        max_age_s: Recycle entries older than this, regardless of use.
+        health_interval_s: Ping an entry before reuse if it has not been used
+            or checked for this long.
+        clock: Monotonic clock, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], T],
+        *,
+        closer: Optional[Callable[[T], Any]] = None,
+        pinger: Optional[Callable[[T], Any]] = None,
+        max_idle_s: float = 300.0,
+        max_age_s: float = 1800.0,
+        health_interval_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._factory = factory
+        self._closer = closer
+        self._pinger = pinger
+        self.max_idle_s = max_idle_s
+        self.max_age_s = max_age_s
+        self.health_interval_s = health_interval_s
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: dict[str, _Entry[T]] = {}
+        # One build lock per key so concurrent callers for the same node wait
+        # for a single handshake instead of each opening their own tunnel.
+        self._build_locks: dict[str, threading.Lock] = {}
+        self._stats = PoolStats()
+
+    # -- internals ----------------------------------------------------------
+
+    def _close(self, value: T) -> None:
+        if self._closer is None:
+            return
+        try:
+            self._closer(value)
+        except Exception as e:
+            logger.debug("NodeClientPool: error closing entry: %s", e)
+
+    def _healthy(self, value: T) -> bool:
+        if self._pinger is None:
+            return True
+        try:
+            return self._pinger(value) is not False
+        except Exception as e:
+            logger.debug("NodeClientPool: health check failed: %s", e)
+            return False
+
+    def _pop_expired(self, now: float) -> list[T]:
+        """Remove idle/over-age entries; return their values for closing.
+
+        Caller must hold ``self._lock``.
+        """
+        dead = []
+        for key, e in list(self._entries.items()):
+            if now - e.last_used >= self.max_idle_s:
+                self._stats.evicted_idle += 1
+            elif now - e.created >= self.max_age_s:
+                self._stats.recycled_age += 1
+            else:
+                continue
+            logger.debug("NodeClientPool: expiring entry for %s", key)
+            dead.append(self._entries.pop(key).value)
+        return dead
+
+    # -- public API ---------------------------------------------------------
+
+    def get(self, key: str) -> T:
+        """Return a live entry for ``key``, building one if needed."""
+        now = self._clock()
+        with self._lock:
+            dead = self._pop_expired(now)
+            entry = self._entries.get(key)
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        for v in dead:
+            self._close(v)
+
+        if entry is not None:
+            if now - entry.last_checked >= self.health_interval_s:
+                if not self._healthy(entry.value):
+                    self._stats.failed_health += 1
+                    logger.warning("NodeClientPool: %s failed health check; rebuilding", key)
+                    self.invalidate(key, entry.value)
+                    entry = None
+                else:
+                    entry.last_checked = now
+            if entry is not None:
+                with self._lock:
+                    entry.last_used = now
+                    entry.uses += 1
+                    self._stats.reused += 1
+                return entry.value
+
+        with build_lock:
+            # Another thread may have built it while we waited.
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.last_used = self._clock()
+                    entry.uses += 1
+                    self._stats.reused += 1
+                    return entry.value
+
+            value = self._factory(key)
+            now = self._clock()
+            with self._lock:
+                self._entries[key] = _Entry(value=value, created=now, last_used=now,
+                                            last_checked=now, uses=1)
+                self._stats.created += 1
+            logger.debug("NodeClientPool: opened entry for %s", key)
+            return value
+
+    def invalidate(self, key: str, value: Optional[T] = None) -> None:
+        """Drop and close the entry for ``key``.
+
+        If ``value`` is given, only drop the entry if it is still that value —
+        a concurrent caller may already have replaced a stale entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (value is not None and entry.value is not value):
+                entry = None
+            else:
+                del self._entries[key]
+        if entry is not None:
+            self._close(entry.value)
+
+    def call(self, key: str, fn: Callable[[T], Any]) -> Any:
+        """Run ``fn(entry)``; on a stale-tunnel error rebuild and retry once."""
+        value = self.get(key)
+        try:
+            return fn(value)
+        except STALE_ERRORS as e:
+            if isinstance(e, APIError):
+                raise
+            self._stats.rebuilt_stale += 1
+            logger.warning("Stale connection to node %s; rebuilding and retrying: %s", key, e)
+            self.invalidate(key, value)
+            return fn(self.get(key))
+
+    def evict_idle(self) -> int:
+        """Close idle and over-age entries now; return how many were closed."""
+        with self._lock:
+            dead = self._pop_expired(self._clock())
+        for v in dead:
+            self._close(v)
+        return len(dead)
+
+    def close_all(self) -> None:
+        """Close every entry (e.g. at process shutdown)."""
+        with self._lock:
+            values = [e.value for e in self._entries.values()]
+            self._entries.clear()
+        for v in values:
+            self._close(v)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            s = PoolStats(**{k: v for k, v in vars(self._stats).items()
+                             if k not in ("size", "keys")})
+            s.size = len(self._entries)
+            s.keys = sorted(self._entries)
+        return s
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
@@ -0,0 +1,165 @@
+"""
+cspawn/cs_docker/ports.py — Host port leases for new code hosts.
+
+`define_cs_container` needs two host ports per host (code-server and VNC),
+published directly in development and part of the hostname template
+elsewhere. They used to come from `get_unused_port`, which loaded every
+CodeHost, parsed each `public_url`, and guessed random ports until one missed.
+It did that once per port, and two concurrent `new_cs` calls could draw the
+same one.
+
+Ports are now rows in `PortLease`, one per port in ``PORT_MIN..PORT_MAX``:
+
+- `lease_ports(user_id, n)` takes the lowest free ports using the same claim as
+  `startjobs.claim_next_job`: ``SELECT ... FOR UPDATE SKIP LOCKED`` on the
+  partial index of free ports, then a conditional ``UPDATE ... WHERE user_id
+  IS NULL``. Concurrent callers skip each other's rows instead of colliding,
+  and the cost does not grow with the number of leased ports.
+- Leases are per user and idempotent: a user who already holds ports (a
+  retried start) gets the same ones back.
+- Deleting a CodeHost row releases its user's ports (an ORM event in
+  `cspawn.models`). `release_orphaned_ports` catches rows removed by bulk
+  deletes, which skip ORM events; `cspawnctl host reap` runs it.
+- Hosts started before leases existed hold ports the table does not know
+  about. The migration backfills the code-server port from ``public_url``,
+  but the VNC port is only in the Swarm service spec, so `reserve_ports`
+  leases every port a running service publishes; `CodeServerManager.sync`
+  calls it on each pass.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from cspawn.util.exceptions import DockerException
+
+logger = logging.getLogger("cspawn.docker")
+
+PORT_MIN = 25000
+PORT_MAX = 30000
+
+
+class PortsExhausted(DockerException):
+    """Raised when every port in the range is leased."""
+
+
+def seed_ports(lo: int = PORT_MIN, hi: int = PORT_MAX) -> int:
+    """Insert a free row for each port in ``lo..hi`` that has none; returns how many."""
+    from cspawn.models import PortLease, db
+
+    have = {p for (p,) in db.session.query(PortLease.port).filter(PortLease.port.between(lo, hi))}
+    missing = [{"port": p} for p in range(lo, hi + 1) if p not in have]
+    if missing:
+        db.session.bulk_insert_mappings(PortLease, missing)
+        db.session.commit()
+    return len(missing)
+
+
+def leased_ports(user_id: int) -> List[int]:
+    from cspawn.models import PortLease
+
+    return [p for (p,) in PortLease.query.with_entities(PortLease.port)
+            .filter_by(user_id=user_id).order_by(PortLease.port)]
+
+
+def lease_ports(user_id: int, n: int = 1, *, now: Optional[datetime] = None) -> List[int]:
+    """Lease `n` ports to `user_id` (or return the ones it already holds).
+
+    Raises:
+        PortsExhausted: Fewer than `n` ports are free.
+    """
+    from cspawn.models import PortLease, db
+
+    now = now or datetime.now(timezone.utc)
+    held = leased_ports(user_id)
+    seeded = False
+
+    while len(held) < n:
+        need = n - len(held)
+        candidates = [p for (p,) in (
+            db.session.query(PortLease.port)
+            .filter(PortLease.user_id.is_(None))
+            .order_by(PortLease.port)
+            .limit(need)
+            .with_for_update(skip_locked=True)
+        )]
+        if len(candidates) < need and not seeded:
+            db.session.rollback()
+            seeded = True
+            if seed_ports():
+                continue
+        if not candidates:
+            db.session.rollback()
+            raise PortsExhausted(f"No free ports in {PORT_MIN}-{PORT_MAX} for user {user_id}")
+
+        PortLease.query.filter(PortLease.port.in_(candidates), PortLease.user_id.is_(None)).update(
+            {"user_id": user_id, "leased_at": now}, synchronize_session=False
+        )
+        db.session.commit()
+        # Anything a concurrent caller got first is simply not ours; go round
+        # again for the remainder.
+        held = leased_ports(user_id)
+
+    return held[:n]
+
+
+def reserve_ports(held: Dict[int, int], *, now: Optional[datetime] = None) -> int:
+    """Lease each ``{port: user_id}`` in `held` whose port is still free.
+
+    A port already leased, to anyone, is left alone. Returns how many
+    ports were leased.
+    """
+    from cspawn.models import PortLease, db
+
+    held = {p: u for p, u in held.items() if PORT_MIN <= p <= PORT_MAX}
+    if not held:
+        return 0
+    now = now or datetime.now(timezone.utc)
+
+    if PortLease.query.filter(PortLease.port.in_(held)).count() < len(held):
+        seed_ports()
+    free = [p for (p,) in db.session.query(PortLease.port)
+            .filter(PortLease.port.in_(held), PortLease.user_id.is_(None))]
+    n = 0
+    for port in sorted(free):
+        n += PortLease.query.filter(PortLease.port == port, PortLease.user_id.is_(None)).update(
+            {"user_id": held[port], "leased_at": now}, synchronize_session=False
+        )
+    db.session.commit()
+    if n:
+        logger.info("Leased %d port(s) already published by running hosts", n)
+    return n
+
+
+def release_ports(user_id: int) -> int:
+    """Free every port leased to `user_id`; returns how many."""
+    from cspawn.models import PortLease, db
+
+    n = PortLease.query.filter_by(user_id=user_id).update(
+        {"user_id": None, "leased_at": None}, synchronize_session=False
+    )
+    db.session.commit()
+    return n
+
+
+def release_orphaned_ports(grace: timedelta = timedelta(minutes=30),
+                           now: Optional[datetime] = None) -> int:
+    """Free leases whose user has no CodeHost, once older than `grace`.
+
+    The grace period covers a `new_cs` that has leased ports but not yet
+    written its CodeHost row.
+    """
+    from cspawn.models import CodeHost, PortLease, db
+
+    now = now or datetime.now(timezone.utc)
+    has_host = db.session.query(CodeHost.user_id)
+    n = PortLease.query.filter(
+        PortLease.user_id.isnot(None),
+        PortLease.user_id.notin_(has_host),
+        PortLease.leased_at < now - grace,
+    ).update({"user_id": None, "leased_at": None}, synchronize_session=False)
+    db.session.commit()
+    if n:
+        logger.info("Released %d orphaned port lease(s)", n)
+    return n
@@ -0,0 +1,224 @@
+"""
+cspawn/cs_docker/prepull.py — Planning for node image pre-pulls.
+
+`cspawn.cli.node._prepull_images` warms a new node's image cache before it is
+activated. It used to run one ``docker pull`` per image, each over its own SSH
+connection, one after another. Class images mostly share their base layers, so
+that downloaded the same layers again and again and left the node's bandwidth idle
+between pulls.
+
+The pure parts of the replacement live here:
+
+- `image_layers` reads layer digests from ``docker manifest inspect -v``
+  output, and `plan_waves` orders the pulls with them. Images that share
+  layers form a family. The member sharing the most layers with the rest is
+  pulled first (wave 1), and the others then fetch only their own top layers,
+  concurrently (wave 2). Images whose layers are unknown go in wave 1.
+- `parse_mirrors` / `mirror_ref` map an image onto a registry mirror or
+  pull-through cache (``NODE_PREPULL_MIRRORS``), so a batch of new nodes
+  fetches from inside the VPC instead of each pulling gigabytes from ghcr.
+- `pull_script` renders the bash that runs on the node in a single SSH
+  session. It runs a bounded number of pulls at once (``NODE_PREPULL_CONCURRENCY``),
+  tries the mirror first and falls back to the origin registry, and prints one
+  ``PROGRESS`` line per docker output line and one ``RESULT`` line per image.
+  `PullProgress` turns those lines into per-image log lines.
+"""
+from __future__ import annotations
+
+import json
+import shlex
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+DEFAULT_CONCURRENCY = 3
+NODE_ARCH = "amd64"
+
+
+# ---------------------------------------------------------------------------
+# Layer-aware ordering
+# ---------------------------------------------------------------------------
+
+def image_layers(inspect_output: str, arch: str = NODE_ARCH) -> list[str]:
+    """Layer digests from ``docker manifest inspect -v`` output; ``[]`` if unparseable.
+
+    A single-platform image prints one object; a multi-platform image prints a
+    list with one per platform, of which the `arch` one is used.
+    """
+    try:
+        data = json.loads(inspect_output)
+    except ValueError:
+        return []
+    entries = data if isinstance(data, list) else [data]
+    chosen = None
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        platform = (entry.get("Descriptor") or {}).get("platform") or {}
+        if chosen is None or platform.get("architecture") == arch:
+            chosen = entry
+            if platform.get("architecture") == arch:
+                break
+    manifest = (chosen or {}).get("SchemaV2Manifest") or (chosen or {}).get("OCIManifest") or {}
+    return [layer["digest"] for layer in manifest.get("layers") or [] if isinstance(layer, dict) and "digest" in layer]
+
+
+def plan_waves(images: list[str], layers: dict[str, list[str]]) -> list[list[str]]:
+    """Split `images` into pull waves so shared layers are fetched once.
+
+    Wave 1 holds one leader per family of layer-sharing images (the member
+    sharing the most layers with the others), every image with no family,
+    and every image with unknown layers. Wave 2 holds the rest, most-shared
+    first. Order within a wave follows `images` otherwise.
+    """
+    known = [i for i in images if layers.get(i)]
+    families: list[tuple[set[str], list[str]]] = []
+    for image in known:
+        own = set(layers[image])
+        overlapping = [f for f in families if f[0] & own]
+        merged_layers, merged_images = set(own), [image]
+        for f in overlapping:
+            merged_layers |= f[0]
+            merged_images = f[1] + merged_images
+            families.remove(f)
+        families.append((merged_layers, merged_images))
+
+    def shared(image: str, family: list[str]) -> int:
+        own = set(layers[image])
+        return sum(len(own & set(layers[o])) for o in family if o != image)
+
+    followers: dict[str, int] = {}
+    for _, members in families:
+        ranked = sorted(members, key=lambda i: (-shared(i, members), images.index(i)))
+        for image in ranked[1:]:
+            followers[image] = shared(image, members)
+
+    first = [i for i in images if i not in followers]
+    second = sorted(followers, key=lambda i: (-followers[i], images.index(i)))
+    return [wave for wave in (first, second) if wave]
+
+
+# ---------------------------------------------------------------------------
+# Registry mirrors
+# ---------------------------------------------------------------------------
+
+def parse_mirrors(raw: Optional[str]) -> dict[str, str]:
+    """Parse ``NODE_PREPULL_MIRRORS``: ``registry=mirror`` pairs, comma/space separated.
+
+    e.g. ``ghcr.io=10.124.0.2:5000`` sends ghcr pulls through a pull-through
+    cache on the VPC. Malformed entries are ignored.
+    """
+    mirrors = {}
+    for entry in (raw or "").replace(",", " ").split():
+        registry, sep, mirror = entry.partition("=")
+        if sep and registry and mirror:
+            mirrors[registry.strip()] = mirror.strip().rstrip("/")
+    return mirrors
+
+
+def _split_registry(image: str) -> tuple[str, str]:
+    first, sep, rest = image.partition("/")
+    if sep and ("." in first or ":" in first or first == "localhost"):
+        return first, rest
+    # Docker Hub: "python:3" is "library/python:3" on the registry.
+    return "docker.io", image if sep else f"library/{image}"
+
+
+def mirror_ref(image: str, mirrors: dict[str, str]) -> Optional[str]:
+    """The mirror's name for `image`, or ``None`` if its registry has no mirror."""
+    registry, path = _split_registry(image)
+    mirror = mirrors.get(registry)
+    return f"{mirror}/{path}" if mirror else None
+
+
+# ---------------------------------------------------------------------------
+# Node-side script and progress
+# ---------------------------------------------------------------------------
+
+_PULL_FN = r"""
+pull_one() {
+  local img="$1" src="$2" t0=$SECONDS rc
+  if [ -n "$src" ]; then
+    timeout __TIMEOUT__ docker pull "$src" 2>&1 | sed -u "s|^|PROGRESS $img |"
+    rc=${PIPESTATUS[0]}
+    if [ "$rc" -eq 0 ] && docker tag "$src" "$img"; then
+      echo "RESULT ok $img $((SECONDS - t0)) mirror"
+      return
+    fi
+    echo "PROGRESS $img mirror $src failed (exit $rc); pulling from origin"
+  fi
+  timeout __TIMEOUT__ docker pull "$img" 2>&1 | sed -u "s|^|PROGRESS $img |"
+  rc=${PIPESTATUS[0]}
+  if [ "$rc" -eq 0 ]; then
+    echo "RESULT ok $img $((SECONDS - t0))"
+  else
+    echo "RESULT fail $img $((SECONDS - t0)) exit=$rc"
+  fi
+}
+run() {
+  while [ "$(jobs -rp | wc -l)" -ge __CONCURRENCY__ ]; do wait -n; done
+  pull_one "$@" &
+}
+"""
+
+
+def inspect_script(images: Iterable[str], timeout: int = 30) -> str:
+    """Bash printing ``@@ <image>`` then its one-line ``manifest inspect -v`` JSON, per image."""
+    lines = []
+    for image in images:
+        q = shlex.quote(image)
+        lines.append(f"echo @@ {q}; timeout {int(timeout)} docker manifest inspect -v {q} 2>/dev/null | tr -d '\\n'; echo")
+    return "\n".join(lines)
+
+
+def parse_inspect(output: str) -> dict[str, list[str]]:
+    layers, image = {}, None
+    for line in output.splitlines():
+        if line.startswith("@@ "):
+            image = line[3:].strip()
+        elif image is not None:
+            layers[image] = image_layers(line)
+            image = None
+    return layers
+
+
+def pull_script(waves: list[list[str]], *, concurrency: int, timeout: float,
+                mirrors: Optional[dict[str, str]] = None) -> str:
+    """Bash that pulls `waves` in order, each with at most `concurrency` pulls at once."""
+    body = [_PULL_FN.replace("__TIMEOUT__", str(int(timeout))).replace("__CONCURRENCY__", str(max(1, concurrency)))]
+    for wave in waves:
+        for image in wave:
+            body.append(f"run {shlex.quote(image)} {shlex.quote(mirror_ref(image, mirrors or {}) or '')}")
+        body.append("wait")
+    body.append("echo PREPULL_DONE")
+    return "\n".join(body)
+
+
+@dataclass
+class PullProgress:
+    """Folds the script's output into per-image state and log lines."""
+    layers: dict[str, list[str]] = field(default_factory=dict)
+    done: dict[str, set] = field(default_factory=dict)
+    results: dict[str, bool] = field(default_factory=dict)
+    details: dict[str, str] = field(default_factory=dict)
+
+    def feed(self, line: str) -> Optional[str]:
+        """Consume one output line; return a log line worth showing, if any."""
+        kind, _, rest = line.partition(" ")
+        if kind == "RESULT":
+            status, _, rest = rest.partition(" ")
+            image, _, detail = rest.partition(" ")
+            self.results[image] = status == "ok"
+            self.details[image] = detail
+            return f"{image}: {'pulled' if status == 'ok' else 'FAILED'} ({detail})"
+        if kind != "PROGRESS":
+            return None
+        image, _, text = rest.partition(" ")
+        layer, _, status = text.partition(": ")
+        if status in ("Pull complete", "Already exists"):
+            seen = self.done.setdefault(image, set())
+            seen.add(layer)
+            total = len(self.layers.get(image) or []) or "?"
+            return f"{image}: layer {len(seen)}/{total} {status.lower()}"
+        if text.startswith(("Status:", "Error", "error")) or "mirror" in text:
+            return f"{image}: {text}"
+        return None
@@ -123,22 +123,42 @@ class Container(ProcessBase):
 
 
 class Service(ProcessBase):
-    """Represents a single Docker service (for Swarm mode)."""
+    """Represents a single Docker service (for Swarm mode).
 
+    If a `SwarmSnapshot` is attached (`snapshot`), task and node lookups are
+    answered from it instead of calling the manager once per service.
+    """
 
+    snapshot = None
+
+    def __init__(self, manager, obj, snapshot=None):
+        super().__init__(manager, obj)
+        self.snapshot = snapshot
 
     def start(self):
         """Starting a service is not typically required (it auto-runs)."""
         raise NotImplementedError("Services do not support explicit start()")
 
     def stats(self):
-        """Service stats are obtained from the associated task/container."""
+        """Service stats are obtained from the associated task/container.
+
+        The container lives on the task's node, so it is inspected through
+        that node's pooled client rather than the manager's.
+        """
         task = self._get_single_task()
         if task:
             container_id = task["Status"].get("ContainerStatus", {}).get("ContainerID")
             if container_id:
-                container = self.client.containers.get(container_id)
-                return container.stats(stream=False)
+                try:
+                    node = self._get_node(task.get("NodeID"))
+                except NotFound:
+                    logger.error(f"Node for service {self.name} no longer exists in the Swarm")
+                    return None
+                node_name = node.attrs.get("Description", {}).get("Hostname")
+                n_manager = self.manager._node_manager(node_name)
+                if n_manager is None:
+                    return None
+                return n_manager.get(container_id).stats
 
     @property
     def container_states(self):
@@ -158,7 +178,7 @@ class Service(ProcessBase):
         for t in self.container_tasks:
             node_id = t["NodeID"]
             try:
-                node = self.manager.client.nodes.get(node_id)
+                node = self._get_node(node_id)
             except NotFound as e:
                 logger.error(
                     f"Node {node_id} for task {t['ID']} in service {self.name} "
@@ -201,37 +221,17 @@ class Service(ProcessBase):
                 )
                 continue
 
-            # The actual Docker inspect call tunnels over SSH to the node. A
-            # transient blip can leave a half-open tunnel that broken-pipes on
-            # every reuse even though the node is healthy and a *fresh* ssh
-            # connects fine. Rebuild the node manager (which constructs a new
-            # ssh subprocess) and retry once before giving up on the container.
-            cont = None
-            for attempt in (1, 2):
-                try:
-                    cont = n_manager.get(container_id)
-                    break
-                except (ConnectionError, OSError) as e:
-                    if attempt == 1:
-                        logger.warning(
-                            f"Stale connection to node {node_name} inspecting "
-                            f"{container_id}; rebuilding and retrying: {e}"
-                        )
-                        try:
-                            n_manager = self.manager._node_manager(node_name)
-                        except (NoValidConnectionsError, ConnectionError, OSError) as e2:
-                            logger.error(
-                                f"Rebuild of node manager for {node_name} failed: {e2}"
-                            )
-                            n_manager = None
-                        if n_manager is None:
-                            break
-                    else:
-                        logger.error(
-                            f"Error inspecting container {container_id} on node "
-                            f"{node_name} after retry: {e}"
-                        )
-            if cont is None:
+            # The inspect tunnels over SSH to the node. The node manager comes
+            # from the manager's NodeClientPool, whose get() detects a stale
+            # (half-open) tunnel, rebuilds it and retries once, so an error
+            # reaching here means the node is genuinely unreachable.
+            try:
+                cont = n_manager.get(container_id)
+            except (ConnectionError, OSError) as e:
+                logger.error(
+                    f"Error inspecting container {container_id} on node "
+                    f"{node_name} after retry: {e}"
+                )
                 continue
 
             cont.node = node
@@ -258,16 +258,34 @@ class Service(ProcessBase):
                 "labels": labels,
             }
 
+    def _raw_tasks(self) -> list:
+        """Raw task dicts, from the attached snapshot if there is one."""
+        if self.snapshot is not None:
+            return self.snapshot.tasks_for(self.id)
+        return self._object.tasks()
+
+    def _get_node(self, node_id):
+        """Resolve a node by id, from the attached snapshot if there is one.
+
+        Raises `NotFound` when the node has left the Swarm, in both modes.
+        """
+        if self.snapshot is not None:
+            node = self.snapshot.node(node_id)
+            if node is None:
+                raise NotFound(f"node {node_id} not in snapshot")
+            return node
+        return self.manager.client.nodes.get(node_id)
+
     @property
     def tasks(self):
         """Return the tasks associated with the service."""
-        return self._object.tasks()
+        return self._raw_tasks()
 
     @property
     def running_tasks(self):
         """Return the tasks associated with the service."""
 
-        for t in self._object.tasks():
+        for t in self._raw_tasks():
             if t['Status']['State'] == "running":
                 yield t
 
@@ -284,7 +302,7 @@ class Service(ProcessBase):
         """
 
         tasks = []
-        for t in self._object.tasks():
+        for t in self._raw_tasks():
             try:
                 if t["Status"]["ContainerStatus"]["ContainerID"]:
                     tasks.append(t)
@@ -343,9 +361,40 @@ class Service(ProcessBase):
         if not task_node_ids:
             return False
 
-        live_node_ids = {n.id for n in self.manager.client.nodes.list()}
+        if self.snapshot is not None:
+            live_node_ids = set(self.snapshot.nodes)
+        else:
+            live_node_ids = {n.id for n in self.manager.client.nodes.list()}
         return bool(task_node_ids - live_node_ids)
 
+    @property
+    def placement(self):
+        """Return a `TaskPlacement` for the current task, from the snapshot.
+
+        Resolves container id/name and node without an SSH inspect of the
+        node. Returns None if no snapshot is attached, there is no
+        container-bearing task yet, or the task's node has left the Swarm.
+        """
+        if self.snapshot is None:
+            return None
+
+        from .snapshot import TaskPlacement, task_container_name
+
+        task = self._get_single_task()
+        if task is None:
+            return None
+        node_id = task.get("NodeID")
+        if not self.snapshot.has_node(node_id):
+            return None
+        return TaskPlacement(
+            task_id=task["ID"],
+            node_id=node_id,
+            node_name=self.snapshot.node_name(node_id),
+            container_id=task["Status"]["ContainerStatus"]["ContainerID"],
+            container_name=task_container_name(self.name, task),
+            state=task["Status"]["State"],
+        )
+
     def first_container(self) -> Container:
         """Return this service's first live container.
 
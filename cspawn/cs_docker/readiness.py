@@ -0,0 +1,279 @@
+"""
+cspawn/cs_docker/readiness.py — Concurrent readiness probing for code-server hosts.
+
+`CSMService.is_ready` is a blocking GET of the host's public URL with a 10 s
+timeout. `sync(check_ready=True)` used to call it once per unsettled host,
+one after another, so twenty hosts that were still booting could hold the
+admin index page for minutes.
+
+`ReadinessProber` probes a whole batch at once:
+
+- **Bounded concurrency**: at most `concurrency` requests are in flight. The
+  default is well below what Caddy will take from one client.
+- **Per-host timeout**: one slow host costs `timeout_s`, not the whole pass.
+- **Shared keep-alive pool**: all probes go through a single
+  `requests.Session` whose adapter keeps `concurrency` connections per host,
+  so repeated passes (`sync_converge`, `test start`) reuse TLS connections to
+  the Caddy front end instead of handshaking for every probe.
+
+The repo does its concurrency with threads and `requests` elsewhere (the
+start worker pool, `test start`), so this module uses a thread pool too
+rather than adding an async HTTP client.
+
+Waiting students poll ``/host/is_ready`` (or hold an event stream open) every
+couple of seconds. The route used to re-read the service from Docker and
+probe the host on every poll. Now it only reads the host's row
+(`host_ready_status`):
+
+- `ReadinessTracker`, run by the host watcher, probes every starting host
+  (``app_state`` not yet ready) once per ``READY_TRACK_INTERVAL_S``, all in
+  one `probe_all` batch, and marks the rows that answer READY. The number of
+  browsers waiting on a host makes no difference. A host is followed for
+  ``READY_TRACK_TTL_S``; after that the watcher's periodic full sync still
+  catches it.
+- When the watcher is not running, `host_ready_status` probes the host
+  itself, at most once per ``READY_TRACK_INTERVAL_S`` per URL in each process
+  (`probe_cached`). It still never touches Docker.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("cspawn.docker")
+
+# Status codes that mean code-server is serving (302 is the login redirect).
+READY_STATUS = (200, 302)
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_TIMEOUT_S = 10.0
+
+
+def _make_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ReadinessProber:
+    """Probe many public URLs concurrently over one keep-alive session.
+
+    Args:
+        concurrency: Maximum probes in flight at once.
+        timeout_s: Per-request connect/read timeout.
+        session: Injectable for tests; defaults to a pooled `requests.Session`.
+    """
+
+    def __init__(self, *, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout_s: float = DEFAULT_TIMEOUT_S,
+                 session: Optional[requests.Session] = None) -> None:
+        self.concurrency = max(1, int(concurrency))
+        self.timeout_s = timeout_s
+        self.session = session or _make_session(self.concurrency)
+
+    @classmethod
+    def from_config(cls, config) -> "ReadinessProber":
+        from cspawn.util.config import cfg_float, cfg_int
+
+        return cls(
+            concurrency=cfg_int(config, "READY_PROBE_CONCURRENCY", DEFAULT_CONCURRENCY),
+            timeout_s=cfg_float(config, "READY_PROBE_TIMEOUT", DEFAULT_TIMEOUT_S),
+        )
+
+    def probe(self, url: Optional[str]) -> bool:
+        """True if `url` answers with a ready status. Never raises."""
+        if not url:
+            return False
+        try:
+            response = self.session.get(url, timeout=self.timeout_s)
+            logger.debug("Response from %s: %s", url, response.status_code)
+            return response.status_code in READY_STATUS
+        except requests.exceptions.SSLError:
+            logger.debug("SSL error encountered when connecting to %s", url)
+            return False
+        except requests.exceptions.RequestException as e:
+            logger.debug("Error checking server status to %s: %s", url, e)
+            return False
+
+    def probe_all(self, urls: Iterable[Optional[str]]) -> Dict[str, bool]:
+        """Probe every distinct URL concurrently; returns ``{url: ready}``.
+
+        Empty/None URLs are reported not ready without a request.
+        """
+        todo = list(dict.fromkeys(u for u in urls if u))
+        if not todo:
+            return {}
+        if len(todo) == 1:
+            return {todo[0]: self.probe(todo[0])}
+
+        t0 = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(todo)),
+                                thread_name_prefix="ready-probe") as ex:
+            results = dict(zip(todo, ex.map(self.probe, todo)))
+        logger.info("Probed %d host(s) in %.2fs: %d ready",
+                    len(todo), time.monotonic() - t0, sum(results.values()))
+        return results
+
+    def wait_all(self, urls: Iterable[Optional[str]], *, timeout_s: float,
+                 interval_s: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep) -> Dict[str, float]:
+        """Probe until every URL is ready or `timeout_s` passes.
+
+        Each round probes only the URLs still pending, all concurrently.
+
+        Returns:
+            ``{url: clock() at which it was first seen ready}``; URLs that
+            never became ready are absent.
+        """
+        pending = list(dict.fromkeys(u for u in urls if u))
+        ready_at: Dict[str, float] = {}
+        deadline = clock() + timeout_s
+        while pending:
+            now_ready = self.probe_all(pending)
+            t = clock()
+            for url, ok in now_ready.items():
+                if ok:
+                    ready_at[url] = t
+            pending = [u for u in pending if u not in ready_at]
+            if not pending or t >= deadline:
+                break
+            sleep(min(interval_s, max(0.0, deadline - t)))
+        return ready_at
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default: Optional[ReadinessProber] = None
+_default_lock = threading.Lock()
+
+
+def default_prober() -> ReadinessProber:
+    """Process-wide prober used by `CSMService.is_ready` for single probes."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ReadinessProber()
+        return _default
+
+
+_probe_cache: Dict[str, tuple] = {}  # url -> (clock, ready)
+_cache_lock = threading.Lock()
+
+
+def probe_cached(url: Optional[str], ttl_s: float, *, clock: Callable[[], float] = time.monotonic) -> bool:
+    """`default_prober().probe(url)`, reusing a result younger than `ttl_s` seconds."""
+    if not url:
+        return False
+    now = clock()
+    with _cache_lock:
+        hit = _probe_cache.get(url)
+        if hit is not None and now - hit[0] < ttl_s:
+            return hit[1]
+    ready = default_prober().probe(url)
+    with _cache_lock:
+        _probe_cache[url] = (now, ready)
+        for stale in [u for u, (t, _) in _probe_cache.items() if now - t >= ttl_s]:
+            del _probe_cache[stale]
+    return ready
+
+
+def host_ready_status(host, cfg) -> Dict[str, Any]:
+    """The ``/host/is_ready`` answer for `host` (a `CodeHost` row) without touching Docker.
+
+    Reads the row that `ReadinessTracker` keeps current. With no live
+    watcher, probes the public URL (cached) and records a READY answer.
+    """
+    from cspawn.models import HostState, db
+
+    from cspawn.util.config import cfg_float
+    from .watcher import watcher_alive
+
+    if host.is_mia:
+        return {"status": "error", "message": "Host is no longer running"}
+    if host.app_state == HostState.READY.value:
+        return {"status": "ready", "hostname_url": host.public_url}
+    if watcher_alive(cfg):
+        return {"status": "not_ready"}
+    if probe_cached(host.public_url, cfg_float(cfg, "READY_TRACK_INTERVAL_S", 2.0)):
+        host.app_state = HostState.READY.value
+        db.session.commit()
+        return {"status": "ready", "hostname_url": host.public_url}
+    return {"status": "not_ready"}
+
+
+class ReadinessTracker:
+    """Probe every starting host once per interval and mark the ready ones.
+
+    Args:
+        prober: The prober for the batch probes.
+        interval_s: Minimum seconds between passes; `track` is a no-op sooner.
+        ttl_s: Stop following a host this long after first seeing it.
+        clock: Monotonic clock, injectable for tests.
+    """
+
+    def __init__(self, prober: ReadinessProber, *, interval_s: float = 2.0, ttl_s: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.prober = prober
+        self.interval_s = interval_s
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self.last_pass: Optional[float] = None
+        self.first_seen: Dict[str, float] = {}  # service_id -> clock
+        self.passes = 0
+
+    @classmethod
+    def from_config(cls, config, prober: ReadinessProber) -> "ReadinessTracker":
+        from cspawn.util.config import cfg_float
+
+        return cls(
+            prober,
+            interval_s=cfg_float(config, "READY_TRACK_INTERVAL_S", 2.0),
+            ttl_s=cfg_float(config, "READY_TRACK_TTL_S", 300.0),
+        )
+
+    def track(self) -> int:
+        """One pass if due; returns the number of hosts newly marked READY.
+
+        Must run inside an app context.
+        """
+        from cspawn.models import CodeHost, HostState, db
+
+        now = self._clock()
+        if self.last_pass is not None and now - self.last_pass < self.interval_s:
+            return 0
+        self.last_pass = now
+
+        rows = CodeHost.query.filter(
+            CodeHost.public_url.isnot(None),
+            CodeHost.state != HostState.MIA.value,
+            (CodeHost.app_state.is_(None)) | (~CodeHost.app_state.in_([HostState.READY.value, HostState.MIA.value])),
+        ).all()
+        current = {ch.service_id for ch in rows}
+        self.first_seen = {sid: t for sid, t in self.first_seen.items() if sid in current}
+        for ch in rows:
+            self.first_seen.setdefault(ch.service_id, now)
+        rows = [ch for ch in rows if now - self.first_seen[ch.service_id] < self.ttl_s]
+        if not rows:
+            return 0
+
+        self.passes += 1
+        results = self.prober.probe_all(ch.public_url for ch in rows)
+        marked = 0
+        for ch in rows:
+            if results.get(ch.public_url):
+                ch.app_state = HostState.READY.value
+                marked += 1
+        if marked:
+            db.session.commit()
+            logger.info("readiness: %d host(s) ready", marked)
+        return marked
@@ -0,0 +1,308 @@
+"""
+cspawn/cs_docker/repack.py — Empty sparse nodes by moving their idle hosts onto fuller ones.
+
+After a class ends, a few stragglers can keep several half-empty nodes alive
+until ``purge_by``: none of them is empty, so `autoscale.plan_scale_down` has
+nothing to remove. ``node rebalance`` makes this worse, since it levels load.
+Repacking goes the other way:
+
+- `plan_repack` finds **sparse** nodes: active workers whose hosts fill at
+  most ``AUTOSCALE_REPACK_SPARSE_FRACTION`` of their slots, where every host
+  is quiescent (``CodeHost.is_quiescent``). It skips nodes in
+  ``protected_node_fqdns``. A node with any active host is left alone, because
+  moving only some of its hosts would not empty it. Each sparse node's hosts
+  go to fuller nodes with room (`placement.choose_node`, the same fit rule
+  new hosts use). A node is only planned if all of its hosts fit, within
+  ``AUTOSCALE_REPACK_MAX_MOVES`` moves per run. Emptiest nodes go first.
+- `apply_repack` moves each host like ``node rebalance`` does: a best-effort
+  push to GitHub, then a re-pin to the target (``_pin_service_to_node``).
+  Swarm recreates the container there, and the workspace follows on NFS.
+- The emptied nodes are entered in ``empty_since``, so the normal scale-down
+  cooldown starts and a later cycle removes them.
+
+``run_autoscale`` runs a repack in quiet periods only: when the cycle's plan
+is a hold and no host is pending. Runs are at least
+``AUTOSCALE_REPACK_INTERVAL_MIN`` apart. ``cspawnctl node repack`` runs one by
+hand. Repacking works best with ``PLACEMENT_BINPACK``. Under Swarm's spread
+strategy, new hosts are drawn to the emptied nodes.
+
+Config keys:
+  AUTOSCALE_REPACK                 bool  default false — repack in quiet autoscale cycles
+  AUTOSCALE_REPACK_SPARSE_FRACTION float default 0.34  — fill at or below which a node is sparse
+  AUTOSCALE_REPACK_MAX_MOVES       int   default 4     — host moves per run
+  AUTOSCALE_REPACK_INTERVAL_MIN    int   default 20    — minimum time between automatic runs
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
+
+from .autoscale import _extract_serial, _nodes_cost, assess_cluster
+from .placement import MB, NodeRoom, choose_node, host_memory_estimate, node_rooms
+from .tiers import load_tiers
+
+logger = logging.getLogger("cspawn.autoscale")
+
+REPACK_STATE_FILE = ".repack_state.json"
+
+
+@dataclass(frozen=True)
+class RepackHost:
+    """A running code host, as repacking sees it."""
+
+    username: str
+    service_id: str
+    node: str              # short name of the node it runs on
+    quiescent: bool
+    memory: int = 0        # bytes, from telemetry; 0 when unknown
+
+
+@dataclass
+class RepackPlan:
+    moves: list[tuple[RepackHost, str]] = field(default_factory=list)  # (host, target fqdn)
+    emptied: list[str] = field(default_factory=list)                  # fqdns
+    saving_hourly: Optional[float] = None   # None when a node's tier has no price
+
+    def summary(self) -> str:
+        saving = f" saving_hourly={self.saving_hourly:.3f}" if self.saving_hourly is not None else ""
+        return f"repack moves={len(self.moves)} emptied={self.emptied}{saving}"
+
+
+@dataclass
+class RepackResult:
+    plan: RepackPlan
+    moved: int = 0
+    failed: set[str] = field(default_factory=set)  # usernames not moved
+    errors: list[str] = field(default_factory=list)
+
+
+def plan_repack(
+    node_dicts: list[dict],
+    hosts: list[RepackHost],
+    cfg,
+    protected_node_fqdns: "frozenset[str] | None" = None,
+    *,
+    max_moves: Optional[int] = None,
+) -> RepackPlan:
+    """Choose sparse nodes to empty and where their hosts go; see the module docstring."""
+    sparse_fraction = cfg_float(cfg, "AUTOSCALE_REPACK_SPARSE_FRACTION", 0.34)
+    if max_moves is None:
+        max_moves = cfg_int(cfg, "AUTOSCALE_REPACK_MAX_MOVES", 4)
+    reserve = cfg_int(cfg, "PLACEMENT_MEMORY_RESERVE_MB", 1024) * MB
+    cpus_per_host = cfg_float(cfg, "PLACEMENT_HOST_CPUS", 0.5)
+    protected = protected_node_fqdns or frozenset()
+
+    by_node: dict[str, list[RepackHost]] = {}
+    for h in hosts:
+        by_node.setdefault(h.node, []).append(h)
+    host_mem = host_memory_estimate([h.memory for h in hosts],
+                                    cfg_int(cfg, "PLACEMENT_HOST_MEMORY_MB", 1536) * MB)
+    rooms = node_rooms(node_dicts, {n: len(v) for n, v in by_node.items()},
+                       {n: [h.memory for h in v] for n, v in by_node.items()}, cfg, host_mem=host_mem)
+
+    def _short(room: NodeRoom) -> str:
+        return room.fqdn.split(".")[0]
+
+    sources = [
+        r for r in rooms
+        if r.fqdn not in protected
+        and 0 < r.hosts <= r.slots * sparse_fraction
+        and all(h.quiescent for h in by_node[_short(r)])
+    ]
+    # Emptiest first; among equals the highest serial, as scale-down removes.
+    sources.sort(key=lambda r: (r.hosts, -(_extract_serial(_short(r)) or 0)))
+
+    plan = RepackPlan()
+    emptying: set[str] = set()
+    receiving: set[str] = set()
+    for src in sources:
+        if src.fqdn in receiving:
+            continue
+        moving = by_node[_short(src)]
+        if len(plan.moves) + len(moving) > max_moves:
+            continue
+        # Try the whole node on copies, so a node that does not fit leaves no trace.
+        trial = {r.fqdn: replace(r) for r in rooms if r.fqdn != src.fqdn and r.fqdn not in emptying}
+        moves = []
+        for h in moving:
+            mem = h.memory or host_mem
+            targets = [r for r in trial.values() if r.hosts >= src.hosts]
+            target = choose_node(targets, mem=mem, cpus_per_host=cpus_per_host, reserve=reserve)
+            if target is None:
+                break
+            trial[target].hosts += 1
+            trial[target].mem_used += mem
+            moves.append((h, target))
+        if len(moves) < len(moving):
+            continue
+        for r in rooms:
+            if r.fqdn in trial:
+                r.hosts, r.mem_used = trial[r.fqdn].hosts, trial[r.fqdn].mem_used
+        plan.moves.extend(moves)
+        plan.emptied.append(src.fqdn)
+        emptying.add(src.fqdn)
+        receiving.update(target for _, target in moves)
+
+    if plan.emptied:
+        state = assess_cluster(node_dicts, {}, 0, cfg)
+        plan.saving_hourly = _nodes_cost([n for n in state.nodes if n.fqdn in emptying], load_tiers(cfg))
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Orchestrator (side-effecting)
+# ---------------------------------------------------------------------------
+
+def gather_repack_hosts(app, snap) -> list[RepackHost]:
+    """Running code hosts from a ``SwarmSnapshot``, with quiescence and memory from the DB."""
+    from cspawn.models import CodeHost, db
+
+    with app.app_context():
+        rows = {
+            service_id: (bool(quiescent), memory or 0)
+            for service_id, quiescent, memory in db.session.query(
+                CodeHost.service_id, CodeHost.is_quiescent, CodeHost.memory_usage)
+        }
+        hosts = []
+        for svc_id, svc in snap.services.items():
+            labels = (svc.attrs.get("Spec", {}) or {}).get("Labels", {}) or {}
+            for t in snap.tasks_for(svc_id):
+                if t.get("DesiredState") != "running" or (t.get("Status", {}) or {}).get("State") != "running":
+                    continue
+                node_name = snap.node_name(t.get("NodeID"))
+                if not node_name:
+                    continue
+                row = rows.get(svc_id)
+                hosts.append(RepackHost(
+                    username=labels.get("jtl.codeserver.username") or svc.name,
+                    service_id=svc_id,
+                    node=node_name.split(".")[0],
+                    # No DB row: nothing says it is idle, so it stays put.
+                    quiescent=row is not None and row[0],
+                    memory=row[1] if row is not None else 0,
+                ))
+    return hosts
+
+
+def apply_repack(app, snap, plan: RepackPlan, *, dry_run: bool, push: bool = True) -> RepackResult:
+    """Push and re-pin every planned host; per-host failures are recorded, never raised."""
+    from cspawn.cli.node import _pin_service_to_node
+
+    result = RepackResult(plan=plan)
+    if dry_run:
+        logger.info("[repack] dry-run: %s", plan.summary())
+        return result
+
+    for host, target in plan.moves:
+        svc = snap.services.get(host.service_id)
+        if svc is None:
+            result.failed.add(host.username)
+            result.errors.append(f"{host.username}: service vanished")
+            continue
+        if push:
+            try:
+                from cspawn.cs_github.repo import CodeHostRepo
+
+                with app.app_context():
+                    CodeHostRepo.new_codehostrepo(app, host.username).push()
+            except Exception as e:
+                # Data is safe on NFS regardless; the push is a snapshot.
+                logger.warning("[repack] push of %s failed (%s); moving anyway", host.username, e)
+        try:
+            _pin_service_to_node(svc, target)
+        except Exception as e:
+            result.failed.add(host.username)
+            result.errors.append(f"{host.username}: move to {target} failed: {e}")
+            continue
+        result.moved += 1
+        try:
+            from cspawn.models import CodeHost, db
+
+            with app.app_context():
+                row = CodeHost.query.filter_by(service_id=host.service_id).first()
+                if row is not None:
+                    row.node_name = target
+                    db.session.commit()
+        except Exception as e:
+            logger.warning("[repack] could not record new node for %s: %s", host.username, e)
+        logger.info("[repack] moved %s %s -> %s", host.username, host.node, target)
+
+    if result.errors:
+        logger.warning("[repack] %d move(s) failed: %s", len(result.errors), "; ".join(result.errors))
+    return result
+
+
+def repack_due(data_dir: str, cfg, now: datetime) -> bool:
+    """Whether ``AUTOSCALE_REPACK_INTERVAL_MIN`` has passed since the last automatic run."""
+    try:
+        raw = json.loads((Path(data_dir) / REPACK_STATE_FILE).read_text()).get("last_run")
+        last = datetime.fromisoformat(raw)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return True
+    if last.tzinfo is None:
+        last = last.replace(tzinfo=timezone.utc)
+    return now - last >= timedelta(minutes=cfg_int(cfg, "AUTOSCALE_REPACK_INTERVAL_MIN", 20))
+
+
+def _record_repack_run(data_dir: str, now: datetime) -> None:
+    """Atomically record the time of an automatic run (same idiom as the empty_since sidecar)."""
+    fd, tmp = tempfile.mkstemp(dir=data_dir, prefix=".repack_state.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"last_run": now.isoformat()}, f)
+        os.replace(tmp, Path(data_dir) / REPACK_STATE_FILE)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def run_repack_cycle(
+    app,
+    manager_client,
+    cfg,
+    *,
+    node_dicts: list[dict],
+    protected: frozenset[str],
+    empty_since: dict[str, datetime],
+    now: datetime,
+    dry_run: bool,
+) -> Optional[RepackResult]:
+    """The automatic repack step of ``run_autoscale``; ``None`` when off or not due.
+
+    Emptied nodes go into `empty_since` (in place) so their scale-down
+    cooldown starts now.
+    """
+    if not cfg_bool(cfg, "AUTOSCALE_REPACK", False):
+        return None
+    data_dir = cfg.get("DATA_DIR", "/tmp")
+    if not repack_due(data_dir, cfg, now):
+        return None
+
+    from .snapshot import SwarmSnapshot
+
+    snap = SwarmSnapshot.build(manager_client, label="jtl.codeserver=true")
+    plan = plan_repack(node_dicts, gather_repack_hosts(app, snap), cfg, protected)
+    # A run with nothing to move still counts: the snapshot and host read are
+    # the cost the interval is there to bound.
+    if not dry_run:
+        _record_repack_run(data_dir, now)
+    if not plan.moves:
+        return RepackResult(plan=plan)
+    logger.info("[repack] %s", plan.summary())
+    result = apply_repack(app, snap, plan, dry_run=dry_run)
+    if not dry_run:
+        for fqdn in plan.emptied:
+            short = fqdn.split(".")[0]
+            if not any(h.node == short and h.username in result.failed for h, _ in plan.moves):
+                empty_since.setdefault(fqdn, now)
+    return result
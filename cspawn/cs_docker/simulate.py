@@ -0,0 +1,384 @@
+"""
+cspawn/cs_docker/simulate.py — Replay a demand trace through the autoscale planner.
+
+The decision layer in ``autoscale.py`` is pure, so a policy change (headroom,
+cooldowns, per-cycle limits, the forecast) can be measured offline instead of
+by a week of dry-run in production. `simulate` drives the planner
+(`assess_cluster` → `estimate_demand` → `build_plan`) with a discrete-event
+clock over a `Trace`:
+
+- host arrivals and departures: a host is placed on the least-loaded ready
+  node with a free slot, else it waits for capacity;
+- an autoscale cycle every ``interval_min`` (cron runs it every 2 minutes).
+  As in production, a cycle that adds nodes holds the autoscale lock until
+  they are all provisioned, so the cycles that fall inside that window are
+  skipped;
+- node provisioning latencies, taken in turn from the trace;
+- consolidations (``AUTOSCALE_CONSOLIDATE``): the idle nodes go once their
+  replacement is ready, if they are still empty.
+
+`SimResult` reports what a policy costs (node-hours per tier), what students
+pay for it (how long they waited for a slot), and how often it flapped (an
+add and a remove in opposite directions within ``flap_window_min``).
+
+Traces are JSON (`Trace.to_json`). `recorded_trace` builds one from history
+(``autoscale.gather_demand_history``); `synthetic_trace` generates one from
+class schedules. Both are pure; ``cspawnctl node autoscale simulate`` wires
+them to the database and files.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from cspawn.cs_docker.autoscale import (
+    assess_cluster,
+    build_plan,
+    estimate_demand,
+)
+from cspawn.cs_docker.tiers import load_tiers
+from cspawn.util.config import cfg_bool, cfg_int
+
+DEFAULT_INTERVAL_MIN = 2
+DEFAULT_FLAP_WINDOW_MIN = 60
+DEFAULT_PROVISION_S = 900.0
+
+
+# ---------------------------------------------------------------------------
+# Traces
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TraceHost:
+    user_id: int
+    class_id: Optional[int]
+    arrive: datetime
+    depart: datetime
+
+
+@dataclass
+class Trace:
+    """What happened (or might happen): the input to `simulate`."""
+    start: datetime
+    end: datetime
+    hosts: list[TraceHost] = field(default_factory=list)
+    classes: list[dict] = field(default_factory=list)  # shaped like gather_demand_history output
+    provision_s: list[float] = field(default_factory=lambda: [DEFAULT_PROVISION_S])
+    nodes: dict[str, int] = field(default_factory=dict)  # tier name -> workers at start
+
+    def to_json(self) -> str:
+        def _default(o):
+            if isinstance(o, datetime):
+                return o.isoformat()
+            raise TypeError(type(o).__name__)
+
+        return json.dumps(asdict(self), default=_default, indent=1)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Trace":
+        data = json.loads(text)
+
+        def _dt(v):
+            return _aware(datetime.fromisoformat(v)) if isinstance(v, str) else v
+
+        classes = []
+        for c in data.get("classes") or []:
+            c = dict(c)
+            for key in ("start_date", "end_date", "purge_after", "purge_by"):
+                if c.get(key):
+                    c[key] = _dt(c[key])
+            classes.append(c)
+        return cls(
+            start=_dt(data["start"]),
+            end=_dt(data["end"]),
+            hosts=[TraceHost(h.get("user_id"), h.get("class_id"), _dt(h["arrive"]), _dt(h["depart"]))
+                   for h in data.get("hosts") or []],
+            classes=classes,
+            provision_s=[float(s) for s in data.get("provision_s") or [DEFAULT_PROVISION_S]],
+            nodes={str(k): int(v) for k, v in (data.get("nodes") or {}).items()},
+        )
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+def recorded_trace(classes: list[dict], arrivals: list[dict], durations_s: list[float], *,
+                   start: datetime, end: datetime, session_min: int,
+                   nodes: Optional[dict[str, int]] = None) -> Trace:
+    """A trace of recorded host starts in ``[start, end)``.
+
+    Stop times are not recorded (the ``CodeHost`` row goes with the host), so
+    each host is assumed to last `session_min` minutes. Repeated starts by one
+    student within that window are one host.
+    """
+    hosts: list[TraceHost] = []
+    last: dict = {}
+    for a in sorted(arrivals, key=lambda a: a["at"]):
+        at = _aware(a["at"])
+        if not (start <= at < end):
+            continue
+        key = (a["user_id"], a["class_id"])
+        if key in last and at < last[key].depart:
+            continue
+        last[key] = TraceHost(a["user_id"], a["class_id"], at, at + timedelta(minutes=session_min))
+        hosts.append(last[key])
+    return Trace(start=start, end=end, hosts=hosts, classes=classes,
+                 provision_s=[float(d) for d in durations_s] or [DEFAULT_PROVISION_S], nodes=nodes or {})
+
+
+def synthetic_trace(classes: list[dict], *, start: datetime, end: datetime, session_min: int = 90,
+                    show_rate: float = 0.85, provision_s: Optional[list[float]] = None,
+                    nodes: Optional[dict[str, int]] = None, seed: int = 0) -> Trace:
+    """A trace generated from class schedules.
+
+    For each session, `show_rate` of the roster arrives between 10 minutes
+    before and 15 minutes after the start, and leaves within the last 15
+    minutes of the session. Deterministic for a given `seed`.
+    """
+    from cspawn.cs_docker.forecast import _roster, session_starts
+
+    rng = random.Random(seed)
+    hosts = []
+    for c in classes:
+        roster = _roster(c)
+        for s in session_starts(c, after=start, before=end):
+            for user in range(roster):
+                if rng.random() >= show_rate:
+                    continue
+                arrive = s + timedelta(minutes=rng.uniform(-10, 15))
+                depart = s + timedelta(minutes=session_min - rng.uniform(0, 15))
+                hosts.append(TraceHost(user, c.get("id"), arrive, max(depart, arrive + timedelta(minutes=5))))
+    hosts.sort(key=lambda h: h.arrive)
+    return Trace(start=start, end=end, hosts=hosts, classes=classes,
+                 provision_s=list(provision_s or [DEFAULT_PROVISION_S]), nodes=nodes or {})
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Node:
+    short: str
+    tier_name: str
+    capacity: int
+    created: datetime
+    ready: datetime
+    removed: Optional[datetime] = None
+    hosts: set = field(default_factory=set)
+
+    def attrs(self) -> dict:
+        """Swarm-shaped node attrs, as ``assess_cluster`` reads them."""
+        return {
+            "ID": self.short,
+            "Description": {"Hostname": f"{self.short}.sim"},
+            "Spec": {"Role": "worker", "Labels": {"cs.capacity": str(self.capacity)}},
+        }
+
+
+@dataclass
+class SimResult:
+    """Outcome of one `simulate` run."""
+    node_hours: dict[str, float] = field(default_factory=dict)  # tier name -> node-hours
+    waits_s: list[float] = field(default_factory=list)          # one per host, 0 if placed at once
+    unserved: int = 0          # hosts that left (or the trace ended) before getting a slot
+    adds: int = 0
+    removes: int = 0
+    flaps: int = 0
+    cycles: int = 0
+    skipped_cycles: int = 0    # cycles that found the lock held by a scale-up
+    peak_nodes: int = 0
+
+    @property
+    def waited(self) -> int:
+        return sum(1 for w in self.waits_s if w > 0)
+
+    def wait_percentile(self, pct: float) -> float:
+        if not self.waits_s:
+            return 0.0
+        ordered = sorted(self.waits_s)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self) -> str:
+        hours = " ".join(f"node_hours_{k}={v:.1f}" for k, v in sorted(self.node_hours.items()))
+        return (
+            f"simulate hosts={len(self.waits_s)} waited={self.waited} unserved={self.unserved} "
+            f"wait_p50_s={self.wait_percentile(50):.0f} wait_p95_s={self.wait_percentile(95):.0f} "
+            f"wait_max_s={max(self.waits_s, default=0):.0f} {hours} "
+            f"adds={self.adds} removes={self.removes} flaps={self.flaps} peak_nodes={self.peak_nodes}"
+        )
+
+
+# Same-instant events run departures first and cycles last, so a cycle sees
+# every arrival and departure at its own timestamp.
+_DEPART, _READY, _ARRIVE, _CYCLE = range(4)
+
+
+def simulate(trace: Trace, cfg, *, interval_min: int = DEFAULT_INTERVAL_MIN,
+             flap_window_min: int = DEFAULT_FLAP_WINDOW_MIN) -> SimResult:
+    """Run `trace` through the real planner under `cfg`; see the module docstring."""
+    tiers = {t.name: t for t in load_tiers(cfg)}
+    by_capacity = sorted(tiers.values(), key=lambda t: t.capacity)
+    tier_small = by_capacity[0]
+    use_forecast = cfg_bool(cfg, "AUTOSCALE_FORECAST", False)
+
+    result = SimResult()
+    nodes: list[_Node] = []
+    serial = [1]
+
+    def add_node(tier, now: datetime, ready: datetime) -> _Node:
+        serial[0] += 1
+        node = _Node(f"swarm{serial[0]}", tier.name, tier.capacity, now, ready)
+        nodes.append(node)
+        return node
+
+    for name, count in trace.nodes.items():
+        tier = tiers.get(name) or tier_small
+        for _ in range(count):
+            add_node(tier, trace.start, trace.start)
+    if not nodes:
+        for _ in range(cfg_int(cfg, "AUTOSCALE_MIN_WORKER_NODES", 1)):
+            add_node(tier_small, trace.start, trace.start)
+
+    events: list = []
+    seq = [0]
+
+    def push(at: datetime, kind: int, payload=None) -> None:
+        seq[0] += 1
+        heapq.heappush(events, (at, kind, seq[0], payload))
+
+    for i, h in enumerate(trace.hosts):
+        push(h.arrive, _ARRIVE, i)
+        push(h.depart, _DEPART, i)
+    t = trace.start
+    while t < trace.end:
+        push(t, _CYCLE)
+        t += timedelta(minutes=interval_min)
+
+    placed: dict[int, _Node] = {}
+    waiting: list[int] = []
+    arrived_at: dict[int, datetime] = {}
+    departed: set[int] = set()
+    empty_since: dict[str, datetime] = {}
+    busy_until = trace.start
+    latencies = list(trace.provision_s) or [DEFAULT_PROVISION_S]
+    next_latency = [0]
+    last_action: Optional[tuple[str, datetime]] = None
+    forecast_cache: dict = {}
+
+    def live_nodes(now: datetime) -> list[_Node]:
+        return [n for n in nodes if n.removed is None and n.ready <= now]
+
+    def place(i: int, now: datetime) -> bool:
+        free = [n for n in live_nodes(now) if len(n.hosts) < n.capacity]
+        if not free:
+            return False
+        node = min(free, key=lambda n: (len(n.hosts) / n.capacity, n.short))
+        node.hosts.add(i)
+        placed[i] = node
+        result.waits_s.append((now - arrived_at[i]).total_seconds())
+        return True
+
+    def drain(now: datetime) -> None:
+        while waiting and place(waiting[0], now):
+            waiting.pop(0)
+
+    def forecast_at(now: datetime):
+        from cspawn.cs_docker.forecast import build_forecast
+
+        # Rebuilding every cycle is wasteful and the curves move slowly.
+        key = now.replace(minute=now.minute - now.minute % 15, second=0, microsecond=0)
+        if key not in forecast_cache:
+            arrivals = [{"class_id": h.class_id, "user_id": h.user_id, "at": h.arrive}
+                        for h in trace.hosts if h.arrive < now]
+            forecast_cache.clear()
+            forecast_cache[key] = build_forecast(trace.classes, arrivals, latencies, cfg, now)
+        return forecast_cache[key]
+
+    def cycle(now: datetime) -> None:
+        nonlocal busy_until, last_action
+        result.cycles += 1
+        if now < busy_until:
+            result.skipped_cycles += 1
+            return
+        current = live_nodes(now)
+        for n in current:
+            if n.hosts:
+                empty_since.pop(f"{n.short}.sim", None)
+            else:
+                empty_since.setdefault(f"{n.short}.sim", now)
+        host_rows = [{"app_state": "ready"} for _ in placed] + [{"app_state": "pending"} for _ in waiting]
+        state = assess_cluster([n.attrs() for n in current], {n.short: len(n.hosts) for n in current},
+                               len(waiting), cfg)
+        forecast = forecast_at(now) if use_forecast else None
+        demand = estimate_demand(trace.classes, host_rows, cfg, forecast=forecast, now=now)
+        plan = build_plan(state, demand, cfg, now, empty_since)
+
+        direction = None
+        adds = plan.nodes_to_add(by_capacity)
+        if adds:
+            # A consolidation is a swap, not a change of direction.
+            direction = None if plan.consolidate else "up"
+            for tier in adds:
+                latency = timedelta(seconds=latencies[next_latency[0] % len(latencies)])
+                next_latency[0] += 1
+                node = add_node(tier, now, now + latency)
+                push(node.ready, _READY, plan.remove_nodes if plan.consolidate else None)
+                busy_until = max(busy_until, node.ready)
+            result.adds += len(adds)
+        elif plan.remove_nodes:
+            direction = "down"
+            for fqdn in plan.remove_nodes:
+                for n in current:
+                    if f"{n.short}.sim" == fqdn and not n.hosts:
+                        n.removed = now
+                        empty_since.pop(fqdn, None)
+                        result.removes += 1
+        if direction:
+            if (last_action and last_action[0] != direction
+                    and now - last_action[1] <= timedelta(minutes=flap_window_min)):
+                result.flaps += 1
+            last_action = (direction, now)
+        result.peak_nodes = max(result.peak_nodes, sum(1 for n in nodes if n.removed is None))
+
+    while events:
+        now, kind, _, payload = heapq.heappop(events)
+        if now >= trace.end:
+            break
+        if kind == _ARRIVE:
+            arrived_at[payload] = now
+            if not place(payload, now):
+                waiting.append(payload)
+        elif kind == _DEPART:
+            departed.add(payload)
+            if payload in placed:
+                placed.pop(payload).hosts.discard(payload)
+                drain(now)
+            elif payload in waiting:
+                waiting.remove(payload)
+                result.unserved += 1
+                result.waits_s.append((now - arrived_at[payload]).total_seconds())
+        elif kind == _READY:
+            for n in nodes:
+                if payload and f"{n.short}.sim" in payload and n.removed is None and not n.hosts:
+                    n.removed = now
+                    empty_since.pop(f"{n.short}.sim", None)
+                    result.removes += 1
+            drain(now)
+        else:
+            cycle(now)
+
+    for i in waiting:
+        result.unserved += 1
+        result.waits_s.append((trace.end - arrived_at[i]).total_seconds())
+    for n in nodes:
+        until = n.removed or trace.end
+        result.node_hours[n.tier_name] = (
+            result.node_hours.get(n.tier_name, 0.0) + max(0.0, (until - n.created).total_seconds() / 3600)
+        )
+    return result
@@ -0,0 +1,133 @@
+"""
+cspawn/cs_docker/snapshot.py — One-shot, in-memory index of Swarm state.
+
+A sync pass used to ask the manager about every host separately: a
+`services.get()` per host, a `tasks()` per service, a `nodes.get()` per task,
+and an SSH-tunneled container inspect on the task's node. With a full class
+that is hundreds of round-trips. `SwarmSnapshot.build()` replaces all of them
+with exactly three manager calls:
+
+    services.list(label)   — every code host service
+    tasks(label)           — every task of those services
+    nodes.list()           — every node currently in the Swarm
+
+Everything a sync needs (placement, container id/name, task state, whether a
+task's node has been destroyed) is then resolved from the index. A snapshot is
+a point-in-time view; build a fresh one per pass rather than holding one.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+logger = logging.getLogger("cspawn.docker")
+
+CODESERVER_LABEL = "jtl.codeserver"
+
+
+@dataclass(frozen=True)
+class TaskPlacement:
+    """Where a service's current task lives, resolved without touching a node."""
+
+    task_id: str
+    node_id: Optional[str]
+    node_name: Optional[str]
+    container_id: Optional[str]
+    container_name: Optional[str]
+    state: str
+
+
+def task_container_name(service_name: str, task: dict) -> str:
+    """Return the container name Swarm gives a task's container.
+
+    Swarm names task containers ``<service>.<slot>.<task id>`` for replicated
+    services and ``<service>.<node id>.<task id>`` for global ones, so the name
+    can be derived from the task without inspecting the container.
+    """
+    slot = task.get("Slot") or task.get("NodeID")
+    return f"{service_name}.{slot}.{task['ID']}"
+
+
+@dataclass
+class SwarmSnapshot:
+    """Services, tasks and nodes captured by one listing of each."""
+
+    services: dict[str, Any] = field(default_factory=dict)
+    tasks_by_service: dict[str, list[dict]] = field(default_factory=dict)
+    nodes: dict[str, Any] = field(default_factory=dict)
+    taken_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def build(cls, client, label: str = CODESERVER_LABEL) -> "SwarmSnapshot":
+        """Capture the Swarm with one services, one tasks and one nodes listing.
+
+        The tasks listing uses the same label filter as the services listing;
+        Swarm matches task label filters against the owning service's labels.
+        """
+        t0 = time.monotonic()
+        services = {s.id: s for s in client.services.list(filters={"label": label})}
+
+        tasks_by_service: dict[str, list[dict]] = defaultdict(list)
+        for t in client.api.tasks(filters={"label": label}):
+            tasks_by_service[t.get("ServiceID")].append(t)
+
+        nodes = {n.id: n for n in client.nodes.list()}
+
+        snap = cls(
+            services=services,
+            tasks_by_service=dict(tasks_by_service),
+            nodes=nodes,
+        )
+        logger.debug(
+            "SwarmSnapshot: %d services, %d tasks, %d nodes in %.2fs",
+            len(services),
+            sum(len(v) for v in tasks_by_service.values()),
+            len(nodes),
+            time.monotonic() - t0,
+        )
+        return snap
+
+    @property
+    def service_ids(self) -> set[str]:
+        return set(self.services)
+
+    def tasks_for(self, service_id: str) -> list[dict]:
+        """Return the raw task dicts for a service (empty if none / unknown)."""
+        return list(self.tasks_by_service.get(service_id, []))
+
+    def node(self, node_id: Optional[str]):
+        """Return the docker-py Node for an id, or None if it is not in the Swarm."""
+        if not node_id:
+            return None
+        return self.nodes.get(node_id)
+
+    def node_name(self, node_id: Optional[str]) -> Optional[str]:
+        n = self.node(node_id)
+        if n is None:
+            return None
+        return n.attrs.get("Description", {}).get("Hostname")
+
+    def has_node(self, node_id: Optional[str]) -> bool:
+        return bool(node_id) and node_id in self.nodes
+
+    def running_hosts_per_node(self) -> dict[str, int]:
+        """Return {short_node_name: running task count}, like `count_hosts_per_node`.
+
+        Only tasks Swarm wants running and that actually are running count.
+        Tasks on a node that has left the Swarm are keyed by their raw node id.
+        """
+        per_node: dict[str, int] = defaultdict(int)
+        for tasks in self.tasks_by_service.values():
+            for t in tasks:
+                if t.get("DesiredState") != "running":
+                    continue
+                if (t.get("Status", {}) or {}).get("State") != "running":
+                    continue
+                nid = t.get("NodeID")
+                hn = self.node_name(nid) or nid
+                short = hn.split(".")[0] if hn else "?"
+                per_node[short] += 1
+        return dict(per_node)
@@ -0,0 +1,335 @@
+"""
+cspawn/cs_docker/standby.py — Warm standby code-server services.
+
+Even with the fork cached (see `cspawn.cs_github.prefork`), a cold start waits
+for Swarm to pick a node, the node to pull the image if it does not have it,
+and the container to be created. `StandbyPool` keeps a few pre-started,
+unassigned services per `ClassProto` image, each pinned to a worker node with
+spare capacity, so a start can *claim* one instead:
+
+- **Claim** — `claim()` rewrites a standby service in a single, version-checked
+  `service.update()`: the service labels become the student's (username,
+  password, public URL, Caddy routes and basic auth) and the container env and
+  mounts become the student's (repo, password, user directory). Swarm replaces
+  the task on the node it is already pinned to, where the image is present.
+  Two claimers racing for the same standby cannot both win: the loser's update
+  fails with "update out of sequence" and it tries the next standby.
+- **Invisible until claimed** — standby services carry only ``jtl.standby*``
+  labels, not ``jtl.codeserver``, so sync, the reaper, the watcher and every
+  listing of code hosts ignore them. A claimed service looks like any other
+  host, except that its Swarm name stays ``standby-...`` (Swarm cannot rename
+  services); the username label is what identifies the student.
+- **Sizing** — `target_sizes()` sizes each prototype's pool from the rosters
+  of classes whose purge window is open or about to open, counting only
+  students who do not already have a host.
+- **Refill** — `refill()` creates missing standbys on the least-loaded nodes
+  and removes surplus ones. It runs from cron (`cspawnctl host standby
+  --refill`) and, after every claim, in a background thread.
+
+Claims are recorded on the start job (`StartJob.path` = ``warm`` or ``cold``),
+and `latency_report()` compares the two.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import docker
+from slugify import slugify
+
+from cspawn.util.auth import random_string
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
+
+from .autoscale import capacity_for_node
+from .snapshot import SwarmSnapshot
+
+logger = logging.getLogger("cspawn.docker")
+
+STANDBY_LABEL = "jtl.standby"
+STANDBY_PROTO_LABEL = "jtl.standby.proto"
+STANDBY_CREATED_LABEL = "jtl.standby.created"
+
+
+def _labels(raw) -> dict:
+    return (raw.attrs.get("Spec", {}) or {}).get("Labels", {}) or {}
+
+
+def _created(raw) -> str:
+    return _labels(raw).get(STANDBY_CREATED_LABEL, "")
+
+
+def pinned_node(raw) -> Optional[str]:
+    """The node a service is pinned to by a ``node.hostname==`` constraint."""
+    spec = raw.attrs.get("Spec", {}) or {}
+    placement = (spec.get("TaskTemplate", {}) or {}).get("Placement", {}) or {}
+    for c in placement.get("Constraints", []) or []:
+        c = c.replace(" ", "")
+        if c.startswith("node.hostname=="):
+            return c.split("==", 1)[1]
+    return None
+
+
+@dataclass
+class RefillResult:
+    """What one `StandbyPool.refill()` pass did (or would do, when dry)."""
+
+    targets: dict = field(default_factory=dict)  # proto_id -> wanted
+    have: dict = field(default_factory=dict)  # proto_id -> existing
+    created: list = field(default_factory=list)  # (proto_id, node, service name)
+    removed: list = field(default_factory=list)  # service names
+    no_capacity: int = 0  # standbys wanted but no node had room
+    errors: list = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (f"targets={sum(self.targets.values())} have={sum(self.have.values())} "
+                f"created={len(self.created)} removed={len(self.removed)} "
+                f"no_capacity={self.no_capacity} errors={len(self.errors)}")
+
+
+class StandbyPool:
+    """Keeps and hands out pre-started services for `CodeServerManager`.
+
+    Config keys:
+        STANDBY_ENABLED: Claim standbys in `new_cs()` (default false).
+        STANDBY_FRACTION: Fraction of not-yet-started students in an upcoming
+            or running class session to keep standbys for (default 0.2).
+        STANDBY_MAX_PER_PROTO: Cap per prototype image (default 5).
+        STANDBY_LEAD_MINUTES: How long before a purge window opens to start
+            filling (default 30).
+    """
+
+    def __init__(self, csm) -> None:
+        self.csm = csm
+        self.config = csm.config
+        self.fraction = cfg_float(self.config, "STANDBY_FRACTION", 0.2)
+        self.max_per_proto = cfg_int(self.config, "STANDBY_MAX_PER_PROTO", 5)
+        self.lead = timedelta(minutes=cfg_float(self.config, "STANDBY_LEAD_MINUTES", 30))
+        self._refill_lock = threading.Lock()
+
+    @staticmethod
+    def enabled(config) -> bool:
+        return cfg_bool(config, "STANDBY_ENABLED", False)
+
+    # -- inventory ----------------------------------------------------------
+
+    def list_raw(self, proto_id: Optional[int] = None) -> list:
+        """Raw docker-py services in the pool, oldest first. No semaphore."""
+        label = f"{STANDBY_PROTO_LABEL}={proto_id}" if proto_id is not None else STANDBY_LABEL
+        services = self.csm.client.services.list(filters={"label": label})
+        return sorted(services, key=_created)
+
+    def target_sizes(self, now: Optional[datetime] = None) -> dict[int, int]:
+        """{proto_id: standbys wanted} from the rosters of classes about to run."""
+        from cspawn.cs_github.prefork import classes_due_for_prefork
+        from cspawn.models import CodeHost
+
+        started = {uid for (uid,) in CodeHost.query.with_entities(CodeHost.user_id).all()}
+        waiting: dict[int, int] = defaultdict(int)
+        for c in classes_due_for_prefork(now, self.lead):
+            if c.proto is None or not c.proto.image_uri:
+                continue
+            waiting[c.proto_id] += sum(1 for s in c.students if s.id not in started)
+
+        return {
+            pid: min(self.max_per_proto, math.ceil(n * self.fraction))
+            for pid, n in waiting.items()
+            if n
+        }
+
+    def _free_slots(self) -> dict[str, int]:
+        """{node fqdn: free host slots} over active, ready worker nodes.
+
+        Running code hosts and existing standbys both take a slot.
+        """
+        hosts = SwarmSnapshot.build(self.csm.client)
+        standbys = SwarmSnapshot.build(self.csm.client, label=STANDBY_LABEL)
+        used = defaultdict(int, hosts.running_hosts_per_node())
+        for short, n in standbys.running_hosts_per_node().items():
+            used[short] += n
+
+        free = {}
+        for node in hosts.nodes.values():
+            attrs = node.attrs
+            spec = attrs.get("Spec", {}) or {}
+            if (spec.get("Role") or "").lower() != "worker":
+                continue
+            if spec.get("Availability", "active") != "active":
+                continue
+            if ((attrs.get("Status") or {}).get("State")) not in (None, "ready"):
+                continue
+            hostname = (attrs.get("Description") or {}).get("Hostname") or ""
+            if not hostname:
+                continue
+            free[hostname] = capacity_for_node(attrs, self.config) - used[hostname.split(".")[0]]
+        return free
+
+    # -- create / remove ----------------------------------------------------
+
+    def _spec(self, proto, node_fqdn: str) -> dict:
+        name = f"standby-{proto.id}-{slugify(random_string(6)).lower()}"
+        constraints = [f"node.hostname=={node_fqdn}"]
+        extra = getattr(self.config, "PLACEMENT_CONSTRAINTS", None)
+        if extra:
+            if isinstance(extra, str):
+                extra = [c.strip() for c in extra.split(",") if c.strip()]
+            constraints = [c for c in extra if not c.replace(" ", "").startswith("node.hostname==")] + constraints
+        return {
+            "name": name,
+            "image": proto.image_uri,
+            "labels": {
+                STANDBY_LABEL: "true",
+                STANDBY_PROTO_LABEL: str(proto.id),
+                STANDBY_CREATED_LABEL: datetime.now(timezone.utc).isoformat(),
+            },
+            "environment": {"DISPLAY": ":0", "JTL_USERNAME": name, "PASSWORD": random_string(16)},
+            "network": ["caddy", "jtlctl"],
+            "constraints": constraints,
+        }
+
+    def create(self, proto, node_fqdn: str):
+        """Start one standby for `proto` pinned to `node_fqdn`."""
+        spec = self._spec(proto, node_fqdn)
+        with self.csm._docker_sem:
+            s = self.csm.run(**spec)
+        logger.info("standby: created %s for proto %s on %s", spec["name"], proto.id, node_fqdn)
+        return s
+
+    def remove(self, raw) -> None:
+        with self.csm._docker_sem:
+            raw.remove()
+
+    def refill(self, *, dry_run: bool = False, now: Optional[datetime] = None) -> RefillResult:
+        """Bring every prototype's pool to its target size."""
+        from cspawn.models import ClassProto
+
+        result = RefillResult(targets=self.target_sizes(now))
+        with self.csm._docker_sem:
+            by_proto: dict[int, list] = defaultdict(list)
+            for raw in self.list_raw():
+                try:
+                    by_proto[int(_labels(raw).get(STANDBY_PROTO_LABEL, -1))].append(raw)
+                except ValueError:
+                    by_proto[-1].append(raw)
+        result.have = {pid: len(v) for pid, v in by_proto.items()}
+
+        # Surplus first: frees slots for prototypes that are short.
+        for pid, services in by_proto.items():
+            surplus = len(services) - result.targets.get(pid, 0)
+            for raw in services[:max(0, surplus)]:
+                result.removed.append(raw.name)
+                if not dry_run:
+                    try:
+                        self.remove(raw)
+                    except docker.errors.APIError as e:
+                        result.errors.append(f"remove {raw.name}: {e}")
+
+        short = {pid: n - len(by_proto.get(pid, [])) for pid, n in result.targets.items()}
+        short = {pid: n for pid, n in short.items() if n > 0}
+        if not short:
+            return result
+
+        with self.csm._docker_sem:
+            free = self._free_slots()
+        for pid, n in short.items():
+            proto = ClassProto.query.get(pid)
+            for _ in range(n):
+                node = max(free, key=free.get, default=None)
+                if node is None or free[node] <= 0:
+                    result.no_capacity += 1
+                    continue
+                free[node] -= 1
+                if dry_run:
+                    result.created.append((pid, node, None))
+                    continue
+                try:
+                    s = self.create(proto, node)
+                    result.created.append((pid, node, s.name))
+                except Exception as e:
+                    result.errors.append(f"create for proto {pid} on {node}: {e}")
+        return result
+
+    def refill_async(self, app) -> Optional[threading.Thread]:
+        """Refill in a background thread, unless one is already running."""
+        if not self._refill_lock.acquire(blocking=False):
+            return None
+
+        def _run():
+            try:
+                with app.app_context():
+                    r = self.refill()
+                    logger.info("standby: refill %s", r.summary())
+            except Exception as e:
+                logger.warning("standby: background refill failed: %s", e)
+            finally:
+                self._refill_lock.release()
+
+        t = threading.Thread(target=_run, name="standby-refill", daemon=True)
+        t.start()
+        return t
+
+    # -- claim --------------------------------------------------------------
+
+    def claim(self, proto, container_def: dict) -> Optional[Any]:
+        """Turn a standby for `proto` into the host described by `container_def`.
+
+        Called from `_new_cs_inner`, which holds no Docker lease; each raw
+        client call here takes its own through the limited client. Returns the
+        claimed `CSMService`, or None if no standby could be claimed (the
+        caller then starts one cold).
+        """
+        t0 = time.monotonic()
+        for raw in self.list_raw(proto.id):
+            try:
+                raw.reload()
+                if STANDBY_LABEL not in _labels(raw):
+                    continue  # claimed since we listed it
+                # One update, checked against the version we just read.
+                raw.update(
+                    labels=container_def["labels"],
+                    env=container_def["environment"],
+                    mounts=container_def.get("mounts", []),
+                )
+            except docker.errors.APIError as e:
+                logger.info("standby: could not claim %s (%s); trying next", raw.name, e)
+                continue
+            raw.reload()
+            logger.info("standby: claimed %s for %s in %.2fs", raw.name,
+                        container_def["labels"].get("jtl.codeserver.username"),
+                        time.monotonic() - t0)
+            return self.csm.service_class(self.csm, raw)
+        return None
+
+
+def latency_report(since: Optional[datetime] = None) -> dict[str, dict]:
+    """Start latency (job claimed → host recorded) by path, from `StartJob` rows.
+
+    Returns ``{"warm": {...}, "cold": {...}}`` with count, p50 and p90 seconds.
+    """
+    from cspawn.models import StartJob
+
+    since = since or datetime.now(timezone.utc) - timedelta(days=7)
+    q = StartJob.query.filter(
+        StartJob.status == "done",
+        StartJob.path.isnot(None),
+        StartJob.started_at.isnot(None),
+        StartJob.finished_at.isnot(None),
+        StartJob.created_at >= since,
+    )
+    by_path: dict[str, list[float]] = defaultdict(list)
+    for job in q.all():
+        by_path[job.path].append((job.finished_at - job.started_at).total_seconds())
+
+    def pct(xs, p):
+        xs = sorted(xs)
+        return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+    return {
+        path: {"count": len(xs), "p50_s": pct(xs, 0.5), "p90_s": pct(xs, 0.9)}
+        for path, xs in sorted(by_path.items())
+    }
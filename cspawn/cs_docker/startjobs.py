@@ -0,0 +1,331 @@
+"""
+cspawn/cs_docker/startjobs.py — Asynchronous host creation.
+
+`new_cs()` can take minutes: a GitHub fork (plus waiting for it to become
+cloneable), an SSH session to create the user directory, `services.create`,
+and placement pinning. Running that inside a gunicorn request ties up one of a
+handful of sync workers per student, so a whole class pressing Start at once
+starves the web tier.
+
+Instead `start_class` calls `enqueue_start()` and returns immediately with a
+`StartJob` id. `StartWorkerPool` (run by `cspawnctl host start-worker` under
+supervisord) claims queued jobs and executes them with bounded concurrency,
+recording the current `new_cs()` stage on the row; the browser polls
+`/host/start_job/<id>` for progress.
+
+Claiming is safe across several worker processes: on PostgreSQL the claim
+query uses ``FOR UPDATE SKIP LOCKED``, and every claim is a conditional
+``UPDATE ... WHERE status='queued'`` so a row is only ever taken once.
+
+While a job runs, its worker refreshes ``heartbeat_at`` every ``HEARTBEAT_S``.
+Every worker also sweeps, on the same beat, for 'running' jobs whose
+heartbeat is older than ``STALE_RUNNING_S`` and requeues them. A worker
+killed mid-job therefore has its jobs picked up by the survivors (or by
+its own restarted process) within a couple of minutes.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger("cspawn.docker")
+
+# How often a worker refreshes its running jobs' heartbeats and sweeps.
+HEARTBEAT_S = 15
+# A 'running' job whose heartbeat is older than this belonged to a worker that died.
+STALE_RUNNING_S = 120
+MAX_ATTEMPTS = 3
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_start(user, proto, class_):
+    """Queue a host start for `user`, or return the job already in flight.
+
+    Returns:
+        The `StartJob` (new or existing active one).
+    """
+    from cspawn.models import StartJob, db
+
+    existing = StartJob.active_for(user.id)
+    if existing is not None:
+        return existing
+
+    job = StartJob(
+        user_id=user.id,
+        proto_id=proto.id,
+        class_id=class_.id if class_ else None,
+        status="queued",
+    )
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent click; the partial unique index on
+        # active jobs (PostgreSQL) rejected the duplicate.
+        db.session.rollback()
+        return StartJob.active_for(user.id)
+
+    logger.info("Queued start job %s for %s", job.id, user.username)
+    return job
+
+
+def claim_next_job(worker: str):
+    """Atomically take the oldest queued job, or return None."""
+    from cspawn.models import StartJob, db
+
+    candidate = (
+        StartJob.query.filter_by(status="queued")
+        .order_by(StartJob.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if candidate is None:
+        db.session.rollback()
+        return None
+
+    claimed = (
+        StartJob.query.filter_by(id=candidate.id, status="queued")
+        .update(
+            {
+                "status": "running",
+                "worker": worker,
+                "started_at": _now(),
+                "heartbeat_at": _now(),
+                "attempts": StartJob.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.session.commit()
+    if claimed != 1:
+        return None
+
+    db.session.refresh(candidate)
+    return candidate
+
+
+def _finish(job, status: str, message: Optional[str] = None) -> None:
+    from cspawn.models import db
+
+    job.status = status
+    job.message = message
+    job.finished_at = _now()
+    db.session.commit()
+
+
+def run_start_job(app, job) -> None:
+    """Execute one claimed job: the `new_cs()` stages, then record the outcome.
+
+    Never raises; failures are recorded on the job row.
+    """
+    from cspawn.models import Class, ClassProto, CodeHost, User, db
+
+    stages = []
+
+    def progress(stage: str) -> None:
+        stages.append(stage)
+        job.stage = stage
+        db.session.commit()
+
+    t0 = time.monotonic()
+    try:
+        user = User.query.get(job.user_id)
+        proto = ClassProto.query.get(job.proto_id)
+        class_ = Class.query.get(job.class_id) if job.class_id else None
+        if user is None or proto is None:
+            _finish(job, "failed", "user or class prototype no longer exists")
+            return
+
+        extant = CodeHost.query.filter_by(user_id=user.id).first()
+        if extant is not None:
+            job.service_id = extant.service_id
+            _finish(job, "done", "host already exists")
+            return
+
+        # A service without a row (e.g. the row was lost): adopt it.
+        s = app.csm.get_by_username(user.username)
+        if s is not None:
+            s.sync_to_db(check_ready=True)
+            job.service_id = s.id
+            _finish(job, "done", "host already running")
+            return
+
+        s, ch = app.csm.new_cs(user=user, proto=proto, class_=class_, progress=progress)
+        if s is None:
+            _finish(job, "failed", "failed to start host")
+            return
+
+        if ch is not None and ch.class_id is None and job.class_id is not None:
+            ch.class_id = job.class_id
+            db.session.commit()
+
+        job.service_id = s.id
+        # A failed standby claim falls through to "create".
+        job.path = "warm" if "claim" in stages and "create" not in stages else "cold"
+        _finish(job, "done", f"started {s.name} ({job.path}) in {time.monotonic() - t0:.1f}s")
+        logger.info("Start job %s done in %.1fs", job.id, time.monotonic() - t0)
+    except Exception as e:
+        db.session.rollback()
+        logger.error("Start job %s failed at stage %s: %s", job.id, job.stage, e)
+        try:
+            _finish(job, "failed", f"{job.stage or 'start'}: {e}")
+        except Exception:
+            db.session.rollback()
+
+
+def requeue_stale_jobs(stale_after_s: float = STALE_RUNNING_S,
+                       max_attempts: int = MAX_ATTEMPTS) -> int:
+    """Requeue (or fail) 'running' jobs whose worker evidently died.
+
+    A job is stale when its heartbeat (or, for a row without one, its
+    start) is older than `stale_after_s`. Each row is changed with a
+    conditional ``UPDATE``, so workers sweeping at the same time, or a
+    worker that beats just in time, never double-handle a job.
+
+    Returns the number of rows changed.
+    """
+    from cspawn.models import StartJob, db
+
+    cutoff = _now() - timedelta(seconds=stale_after_s)
+    last_beat = func.coalesce(StartJob.heartbeat_at, StartJob.started_at)
+    stale = StartJob.query.filter(StartJob.status == "running", last_beat < cutoff).all()
+    changed = 0
+    for job in stale:
+        if (job.attempts or 0) >= max_attempts:
+            values = {
+                "status": "failed",
+                "message": f"worker lost during stage {job.stage}; gave up after {job.attempts} attempts",
+                "finished_at": _now(),
+            }
+        else:
+            values = {"status": "queued",
+                      "message": f"requeued after worker lost during stage {job.stage}"}
+        changed += (
+            StartJob.query.filter(StartJob.id == job.id, StartJob.status == "running", last_beat < cutoff)
+            .update(values, synchronize_session=False)
+        )
+    db.session.commit()
+    return changed
+
+
+class StartWorkerPool:
+    """Bounded pool of threads that claim and run `StartJob` rows.
+
+    Args:
+        app: Flask app with `app.csm`.
+        workers: Number of jobs run concurrently. Docker access inside
+            `new_cs()` is still bounded separately, per request, by the Docker
+            limiter, so this mainly bounds concurrent GitHub forks.
+        poll_interval_s: Idle wait between claim attempts.
+        heartbeat_s: How often running jobs' heartbeats are refreshed and
+            stale jobs (from any worker) are swept.
+        stale_after_s: Heartbeat age at which a 'running' job is requeued.
+    """
+
+    def __init__(self, app, *, workers: int = 4, poll_interval_s: float = 1.0,
+                 heartbeat_s: float = HEARTBEAT_S, stale_after_s: float = STALE_RUNNING_S,
+                 on_job: Optional[Callable] = None) -> None:
+        self.app = app
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self.heartbeat_s = heartbeat_s
+        self.stale_after_s = stale_after_s
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._on_job = on_job or run_start_job
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self.jobs_run = 0
+        self._count_lock = threading.Lock()
+        self._running: set[str] = set()
+
+    def _loop(self, n: int) -> None:
+        worker = f"{self.name}/{n}"
+        with self.app.app_context():
+            from cspawn.models import db
+
+            while not self._stop.is_set():
+                try:
+                    job = claim_next_job(worker)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning("start-worker %s: claim failed: %s", worker, e)
+                    job = None
+                if job is None:
+                    self._stop.wait(self.poll_interval_s)
+                    continue
+                with self._count_lock:
+                    self._running.add(job.id)
+                try:
+                    self._on_job(self.app, job)
+                finally:
+                    with self._count_lock:
+                        self._running.discard(job.id)
+                        self.jobs_run += 1
+                db.session.remove()
+
+    def beat(self) -> int:
+        """Refresh this pool's running jobs' heartbeats, then sweep stale ones.
+
+        Call inside an app context. Returns the number of jobs recovered.
+        """
+        from cspawn.models import StartJob, db
+
+        with self._count_lock:
+            running = list(self._running)
+        if running:
+            StartJob.query.filter(StartJob.id.in_(running), StartJob.status == "running").update(
+                {"heartbeat_at": _now()}, synchronize_session=False)
+            db.session.commit()
+        n = requeue_stale_jobs(self.stale_after_s)
+        if n:
+            logger.warning("start-worker: recovered %d stale job(s)", n)
+        return n
+
+    def _heartbeat_loop(self) -> None:
+        with self.app.app_context():
+            from cspawn.models import db
+
+            while not self._stop.wait(self.heartbeat_s):
+                try:
+                    self.beat()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning("start-worker: heartbeat failed: %s", e)
+                finally:
+                    db.session.remove()
+
+    def start(self) -> None:
+        with self.app.app_context():
+            self.beat()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._loop, args=(n,), name=f"start-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="start-worker-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def run(self) -> None:
+        """Start the threads and block until `stop()` (or Ctrl-C)."""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(1.0)
+        finally:
+            self.stop()
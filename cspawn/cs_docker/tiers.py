@@ -16,10 +16,15 @@ if TYPE_CHECKING:
 
 @dataclass(frozen=True)
 class Tier:
-    """A named node size tier with a DigitalOcean slug and host capacity."""
+    """A named node size tier with a DigitalOcean slug and host capacity.
+
+    ``price_hourly`` (USD, optional) lets the autoscaler pick the cheapest
+    tier mix; see ``autoscale.solve_tier_mix``.
+    """
     name: str
     slug: str
     capacity: int
+    price_hourly: float | None = None
 
 
 def load_tiers(cfg) -> list[Tier]:
@@ -55,7 +60,13 @@ def load_tiers(cfg) -> list[Tier]:
             cap = int(entry["capacity"])
         except (TypeError, ValueError) as exc:
             raise ValueError(f"NODE_TIERS[{i}].capacity must be an integer: {exc}") from exc
-        tiers.append(Tier(name=str(entry["name"]), slug=str(entry["slug"]), capacity=cap))
+        price = entry.get("price_hourly")
+        if price is not None:
+            try:
+                price = float(price)
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"NODE_TIERS[{i}].price_hourly must be a number: {exc}") from exc
+        tiers.append(Tier(name=str(entry["name"]), slug=str(entry["slug"]), capacity=cap, price_hourly=price))
 
     return tiers
 
@@ -0,0 +1,331 @@
+"""
+cspawn/cs_docker/watcher.py — Event-driven CodeHost state tracking.
+
+`HostStateWatcher` is a long-running loop (`cspawnctl host watch`, run under
+supervisord next to gunicorn) that keeps the `code_host` table current from
+the Swarm manager's event stream instead of waiting for something to poll:
+
+- **service** events: ``create``/``update`` re-read just that service (one
+  ``services.get`` + one ``tasks`` call) and sync its row; ``remove`` marks
+  the row MIA exactly as `CodeServerManager.sync()` does.
+- **node** events: refresh the cached node map; hosts whose task sat on a
+  node that was removed or went down are re-read, which marks them MIA (or
+  picks up the reschedule) through the normal `to_model()` path.
+
+Swarm's event API has no task events, so a task moving new → running after a
+``service create`` is not announced. Services touched by an event are kept on
+a short *pending* list and re-read every `pending_interval_s` until their row
+settles (running + ready, or MIA) or `pending_ttl_s` passes.
+
+With a `ReadinessTracker`, each loop also probes every host that is still
+starting, so ``/host/is_ready`` can answer from the row alone.
+
+A full `sync()` still runs every `resync_interval_s` — and immediately after
+every (re)connect of the event stream, since events may have been missed —
+as a safety net, not as the primary mechanism.
+
+The watcher writes a heartbeat file (``DATA_DIR/.watcher_heartbeat``) each
+loop so other processes can tell whether event-driven tracking is live; see
+`watcher_alive()`.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from docker.errors import NotFound
+
+from .clusterview import invalidate_cluster_view
+from .snapshot import CODESERVER_LABEL, SwarmSnapshot
+
+if TYPE_CHECKING:
+    from .readiness import ReadinessTracker
+
+logger = logging.getLogger("cspawn.docker")
+
+HEARTBEAT_FILE = ".watcher_heartbeat"
+
+# Node events that mean the hosts on that node need to be re-read.
+_NODE_ACTIONS = {"remove", "update"}
+
+
+def _heartbeat_path(cfg) -> Path:
+    return Path(cfg.get("DATA_DIR", "/tmp")) / HEARTBEAT_FILE
+
+
+def watcher_alive(cfg, max_age_s: float = 120.0, now: Optional[float] = None) -> bool:
+    """True if a watcher has written its heartbeat within `max_age_s` seconds."""
+    p = _heartbeat_path(cfg)
+    try:
+        age = (now if now is not None else time.time()) - p.stat().st_mtime
+    except OSError:
+        return False
+    return age <= max_age_s
+
+
+class HostStateWatcher:
+    """Apply Swarm service/node events to `CodeHost` rows incrementally.
+
+    Args:
+        app: Flask app (`app.csm`, `app.app_config`, `app.app_context()`).
+        client_factory: Builds the Docker client used for the event stream.
+            The stream is a blocking long-poll, so it gets its own connection
+            rather than sharing `app.csm.client`. Defaults to a new SSH
+            client for ``DOCKER_URI``.
+        resync_interval_s: Seconds between safety-net full syncs.
+        pending_interval_s: Seconds between re-reads of pending services.
+        pending_ttl_s: Give up following a pending service after this long.
+        readiness: Probes starting hosts each loop (`ReadinessTracker`);
+            ``None`` to leave readiness to the pending re-reads and resyncs.
+        clock: Monotonic clock, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        app,
+        *,
+        client_factory: Optional[Callable[[], Any]] = None,
+        resync_interval_s: float = 300.0,
+        pending_interval_s: float = 3.0,
+        pending_ttl_s: float = 180.0,
+        readiness: Optional["ReadinessTracker"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.app = app
+        self.csm = app.csm
+        self.cfg = app.app_config
+        self._client_factory = client_factory or self._default_client
+        self.resync_interval_s = resync_interval_s
+        self.pending_interval_s = pending_interval_s
+        self.pending_ttl_s = pending_ttl_s
+        self.readiness = readiness
+        self._clock = clock
+
+        self.nodes: dict[str, Any] = {}
+        self.pending: dict[str, float] = {}  # service_id -> first seen
+        self.last_resync: Optional[float] = None
+        self.last_event_time: Optional[int] = None
+        self.events_handled = 0
+
+        self._events: "queue.Queue[dict]" = queue.Queue()
+        self._stream_failed = threading.Event()
+        self._stop = threading.Event()
+
+    def _default_client(self):
+        from .limiter import docker_client
+
+        return docker_client(self.csm.config, self.csm.docker_uri)
+
+    # -- state refresh ------------------------------------------------------
+
+    def refresh_nodes(self) -> None:
+        self.nodes = {n.id: n for n in self.csm.client.nodes.list()}
+
+    def _snapshot_for(self, service_id: str) -> Optional[SwarmSnapshot]:
+        """A one-service snapshot: one services.get + one tasks call."""
+        try:
+            raw = self.csm.client.services.get(service_id)
+        except NotFound:
+            return None
+        labels = (raw.attrs.get("Spec", {}) or {}).get("Labels", {}) or {}
+        if CODESERVER_LABEL not in labels:
+            return None
+        tasks = self.csm.client.api.tasks(filters={"service": service_id})
+        return SwarmSnapshot(
+            services={service_id: raw},
+            tasks_by_service={service_id: list(tasks)},
+            nodes=dict(self.nodes),
+        )
+
+    def refresh_service(self, service_id: str, *, check_ready: bool = False) -> bool:
+        """Re-read one service and sync its row. Returns False if it is gone.
+
+        Only existing rows are updated. A service with no row yet is being
+        created by `new_cs()`, which inserts the row itself; inserting it here
+        too would race that insert on the unique service_id. Orphans that never
+        get a row are picked up by the periodic full resync.
+        """
+        from cspawn.models import CodeHost
+
+        ch = CodeHost.query.filter_by(service_id=service_id).first()
+        snap = self._snapshot_for(service_id)
+        if snap is None:
+            if ch is not None:
+                self.mark_mia(ch)
+            return False
+        if ch is None:
+            return True
+
+        s = self.csm.from_snapshot(snap, service_id)
+        s.sync_to_db(check_ready=check_ready)
+        return True
+
+    def mark_mia(self, ch) -> None:
+        from cspawn.models import HostState, db
+
+        if ch.state == HostState.MIA.value and ch.app_state == HostState.MIA.value:
+            return
+        logger.info("watcher: %s is gone from the Swarm; marking MIA", ch.service_name)
+        ch.state = HostState.MIA.value
+        ch.app_state = HostState.MIA.value
+        db.session.commit()
+
+    # -- event handling -----------------------------------------------------
+
+    def handle_event(self, event: dict) -> None:
+        """Apply one decoded Docker event. Never raises."""
+        from cspawn.models import CodeHost, db
+
+        etype = event.get("Type")
+        action = event.get("Action", "")
+        actor_id = (event.get("Actor") or {}).get("ID")
+        self.last_event_time = event.get("time", self.last_event_time)
+        self.events_handled += 1
+
+        try:
+            if etype == "service" and actor_id:
+                if action == "remove":
+                    self.pending.pop(actor_id, None)
+                    ch = CodeHost.query.filter_by(service_id=actor_id).first()
+                    if ch is not None:
+                        self.mark_mia(ch)
+                else:
+                    if self.refresh_service(actor_id):
+                        self.pending.setdefault(actor_id, self._clock())
+
+            elif etype == "node" and action in _NODE_ACTIONS:
+                self.refresh_nodes()
+                invalidate_cluster_view(self.cfg)
+                hosts = CodeHost.query.filter_by(node_id=actor_id).all() if actor_id else []
+                for ch in hosts:
+                    if self.refresh_service(ch.service_id):
+                        self.pending.setdefault(ch.service_id, self._clock())
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("watcher: failed to apply %s %s event for %s: %s",
+                           etype, action, actor_id, e)
+
+    def poll_pending(self, *, check_ready: bool = True) -> None:
+        """Re-read services an event touched until their rows settle."""
+        from cspawn.models import CodeHost, HostState, db
+
+        now = self._clock()
+        for service_id, since in list(self.pending.items()):
+            if now - since >= self.pending_ttl_s:
+                logger.info("watcher: giving up following %s after %.0fs",
+                            service_id, now - since)
+                del self.pending[service_id]
+                continue
+            try:
+                if not self.refresh_service(service_id, check_ready=check_ready):
+                    del self.pending[service_id]
+                    continue
+                # No row yet means new_cs() hasn't committed it; keep following.
+                ch = CodeHost.query.filter_by(service_id=service_id).first()
+                if ch is not None and (ch.is_mia or ch.app_state == HostState.READY.value):
+                    del self.pending[service_id]
+            except Exception as e:
+                db.session.rollback()
+                logger.warning("watcher: failed to poll %s: %s", service_id, e)
+
+    def resync(self) -> None:
+        """Full safety-net sync against one SwarmSnapshot."""
+        from cspawn.models import db
+
+        try:
+            snap = self.csm.swarm_snapshot()
+            self.nodes = dict(snap.nodes)
+            self.csm.sync(check_ready=True, snapshot=snap)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("watcher: full resync failed: %s", e)
+        self.last_resync = self._clock()
+
+    def heartbeat(self) -> None:
+        p = _heartbeat_path(self.cfg)
+        try:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.touch()
+        except OSError as e:
+            logger.debug("watcher: cannot write heartbeat %s: %s", p, e)
+
+    # -- main loop ----------------------------------------------------------
+
+    def _stream(self) -> None:
+        """Event-stream thread: push decoded events onto the queue."""
+        try:
+            client = self._client_factory()
+            kwargs = {"decode": True, "filters": {"type": ["service", "node"]}}
+            if self.last_event_time:
+                kwargs["since"] = self.last_event_time
+            for event in client.events(**kwargs):
+                if self._stop.is_set():
+                    break
+                self._events.put(event)
+        except Exception as e:
+            logger.warning("watcher: event stream ended: %s", e)
+        finally:
+            self._stream_failed.set()
+
+    def _start_stream(self) -> threading.Thread:
+        self._stream_failed.clear()
+        t = threading.Thread(target=self._stream, name="cspawn-events", daemon=True)
+        t.start()
+        return t
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def step(self) -> None:
+        """One loop iteration: drain events, follow pending, probe starting hosts, resync if due."""
+        wait = self.pending_interval_s
+        if self.readiness is not None:
+            wait = min(wait, self.readiness.interval_s)
+        deadline = self._clock() + wait
+        while True:
+            timeout = max(0.0, deadline - self._clock())
+            try:
+                event = self._events.get(timeout=timeout)
+            except queue.Empty:
+                break
+            self.handle_event(event)
+
+        if self.pending:
+            self.poll_pending()
+
+        if self.readiness is not None:
+            from cspawn.models import db
+
+            try:
+                self.readiness.track()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning("watcher: readiness pass failed: %s", e)
+
+        if self.last_resync is None or self._clock() - self.last_resync >= self.resync_interval_s:
+            self.resync()
+
+        self.heartbeat()
+
+    def run(self, *, max_backoff_s: float = 60.0) -> None:
+        """Run until `stop()` is called, reconnecting the stream with backoff."""
+        backoff = 1.0
+        with self.app.app_context():
+            self.refresh_nodes()
+            self._start_stream()
+            self.resync()
+            while not self._stop.is_set():
+                self.step()
+                if self._stream_failed.is_set() and not self._stop.is_set():
+                    logger.warning("watcher: reconnecting event stream in %.0fs", backoff)
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, max_backoff_s)
+                    self._start_stream()
+                    # Events may have been missed while disconnected.
+                    self.resync()
+                else:
+                    backoff = 1.0
@@ -0,0 +1,260 @@
+"""
+cspawn/cs_github/fleetpush.py — Push every code host to GitHub in one pass.
+
+`host push --all` used to run one ``cspawnctl host push <name>`` process per
+host, one after another. Each one re-imported the app, looked its service up
+over the docker-over-SSH tunnel and opened a fresh SSH session to the node,
+so a fleet-wide push before a drain or an end-of-term snapshot took many
+minutes. `push_hosts` does the same work in one process:
+
+- One `SwarmSnapshot` (three manager calls) resolves every host's node,
+  container and repo. After that, no Docker API call is made, so a dropped
+  manager tunnel cannot take the rest of the batch down with it.
+- `NodeMasters` opens one SSH master connection per node (OpenSSH
+  ``ControlMaster``). Every push to that node is a ``docker exec`` session
+  multiplexed over it, so there is no new TCP connection or key exchange
+  per host, and a node's sshd rate limit is not tripped. paramiko is
+  already a dependency, but `push_container` shells out to ``ssh`` and
+  pipes the token over stdin. Multiplexing keeps that exact transport,
+  including its per-process timeout, kill-on-timeout and host-key options.
+  A paramiko pool would need all of these written again.
+- Pushes run on a thread pool: at most ``PUSH_CONCURRENCY`` at once, and at
+  most ``PUSH_PER_NODE`` on any one node. Each host gets its own timeout and
+  one retry; a failure is recorded in that host's `PushResult` and does not
+  affect the others.
+
+Config keys:
+  PUSH_CONCURRENCY        int default 16 — pushes running at once
+  PUSH_PER_NODE           int default 4  — pushes at once on one node (sshd MaxSessions is 10)
+  PUSH_CONTROL_PERSIST_S  int default 60 — how long an idle SSH master stays up
+  CODEHOST_PUSH_TIMEOUT_S int default 30 — per-push timeout, shared with CodeHostRepo.push
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
+
+from cspawn.util.config import cfg_float, cfg_int
+from cspawn.cs_github.repo import push_container
+
+if TYPE_CHECKING:
+    from cspawn.init import App
+    from cspawn.models import CodeHost
+
+logger = logging.getLogger("cspawn.github")
+
+# Options every ssh to a node carries; see push_container.
+_SSH_BASE = ["-o", "StrictHostKeyChecking=no", "-o", "UserKnownHostsFile=/dev/null", "-o", "BatchMode=yes"]
+
+
+@dataclass
+class PushTarget:
+    """What a push needs to know about one host, resolved up front."""
+
+    service_name: str
+    username: Optional[str]
+    node_host: Optional[str] = None
+    container_id: Optional[str] = None
+    repo: Optional[str] = None
+    error: Optional[str] = None     # why the host cannot be pushed
+
+
+@dataclass
+class PushResult:
+    """Outcome of pushing one host."""
+
+    service_name: str
+    node: Optional[str] = None
+    ok: bool = False
+    timed_out: bool = False
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed_s: float = 0.0
+
+
+class NodeMasters:
+    """One multiplexed SSH connection per node, shared by every push to it.
+
+    `options(node_fqdn)` starts the node's master on first use and returns
+    the ``-o`` arguments that make an ``ssh`` ride on it. If the master
+    cannot be started, pushes to that node still work: ``ControlMaster=auto``
+    falls back to a connection of its own. `close` stops every master.
+    """
+
+    def __init__(self, persist_s: int = 60, *, connect_timeout: float = 15) -> None:
+        self.persist_s = persist_s
+        self.connect_timeout = connect_timeout
+        # Short prefix: the socket path (dir + %C hash) must stay under the
+        # ~104-byte Unix socket limit.
+        self.control_dir = tempfile.mkdtemp(prefix="cspush-")
+        self._control_path = os.path.join(self.control_dir, "%C")
+        self._started: dict[str, bool] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._mu = threading.Lock()
+
+    def _mux_options(self) -> list[str]:
+        return ["-o", "ControlMaster=auto", "-o", f"ControlPath={self._control_path}",
+                "-o", f"ControlPersist={self.persist_s}"]
+
+    def options(self, node_fqdn: str) -> list[str]:
+        with self._mu:
+            lock = self._locks.setdefault(node_fqdn, threading.Lock())
+        with lock:
+            if node_fqdn not in self._started:
+                self._started[node_fqdn] = self._start(node_fqdn)
+        return self._mux_options()
+
+    def _start(self, node_fqdn: str) -> bool:
+        """Open the master with a no-op session; ControlPersist keeps it up afterwards."""
+        argv = ["ssh", *_SSH_BASE, "-o", f"ConnectTimeout={int(self.connect_timeout)}",
+                *self._mux_options(), f"root@{node_fqdn}", "true"]
+        try:
+            proc = subprocess.run(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.PIPE, text=True, timeout=self.connect_timeout + 5)
+        except subprocess.TimeoutExpired:
+            logger.warning("SSH master to %s timed out; pushing without multiplexing", node_fqdn)
+            return False
+        if proc.returncode != 0:
+            logger.warning("SSH master to %s failed (rc=%s): %s; pushing without multiplexing",
+                           node_fqdn, proc.returncode, (proc.stderr or "").strip()[-200:])
+            return False
+        return True
+
+    def close(self) -> None:
+        for node_fqdn, started in self._started.items():
+            if not started:
+                continue
+            try:
+                subprocess.run(["ssh", "-o", f"ControlPath={self._control_path}", "-O", "exit",
+                                f"root@{node_fqdn}"], capture_output=True, timeout=10)
+            except Exception as e:
+                logger.debug("SSH master to %s did not exit cleanly: %s", node_fqdn, e)
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+    def __enter__(self) -> "NodeMasters":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def resolve_targets(app: "App", code_hosts: Iterable["CodeHost"]) -> List[PushTarget]:
+    """Resolve each host's node, container and repo from one Swarm snapshot.
+
+    Call from the thread that owns the rows. A host whose service or
+    container cannot be found gets a target with `error` set.
+    """
+    snap = app.csm.swarm_snapshot()
+    by_name = {svc.name: sid for sid, svc in snap.services.items()}
+
+    targets = []
+    for ch in code_hosts:
+        t = PushTarget(service_name=ch.service_name, username=ch.user.username if ch.user else None)
+        targets.append(t)
+        sid = ch.service_id if ch.service_id in snap.services else by_name.get(ch.service_name)
+        service = app.csm.from_snapshot(snap, sid) if sid else None
+        if service is None:
+            t.error = "no service in the Swarm"
+            continue
+        placement = service.placement
+        if placement is None or not placement.container_id:
+            t.error = "no running container"
+            continue
+        t.node_host = placement.node_name
+        t.container_id = placement.container_id
+        t.repo = service.env.get("JTL_REPO")
+        if not t.repo:
+            t.error = "service has no JTL_REPO"
+    return targets
+
+
+def push_hosts(
+    app: "App",
+    code_hosts: Iterable["CodeHost"],
+    *,
+    branch: Optional[str] = "master",
+    timeout: Optional[float] = None,
+    retries: int = 1,
+    concurrency: Optional[int] = None,
+    per_node: Optional[int] = None,
+    on_result: Optional[Callable[[PushResult], None]] = None,
+) -> List[PushResult]:
+    """Push `code_hosts` to GitHub concurrently; see the module docstring.
+
+    `on_result` is called with each `PushResult` as it finishes, from the
+    calling thread. Results are returned in input order.
+
+    Raises:
+        RuntimeError: if there is no ``ssh`` binary.
+        ValueError: if ``GITHUB_TOKEN`` is not configured.
+    """
+    cfg = app.app_config
+    if shutil.which("ssh") is None:
+        raise RuntimeError("ssh binary not found on PATH — cannot push via docker exec")
+    token = cfg.get("GITHUB_TOKEN") or os.getenv("GITHUB_TOKEN")
+    if not token:
+        raise ValueError("GITHUB_TOKEN is not configured for git operations")
+
+    timeout = timeout or cfg_float(cfg, "CODEHOST_PUSH_TIMEOUT_S", 30.0)
+    concurrency = concurrency or cfg_int(cfg, "PUSH_CONCURRENCY", 16)
+    per_node = per_node or cfg_int(cfg, "PUSH_PER_NODE", 4)
+
+    targets = resolve_targets(app, code_hosts)
+    if not targets:
+        return []
+
+    node_sems = {t.node_host: threading.BoundedSemaphore(per_node)
+                 for t in targets if t.error is None}
+
+    def _push(t: PushTarget, masters: NodeMasters) -> PushResult:
+        result = PushResult(service_name=t.service_name, node=t.node_host)
+        t0 = time.monotonic()
+        node_fqdn = cfg["NODE_HOSTNAME_TEMPLATE"].format(nodename=t.node_host)
+        with node_sems[t.node_host]:
+            for attempt in range(1, retries + 2):
+                result.attempts = attempt
+                try:
+                    push_container(app, username=t.username, node_host=t.node_host,
+                                   container_id=t.container_id, repo=t.repo, token=token,
+                                   branch=branch, timeout=timeout,
+                                   ssh_options=masters.options(node_fqdn))
+                    result.ok, result.timed_out, result.error = True, False, None
+                    break
+                except Exception as e:
+                    result.timed_out = "timed out" in str(e)
+                    result.error = str(e)
+                    logger.info("push %s attempt %d failed: %s", t.service_name, attempt, e)
+        result.elapsed_s = time.monotonic() - t0
+        return result
+
+    results: dict[int, PushResult] = {}
+    t0 = time.monotonic()
+    with NodeMasters(cfg_int(cfg, "PUSH_CONTROL_PERSIST_S", 60)) as masters, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="push-host") as pool:
+        futures = {}
+        for i, t in enumerate(targets):
+            if t.error is not None:
+                results[i] = PushResult(service_name=t.service_name, node=t.node_host, error=t.error)
+                if on_result:
+                    on_result(results[i])
+            else:
+                futures[pool.submit(_push, t, masters)] = i
+        for fut in as_completed(futures):
+            i = futures[fut]
+            results[i] = fut.result()
+            if on_result:
+                on_result(results[i])
+
+    ordered = [results[i] for i in range(len(targets))]
+    logger.info("push_hosts: %d pushed, %d failed across %d nodes in %.1fs",
+                sum(r.ok for r in ordered), sum(not r.ok for r in ordered), len(node_sems),
+                time.monotonic() - t0)
+    return ordered
@@ -0,0 +1,278 @@
+"""
+cspawn/cs_github/prefork.py — Fork student repos ahead of time.
+
+`GithubOrg.fork` is the slowest part of starting a host: a `create_fork` POST
+(serialized per upstream under `_fork_lock`, with backoff of up to 30 s per
+retry) and then a wait until the fork is cloneable. When a whole class
+presses Start together the forks queue up behind one another.
+
+This module moves that work off the start path:
+
+- `prefork_class()` walks `Class.students` and forks the class prototype's
+  repo for every student who does not already have one, recording each fork
+  in the `StudentFork` table.
+- `prefork_due()` does the same for every class whose purge window is open or
+  opens within the lead time; `cspawnctl github prefork --due` runs it from
+  cron.
+- `get_or_fork()` is what `new_cs()` calls: a DB lookup when the fork was
+  made ahead of time, falling back to a live fork (which it then records).
+
+Forking ahead is rate-limit aware: `ForkBudget` spaces `create_fork` calls
+(GitHub's secondary limit on content creation) and ends the pass before the
+core API quota drops below a reserve kept for interactive starts.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable, Optional
+
+from github import GithubException
+
+from .repo import GithubOrg, StudentRepo, _parse_repo
+
+if TYPE_CHECKING:
+    from cspawn.models import Class, User
+
+logger = logging.getLogger("cspawn.github")
+
+
+class RateLimited(Exception):
+    """Raised when a prefork pass must stop to leave API quota for users."""
+
+
+def _upstream_name(upstream_url: str) -> str:
+    return _parse_repo(upstream_url)[1]
+
+
+def lookup_fork(app, user: "User", upstream_url: str) -> Optional[StudentRepo]:
+    """Return the cached fork of `upstream_url` for `user`, or None."""
+    from cspawn.models import StudentFork
+
+    row = StudentFork.query.filter_by(user_id=user.id, upstream_url=upstream_url).first()
+    if row is None:
+        return None
+    return StudentRepo(getattr(app, "app_config", None), app, row.org, row.name,
+                       _upstream_name(upstream_url), upstream_url, user.username)
+
+
+def record_fork(user: "User", upstream_url: str, sr: StudentRepo) -> None:
+    """Remember that `sr` is `user`'s fork of `upstream_url`."""
+    from cspawn.models import StudentFork, db
+
+    row = StudentFork.query.filter_by(user_id=user.id, upstream_url=upstream_url).first()
+    if row is None:
+        row = StudentFork(user_id=user.id, upstream_url=upstream_url)
+        db.session.add(row)
+    row.org = sr.org
+    row.name = sr.name
+    db.session.commit()
+
+
+def forget_fork(full_name: str) -> int:
+    """Drop cache rows for the repo ``org/name``; returns how many were removed."""
+    from cspawn.models import StudentFork, db
+
+    org, _, name = full_name.strip("/").partition("/")
+    n = StudentFork.query.filter_by(org=org, name=name).delete(synchronize_session=False)
+    db.session.commit()
+    return n
+
+
+def get_or_fork(app, user: "User", upstream_url: str,
+                org_factory: Optional[Callable] = None) -> StudentRepo:
+    """The student's fork: from the cache if pre-forked, otherwise fork now."""
+    sr = lookup_fork(app, user, upstream_url)
+    if sr is not None:
+        logger.debug("Using pre-forked %s for %s", sr.full_name, user.username)
+        return sr
+
+    sr = (org_factory or GithubOrg.new_org)(app).fork(upstream_url, user.username)
+    try:
+        record_fork(user, upstream_url, sr)
+    except Exception as e:
+        from cspawn.models import db
+
+        db.session.rollback()
+        logger.warning("Could not cache fork %s: %s", sr.full_name, e)
+    return sr
+
+
+class ForkBudget:
+    """Paces `create_fork` calls and guards the core API quota.
+
+    Args:
+        gh: The PyGithub client (`GithubOrg.gh`); its `rate_limiting` is the
+            (remaining, limit) pair from the last response headers.
+        min_interval_s: Minimum seconds between forks. GitHub's secondary
+            rate limit on content creation trips well before the hourly quota.
+        reserve: Stop once fewer than this many core requests remain, so
+            students starting hosts right now are never starved by prefork.
+        sleep, clock: Injectable for tests.
+    """
+
+    def __init__(self, gh, *, min_interval_s: float = 2.0, reserve: int = 500,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.gh = gh
+        self.min_interval_s = min_interval_s
+        self.reserve = reserve
+        self._sleep = sleep
+        self._clock = clock
+        self._last: Optional[float] = None
+
+    def remaining(self) -> Optional[int]:
+        try:
+            remaining, _limit = self.gh.rate_limiting
+        except Exception:
+            return None
+        return remaining if remaining >= 0 else None
+
+    def acquire(self) -> None:
+        """Wait out the pacing interval; raise `RateLimited` if quota is low."""
+        remaining = self.remaining()
+        if remaining is not None and remaining < self.reserve:
+            raise RateLimited(f"{remaining} GitHub API requests left (reserve {self.reserve})")
+        if self._last is not None:
+            wait = self.min_interval_s - (self._clock() - self._last)
+            if wait > 0:
+                self._sleep(wait)
+        self._last = self._clock()
+
+
+@dataclass
+class PreforkReport:
+    """Outcome of a prefork pass over one or more classes."""
+
+    forked: list = field(default_factory=list)
+    cached: list = field(default_factory=list)
+    failed: list = field(default_factory=list)  # (username, error)
+    pending: list = field(default_factory=list)  # would fork (dry run)
+    skipped: list = field(default_factory=list)  # students with no username
+    stopped: Optional[str] = None  # why the pass ended early, if it did
+
+    def merge(self, other: "PreforkReport") -> None:
+        self.forked += other.forked
+        self.cached += other.cached
+        self.failed += other.failed
+        self.pending += other.pending
+        self.skipped += other.skipped
+        self.stopped = self.stopped or other.stopped
+
+    def summary(self) -> str:
+        s = (f"{len(self.forked)} forked, {len(self.cached)} already cached, "
+             f"{len(self.failed)} failed")
+        if self.pending:
+            s += f", {len(self.pending)} would fork"
+        if self.stopped:
+            s += f"; stopped early: {self.stopped}"
+        return s
+
+
+def prefork_class(app, class_: "Class", *, org: Optional[GithubOrg] = None,
+                  budget: Optional[ForkBudget] = None,
+                  dry_run: bool = False) -> PreforkReport:
+    """Fork the class prototype repo for every enrolled student lacking one."""
+    report = PreforkReport()
+    proto = class_.proto
+    if proto is None or not proto.repo_uri:
+        logger.info("prefork %s: class has no prototype repo; skipping", class_.name)
+        return report
+    upstream_url = proto.repo_uri
+
+    todo = []
+    for student in class_.students:
+        if not student.username:
+            report.skipped.append(student.id)
+        elif lookup_fork(app, student, upstream_url) is not None:
+            report.cached.append(student.username)
+        else:
+            todo.append(student)
+
+    if dry_run:
+        report.pending = [s.username for s in todo]
+        return report
+    if not todo:
+        return report
+
+    org = org or GithubOrg.new_org(app)
+    budget = budget or ForkBudget(org.gh)
+
+    for student in todo:
+        try:
+            budget.acquire()
+        except RateLimited as e:
+            report.stopped = str(e)
+            break
+        try:
+            sr = org.fork(upstream_url, student.username)
+            record_fork(student, upstream_url, sr)
+            report.forked.append(student.username)
+        except GithubException as e:
+            from cspawn.models import db
+
+            db.session.rollback()
+            report.failed.append((student.username, str(e)))
+            if e.status in (403, 429) and "rate limit" in str(e.data).lower():
+                report.stopped = f"GitHub rate limit: {e.status}"
+                break
+        except Exception as e:
+            from cspawn.models import db
+
+            db.session.rollback()
+            report.failed.append((student.username, str(e)))
+
+    logger.info("prefork %s: %s", class_.name, report.summary())
+    return report
+
+
+def classes_due_for_prefork(now: Optional[datetime] = None,
+                            lead: timedelta = timedelta(hours=24)) -> list:
+    """Classes whose purge window is open or opens within `lead`.
+
+    The purge window (``purge_after`` .. ``purge_by``) is when a class
+    session's hosts are live, so that is when its students will press Start.
+    """
+    from cspawn.models import Class
+
+    now = now or datetime.now(timezone.utc)
+    rows = Class.query.filter(
+        Class.purge_after.isnot(None),
+        Class.purge_by.isnot(None),
+    ).all()
+
+    due = []
+    for c in rows:
+        after, by = c.purge_after, c.purge_by
+        if after.tzinfo is None:
+            after = after.replace(tzinfo=timezone.utc)
+        if by.tzinfo is None:
+            by = by.replace(tzinfo=timezone.utc)
+        if after - lead <= now < by:
+            due.append(c)
+    return due
+
+
+def prefork_due(app, *, now: Optional[datetime] = None,
+                lead: timedelta = timedelta(hours=24),
+                org: Optional[GithubOrg] = None,
+                budget: Optional[ForkBudget] = None,
+                dry_run: bool = False) -> PreforkReport:
+    """Run `prefork_class` for every class returned by `classes_due_for_prefork`."""
+    report = PreforkReport()
+    classes = classes_due_for_prefork(now, lead)
+    if not classes:
+        return report
+
+    if org is None and not dry_run:
+        org = GithubOrg.new_org(app)
+    if org is not None and budget is None:
+        budget = ForkBudget(org.gh)
+
+    for c in classes:
+        report.merge(prefork_class(app, c, org=org, budget=budget, dry_run=dry_run))
+        if report.stopped:
+            break
+    return report
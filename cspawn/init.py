@@ -30,7 +30,9 @@ from sqlalchemy.exc import OperationalError, ProgrammingError
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from cspawn.__version__ import __version__ as version
+from cspawn.cs_docker.clusterview import ClusterViewCache
 from cspawn.cs_docker.csmanager import CodeServerManager
+from cspawn.telem_ingest import TelemetryBuffer
 from cspawn.util.app_support import (configure_app_dir, configure_config_tree,
                                      human_time_format, is_running_under_gunicorn, setup_database,
                                      setup_sessions)
@@ -52,6 +54,8 @@ class App(Flask):
     deployment: str
     db: SQLAlchemy
     csm: CodeServerManager
+    telem_buffer: TelemetryBuffer | None
+    cluster_view: ClusterViewCache
     bootstrap: Bootstrap5
     font_awesome: FontAwesome
 
@@ -195,6 +199,12 @@ def init_app(config_dir=None, deployment=None, log_level=None, sweep_node_ops: b
         setup_sessions(app, devel=insecure_http)
 
         app.csm = CodeServerManager(app)
+
+        # Buffered /telem writes (see cspawn.telem_ingest).
+        app.telem_buffer = TelemetryBuffer(app) if TelemetryBuffer.enabled(config) else None
+
+        # Nodes/hosts for the admin pages, shared across workers (see cspawn.cs_docker.clusterview).
+        app.cluster_view = ClusterViewCache(config)
         
         app.logger.info(f"Application initialized successfully in {deployment} mode")
 
@@ -5,6 +5,7 @@ from flask_migrate import current
 from sqlalchemy.exc import IntegrityError
 from cspawn.main import main_bp
 from cspawn.models import Class, CodeHost, User, db
+from cspawn.cs_docker.startjobs import enqueue_start
 from cspawn.forms import ClassForm
 
 from flask import abort, current_app, flash, redirect, render_template, request, url_for, jsonify
@@ -91,26 +92,14 @@ def start_class(class_id) -> str:
         flash("A host is already running for the current user", "info")
         return redirect(url_for("hosts.index"))
 
-    # Create a new CodeHost instance
-    s = ca.csm.get_by_username(current_user.username)
+    # Host creation (fork, service create, pin) takes too long to run inside
+    # the request; queue it for the start-worker and return at once.
+    job = enqueue_start(current_user, proto, class_)
 
-    if not s:
-        s, ch = ca.csm.new_cs(user=current_user, proto=proto, class_=class_)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"job_id": job.id, "status": job.status, "stage": job.stage})
 
-        if s:
-            flash(f"Host {s.name} started successfully", "success")
-        else:
-            flash("Failed to start host", "error")
-
-        if ch and ch.class_id is None:
-            assert ch.proto_id == proto.id
-            ch.class_id = class_id
-            db.session.add(ch)
-            db.session.commit()
-
-    else:
-        s.sync_to_db(check_ready=True)
-        flash("Host already running", "info")
+    flash("Starting your host; this page will update when it is ready.", "info")
 
     return redirect(return_url)
 
@@ -339,7 +328,7 @@ def remove_students():
         student = User.query.get(student_id)
 
         if student in class_.students:
-            host = CodeHost.query.filter_by(service_name=student.username).first()
+            host = CodeHost.query.filter_by(user_id=student.id).first()
             if host:
                 # stop_host() is best-effort and never raises (push, stop, and
                 # delete of the CodeHost row are each individually isolated
@@ -1,12 +1,14 @@
 import json
+import time
 from typing import cast
 
-from flask import current_app, flash, jsonify, redirect, render_template, request, url_for
+from flask import (Response, current_app, flash, jsonify, redirect, render_template, request,
+                   stream_with_context, url_for)
 from flask_login import current_user, login_required
 
-from cspawn.cs_docker.csmanager import CSMService
+from cspawn.cs_docker.readiness import host_ready_status
 from cspawn.main import main_bp
-from cspawn.models import CodeHost, ClassProto, db, User
+from cspawn.models import CodeHost, ClassProto, StartJob, db, User
 from cspawn.init import cast_app
 from cspawn.util.host_s3_sync import HostS3Sync
 from cspawn.cs_github.repo import CodeHostRepo
@@ -75,24 +77,69 @@ def open_host(host_id) -> str:
 @main_bp.route("/host/is_ready", methods=["GET"])
 @login_required
 def is_ready() -> jsonify:
-    from docker.errors import NotFound
+    """Readiness of the current user's host, from its row; never touches Docker."""
+    host = CodeHost.query.filter_by(user_id=current_user.id).first()
 
-    try:
-        host = CodeHost.query.filter_by(user_id=current_user.id).first()
-        
-        if not host:
-            return jsonify({"status": "error", "message": "No host found"})
+    if not host:
+        return jsonify({"status": "error", "message": "No host found"})
+
+    return jsonify(host_ready_status(host, current_app.app_config))
+
+
+@main_bp.route("/host/ready_events", methods=["GET"])
+@login_required
+def ready_events():
+    """Server-Sent Events version of /host/is_ready (READY_SSE).
+
+    Re-reads the host row every READY_SSE_POLL_S and sends the status when it
+    changes. The stream ends once the host is ready or gone, or after
+    READY_SSE_MAX_S, and the browser reconnects, so a worker is never held
+    for long.
+    """
+    from cspawn.util.config import cfg_bool, cfg_float
+
+    cfg = current_app.app_config
+    if not cfg_bool(cfg, "READY_SSE", False):
+        return jsonify({"status": "error", "message": "Event stream disabled"}), 404
+
+    user_id = current_user.id
+    poll_s = cfg_float(cfg, "READY_SSE_POLL_S", 1.0)
+    max_s = cfg_float(cfg, "READY_SSE_MAX_S", 25.0)
+
+    def stream():
+        yield "retry: 2000\n\n"
+        deadline = time.monotonic() + max_s
+        last = None
+        while True:
+            host = CodeHost.query.filter_by(user_id=user_id).first()
+            status = host_ready_status(host, cfg) if host else {"status": "error", "message": "No host found"}
+            # End the transaction so the next read sees the tracker's commits.
+            db.session.rollback()
+            if status != last:
+                yield f"data: {json.dumps(status)}\n\n"
+                last = status
+            if status["status"] != "not_ready" or time.monotonic() >= deadline:
+                return
+            time.sleep(poll_s)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@main_bp.route("/host/start_job/<job_id>", methods=["GET"])
+@login_required
+def start_job_status(job_id) -> jsonify:
+    """Progress of a queued host start; polled by the class page."""
+    job = StartJob.query.get(job_id)
 
-        s: CSMService = current_app.csm.get(host.service_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"status": "error", "message": "Start job not found"}), 404
 
-        s.sync_to_db()
+    if job.status == "failed":
+        # The poller reloads the page on failure; the reason shows up there.
+        flash(f"Failed to start host: {job.message}" if job.message else "Failed to start host", "error")
 
-        if s.check_ready():
-            return jsonify({"status": "ready", "hostname_url": s.public_url})
-        else:
-            return jsonify({"status": "not_ready"})
-    except (NotFound, AttributeError) as e:
-        return jsonify({"status": "error", "message": str(e)})
+    return jsonify(job.to_dict())
 
 
 @main_bp.route("/host/<chost_id>/open", methods=["GET"])
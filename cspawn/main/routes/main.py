@@ -50,10 +50,30 @@ def datetimeformat(value, format="%Y-%m-%dT%H:%M"):
     return value.strftime(format)
 
 
+def active_start_job():
+    """The current user's queued/running StartJob, for the polling script."""
+    from cspawn.models import StartJob
+
+    if not current_user.is_authenticated:
+        return None
+    return StartJob.active_for(current_user.id)
+
+
+def ready_events_url():
+    """URL of the readiness event stream, or None when READY_SSE is off."""
+    from cspawn.util.config import cfg_bool
+
+    if not cfg_bool(current_app.app_config, "READY_SSE", False):
+        return None
+    return url_for("main.ready_events")
+
+
 @main_bp.before_app_request
 def add_template_filters():
     current_app.jinja_env.filters["unk_filter"] = unk_filter
     current_app.jinja_env.filters["datetimeformat"] = datetimeformat
+    current_app.jinja_env.globals["active_start_job"] = active_start_job
+    current_app.jinja_env.globals["ready_events_url"] = ready_events_url
 
 
 @main_bp.route("/")
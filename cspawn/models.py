@@ -12,22 +12,31 @@ from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
 from slugify import slugify
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Table,
     Text,
+    UniqueConstraint,
+    and_,
     create_engine,
     event,
     func,
+    literal,
+    or_,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import DeclarativeBase, relationship, validates
+from sqlalchemy.orm import DeclarativeBase, backref, relationship, validates
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy_utils import PasswordType, create_database, database_exists
 
 from tzlocal import get_localzone_name
@@ -261,6 +270,9 @@ class Class(db.Model):
         to turn this state into a list of buttons to display to the user."""
 
         if not host:
+            job = StartJob.active_for(user.id) if getattr(user, "id", None) is not None else None
+            if job is not None and job.class_id == self.id:
+                return "starting"  # Queued/running start job, no CodeHost row yet
             if self.running:
                 return "stopped"  # There is no host running
             else:
@@ -334,25 +346,59 @@ class HostState(Enum):
     STARTING = "starting"
 
 
+# Idle thresholds, in minutes, for CodeHost.is_quiescent and is_purgeable.
+QUIESCENT_HEARTBEAT_MIN = 20
+QUIESCENT_EDIT_MIN = 15
+PURGE_IDLE_MIN = 50
+
+
+def _utcnow() -> datetime:
+    """Now as naive UTC, the way the DateTime columns are compared."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _minutes_since(FunctionElement):
+    """SQL for whole minutes from a timestamp to `now`, like `CodeHost.to_minutes`.
+
+    Called as ``_minutes_since(now, ts)``; `now` is a bound naive-UTC value.
+    """
+
+    type = Integer()
+    inherit_cache = True
+    name = "minutes_since"
+
+
+@compiles(_minutes_since)
+def _minutes_since_default(element, compiler, **kw):
+    now, ts = (compiler.process(c, **kw) for c in element.clauses)
+    return f"CAST(ROUND(EXTRACT(EPOCH FROM ({now} - {ts})) / 60) AS INTEGER)"
+
+
+@compiles(_minutes_since, "sqlite")
+def _minutes_since_sqlite(element, compiler, **kw):
+    now, ts = (compiler.process(c, **kw) for c in element.clauses)
+    return f"CAST(ROUND((julianday({now}) - julianday({ts})) * 1440) AS INTEGER)"
+
+
 class CodeHost(db.Model):
     __tablename__ = "code_host"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     user = relationship("User", backref="code_hosts")
 
     service_id = Column(String, nullable=False, unique=True)
-    service_name = Column(String, nullable=False)
+    service_name = Column(String, nullable=False, index=True)
     container_id = Column(String, nullable=True)
     container_name = Column(String, nullable=True)
 
-    state = Column(String, default="unknown", nullable=False)  # Docker state
-    app_state = Column(String, default="unknown", nullable=True)  # Application state
+    state = Column(String, default="unknown", nullable=False, index=True)  # Docker state
+    app_state = Column(String, default="unknown", nullable=True, index=True)  # Application state
 
     proto_id = Column(Integer, ForeignKey("class_proto.id"), nullable=True)
     class_proto = relationship("ClassProto", backref="code_hosts")
 
-    class_id = Column(Integer, ForeignKey("classes.id"), nullable=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=True, index=True)
     class_ = relationship("Class", backref="code_hosts")
 
     node_id = Column(String, nullable=True)
@@ -362,8 +408,8 @@ class CodeHost(db.Model):
 
     memory_usage = Column(Integer, nullable=True)
     last_stats = Column(DateTime, nullable=True)
-    last_heartbeat = Column(DateTime, nullable=True)  # Last time of any report
-    last_utilization = Column(DateTime, nullable=True)  # Last time user editied a file
+    last_heartbeat = Column(DateTime, nullable=True, index=True)  # Last time of any report
+    last_utilization = Column(DateTime, nullable=True, index=True)  # Last time user editied a file
     user_activity_rate = Column(Float, default=0.0, nullable=True)  # 5 M keystroke rate.
     utilization_1 = Column(Float, nullable=True)
     utilization_2 = Column(Float, nullable=True)
@@ -399,6 +445,11 @@ class CodeHost(db.Model):
         except (TypeError, AttributeError):
             return CodeHost.to_minutes(datetime.now(timezone.utc) - self.created_at.replace(tzinfo=timezone.utc))
 
+    @heart_beat_ago.inplace.expression
+    @classmethod
+    def _heart_beat_ago_expression(cls):
+        return _minutes_since(literal(_utcnow(), DateTime()), func.coalesce(cls.last_heartbeat, cls.created_at))
+
     @hybrid_property
     def modified_ago(self) -> int:
         """Time since last file modification in minutes"""
@@ -408,12 +459,36 @@ class CodeHost(db.Model):
         except (TypeError, AttributeError):
             return CodeHost.to_minutes(datetime.now(timezone.utc) - self.created_at.replace(tzinfo=timezone.utc))
 
+    @modified_ago.inplace.expression
+    @classmethod
+    def _modified_ago_expression(cls):
+        return _minutes_since(literal(_utcnow(), DateTime()), func.coalesce(cls.last_utilization, cls.created_at))
+
+    @classmethod
+    def _idle_for(cls, column, minutes: int):
+        """SQL for ``<column>_ago > minutes``, as a plain timestamp comparison.
+
+        Compares the bare column against a cutoff so its index can be used;
+        ``created_at`` stands in when it is NULL. The extra half minute
+        matches the rounding in `to_minutes`. Never NULL, so it negates
+        like the Python side.
+        """
+        cutoff = _utcnow() - timedelta(minutes=minutes + 0.5)
+        return or_(and_(column.isnot(None), column < cutoff),
+                   and_(column.is_(None), cls.created_at < cutoff))
+
     @hybrid_property
     def is_quiescent(self) -> bool:
         """Is the host still being used? True if the last heartbeat is more than 20 minutes ago, 
         or the last file modification is more than 15 minutes ago."""
 
-        return self.heart_beat_ago > 20 or self.modified_ago > 15
+        return self.heart_beat_ago > QUIESCENT_HEARTBEAT_MIN or self.modified_ago > QUIESCENT_EDIT_MIN
+
+    @is_quiescent.inplace.expression
+    @classmethod
+    def _is_quiescent_expression(cls):
+        return or_(cls._idle_for(cls.last_heartbeat, QUIESCENT_HEARTBEAT_MIN),
+                   cls._idle_for(cls.last_utilization, QUIESCENT_EDIT_MIN))
 
     @hybrid_property
     def is_mia(self) -> bool:
@@ -422,10 +497,24 @@ class CodeHost(db.Model):
         
         return self.app_state == HostState.MIA.value or self.state == HostState.MIA.value
 
+    @is_mia.inplace.expression
+    @classmethod
+    def _is_mia_expression(cls):
+        # app_state is nullable; keep the result FALSE, not NULL, so ~is_mia works.
+        return or_(and_(cls.app_state.isnot(None), cls.app_state == HostState.MIA.value),
+                   cls.state == HostState.MIA.value)
+
     @hybrid_property
     def is_purgeable(self) -> bool:
         """Is the host purgeable? True if it is MIA or quiescent."""
-        return self.is_mia or self.heart_beat_ago > 50 or self.modified_ago > 50 
+        return self.is_mia or self.heart_beat_ago > PURGE_IDLE_MIN or self.modified_ago > PURGE_IDLE_MIN
+
+    @is_purgeable.inplace.expression
+    @classmethod
+    def _is_purgeable_expression(cls):
+        return or_(cls.is_mia,
+                   cls._idle_for(cls.last_heartbeat, PURGE_IDLE_MIN),
+                   cls._idle_for(cls.last_utilization, PURGE_IDLE_MIN))
 
     def update_from_ci(self, ci):
         self.service_name = ci["service_name"]
@@ -480,23 +569,8 @@ class CodeHost(db.Model):
         return cls(**data)
 
     def update_telemetry(self, telemetry: TelemetryReport):
-        try:
-            # This finds the time of the last file modification
-            # but there may be more recent keystrokes.
-            max_last_modified = max(file_stat.lastModified for file_name, file_stat in telemetry.fileStats.items())
-        except ValueError:
-            max_last_modified = None
-
-        self.last_stats = telemetry.timestamp
-
-        self.last_heartbeat = telemetry.timestamp  # TIme of
-        self.last_utilization = max_last_modified
-
-        self.memory_usage = telemetry.sysMemory
-        self.user_activity_rate = telemetry.average5m
-
-        self.utilization_1 = telemetry.average30m
-        self.utilization_2 = telemetry.average1m
+        for column, value in telemetry.codehost_values().items():
+            setattr(self, column, value)
 
     def update_stats(self, record: dict):
         record["last_heartbeat"] = datetime.now().astimezone().isoformat()  # set this for every record
@@ -545,6 +619,154 @@ class NodeOp(db.Model):
         return f"<NodeOp(id={self.id!r}, kind={self.kind!r}, status={self.status!r})>"
 
 
+class StartJob(db.Model):
+    """A queued request to start a student's code host.
+
+    `start_class` enqueues one of these and returns at once; a
+    `cspawnctl host start-worker` process claims queued jobs and runs the
+    `new_cs()` stages, recording progress in `stage` so the UI can poll
+    `/host/start_job/<id>`. At most one job per user is active
+    (queued/running) at a time.
+    """
+
+    __tablename__ = "start_jobs"
+
+    ACTIVE = ("queued", "running")
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Jobs are history for a user's starts; they go when the user does.
+    user = relationship("User", backref=backref("start_jobs", cascade="all, delete-orphan"))
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=True)
+    proto_id = Column(Integer, ForeignKey("class_proto.id"), nullable=False)
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued|running|done|failed
+    stage = Column(String(32), nullable=True)  # fork|user_dir|claim|create|pin|record
+    path = Column(String(8), nullable=True)  # warm (claimed a standby) | cold
+    service_id = Column(String, nullable=True)
+    message = Column(Text, nullable=True)
+    worker = Column(String(64), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Refreshed by the owning worker while the job runs; a 'running' job whose
+    # heartbeat has gone stale is requeued by requeue_stale_jobs.
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in self.ACTIVE
+
+    @classmethod
+    def active_for(cls, user_id: int) -> "StartJob | None":
+        """Return the user's queued/running job, if any."""
+        return (
+            cls.query.filter(cls.user_id == user_id, cls.status.in_(cls.ACTIVE))
+            .order_by(cls.created_at.desc())
+            .first()
+        )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "path": self.path,
+            "message": self.message,
+            "service_id": self.service_id,
+            "class_id": self.class_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<StartJob(id={self.id!r}, user_id={self.user_id!r}, status={self.status!r})>"
+
+
+class StudentFork(db.Model):
+    """Cache of a student's fork of an upstream curriculum repo.
+
+    `GithubOrg.fork` takes seconds to minutes (create_fork, then waiting for
+    the fork to become cloneable, serialized per upstream). `cspawnctl github
+    prefork` forks ahead of time for a class roster and records each fork
+    here, so `new_cs()` only has to look the row up.
+    """
+
+    __tablename__ = "student_forks"
+    __table_args__ = (UniqueConstraint("user_id", "upstream_url", name="uq_student_forks_user_upstream"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user = relationship("User", backref=backref("student_forks", cascade="all, delete-orphan"))
+    upstream_url = Column(String(500), nullable=False)
+    org = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False)  # <upstream-name>-<username>
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.org}/{self.name}"
+
+    def __repr__(self):
+        return f"<StudentFork(user_id={self.user_id!r}, full_name={self.full_name!r})>"
+
+
+class PortLease(db.Model):
+    """One host port in the publish range, and the user whose host holds it.
+
+    Every port in the range has a row (seeded by the migration, or lazily by
+    `cspawn.cs_docker.ports.seed_ports`); a free port has ``user_id`` NULL.
+    The primary key makes double allocation impossible, and the partial index
+    on free ports lets `lease_ports` take the lowest free port without
+    scanning the leased ones. Leases are released when the user's CodeHost
+    row is deleted.
+    """
+
+    __tablename__ = "port_leases"
+    __table_args__ = (
+        Index("ix_port_leases_free", "port",
+              postgresql_where=text("user_id IS NULL"), sqlite_where=text("user_id IS NULL")),
+    )
+
+    port = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    leased_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<PortLease(port={self.port!r}, user_id={self.user_id!r})>"
+
+
+class TelemetrySample(db.Model):
+    """One point of a host's telemetry history, raw or rolled up.
+
+    A raw sample (``resolution`` 0) is one report, with ``ts`` the report
+    time. A rollup covers ``resolution`` seconds from ``ts``: ``n`` raw
+    reports, with averages weighted by ``n`` and maxima. Rows are keyed by
+    username, not CodeHost id, so a student's history survives host restarts.
+    Written and read by `cspawn.telem_history`.
+    """
+
+    __tablename__ = "telemetry_samples"
+    __table_args__ = (Index("ix_telemetry_samples_series", "resolution", "username", "ts"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    resolution = Column(Integer, nullable=False, default=0)  # bucket seconds; 0 = raw
+    username = Column(String, nullable=False)
+    class_id = Column(Integer, nullable=True)
+    ts = Column(DateTime, nullable=False)  # naive UTC
+    n = Column(Integer, nullable=False, default=1)
+    memory_avg = Column(BigInteger, nullable=True)  # bytes
+    memory_max = Column(BigInteger, nullable=True)
+    activity_avg = Column(Float, nullable=True)  # 1 m keystroke rate
+    activity_max = Column(Float, nullable=True)
+    last_edit = Column(DateTime, nullable=True)  # latest file modification seen
+
+    def __repr__(self):
+        return f"<TelemetrySample(resolution={self.resolution!r}, username={self.username!r}, ts={self.ts!r})>"
+
+
 class ClassProto(db.Model):
     """A template for a class. It describes the proto and repo to use for a class."""
 
@@ -625,6 +847,18 @@ event.listen(ClassProto, "before_insert", ClassProto.set_hash)
 event.listen(ClassProto, "before_update", ClassProto.set_hash)
 
 
+@event.listens_for(CodeHost, "after_delete")
+def _release_port_leases(mapper, connection, target):
+    """Return a deleted host's ports to the free pool, in the same transaction."""
+    if target.user_id is None:
+        return
+    connection.execute(
+        PortLease.__table__.update()
+        .where(PortLease.user_id == target.user_id)
+        .values(user_id=None, leased_at=None)
+    )
+
+
 def ensure_database_exists(app: Flask):
     uri = app.db.engine.url
     engine = create_engine(uri)
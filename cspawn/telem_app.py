@@ -0,0 +1,7 @@
+from cspawn.telem_ingest import create_telem_app
+
+# Entrypoint for the optional telemetry-only gunicorn process
+# (docker/supervisord.conf, program:telem). It serves /telem and nothing
+# else, so code-server reports never occupy a UI worker. See
+# cspawn/telem_ingest.py.
+app = create_telem_app()
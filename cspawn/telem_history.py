@@ -0,0 +1,260 @@
+"""
+cspawn/telem_history.py — Telemetry history: raw samples, rollups, retention, queries.
+
+``CodeHost.update_telemetry`` keeps only the latest values, so trends are
+lost. With ``TELEM_HISTORY`` on, every report accepted by ``/telem`` is also
+appended to ``telemetry_samples`` (`TelemetrySample`, ``resolution`` 0):
+
+- **Rollups**: `rollup_telemetry` folds complete buckets into 1-minute
+  rollups from raw samples, 15-minute rollups from those, and 1-hour rollups
+  from those. A bucket is complete once ``TELEM_ROLLUP_LAG_S`` has passed
+  since it ended, leaving time for buffered reports to land. Each level
+  continues from its own latest bucket, so repeated runs never duplicate.
+- **Retention**: `apply_retention` deletes each level once it is older than
+  that level's retention. Raw samples are kept for hours; hourly rollups for
+  a year. Run it after the rollups so nothing is deleted before it is rolled
+  up.
+- **Queries**: `series` returns one host's points at the finest resolution
+  still retained for the requested range. `summarize` reduces a window to
+  one point per host (or per host in a class), for callers that need a trend
+  rather than a point sample.
+
+Cron runs ``cspawnctl telem rollup`` every five minutes, which does both.
+
+Config keys:
+  TELEM_HISTORY            bool  default false — record a raw sample per report
+  TELEM_ROLLUP_LAG_S       int   default 120   — wait after a bucket ends before rolling it up
+  TELEM_RETAIN_RAW_H       float default 6     — raw samples
+  TELEM_RETAIN_1M_H        float default 48    — 1-minute rollups
+  TELEM_RETAIN_15M_D       float default 30    — 15-minute rollups
+  TELEM_RETAIN_1H_D        float default 365   — 1-hour rollups
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
+from cspawn.telemetry import TelemetryReport
+
+logger = logging.getLogger("cspawn.telem")
+
+RAW = 0
+# (resolution, source resolution), finest first.
+LEVELS = ((60, RAW), (900, 60), (3600, 900))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class TelemetryPoint:
+    """A host's telemetry over ``resolution`` seconds from ``ts`` (one report when 0)."""
+
+    username: str
+    class_id: Optional[int]
+    ts: datetime
+    resolution: int
+    n: int
+    memory_avg: Optional[int]
+    memory_max: Optional[int]
+    activity_avg: Optional[float]
+    activity_max: Optional[float]
+    last_edit: Optional[datetime]
+
+
+def history_enabled(config) -> bool:
+    return cfg_bool(config, "TELEM_HISTORY", False)
+
+
+def retention(cfg) -> dict[int, timedelta]:
+    """How long each resolution is kept."""
+    return {
+        RAW: timedelta(hours=cfg_float(cfg, "TELEM_RETAIN_RAW_H", 6)),
+        60: timedelta(hours=cfg_float(cfg, "TELEM_RETAIN_1M_H", 48)),
+        900: timedelta(days=cfg_float(cfg, "TELEM_RETAIN_15M_D", 30)),
+        3600: timedelta(days=cfg_float(cfg, "TELEM_RETAIN_1H_D", 365)),
+    }
+
+
+def _utc_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _floor(ts: datetime, seconds: int) -> datetime:
+    return ts - timedelta(seconds=(ts - _EPOCH).total_seconds() % seconds)
+
+
+def sample_row(report: TelemetryReport) -> dict:
+    """The raw `TelemetrySample` values for one report."""
+    values = report.codehost_values()
+    return {
+        "resolution": RAW,
+        "username": report.username,
+        "class_id": report.class_id,
+        "ts": _utc_naive(report.timestamp),
+        "n": 1,
+        "memory_avg": report.sysMemory,
+        "memory_max": report.sysMemory,
+        "activity_avg": report.average1m,
+        "activity_max": report.average1m,
+        "last_edit": _utc_naive(values["last_utilization"]),
+    }
+
+
+def record_samples(reports: Iterable[TelemetryReport]) -> int:
+    """Add a raw sample per report to the session (one bulk INSERT); the caller commits."""
+    from sqlalchemy import insert
+
+    from cspawn.models import TelemetrySample, db
+
+    rows = [sample_row(r) for r in reports]
+    if rows:
+        db.session.execute(insert(TelemetrySample), rows)
+    return len(rows)
+
+
+def _combine(username: str, ts: datetime, resolution: int, parts: list) -> TelemetryPoint:
+    """Fold samples or points (oldest first) into one point."""
+    n = sum(p.n for p in parts)
+
+    def _wavg(attr):
+        known = [(getattr(p, attr), p.n) for p in parts if getattr(p, attr) is not None]
+        weight = sum(w for _, w in known)
+        return sum(v * w for v, w in known) / weight if weight else None
+
+    def _max(attr):
+        known = [getattr(p, attr) for p in parts if getattr(p, attr) is not None]
+        return max(known) if known else None
+
+    memory_avg = _wavg("memory_avg")
+    return TelemetryPoint(
+        username=username,
+        class_id=parts[-1].class_id,
+        ts=ts,
+        resolution=resolution,
+        n=n,
+        memory_avg=round(memory_avg) if memory_avg is not None else None,
+        memory_max=_max("memory_max"),
+        activity_avg=_wavg("activity_avg"),
+        activity_max=_max("activity_max"),
+        last_edit=_max("last_edit"),
+    )
+
+
+def rollup_telemetry(cfg, now: Optional[datetime] = None) -> dict[int, int]:
+    """Roll every complete bucket up one level at a time; returns rows written per resolution.
+
+    Must run inside an app context. Commits.
+    """
+    from sqlalchemy import func, insert
+
+    from cspawn.models import TelemetrySample, db
+
+    now = _utc_naive(now or datetime.now(timezone.utc))
+    lag = timedelta(seconds=cfg_int(cfg, "TELEM_ROLLUP_LAG_S", 120))
+    written: dict[int, int] = {}
+    for resolution, source in LEVELS:
+        end = _floor(now - lag, resolution)
+        last = db.session.query(func.max(TelemetrySample.ts)).filter(
+            TelemetrySample.resolution == resolution).scalar()
+        q = TelemetrySample.query.filter(TelemetrySample.resolution == source, TelemetrySample.ts < end)
+        if last is not None:
+            q = q.filter(TelemetrySample.ts >= last + timedelta(seconds=resolution))
+
+        buckets: dict[tuple[str, datetime], list] = {}
+        for s in q.order_by(TelemetrySample.ts):
+            buckets.setdefault((s.username, _floor(s.ts, resolution)), []).append(s)
+        rows = [asdict(_combine(u, ts, resolution, parts)) for (u, ts), parts in buckets.items()]
+        if rows:
+            db.session.execute(insert(TelemetrySample), rows)
+        db.session.commit()
+        written[resolution] = len(rows)
+    return written
+
+
+def apply_retention(cfg, now: Optional[datetime] = None) -> int:
+    """Delete samples older than their resolution's retention; returns rows deleted. Commits."""
+    from cspawn.models import TelemetrySample, db
+
+    now = _utc_naive(now or datetime.now(timezone.utc))
+    deleted = 0
+    for resolution, keep in retention(cfg).items():
+        deleted += TelemetrySample.query.filter(
+            TelemetrySample.resolution == resolution, TelemetrySample.ts < now - keep
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def _point(s) -> TelemetryPoint:
+    return TelemetryPoint(
+        username=s.username, class_id=s.class_id, ts=s.ts, resolution=s.resolution, n=s.n,
+        memory_avg=s.memory_avg, memory_max=s.memory_max,
+        activity_avg=s.activity_avg, activity_max=s.activity_max, last_edit=s.last_edit,
+    )
+
+
+def pick_resolution(cfg, since: datetime, now: Optional[datetime] = None) -> int:
+    """The finest resolution whose retention still reaches back to `since`."""
+    now = _utc_naive(now or datetime.now(timezone.utc))
+    keep = retention(cfg)
+    for resolution in (RAW,) + tuple(r for r, _ in LEVELS):
+        if now - keep[resolution] <= _utc_naive(since):
+            return resolution
+    return LEVELS[-1][0]
+
+
+def series(
+    cfg,
+    username: str,
+    since: datetime,
+    until: Optional[datetime] = None,
+    *,
+    resolution: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> list[TelemetryPoint]:
+    """One host's points from `since` (to `until`), oldest first.
+
+    With no `resolution`, uses `pick_resolution`.
+    """
+    from cspawn.models import TelemetrySample
+
+    if resolution is None:
+        resolution = pick_resolution(cfg, since, now)
+    q = TelemetrySample.query.filter(
+        TelemetrySample.resolution == resolution,
+        TelemetrySample.username == username,
+        TelemetrySample.ts >= _utc_naive(since),
+    )
+    if until is not None:
+        q = q.filter(TelemetrySample.ts < _utc_naive(until))
+    return [_point(s) for s in q.order_by(TelemetrySample.ts)]
+
+
+def summarize(
+    cfg,
+    since: datetime,
+    *,
+    usernames: Optional[Iterable[str]] = None,
+    class_id: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> dict[str, TelemetryPoint]:
+    """One point per host covering `since` to now, from the resolution `pick_resolution` chooses."""
+    from cspawn.models import TelemetrySample
+
+    resolution = pick_resolution(cfg, since, now)
+    q = TelemetrySample.query.filter(
+        TelemetrySample.resolution == resolution, TelemetrySample.ts >= _utc_naive(since))
+    if usernames is not None:
+        q = q.filter(TelemetrySample.username.in_(list(usernames)))
+    if class_id is not None:
+        q = q.filter(TelemetrySample.class_id == class_id)
+
+    by_user: dict[str, list] = {}
+    for s in q.order_by(TelemetrySample.ts):
+        by_user.setdefault(s.username, []).append(s)
+    return {u: _combine(u, parts[0].ts, resolution, parts) for u, parts in by_user.items()}
@@ -0,0 +1,261 @@
+"""
+cspawn/telem_ingest.py — Buffered ingestion of code-server telemetry.
+
+Every code host POSTs a `TelemetryReport` to ``/telem`` every
+``KST_REPORT_INTERVAL`` seconds. Written through one at a time, that is a
+lookup and a commit per report on a sync gunicorn worker, about seven commits
+a second at 200 hosts, all competing with student requests.
+
+With ``TELEM_BATCH`` on, ``/telem`` only validates the report and hands it to
+`TelemetryBuffer.offer`:
+
+- **Coalescing**: the buffer keeps the latest report per username. Only the
+  newest values are ever written, so a report that a newer one replaces
+  before the flush is simply dropped.
+- **Flushing**: a daemon thread flushes every ``TELEM_FLUSH_INTERVAL_S``.
+  It resolves all buffered usernames to ``CodeHost`` ids with two queries and
+  writes them with one bulk ``UPDATE`` and one commit. With ``TELEM_HISTORY``
+  on, the same commit appends the reports to the history table
+  (`cspawn.telem_history`).
+- **Backpressure**: at most ``TELEM_BUFFER_MAX`` hosts wait for a flush. A
+  report from a host not already buffered is refused once the buffer is full
+  (``/telem`` answers 503) and counted in ``dropped``. The host's next report
+  will try again.
+
+Each gunicorn worker has its own buffer. The flush thread starts with the
+first report a process receives, because under ``preload_app`` threads
+started before the fork do not survive into the workers.
+
+`create_telem_app` builds a minimal app that serves only ``/telem``, always
+buffered. Run it as its own gunicorn process (``cspawn.telem_app:app``) and
+point ``KST_REPORTING_URL`` at it to keep telemetry off the UI workers.
+
+Config keys:
+  TELEM_BATCH             bool  default false — buffer /telem reports in the UI app
+  TELEM_FLUSH_INTERVAL_S  float default 15    — seconds between flushes
+  TELEM_BUFFER_MAX        int   default 2000  — hosts that may wait for a flush
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from flask import current_app, jsonify, request
+from pydantic import ValidationError
+
+from cspawn.util.config import cfg_bool, cfg_float, cfg_int
+from cspawn.telem_history import history_enabled, record_samples
+from cspawn.telemetry import TelemetryReport
+
+logger = logging.getLogger("cspawn.telem")
+
+
+@dataclass
+class IngestStats:
+    accepted: int = 0    # reports taken into the buffer
+    coalesced: int = 0   # reports that replaced an unflushed one from the same host
+    dropped: int = 0     # reports refused because the buffer was full
+    flushed: int = 0     # host rows written
+    unmatched: int = 0   # buffered reports with no CodeHost row
+    failed: int = 0      # flushes that raised
+
+
+class TelemetryBuffer:
+    """Latest telemetry report per host, written to the database in batches."""
+
+    def __init__(self, app, config=None) -> None:
+        self.app = app
+        config = app.app_config if config is None else config
+        self.interval = cfg_float(config, "TELEM_FLUSH_INTERVAL_S", 15.0)
+        self.max_hosts = cfg_int(config, "TELEM_BUFFER_MAX", 2000)
+        self.history = history_enabled(config)
+        self.stats = IngestStats()
+        self._lock = threading.Lock()
+        self._pending: dict[str, TelemetryReport] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def enabled(config) -> bool:
+        return cfg_bool(config, "TELEM_BATCH", False)
+
+    def offer(self, report: TelemetryReport) -> bool:
+        """Buffer `report`; ``False`` when it was dropped because the buffer is full."""
+        self._ensure_flusher()
+        with self._lock:
+            if report.username in self._pending:
+                self.stats.coalesced += 1
+            elif len(self._pending) >= self.max_hosts:
+                self.stats.dropped += 1
+                return False
+            self._pending[report.username] = report
+            self.stats.accepted += 1
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write every buffered report; returns the number of host rows updated.
+
+        Must run inside an app context. On a database error the reports go
+        back into the buffer unless a newer one from the same host has
+        arrived meanwhile.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        from sqlalchemy import update
+
+        from cspawn.models import CodeHost, User, db
+
+        try:
+            ids = dict(
+                db.session.query(CodeHost.service_name, CodeHost.id)
+                .filter(CodeHost.service_name.in_(batch))
+                .all()
+            )
+            missing = [u for u in batch if u not in ids]
+            if missing:
+                # A host claimed from the standby pool keeps its standby-* name.
+                for username, host_id in (
+                    db.session.query(User.username, CodeHost.id)
+                    .join(User, CodeHost.user_id == User.id)
+                    .filter(User.username.in_(missing))
+                ):
+                    ids.setdefault(username, host_id)
+
+            rows = [{"id": ids[u], **r.codehost_values()} for u, r in batch.items() if u in ids]
+            if rows:
+                db.session.execute(update(CodeHost), rows)
+            if self.history:
+                record_samples(batch.values())
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self.stats.failed += 1
+                for username, report in batch.items():
+                    if len(self._pending) >= self.max_hosts:
+                        break
+                    self._pending.setdefault(username, report)
+            logger.error("telemetry flush of %d report(s) failed: %s", len(batch), e)
+            return 0
+
+        with self._lock:
+            self.stats.flushed += len(rows)
+            self.stats.unmatched += len(batch) - len(rows)
+        logger.debug("telemetry flush: %d row(s); %s", len(rows), asdict(self.stats))
+        return len(rows)
+
+    def _ensure_flusher(self) -> None:
+        """Start the flush thread in this process if it is not running."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telem-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self) -> None:
+        dropped = 0
+        while not self._stop.wait(self.interval):
+            self._flush_logged()
+            if self.stats.dropped > dropped:
+                logger.warning("telemetry buffer full: %d report(s) dropped since the last flush",
+                               self.stats.dropped - dropped)
+                dropped = self.stats.dropped
+
+    def _flush_logged(self) -> None:
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.error("telemetry flush error: %s", e)
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._flush_logged()
+
+
+def ingest_telemetry():
+    """Handle a ``/telem`` request, buffered when the app has a `TelemetryBuffer`."""
+    from cspawn.models import CodeHost, User, db
+
+    if request.method != "POST":
+        return jsonify("OK")
+
+    try:
+        telemetry = TelemetryReport(**request.get_json())
+    except ValidationError as e:
+        current_app.logger.error(f"Validation error occurred: {e}")
+        return jsonify("Error")
+
+    buffer = getattr(current_app, "telem_buffer", None)
+    if buffer is not None:
+        if not buffer.offer(telemetry):
+            return jsonify("Busy"), 503
+        return jsonify("OK")
+
+    ch: CodeHost = CodeHost.query.filter_by(service_name=telemetry.username).first()
+    if not ch:
+        # A host claimed from the standby pool keeps its standby-* name.
+        ch = CodeHost.query.join(User).filter(User.username == telemetry.username).first()
+
+    if ch:
+        ch.update_telemetry(telemetry)
+    if history_enabled(getattr(current_app, "app_config", {})):
+        record_samples([telemetry])
+
+    db.session.commit()
+
+    return jsonify("OK")
+
+
+def create_telem_app(config_dir=None, deployment=None, log_level=None):
+    """A minimal app that serves only ``/telem``, always through a `TelemetryBuffer`.
+
+    No blueprints, sessions, login or Docker client: just the config, the
+    database and one route.
+    """
+    from flask import Flask
+
+    from cspawn.init import resolve_deployment
+    from cspawn.models import db
+    from cspawn.util.app_support import configure_config_tree
+    from cspawn.util.logging import init_logger
+
+    app = Flask(__name__)
+    deployment = resolve_deployment(deployment)
+    config = configure_config_tree(config_dir, deploy=deployment)
+    app.app_config = config
+    app.deployment = deployment
+    init_logger(app, log_level=log_level)
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = config["DATABASE_URI"]
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Only the flush threads touch the database.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_size": 2, "max_overflow": 2, "pool_pre_ping": True}
+    app.db = db
+    db.init_app(app)
+
+    app.telem_buffer = TelemetryBuffer(app)
+    app.add_url_rule("/telem", "telem", ingest_telemetry, methods=["GET", "POST"])
+
+    app.logger.info(f"Telemetry ingest app started in {deployment} mode")
+    return app
@@ -28,3 +28,22 @@ class TelemetryReport(BaseModel):
     syllabus: str
     class_id: int
     username: str
+
+    def codehost_values(self) -> Dict[str, Any]:
+        """The `CodeHost` columns this report sets, by column name."""
+        try:
+            # This finds the time of the last file modification
+            # but there may be more recent keystrokes.
+            max_last_modified = max(file_stat.lastModified for file_stat in self.fileStats.values())
+        except ValueError:
+            max_last_modified = None
+
+        return {
+            "last_stats": self.timestamp,
+            "last_heartbeat": self.timestamp,
+            "last_utilization": max_last_modified,
+            "memory_usage": self.sysMemory,
+            "user_activity_rate": self.average5m,
+            "utilization_1": self.average30m,
+            "utilization_2": self.average1m,
+        }
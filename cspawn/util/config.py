@@ -189,6 +189,36 @@ def get_config(
     return Config(config)
 
 
+def cfg_int(cfg, key: str, default: int) -> int:
+    """Read an integer config key; return *default* if absent or un-parseable."""
+    raw = cfg.get(key)
+    if raw is not None:
+        try:
+            return int(raw)
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+def cfg_float(cfg, key: str, default: float) -> float:
+    """Read a float config key; return *default* if absent or un-parseable."""
+    raw = cfg.get(key)
+    if raw is not None:
+        try:
+            return float(raw)
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+def cfg_bool(cfg, key: str, default: bool) -> bool:
+    """Read a boolean config key ('true'/'1'/'yes' → True, else → False)."""
+    raw = cfg.get(key)
+    if raw is None:
+        return default
+    return str(raw).strip().lower() in ("true", "1", "yes")
+
+
 def path_interp(path: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
     """
     Interpolates the parameters into the endpoint URL. So if you have a path
@@ -0,0 +1,107 @@
+"""Add start_jobs table for asynchronous host creation.
+
+Revision ID: v008_add_start_job_table
+Revises: v007_add_node_op_droplet_id
+Create Date: 2026-10-17
+
+Migration path rationale
+------------------------
+This revision creates the ``start_jobs`` table. ``start_class`` now enqueues a
+``StartJob`` row and returns immediately; a ``cspawnctl host start-worker``
+process claims queued rows and runs the ``new_cs()`` stages (fork, user dir,
+service create, pin, record) outside the web request.
+
+PostgreSQL additionally gets a partial unique index on ``user_id`` for rows in
+an active status (``queued``/``running``), so two concurrent clicks on Start
+can never queue two jobs for the same student; the second insert fails and the
+route falls back to the existing job. SQLite (tests) relies on the
+application-level check in ``enqueue_start()`` only.
+
+The migration is idempotent:
+- PostgreSQL: ``CREATE TABLE IF NOT EXISTS`` / ``CREATE INDEX IF NOT EXISTS``
+  via ``bind.execute``.
+- SQLite/other (tests): ``op.create_table(...)`` inside a ``try/except`` that
+  silences the "table already exists" OperationalError.
+
+``downgrade()`` drops the table (and with it the indexes): PostgreSQL uses
+``DROP TABLE IF EXISTS``; SQLite uses ``op.drop_table``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v008_add_start_job_table"
+down_revision = "v007_add_node_op_droplet_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS start_jobs (
+                id VARCHAR(36) NOT NULL,
+                user_id INTEGER NOT NULL REFERENCES users(id),
+                class_id INTEGER REFERENCES classes(id),
+                proto_id INTEGER NOT NULL REFERENCES class_proto(id),
+                status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                stage VARCHAR(32),
+                service_id VARCHAR,
+                message TEXT,
+                worker VARCHAR(64),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                started_at TIMESTAMP WITH TIME ZONE,
+                finished_at TIMESTAMP WITH TIME ZONE,
+                PRIMARY KEY (id)
+            )
+        """))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_start_jobs_user_id ON start_jobs (user_id)"
+        ))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_start_jobs_status ON start_jobs (status)"
+        ))
+        bind.execute(sa.text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_start_jobs_active_user
+            ON start_jobs (user_id) WHERE status IN ('queued', 'running')
+        """))
+    else:
+        # SQLite / other: use Alembic create_table; silently skip if already exists.
+        try:
+            op.create_table(
+                "start_jobs",
+                sa.Column("id", sa.String(36), primary_key=True),
+                sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, index=True),
+                sa.Column("class_id", sa.Integer(), sa.ForeignKey("classes.id"), nullable=True),
+                sa.Column("proto_id", sa.Integer(), sa.ForeignKey("class_proto.id"), nullable=False),
+                sa.Column("status", sa.String(16), nullable=False, server_default="queued", index=True),
+                sa.Column("stage", sa.String(32), nullable=True),
+                sa.Column("service_id", sa.String(), nullable=True),
+                sa.Column("message", sa.Text(), nullable=True),
+                sa.Column("worker", sa.String(64), nullable=True),
+                sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+                sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+            )
+        except OperationalError:
+            # Table already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("DROP TABLE IF EXISTS start_jobs"))
+    else:
+        op.drop_table("start_jobs")
@@ -0,0 +1,87 @@
+"""Add student_forks table caching pre-forked student repos.
+
+Revision ID: v009_add_student_fork_table
+Revises: v008_add_start_job_table
+Create Date: 2026-10-17
+
+Migration path rationale
+------------------------
+This revision creates the ``student_forks`` table. ``cspawnctl github
+prefork`` forks each enrolled student's repo ahead of a class session and
+records the fork here; ``new_cs()`` then looks the fork up instead of calling
+``GithubOrg.fork`` (create_fork plus a readiness wait, serialized per
+upstream) while the student waits.
+
+One row per (user, upstream repo), enforced by a unique constraint. Rows are
+removed when ``GithubOrg.remove`` deletes the repo and when the user is
+deleted.
+
+The migration is idempotent:
+- PostgreSQL: ``CREATE TABLE IF NOT EXISTS`` / ``CREATE INDEX IF NOT EXISTS``
+  via ``bind.execute``.
+- SQLite/other (tests): ``op.create_table(...)`` inside a ``try/except`` that
+  silences the "table already exists" OperationalError.
+
+``downgrade()`` drops the table: PostgreSQL uses ``DROP TABLE IF EXISTS``;
+SQLite uses ``op.drop_table``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v009_add_student_fork_table"
+down_revision = "v008_add_start_job_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS student_forks (
+                id SERIAL NOT NULL,
+                user_id INTEGER NOT NULL REFERENCES users(id),
+                upstream_url VARCHAR(500) NOT NULL,
+                org VARCHAR(255) NOT NULL,
+                name VARCHAR(255) NOT NULL,
+                created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (id),
+                CONSTRAINT uq_student_forks_user_upstream UNIQUE (user_id, upstream_url)
+            )
+        """))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_student_forks_user_id ON student_forks (user_id)"
+        ))
+    else:
+        # SQLite / other: use Alembic create_table; silently skip if already exists.
+        try:
+            op.create_table(
+                "student_forks",
+                sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+                sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, index=True),
+                sa.Column("upstream_url", sa.String(500), nullable=False),
+                sa.Column("org", sa.String(255), nullable=False),
+                sa.Column("name", sa.String(255), nullable=False),
+                sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+                sa.UniqueConstraint("user_id", "upstream_url", name="uq_student_forks_user_upstream"),
+            )
+        except OperationalError:
+            # Table already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("DROP TABLE IF EXISTS student_forks"))
+    else:
+        op.drop_table("student_forks")
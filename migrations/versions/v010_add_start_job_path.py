@@ -0,0 +1,64 @@
+"""Add start_jobs.path to record warm (standby claim) vs cold starts.
+
+Revision ID: v010_add_start_job_path
+Revises: v009_add_student_fork_table
+Create Date: 2026-10-17
+
+Migration path rationale
+------------------------
+``new_cs()`` can now claim a pre-started standby service instead of creating
+one (see ``cspawn.cs_docker.standby``). The start worker records which path a
+job took in ``start_jobs.path`` (``warm`` or ``cold``) so ``cspawnctl host
+standby`` can compare claim latency with cold-start latency.
+
+No backfill: jobs that finished before this revision read back as ``None``
+and are left out of the report.
+
+The migration is idempotent:
+- PostgreSQL: ``ALTER TABLE ... ADD COLUMN IF NOT EXISTS`` via ``bind.execute``.
+- SQLite/other (tests): ``op.add_column(...)`` inside a ``try/except`` that
+  silences the "duplicate column" OperationalError.
+
+``downgrade()`` drops the column: PostgreSQL uses ``DROP COLUMN IF EXISTS``;
+SQLite uses ``op.drop_column``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v010_add_start_job_path"
+down_revision = "v009_add_student_fork_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            ALTER TABLE start_jobs ADD COLUMN IF NOT EXISTS path VARCHAR(8)
+        """))
+    else:
+        # SQLite / other: use Alembic add_column; silently skip if the column
+        # already exists.
+        try:
+            op.add_column("start_jobs", sa.Column("path", sa.String(8), nullable=True))
+        except OperationalError:
+            # Column already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("ALTER TABLE start_jobs DROP COLUMN IF EXISTS path"))
+    else:
+        op.drop_column("start_jobs", "path")
@@ -0,0 +1,103 @@
+"""Add port_leases table for atomic host port allocation.
+
+Revision ID: v011_add_port_lease_table
+Revises: v010_add_start_job_path
+Create Date: 2026-10-17
+
+Migration path rationale
+------------------------
+This revision creates the ``port_leases`` table, one row per port in the
+25000-30000 publish range, and seeds every port as free. ``new_cs()`` leases
+its two ports from here (``cspawn.cs_docker.ports.lease_ports``) instead of
+scanning every ``code_host.public_url`` and drawing random ports, which could
+hand the same port to two concurrent starts.
+
+A partial index on free ports (``WHERE user_id IS NULL``) keeps allocation
+independent of how many ports are leased. On PostgreSQL, ports already in use
+by existing hosts (dev deployments put the port in ``public_url``) are marked
+leased to the host's user.
+
+An existing host's VNC port is not stored in the database; it is only in its
+Swarm service spec. ``CodeServerManager.sync`` leases every port a running
+service publishes (``cspawn.cs_docker.ports.reserve_ports``). Run
+``cspawnctl host dbsync`` right after this upgrade, before any new hosts start,
+so no VNC port in use is handed out again.
+
+The migration is idempotent:
+- PostgreSQL: ``CREATE TABLE IF NOT EXISTS`` / ``CREATE INDEX IF NOT EXISTS``
+  and ``INSERT ... ON CONFLICT DO NOTHING`` via ``bind.execute``.
+- SQLite/other (tests): ``op.create_table(...)`` inside a ``try/except`` that
+  silences the "table already exists" OperationalError; the ports are seeded
+  lazily on first use.
+
+``downgrade()`` drops the table: PostgreSQL uses ``DROP TABLE IF EXISTS``;
+SQLite uses ``op.drop_table``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v011_add_port_lease_table"
+down_revision = "v010_add_start_job_path"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS port_leases (
+                port INTEGER NOT NULL,
+                user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+                leased_at TIMESTAMP WITH TIME ZONE,
+                PRIMARY KEY (port)
+            )
+        """))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_port_leases_user_id ON port_leases (user_id)"
+        ))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_port_leases_free ON port_leases (port) WHERE user_id IS NULL"
+        ))
+        bind.execute(sa.text(
+            "INSERT INTO port_leases (port) SELECT generate_series(25000, 30000) ON CONFLICT DO NOTHING"
+        ))
+        bind.execute(sa.text("""
+            UPDATE port_leases p SET user_id = ch.user_id, leased_at = NOW()
+            FROM code_host ch
+            WHERE p.user_id IS NULL
+              AND substring(ch.public_url from ':([0-9]{5})/') IS NOT NULL
+              AND substring(ch.public_url from ':([0-9]{5})/')::int = p.port
+        """))
+    else:
+        # SQLite / other: use Alembic create_table; silently skip if already exists.
+        try:
+            op.create_table(
+                "port_leases",
+                sa.Column("port", sa.Integer(), primary_key=True, autoincrement=False),
+                sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"),
+                          nullable=True, index=True),
+                sa.Column("leased_at", sa.DateTime(timezone=True), nullable=True),
+            )
+            op.create_index("ix_port_leases_free", "port_leases", ["port"],
+                            sqlite_where=sa.text("user_id IS NULL"))
+        except OperationalError:
+            # Table already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("DROP TABLE IF EXISTS port_leases"))
+    else:
+        op.drop_table("port_leases")
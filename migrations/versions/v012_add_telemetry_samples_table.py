@@ -0,0 +1,96 @@
+"""Add telemetry_samples table for telemetry history and rollups.
+
+Revision ID: v012_add_telemetry_samples_table
+Revises: v011_add_port_lease_table
+Create Date: 2026-10-17
+
+Migration path rationale
+------------------------
+``CodeHost.update_telemetry`` overwrites the host's latest values, so trends
+were lost. This revision creates ``telemetry_samples``: raw reports
+(``resolution`` 0) and 1-minute, 15-minute and 1-hour rollups of them, all in
+one table keyed by username and time (``cspawn.telem_history``). The
+composite index on ``(resolution, username, ts)`` serves both the per-host
+series queries and the rollup and retention scans, which filter on
+resolution and time.
+
+The migration is idempotent:
+- PostgreSQL: ``CREATE TABLE IF NOT EXISTS`` / ``CREATE INDEX IF NOT EXISTS``
+  via ``bind.execute``.
+- SQLite/other (tests): ``op.create_table(...)`` inside a ``try/except`` that
+  silences the "table already exists" OperationalError.
+
+``downgrade()`` drops the table: PostgreSQL uses ``DROP TABLE IF EXISTS``;
+SQLite uses ``op.drop_table``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v012_add_telemetry_samples_table"
+down_revision = "v011_add_port_lease_table"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            CREATE TABLE IF NOT EXISTS telemetry_samples (
+                id SERIAL NOT NULL,
+                resolution INTEGER NOT NULL DEFAULT 0,
+                username VARCHAR NOT NULL,
+                class_id INTEGER,
+                ts TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                n INTEGER NOT NULL DEFAULT 1,
+                memory_avg BIGINT,
+                memory_max BIGINT,
+                activity_avg FLOAT,
+                activity_max FLOAT,
+                last_edit TIMESTAMP WITHOUT TIME ZONE,
+                PRIMARY KEY (id)
+            )
+        """))
+        bind.execute(sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_telemetry_samples_series "
+            "ON telemetry_samples (resolution, username, ts)"
+        ))
+    else:
+        # SQLite / other: use Alembic create_table; silently skip if already exists.
+        try:
+            op.create_table(
+                "telemetry_samples",
+                sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+                sa.Column("resolution", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("username", sa.String(), nullable=False),
+                sa.Column("class_id", sa.Integer(), nullable=True),
+                sa.Column("ts", sa.DateTime(), nullable=False),
+                sa.Column("n", sa.Integer(), nullable=False, server_default="1"),
+                sa.Column("memory_avg", sa.BigInteger(), nullable=True),
+                sa.Column("memory_max", sa.BigInteger(), nullable=True),
+                sa.Column("activity_avg", sa.Float(), nullable=True),
+                sa.Column("activity_max", sa.Float(), nullable=True),
+                sa.Column("last_edit", sa.DateTime(), nullable=True),
+            )
+            op.create_index("ix_telemetry_samples_series", "telemetry_samples",
+                            ["resolution", "username", "ts"])
+        except OperationalError:
+            # Table already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("DROP TABLE IF EXISTS telemetry_samples"))
+    else:
+        op.drop_table("telemetry_samples")
@@ -0,0 +1,46 @@
+"""Add indexes on code_host for the idle/MIA/purgeable predicates.
+
+Revision ID: v013_add_code_host_indexes
+Revises: v012_add_telemetry_samples_table
+Create Date: 2026-10-18
+
+Migration path rationale
+------------------------
+``CodeHost.is_quiescent``, ``is_mia`` and ``is_purgeable`` now have SQL
+expressions, so ``host purge``, ``host reap``, ``unsettled_hosts``,
+``gather_cluster_state`` and the telemetry table filter in the database
+instead of loading every row. This revision indexes the columns those
+predicates and the lookups by user, class and service name compare:
+``last_heartbeat``, ``last_utilization``, ``state``, ``app_state``,
+``class_id``, ``user_id`` and ``service_name``. The names match the
+``index=True`` columns on the model (``ix_code_host_<column>``).
+
+The migration is idempotent: ``CREATE INDEX IF NOT EXISTS`` and ``DROP INDEX
+IF EXISTS`` work the same on PostgreSQL and SQLite (tests). code_host has one
+row per running host, so a plain (locking) ``CREATE INDEX`` is brief.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v013_add_code_host_indexes"
+down_revision = "v012_add_telemetry_samples_table"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("last_heartbeat", "last_utilization", "state", "app_state", "class_id", "user_id", "service_name")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for column in COLUMNS:
+        bind.execute(sa.text(f"CREATE INDEX IF NOT EXISTS ix_code_host_{column} ON code_host ({column})"))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for column in COLUMNS:
+        bind.execute(sa.text(f"DROP INDEX IF EXISTS ix_code_host_{column}"))
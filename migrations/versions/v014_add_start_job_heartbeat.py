@@ -0,0 +1,65 @@
+"""Add start_jobs.heartbeat_at so dead start workers are noticed quickly.
+
+Revision ID: v014_add_start_job_heartbeat
+Revises: v013_add_code_host_indexes
+Create Date: 2026-10-18
+
+Migration path rationale
+------------------------
+A 'running' start job used to be recovered only when a start worker booted
+and found it older than 15 minutes. A worker restarted by supervisord within
+that window left its jobs 'running' for good, and the student's page polled
+them forever. The worker now refreshes ``start_jobs.heartbeat_at`` for each
+job it runs, and every worker periodically requeues running jobs whose
+heartbeat has gone stale (see ``cspawn.cs_docker.startjobs``).
+
+No backfill: a running job with no heartbeat is judged by ``started_at``.
+
+The migration is idempotent:
+- PostgreSQL: ``ALTER TABLE ... ADD COLUMN IF NOT EXISTS`` via ``bind.execute``.
+- SQLite/other (tests): ``op.add_column(...)`` inside a ``try/except`` that
+  silences the "duplicate column" OperationalError.
+
+``downgrade()`` drops the column: PostgreSQL uses ``DROP COLUMN IF EXISTS``;
+SQLite uses ``op.drop_column``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+# ---------------------------------------------------------------------------
+# Alembic revision identifiers
+# ---------------------------------------------------------------------------
+revision = "v014_add_start_job_heartbeat"
+down_revision = "v013_add_code_host_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("""
+            ALTER TABLE start_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE
+        """))
+    else:
+        # SQLite / other: use Alembic add_column; silently skip if the column
+        # already exists.
+        try:
+            op.add_column("start_jobs", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+        except OperationalError:
+            # Column already exists — migration is idempotent.
+            pass
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        bind.execute(sa.text("ALTER TABLE start_jobs DROP COLUMN IF EXISTS heartbeat_at"))
+    else:
+        op.drop_column("start_jobs", "heartbeat_at")
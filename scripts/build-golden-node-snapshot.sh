@@ -12,6 +12,9 @@
 #     `make release` of docker-codeserver-python needs NO snapshot rebuild.
 #     This snapshot only needs rebuilding on a docker MAJOR upgrade — which is
 #     rare, deliberate, and loudly caught by _verify_node_provisioning.
+#   - `cspawnctl node snapshot build` runs the same provision/clean steps
+#     (config/golden/*.sh) and ALSO bakes every class image plus a digest
+#     manifest; prefer it when the spawner config is available.
 #
 # WHAT STILL RUNS AT BOOT (kept in the slimmed cloud-init, per node):
 #   - UFW swarm-dataplane rules (they detect the per-node VPC iface at boot),
@@ -87,75 +90,11 @@ log "SSH up."
 
 # --- 2. provision (docker + prereqs), mirroring the hardened cloud-init ------
 log "Provisioning builder (docker ${DOCKER_VERSION}, held; ufw/jq/do-agent; helper files)..."
-ssh_node "$BUILDER_IP" "DOCKER_VERSION='${DOCKER_VERSION}' bash -s" <<'PROVISION'
-set -euo pipefail
-export DEBIAN_FRONTEND=noninteractive
-
-# Keep unattended-upgrades from racing the dpkg lock during the build.
-systemctl stop unattended-upgrades.service apt-daily.service apt-daily.timer apt-daily-upgrade.service apt-daily-upgrade.timer 2>/dev/null || true
-systemctl mask unattended-upgrades.service apt-daily.service apt-daily.timer apt-daily-upgrade.service apt-daily-upgrade.timer 2>/dev/null || true
-
-apt-get update -qq
-apt-get install -y -o DPkg::Lock::Timeout=600 ufw jq ca-certificates curl gnupg
-
-# Docker's official apt repo.
-. /etc/os-release
-install -m 0755 -d /etc/apt/keyrings
-curl -fsSL https://download.docker.com/linux/ubuntu/gpg -o /etc/apt/keyrings/docker.asc
-chmod a+r /etc/apt/keyrings/docker.asc
-echo "deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.asc] https://download.docker.com/linux/ubuntu ${VERSION_CODENAME} stable" > /etc/apt/sources.list.d/docker.list
-apt-get update -qq
-
-DOCKER_PIN="5:${DOCKER_VERSION}-1~ubuntu.${VERSION_ID}~${VERSION_CODENAME}"
-EXPECTED_MAJOR="${DOCKER_VERSION%%.*}"
-for attempt in 1 2 3; do
-  apt-get install -y --allow-downgrades --allow-change-held-packages -o DPkg::Lock::Timeout=600 \
-    "docker-ce=${DOCKER_PIN}" "docker-ce-cli=${DOCKER_PIN}" containerd.io docker-buildx-plugin docker-compose-plugin && break
-  echo "docker-ce install attempt ${attempt} failed; retrying" >&2; sleep $((attempt * 10))
-done
-apt-mark hold docker-ce docker-ce-cli
-systemctl enable docker
-
-# Fail loud if the pin didn't take.
-ACTUAL="$(docker --version 2>/dev/null || true)"
-ACTUAL_MAJOR="$(echo "$ACTUAL" | grep -oE '[0-9]+' | head -n1)"
-if [ "$ACTUAL_MAJOR" != "$EXPECTED_MAJOR" ]; then
-  echo "GOLDEN_BUILD_DOCKER_PIN_FAILED: expected major ${EXPECTED_MAJOR} (pin ${DOCKER_PIN}), got '${ACTUAL}'" >&2
-  exit 1
-fi
-echo "docker installed + held: ${ACTUAL}"
-
-# DigitalOcean metrics agent.
-curl -sSL https://repos.insights.digitalocean.com/install.sh | bash || echo "WARN: do-agent install failed (non-fatal)"
-
-# Bake the swarm-node helper files (rules themselves run at boot, per-node).
-mkdir -p /etc/ssh/sshd_config.d /usr/local/sbin
-printf '# Raised from default 10:30:100 to tolerate SSH bursts under load.\nMaxStartups 30:60:100\n' > /etc/ssh/sshd_config.d/99-swarm.conf
-chmod 0644 /etc/ssh/sshd_config.d/99-swarm.conf
-
-# Re-enable normal patching (docker-ce is protected by the hold above).
-systemctl unmask unattended-upgrades.service apt-daily.service apt-daily.timer apt-daily-upgrade.service apt-daily-upgrade.timer 2>/dev/null || true
-systemctl enable unattended-upgrades.service apt-daily.timer apt-daily-upgrade.timer 2>/dev/null || true
-
-apt-get clean
-echo "PROVISION_OK"
-PROVISION
+ssh_node "$BUILDER_IP" "DOCKER_VERSION='${DOCKER_VERSION}' bash -s" < config/golden/provision-node.sh
 
 # --- 3. clean identity so clones don't collide ------------------------------
 log "Cleaning identity (machine-id, ssh host keys, cloud-init state, logs)..."
-ssh_node "$BUILDER_IP" "bash -s" <<'CLEAN'
-set -uo pipefail
-cloud-init clean --logs --seed 2>/dev/null || true
-truncate -s 0 /etc/machine-id 2>/dev/null || true
-rm -f /var/lib/dbus/machine-id 2>/dev/null || true
-rm -f /etc/ssh/ssh_host_* 2>/dev/null || true
-rm -rf /var/lib/cloud/instances/* /var/lib/cloud/instance 2>/dev/null || true
-rm -f /root/.bash_history 2>/dev/null || true
-find /var/log -type f -exec truncate -s 0 {} \; 2>/dev/null || true
-rm -f /root/.ssh/authorized_keys 2>/dev/null || true   # DO re-injects the create-time key on clone
-sync
-echo "CLEAN_OK"
-CLEAN
+ssh_node "$BUILDER_IP" "bash -s" < config/golden/clean-node.sh
 
 # --- 4. power off, snapshot, report -----------------------------------------
 log "Powering off builder for a clean snapshot..."
@@ -6,6 +6,8 @@ Covers:
 - POST /admin/nodes/start invalid tier: no NodeOp, no Popen, flash error, redirect.
 - POST /admin/nodes/remove worker node: NodeOp created, Popen called, redirect.
 - POST /admin/nodes/remove manager/leader node: refused, no NodeOp, no Popen.
+- POST /admin/nodes/remove unknown node, or one promoted since the cached
+  view was built: refused.
 - GET /admin/nodes/op/<id>/status: JSON response with correct fields and log_tail.
 - GET /admin/nodes/op/<id>/status unknown id: 404.
 - GET /admin/nodes/op/<id>/log: plain-text response; 404 for unknown id.
@@ -358,6 +360,38 @@ class TestNodesRemove:
             count = NodeOp.query.filter_by(target_fqdn="leader1.example.com").count()
             assert count == 0
 
+    def test_unknown_node_is_refused(self, flask_app, client, admin_user):
+        _login(client, flask_app, admin_user)
+        worker = _mock_node("worker2.example.com", role="worker")
+
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc, \
+             patch("cspawn.admin.routes.subprocess.Popen") as mock_popen:
+            mock_dc.return_value = _mock_docker_with_nodes([worker])
+            resp = client.post("/admin/nodes/remove", data={"fqdn": "ghost9.example.com"})
+
+        assert resp.status_code == 302
+        mock_popen.assert_not_called()
+        with flask_app.app_context():
+            assert NodeOp.query.filter_by(target_fqdn="ghost9.example.com").count() == 0
+
+    def test_promotion_since_cached_view_is_seen(self, flask_app, client, admin_user):
+        """The guard rebuilds the view: a cached 'worker' promoted since is refused."""
+        from cspawn.cs_docker.clusterview import cluster_view_cache
+
+        _login(client, flask_app, admin_user)
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc:
+            mock_dc.return_value = _mock_docker_with_nodes([_mock_node("swarm4.example.com")])
+            cluster_view_cache(flask_app).get()
+
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc, \
+             patch("cspawn.admin.routes.subprocess.Popen") as mock_popen:
+            mock_dc.return_value = _mock_docker_with_nodes([_mock_node("swarm4.example.com", role="manager")])
+            client.post("/admin/nodes/remove", data={"fqdn": "swarm4.example.com"})
+
+        mock_popen.assert_not_called()
+        with flask_app.app_context():
+            assert NodeOp.query.filter_by(target_fqdn="swarm4.example.com").count() == 0
+
     def test_empty_fqdn_is_refused(self, flask_app, client, admin_user):
         _login(client, flask_app, admin_user)
 
@@ -412,6 +446,64 @@ class TestNodesRebalance:
         assert "/admin/nodes" in resp.headers["Location"]
 
 
+# ---------------------------------------------------------------------------
+# Cluster view cache: GET /admin/nodes reuse, POST /admin/cluster/refresh
+# ---------------------------------------------------------------------------
+
+class TestClusterViewCache:
+    def test_second_page_load_reuses_view(self, flask_app, client, admin_user):
+        _login(client, flask_app, admin_user)
+        worker = _mock_node("worker1.example.com")
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc, \
+             patch("cspawn.cli.node.count_hosts_per_node", return_value={"worker1": 1}), \
+             patch("cspawn.admin.routes.render_template", return_value="ok"):
+            mock_dc.return_value = _mock_docker_with_nodes([worker])
+            client.get("/admin/nodes")
+            client.get("/admin/nodes")
+        assert mock_dc.call_count == 1
+
+    def test_refresh_syncs_and_rebuilds(self, flask_app, client, admin_user):
+        _login(client, flask_app, admin_user)
+        flask_app.csm = MagicMock()
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc, \
+             patch("cspawn.cli.node.count_hosts_per_node", return_value={}), \
+             patch("cspawn.admin.routes.render_template", return_value="ok"):
+            mock_dc.return_value = _mock_docker_with_nodes([])
+            client.get("/admin/nodes")
+            resp = client.post("/admin/cluster/refresh", data={"next": "/admin/nodes"})
+            client.get("/admin/nodes")
+
+        assert resp.status_code == 302
+        assert resp.headers["Location"].endswith("/admin/nodes")
+        flask_app.csm.sync.assert_called_once_with(check_ready=True)
+        assert mock_dc.call_count == 2
+
+    @pytest.mark.parametrize("target", [
+        "https://evil.example.com/admin/nodes",
+        "//evil.example.com/admin/nodes",
+        "/\\evil.example.com",
+        "javascript:alert(1)",
+        "admin/nodes",
+    ])
+    def test_refresh_ignores_off_site_next(self, flask_app, client, admin_user, target):
+        _login(client, flask_app, admin_user)
+        flask_app.csm = MagicMock()
+        with patch("cspawn.admin.routes.docker.DockerClient") as mock_dc, \
+             patch("cspawn.cli.node.count_hosts_per_node", return_value={}):
+            mock_dc.return_value = _mock_docker_with_nodes([])
+            resp = client.post("/admin/cluster/refresh", data={"next": target})
+
+        assert resp.status_code == 302
+        assert "evil" not in resp.headers["Location"]
+        assert resp.headers["Location"].endswith("/admin/")
+
+    def test_refresh_redirects_non_admin(self, flask_app, client, plain_user):
+        _login(client, flask_app, plain_user)
+        resp = client.post("/admin/cluster/refresh")
+        assert resp.status_code == 302
+        assert "/admin/" not in resp.headers["Location"]
+
+
 # ---------------------------------------------------------------------------
 # GET /admin/nodes/op/<op_id>/status
 # ---------------------------------------------------------------------------
@@ -1172,7 +1172,10 @@ class TestApplyPlanScaleUpVerification:
             patch("cspawn.cli.node._expected_docker_version", return_value=None),
             patch(
                 "cspawn.cli.node._verify_node_provisioning",
-                side_effect=[["SSH reachability: 0/3 consecutive connects succeeded"], []],
+                # Keyed by ip: the two nodes are provisioned concurrently.
+                side_effect=lambda ip, *a, **k: (
+                    ["SSH reachability: 0/3 consecutive connects succeeded"] if ip == "10.0.0.10" else []
+                ),
             ) as mock_verify,
             patch(
                 "cspawn.cli.node._find_swarm_node", return_value=failed_node_obj
@@ -1828,6 +1831,134 @@ class TestApplyPlanDockerStalenessWarning:
         assert not any("golden snapshot" in rec.message.lower() for rec in caplog.records)
 
 
+# ---------------------------------------------------------------------------
+# apply_plan() — concurrent scale-up pipelines
+# ---------------------------------------------------------------------------
+
+class TestApplyPlanParallelScaleUp:
+    """Scale-up nodes run their pipelines concurrently (bounded by
+    ``AUTOSCALE_PARALLEL_ADDS``), with serials reserved up front and
+    per-stage timings recorded in ``ApplyResult.stage_timings``."""
+
+    @staticmethod
+    def _base_cfg():
+        return {
+            "NODE_TIERS": NODE_TIERS_JSON,
+            "DEFAULT_CAPACITY": "6",
+            "DO_TOKEN": "tok",
+            "DO_NAMES": "swarm{serial}.example.com",
+            "DOCKER_URI": "ssh://fake",
+        }
+
+    @staticmethod
+    def _manager_client(*hostnames):
+        client = MagicMock()
+        client.nodes.list.return_value = [
+            MagicMock(attrs={"Description": {"Hostname": h}}) for h in hostnames
+        ]
+        return client
+
+    @staticmethod
+    def _droplet(ctx, *, desired_serial, **kw):
+        return (MagicMock(), f"10.0.0.{desired_serial}",
+                f"swarm{desired_serial}.example.com", f"swarm{desired_serial}")
+
+    def _patches(self, **overrides):
+        import contextlib
+
+        targets = {
+            "_create_droplet": dict(side_effect=self._droplet),
+            "_configure_node": {},
+            "_join_swarm": {},
+            "_ensure_priv_key": dict(return_value=(Path("/fake/id_rsa"), Path("/fake/id_rsa.pub"))),
+            "_expected_docker_version": dict(return_value=None),
+            "_verify_node_provisioning": dict(return_value=[]),
+            "_find_swarm_node": dict(return_value=MagicMock()),
+            "_drain_swarm_node": {},
+            "_check_docker_staleness": {},
+            "_prepull_images": dict(return_value={}),
+            "_activate_swarm_node": dict(return_value=True),
+        }
+        targets.update(overrides)
+        stack = contextlib.ExitStack()
+        mocks = {name: stack.enter_context(patch(f"cspawn.cli.node.{name}", **kw))
+                 for name, kw in targets.items()}
+        stack.enter_context(patch("digitalocean.Manager"))
+        return stack, mocks
+
+    def test_nodes_provision_concurrently_with_distinct_serials(self):
+        """Both pipelines must be inside ``_configure_node`` at once for the
+        barrier to release; serially, the first would time out."""
+        import threading
+
+        plan = ScalePlan(add_large=1, add_small=1, remove_nodes=[], reason="test")
+        barrier = threading.Barrier(2, timeout=5)
+        stack, mocks = self._patches(_configure_node=dict(side_effect=lambda *a, **k: barrier.wait()))
+        with stack:
+            result = apply_plan(
+                MagicMock(), plan, self._base_cfg(), dry_run=False,
+                manager_client=self._manager_client("swarm3.example.com", "manager"),
+            )
+
+        assert result.added == 2
+        assert result.errors == []
+        serials = sorted(c.kwargs["desired_serial"] for c in mocks["_create_droplet"].call_args_list)
+        assert serials == [4, 5]
+        assert set(result.stage_timings) == {"swarm4.example.com", "swarm5.example.com"}
+        for timings in result.stage_timings.values():
+            assert list(timings) == ["create", "configure", "join", "verify", "prepull", "activate"]
+        assert "scale_up_s=" in result.summary()
+        assert len(result.timings_summary()) == 2
+
+    def test_verification_failure_stops_at_verify_stage(self):
+        plan = ScalePlan(add_large=1, add_small=1, remove_nodes=[], reason="test")
+        stack, _ = self._patches(_verify_node_provisioning=dict(
+            side_effect=lambda ip, *a, **k: ["cloud-init status: not done"] if ip == "10.0.0.1" else []
+        ))
+        with stack:
+            result = apply_plan(
+                MagicMock(), plan, self._base_cfg(), dry_run=False,
+                manager_client=self._manager_client(),
+            )
+
+        assert result.added == 1
+        assert len(result.errors) == 1 and "swarm1.example.com" in result.errors[0]
+        assert list(result.stage_timings["swarm1.example.com"]) == ["create", "configure", "join", "verify"]
+
+    def test_systemic_failure_skips_pipelines_not_yet_started(self):
+        """With one worker, a ClickException in the first pipeline means the
+        second never starts -- the old loop's ``break``."""
+        import click
+
+        plan = ScalePlan(add_large=1, add_small=1, remove_nodes=[], reason="test")
+        cfg = {**self._base_cfg(), "AUTOSCALE_PARALLEL_ADDS": "1"}
+        stack, mocks = self._patches(_create_droplet=dict(side_effect=click.ClickException("bad token")))
+        with stack:
+            result = apply_plan(
+                MagicMock(), plan, cfg, dry_run=False,
+                manager_client=self._manager_client(),
+            )
+
+        assert result.added == 0
+        assert result.errors == ["scale-up error for tier=large: bad token"]
+        assert mocks["_create_droplet"].call_count == 1
+        assert list(result.stage_timings) == ["swarm1.example.com"]
+
+    def test_consolidation_keeps_idle_nodes_when_replacement_fails(self):
+        plan = ScalePlan(add_large=1, add_small=0, remove_nodes=["swarm3.example.com", "swarm4.example.com"],
+                         purge_first=True, reason="test", add_tiers={"large": 1}, consolidate=True)
+        stack, _ = self._patches(_verify_node_provisioning=dict(return_value=["docker: missing"]))
+        with stack, patch("cspawn.cli.node.graceful_remove_node") as remove:
+            result = apply_plan(
+                MagicMock(), plan, self._base_cfg(), dry_run=False,
+                manager_client=self._manager_client(),
+            )
+
+        remove.assert_not_called()
+        assert result.added == 0 and result.removed == 0
+        assert result.errors[-1] == "consolidation skipped: replacement node was not added"
+
+
 # ---------------------------------------------------------------------------
 # run_autoscale — kill-switch and dry-run enforcement
 # ---------------------------------------------------------------------------
@@ -2094,7 +2225,8 @@ class TestApplyReaperZones:
         """Return (app, db, mock_csm) with app.csm mocked to avoid Docker calls.
 
         ``apply_reaper_zones`` now delegates the push/stop/delete sequence to
-        a single ``app.csm.stop_host(ch)`` call (ticket 007-002). By default,
+        ``app.csm.stop_hosts(hosts)``, the bulk form of ``stop_host(ch)``;
+        the mock's ``stop_hosts`` calls ``stop_host`` once per host. By default,
         ``mock_csm.stop_host`` performs the same caller-visible effect the
         real ``CodeServerManager.stop_host()`` has for these tests' purposes
         — deleting the ``CodeHost`` row and committing — and returns a
@@ -2113,6 +2245,7 @@ class TestApplyReaperZones:
             return StopResult(service_name=ch.service_name, pushed=push, stopped=True, deleted=True)
 
         mock_csm.stop_host.side_effect = stop_host_side_effect or _default_stop_host
+        mock_csm.stop_hosts.side_effect = lambda hosts, **kw: [mock_csm.stop_host(ch, **kw) for ch in hosts]
         app.csm = mock_csm
         return app, db, mock_csm
 
@@ -2637,6 +2770,7 @@ class TestApplyReaperZones:
             )
 
         mock_csm.stop_host.side_effect = _stop_host_side_effect
+        mock_csm.stop_hosts.side_effect = lambda hosts, **kw: [mock_csm.stop_host(ch, **kw) for ch in hosts]
         app.csm = mock_csm
 
         now = datetime(2026, 6, 25, 18, 0, 0, tzinfo=timezone.utc)
@@ -2680,6 +2814,7 @@ class TestApplyReaperZones:
             )
 
         mock_csm.stop_host.side_effect = _stop_host_side_effect
+        mock_csm.stop_hosts.side_effect = lambda hosts, **kw: [mock_csm.stop_host(ch, **kw) for ch in hosts]
         app.csm = mock_csm
 
         now = datetime(2026, 6, 25, 14, 0, 0, tzinfo=timezone.utc)
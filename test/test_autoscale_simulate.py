@@ -0,0 +1,128 @@
+"""
+Unit tests for the autoscale decision simulator:
+
+    cspawn/cs_docker/simulate.py::simulate / SimResult
+    cspawn/cs_docker/simulate.py::Trace / recorded_trace / synthetic_trace
+    cspawn/cli/node.py::autoscale_simulate (``node autoscale simulate``)
+
+Traces are built by hand on a fixed clock; the planner is the real one.
+
+Run with::
+
+    uv run pytest test/test_autoscale_simulate.py -v
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from cspawn.cli.node import autoscale_cmd
+from cspawn.cs_docker.simulate import Trace, TraceHost, recorded_trace, simulate, synthetic_trace
+
+T0 = datetime(2026, 10, 5, 16, 0, tzinfo=timezone.utc)
+CFG = {
+    "NODE_TIERS": json.dumps([
+        {"name": "small", "slug": "s-4vcpu-8gb-amd", "capacity": 6},
+        {"name": "large", "slug": "s-8vcpu-16gb-amd", "capacity": 14},
+    ]),
+    "AUTOSCALE_HEADROOM": "0",
+}
+
+
+def _burst(n: int, at_min: int = 10, stay_min: int = 60) -> list[TraceHost]:
+    arrive = T0 + timedelta(minutes=at_min)
+    return [TraceHost(i, 1, arrive, arrive + timedelta(minutes=stay_min)) for i in range(n)]
+
+
+class TestSimulate:
+    def test_burst_waits_for_provisioning_then_scales_back_down(self):
+        trace = Trace(start=T0, end=T0 + timedelta(hours=4), hosts=_burst(10),
+                      provision_s=[600], nodes={"small": 1})
+        result = simulate(trace, CFG)
+
+        assert len(result.waits_s) == 10 and result.unserved == 0
+        assert result.waited == 4  # six fit on the first node
+        # Waiting starts at minute 10; the cycle at 10 orders a node ready at 20.
+        assert max(result.waits_s) == 600
+        assert result.adds == 1 and result.removes == 1
+        assert result.flaps == 0
+        assert result.skipped_cycles == 4  # cycles at 12..18 found the lock held
+        assert result.node_hours["small"] == 4.0
+        assert "waited=4" in result.summary()
+
+    def test_headroom_trades_node_hours_for_waits(self):
+        trace = Trace(start=T0, end=T0 + timedelta(hours=4), hosts=_burst(10, at_min=30), nodes={"small": 1})
+        lean = simulate(trace, CFG)
+        roomy = simulate(trace, {**CFG, "AUTOSCALE_HEADROOM": "8"})
+
+        assert roomy.waited == 0 < lean.waited
+        assert sum(roomy.node_hours.values()) > sum(lean.node_hours.values())
+
+    def test_short_cooldown_flaps_on_recurring_bursts(self):
+        hosts = _burst(10, at_min=10, stay_min=20) + [
+            TraceHost(100 + h.user_id, 1, h.arrive + timedelta(minutes=70), h.depart + timedelta(minutes=70))
+            for h in _burst(10, at_min=10, stay_min=20)
+        ]
+        trace = Trace(start=T0, end=T0 + timedelta(hours=3), hosts=hosts, provision_s=[300], nodes={"small": 1})
+
+        eager = simulate(trace, {**CFG, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN": "5"})
+        patient = simulate(trace, {**CFG, "AUTOSCALE_SCALEDOWN_COOLDOWN_MIN": "90"})
+        assert eager.flaps >= 2 and eager.adds == 2
+        assert patient.flaps == 0 and patient.adds == 1
+
+    def test_host_leaving_before_capacity_is_unserved(self):
+        arrive = T0 + timedelta(minutes=11)
+        hosts = _burst(6) + [TraceHost(99, 1, arrive, arrive + timedelta(minutes=5))]
+        trace = Trace(start=T0, end=T0 + timedelta(hours=1), hosts=hosts, provision_s=[1800], nodes={"small": 1})
+        result = simulate(trace, CFG)
+        assert result.unserved >= 1
+
+
+class TestTraces:
+    def test_json_round_trip(self):
+        trace = Trace(start=T0, end=T0 + timedelta(hours=1), hosts=_burst(2),
+                      classes=[{"id": 1, "start_date": T0, "recurrence_rule": "FREQ=DAILY", "students": 3}],
+                      provision_s=[700.0], nodes={"large": 2})
+        assert Trace.from_json(trace.to_json()) == trace
+
+    def test_recorded_trace_merges_restarts_within_a_session(self):
+        arrivals = [
+            {"class_id": 1, "user_id": 7, "at": T0},
+            {"class_id": 1, "user_id": 7, "at": T0 + timedelta(minutes=30)},  # restart, same host
+            {"class_id": 1, "user_id": 7, "at": T0 + timedelta(days=1)},
+            {"class_id": 1, "user_id": 8, "at": T0 - timedelta(days=9)},      # before the window
+        ]
+        trace = recorded_trace([], arrivals, [], start=T0 - timedelta(days=1), end=T0 + timedelta(days=2),
+                               session_min=90)
+        assert [h.arrive for h in trace.hosts] == [T0, T0 + timedelta(days=1)]
+        assert trace.hosts[0].depart == T0 + timedelta(minutes=90)
+        assert trace.provision_s == [900.0]
+
+    def test_synthetic_trace_is_deterministic(self):
+        classes = [{"id": 1, "start_date": T0, "recurrence_rule": "FREQ=DAILY", "timezone": "UTC", "students": 20}]
+        a = synthetic_trace(classes, start=T0, end=T0 + timedelta(days=3), seed=4)
+        b = synthetic_trace(classes, start=T0, end=T0 + timedelta(days=3), seed=4)
+        assert a == b
+        assert 50 < len(a.hosts) < 80  # four sessions of 20 at an 85% show rate
+        assert all(h.depart > h.arrive for h in a.hosts)
+
+
+def test_cli_sweeps_knobs_over_a_trace_file(tmp_path):
+    trace = Trace(start=T0, end=T0 + timedelta(hours=4), hosts=_burst(10), nodes={"small": 1})
+    path = tmp_path / "trace.json"
+    path.write_text(trace.to_json())
+
+    with patch("cspawn.cli.node.get_config", return_value=CFG):
+        result = CliRunner().invoke(
+            autoscale_cmd,
+            ["simulate", "--trace", str(path), "--set", "AUTOSCALE_HEADROOM=0,8"],
+            obj={"v": 0, "deploy": "devel"},
+            catch_exceptions=False,
+        )
+
+    assert result.exit_code == 0, result.output
+    assert "10 host(s)" in result.output
+    assert "AUTOSCALE_HEADROOM=0" in result.output and "AUTOSCALE_HEADROOM=8" in result.output
@@ -55,6 +55,8 @@ def app_db():
     with app.app_context():
         db.create_all()
         app.csm = MagicMock()
+        # stop_hosts() is the bulk form of stop_host(); run it host by host.
+        app.csm.stop_hosts.side_effect = lambda hosts, **kw: [app.csm.stop_host(ch, **kw) for ch in hosts]
         app.db = db
         yield app
         db.session.remove()
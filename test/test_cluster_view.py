@@ -0,0 +1,158 @@
+"""
+Unit tests for the cached cluster view:
+
+    cspawn/cs_docker/clusterview.py::ClusterView.from_snapshot
+    cspawn/cs_docker/clusterview.py::ClusterViewCache (TTL, stale-while-revalidate,
+        shared DATA_DIR file, invalidation)
+    cspawn/cli/node.py::hosts (reads the view)
+
+Docker is mocked; the clock is injected.
+
+Run with::
+
+    uv run pytest test/test_cluster_view.py -v
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from click.testing import CliRunner
+
+from cspawn.cs_docker.clusterview import ClusterView, ClusterViewCache, invalidate_cluster_view
+from cspawn.cs_docker.snapshot import SwarmSnapshot
+
+
+def _node(node_id, hostname, *, role="worker", leader=False):
+    node = MagicMock()
+    node.id = node_id
+    node.attrs = {
+        "Spec": {"Role": role, "Availability": "active", "Labels": {"cs.tier": "small", "cs.capacity": "6"}},
+        "Description": {"Hostname": hostname},
+        "Status": {"Addr": "10.0.0.1", "State": "ready"},
+        "ManagerStatus": {"Leader": leader} if role == "manager" else None,
+    }
+    return node
+
+
+def _service(service_id, username):
+    svc = MagicMock()
+    svc.id = service_id
+    svc.name = username
+    svc.attrs = {"Spec": {"Name": username, "Labels": {"jtl.codeserver.username": username}}}
+    return svc
+
+
+def _task(service_id, node_id, state="running"):
+    return {"ID": f"t-{service_id}", "ServiceID": service_id, "NodeID": node_id,
+            "DesiredState": "running", "Status": {"State": state}}
+
+
+def _client():
+    client = MagicMock()
+    client.nodes.list.return_value = [_node("n1", "mgr.example.com", role="manager", leader=True),
+                                      _node("n2", "w1.example.com")]
+    client.services.list.return_value = [_service("s1", "alice"), _service("s2", "bob"),
+                                         _service("s3", "carol")]
+    client.api.tasks.return_value = [_task("s1", "n2"), _task("s2", "gone"), _task("s3", "n2", "pending")]
+    return client
+
+
+class _Clock:
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _cache(cfg=None, clock=None, **kw):
+    clients = []
+
+    def factory():
+        clients.append(_client())
+        return clients[-1]
+
+    cache = ClusterViewCache({"CLUSTER_VIEW_TTL_S": "30", "CLUSTER_VIEW_MAX_STALE_S": "300", **(cfg or {})},
+                             client_factory=factory, clock=clock or _Clock(), **kw)
+    return cache, clients
+
+
+class TestFromSnapshot:
+    def test_nodes_hosts_and_unplaced(self):
+        client = _client()
+        snap = SwarmSnapshot.build(client)
+        view = ClusterView.from_snapshot(snap, snap.running_hosts_per_node(), built_at=5.0)
+
+        mgr, w1 = view.nodes
+        assert (mgr.role, mgr.is_manager, mgr.is_leader) == ("leader", True, True)
+        assert (w1.short, w1.hosts, w1.host_count, w1.tier) == ("w1", ["alice"], 1, "small")
+        assert view.unplaced == ["bob"]
+        assert view.node("w1").hostname == "w1.example.com"
+        assert ClusterView.from_dict(view.to_dict()) == view
+
+
+class TestCache:
+    def test_fresh_view_is_reused(self):
+        clock = _Clock()
+        cache, clients = _cache(clock=clock)
+        first = cache.get()
+        clock.t += 29
+        assert cache.get() is first
+        assert len(clients) == 1
+        assert clients[0].close.called
+
+    def test_stale_view_is_served_while_rebuilt(self):
+        clock = _Clock()
+        cache, clients = _cache(clock=clock)
+        first = cache.get()
+        clock.t += 60
+        with patch.object(cache, "_refresh_async") as refresh_async:
+            assert cache.get() is first
+        refresh_async.assert_called_once()
+        assert len(clients) == 1
+
+    def test_too_old_or_zero_stale_rebuilds_now(self):
+        clock = _Clock()
+        cache, clients = _cache(clock=clock)
+        cache.get()
+        clock.t += 301
+        assert cache.get().built_at == clock.t
+
+        short, short_clients = _cache(clock=clock, max_stale_s=0)
+        short.get()
+        clock.t += 31
+        short.get()
+        assert len(short_clients) == 2
+
+    def test_data_dir_view_is_shared_and_invalidated(self, tmp_path):
+        clock = _Clock()
+        cfg = {"DATA_DIR": str(tmp_path)}
+        a, a_clients = _cache(cfg, clock=clock)
+        b, b_clients = _cache(cfg, clock=clock)
+
+        built = a.get()
+        assert b.get().built_at == built.built_at
+        assert not b_clients
+
+        clock.t += 1
+        invalidate_cluster_view(cfg, now=clock.t)
+        b.get()
+        assert len(b_clients) == 1
+        a.get()
+        assert len(a_clients) == 1
+
+
+def test_node_hosts_cli_reads_view(tmp_path):
+    from cspawn.cli.node import hosts
+
+    cfg = {"DOCKER_URI": "ssh://fake-manager", "DATA_DIR": str(tmp_path)}
+    with patch("cspawn.cli.node.get_config", return_value=cfg), \
+         patch("cspawn.cli.node.docker_client", return_value=_client()) as dc:
+        runner = CliRunner()
+        out = runner.invoke(hosts, ["--summary"], obj={})
+        again = runner.invoke(hosts, ["--summary"], obj={})
+
+    assert out.exit_code == 0, out.output
+    assert "w1           1" in out.output and "?            1" in out.output
+    assert "w1           1" in again.output
+    assert dc.call_count == 1
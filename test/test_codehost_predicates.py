@@ -0,0 +1,144 @@
+"""
+Unit tests for the SQL side of the CodeHost host predicates:
+
+    cspawn/models.py::CodeHost.is_quiescent / is_mia / is_purgeable (expressions)
+    cspawn/models.py::CodeHost.heart_beat_ago / modified_ago (expressions)
+    cspawn/cs_docker/csmanager.py::CodeServerManager.unsettled_hosts
+    cspawn/cs_docker/autoscale.py::gather_cluster_state (host rows, pending count)
+    migrations/versions/v013_add_code_host_indexes.py
+
+Every expression must select exactly the rows the Python property accepts,
+NULL timestamps and NULL app_state included. The DB is in-memory SQLite,
+following test/test_start_jobs.py.
+
+Run with::
+
+    uv run pytest test/test_codehost_predicates.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+import sqlalchemy as sa
+
+from cspawn.models import CodeHost
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None)
+
+# service_name: (minutes since heartbeat, minutes since edit, state, app_state)
+HOSTS = {
+    "busy": (1, 1, "running", "ready"),
+    "no-heartbeat": (None, None, "running", "ready"),
+    "hb-21": (21, 1, "running", "ready"),
+    "hb-20": (20, 1, "running", None),
+    "edit-16": (1, 16, "running", "starting"),
+    "edit-51": (1, 51, "running", "ready"),
+    "mia-app": (1, 1, "running", "mia"),
+    "mia-state": (1, 1, "mia", None),
+}
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-predicates-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+@pytest.fixture
+def seeded():
+    from cspawn.models import User
+
+    app, db = _make_flask_app()
+    with app.app_context():
+        for i, (name, (hb, edit, state, app_state)) in enumerate(HOSTS.items()):
+            user = User(user_id=f"uid-{i}", username=f"user{i}", is_active=True)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(CodeHost(
+                user_id=user.id, service_id=f"svc-{i}", service_name=name,
+                state=state, app_state=app_state, created_at=NOW - timedelta(minutes=5),
+                last_heartbeat=NOW - timedelta(minutes=hb) if hb is not None else None,
+                last_utilization=NOW - timedelta(minutes=edit) if edit is not None else None,
+            ))
+        db.session.commit()
+        yield app, db
+
+
+@pytest.mark.parametrize("attr", ["is_quiescent", "is_mia", "is_purgeable"])
+def test_expression_and_negation_match_python(seeded, attr):
+    expected = {h.service_name for h in CodeHost.query if getattr(h, attr)}
+    assert {h.service_name for h in CodeHost.query.filter(getattr(CodeHost, attr))} == expected
+    assert {h.service_name for h in CodeHost.query.filter(~getattr(CodeHost, attr))} == set(HOSTS) - expected
+
+
+def test_expected_rows(seeded):
+    def names(expr):
+        return {h.service_name for h in CodeHost.query.filter(expr)}
+
+    assert names(CodeHost.is_mia) == {"mia-app", "mia-state"}
+    assert names(CodeHost.is_quiescent) == {"hb-21", "edit-16", "edit-51"}
+    assert names(CodeHost.is_purgeable) == {"edit-51", "mia-app", "mia-state"}
+
+
+def test_minutes_ago_match_python(seeded):
+    _, db = seeded
+    in_sql = {name: (hb, mod) for name, hb, mod in db.session.query(
+        CodeHost.service_name, CodeHost.heart_beat_ago, CodeHost.modified_ago)}
+    assert in_sql == {h.service_name: (h.heart_beat_ago, h.modified_ago) for h in CodeHost.query}
+    assert in_sql["no-heartbeat"] == (5, 5)
+
+
+def test_unsettled_hosts_and_pending_count(seeded):
+    from cspawn.cs_docker.autoscale import gather_cluster_state
+    from cspawn.cs_docker.csmanager import CodeServerManager
+
+    app, _ = seeded
+    csm = CodeServerManager.__new__(CodeServerManager)
+    assert {h.service_name for h in csm.unsettled_hosts()} == {"hb-20", "edit-16"}
+
+    client = MagicMock()
+    client.nodes.list.return_value = []
+    client.services.list.return_value = []
+    client.api.tasks.return_value = []
+    _, _, pending, _, host_rows, _ = gather_cluster_state(app, client, {"DEFAULT_CAPACITY": "6"})
+    assert pending == 2
+    assert sum(1 for h in host_rows if h["is_purgeable"]) == 3
+
+
+def test_v013_migration_upgrade_idempotent_and_downgrade():
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    from migrations.versions.v013_add_code_host_indexes import COLUMNS, downgrade, upgrade
+
+    engine = sa.create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(sa.text(
+            "CREATE TABLE code_host (id INTEGER PRIMARY KEY, user_id INTEGER, service_name VARCHAR, "
+            "state VARCHAR, app_state VARCHAR, class_id INTEGER, last_heartbeat DATETIME, "
+            "last_utilization DATETIME)"))
+
+    def run(fn):
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                fn()
+
+    def indexes():
+        return {i["name"] for i in sa.inspect(engine).get_indexes("code_host")}
+
+    run(upgrade)
+    run(upgrade)
+    assert indexes() == {f"ix_code_host_{c}" for c in COLUMNS}
+    assert {i.name for i in CodeHost.__table__.indexes} == indexes()
+    run(downgrade)
+    assert indexes() == set()
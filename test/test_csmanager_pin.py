@@ -339,6 +339,40 @@ class TestNewCsInnerPin:
             mock_pin.assert_not_called()
             assert ch.node_name is None
 
+    def test_binpack_creates_the_service_already_pinned(self):
+        """With a placer, the chosen node's pin goes into the create call and
+        the post-create resolve/pin is skipped; a 409 keeps node_name unset."""
+        app, db = _make_flask_app()
+        with app.app_context():
+            user, proto = _make_user_and_proto(db)
+            csm = _make_manager(app, pin_hosts_to_node=True)
+            csm.placer = MagicMock()
+            csm.placer.pick.return_value = "swarm4.example.com"
+            fake_service = _make_fake_cs_service(user, service_id="svc-packed")
+            csm.run = MagicMock(return_value=fake_service)
+
+            gorg_patch, container_patch = _patch_creation_deps(
+                {"name": "svc", "image": "img", "constraints": ["node.role==worker"]}
+            )
+            with gorg_patch, container_patch, \
+                 patch("cspawn.cli.node._resolve_task_node_fqdn") as mock_resolve, \
+                 patch("cspawn.cli.node._pin_service_to_node") as mock_pin:
+                s, ch = csm._new_cs_inner(user, proto, None)
+
+                assert csm.run.call_args.kwargs["constraints"] == [
+                    "node.role==worker", "node.hostname==swarm4.example.com",
+                ]
+                mock_resolve.assert_not_called()
+                mock_pin.assert_not_called()
+                assert ch.node_name == "swarm4.example.com"
+
+                other, _ = _make_user_and_proto(db)
+                csm.run = MagicMock(side_effect=_make_conflict_error())
+                csm._get_by_username_raw = MagicMock(
+                    return_value=_make_fake_cs_service(other, service_id="svc-packed-409"))
+                _, ch = csm._new_cs_inner(other, proto, None)
+                assert ch.node_name is None
+
     def test_idempotent_retried_start_does_not_double_pin(self):
         """A retried 'Start' hitting the 409-recovery path twice in a row
         never triggers a pin call at all -- relies on the 409 branch itself
@@ -0,0 +1,232 @@
+"""
+Unit tests for the cluster-wide Docker API limiter:
+
+    cspawn/cs_docker/limiter.py::LocalLimiter
+    cspawn/cs_docker/limiter.py::AdvisoryLockLimiter
+    cspawn/cs_docker/limiter.py::limiter_for / limit_client / docker_client
+    cspawn/cs_docker/csmanager.py::CodeServerManager.new_cs (holds no lease across a start)
+
+The advisory-lock limiter runs against a fake engine that implements
+``pg_try_advisory_lock``/``pg_advisory_unlock`` per connection, standing in
+for PostgreSQL. Two limiter instances on the same fake server play the part
+of two processes.
+
+Run with::
+
+    uv run pytest test/test_docker_limiter.py -v
+"""
+from __future__ import annotations
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cspawn.cs_docker import limiter as limiter_mod
+from cspawn.cs_docker.limiter import (
+    AdvisoryLockLimiter,
+    DockerApiBusy,
+    LocalLimiter,
+    docker_client,
+    host_key,
+    limit_client,
+    limiter_for,
+    limiter_kind,
+)
+
+
+class _FakePg:
+    """Advisory locks keyed by (class, slot), owned by a connection."""
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def engine(self):
+        pg = self
+
+        class _Conn:
+            def execution_options(self, **kw):
+                return self
+
+            def execute(self, stmt, params):
+                key = (params["c"], params["s"])
+                with pg.lock:
+                    if "pg_try_advisory_lock" in str(stmt):
+                        if key in pg.locks and pg.locks[key] is not self:
+                            ok = False
+                        else:
+                            pg.locks[key] = self
+                            ok = True
+                    else:
+                        ok = pg.locks.get(key) is self
+                        if ok:
+                            del pg.locks[key]
+                return MagicMock(scalar=MagicMock(return_value=ok))
+
+            def close(self):
+                pass
+
+            def invalidate(self):
+                with pg.lock:
+                    for k in [k for k, v in pg.locks.items() if v is self]:
+                        del pg.locks[k]
+
+        eng = MagicMock()
+        eng.connect.side_effect = lambda: _Conn()
+        return eng
+
+
+class TestLocalLimiter:
+    def test_caps_concurrency_and_is_reentrant(self):
+        lim = LocalLimiter("mgr", slots=2, timeout_s=0.05)
+        with lim:
+            with lim:  # nested in the same thread: no second slot
+                assert lim.stats.in_use == 1
+        holders = [threading.Thread(target=lim.acquire) for _ in range(2)]
+        for t in holders:
+            t.start()
+            t.join()
+        with pytest.raises(DockerApiBusy):
+            lim.acquire()
+        assert lim.stats.timeouts == 1
+        assert lim.stats.acquired == 3
+
+    def test_release_without_acquire_raises(self):
+        with pytest.raises(ValueError):
+            LocalLimiter("mgr").release()
+
+
+class TestAdvisoryLockLimiter:
+    def test_slots_are_shared_between_processes(self):
+        pg = _FakePg()
+        a = AdvisoryLockLimiter("swarm1", pg.engine(), slots=2, timeout_s=0.05, poll_s=0.01)
+        b = AdvisoryLockLimiter("swarm1", pg.engine(), slots=2, timeout_s=0.05, poll_s=0.01)
+        a.acquire()
+        b.acquire()
+        assert len(pg.locks) == 2
+
+        # A third thread in "process" a finds every cluster slot taken.
+        errors = []
+
+        def third():
+            try:
+                a.acquire()
+            except DockerApiBusy as e:
+                errors.append(e)
+
+        t = threading.Thread(target=third)
+        t.start()
+        t.join()
+        assert len(errors) == 1 and a.stats.timeouts == 1
+
+        b.release()
+        assert len(pg.locks) == 1
+        a.release()
+        assert pg.locks == {}
+
+    def test_waiter_gets_freed_slot_and_wait_is_recorded(self):
+        pg = _FakePg()
+        a = AdvisoryLockLimiter("swarm1", pg.engine(), slots=1, timeout_s=2, poll_s=0.01)
+        b = AdvisoryLockLimiter("swarm1", pg.engine(), slots=1, timeout_s=2, poll_s=0.01)
+        held = threading.Event()
+
+        def hold():
+            with a:
+                held.set()
+                threading.Event().wait(0.1)
+
+        t = threading.Thread(target=hold)
+        t.start()
+        held.wait()
+        with b:
+            pass
+        t.join()
+        stats = b.stats.as_dict()
+        assert stats["acquired"] == 1 and stats["waited"] == 1
+        assert stats["wait_max_s"] >= 0.05
+
+    def test_different_hosts_do_not_share_slots(self):
+        pg = _FakePg()
+        a = AdvisoryLockLimiter("swarm1", pg.engine(), slots=1, timeout_s=0.05)
+        b = AdvisoryLockLimiter("swarm2", pg.engine(), slots=1, timeout_s=0.05)
+        with a, b:
+            assert len(pg.locks) == 2
+
+
+class TestRegistryAndClients:
+    def setup_method(self):
+        limiter_mod._limiters.clear()
+
+    def test_kind_and_key(self):
+        assert limiter_kind({"DATABASE_URI": "postgresql://db/cspawn"}) == "advisory"
+        assert limiter_kind({"DATABASE_URI": "sqlite:///x.db"}) == "local"
+        assert limiter_kind({"DOCKER_LIMITER": "local", "DATABASE_URI": "postgresql://db"}) == "local"
+        assert host_key("ssh://root@swarm1.example.com") == "swarm1.example.com"
+
+    def test_limiter_for_is_shared_per_host(self):
+        cfg = {"DOCKER_URI": "ssh://root@swarm1.example.com", "DOCKER_SSH_CONCURRENCY": "3"}
+        a = limiter_for(cfg)
+        assert a is limiter_for(cfg, "ssh://root@swarm1.example.com")
+        assert a is not limiter_for(cfg, "ssh://root@swarm2.example.com")
+        assert a.slots == 3
+
+    def test_limit_client_wraps_every_request(self):
+        lim = LocalLimiter("mgr", slots=1)
+        client = MagicMock()
+        seen = []
+        client.api.send.side_effect = lambda req, **kw: seen.append(lim.stats.in_use) or "resp"
+        limit_client(client, lim)
+
+        assert client.api.send("req", timeout=5) == "resp"
+        assert seen == [1]
+        assert lim.stats.in_use == 0 and lim.stats.acquired == 1
+
+    def test_docker_client_builds_under_a_lease(self):
+        cfg = {"DOCKER_URI": "ssh://root@swarm1.example.com"}
+        with patch("docker.DockerClient") as DC:
+            c = docker_client(cfg, timeout=10)
+        DC.assert_called_once_with(base_url="ssh://root@swarm1.example.com", use_ssh_client=True, timeout=10)
+        assert c is DC.return_value
+        assert limiter_for(cfg).stats.acquired == 1
+
+
+class TestStartsLeaveLeasesFree:
+    def test_other_process_gets_a_lease_while_start_workers_are_busy(self):
+        """new_cs holds no lease across a start: with every start-worker
+        thread mid-start (user dir, pin wait), another process still gets one."""
+        from cspawn.cs_docker.csmanager import CodeServerManager
+
+        pg = _FakePg()
+        worker = AdvisoryLockLimiter("swarm1", pg.engine(), slots=4, timeout_s=0.05, poll_s=0.01)
+        web = AdvisoryLockLimiter("swarm1", pg.engine(), slots=4, timeout_s=0.05, poll_s=0.01)
+
+        csm = CodeServerManager.__new__(CodeServerManager)
+        csm._docker_sem = worker
+        csm.app = MagicMock()
+        started = threading.Semaphore(0)
+        finish = threading.Event()
+
+        def slow_start(*args, **kwargs):
+            with worker:  # one Docker request, under its own lease
+                pass
+            started.release()
+            finish.wait(5)  # make_user_dir / pin wait: no Docker request
+            return None, None
+
+        csm._new_cs_inner = slow_start
+        with patch("cspawn.cs_docker.csmanager.get_or_fork"):
+            threads = [threading.Thread(target=csm.new_cs, args=(MagicMock(), MagicMock(), None))
+                       for _ in range(4)]
+            for t in threads:
+                t.start()
+            for _ in threads:
+                assert started.acquire(timeout=2)
+            try:
+                with web:
+                    assert web.stats.timeouts == 0
+            finally:
+                finish.set()
+                for t in threads:
+                    t.join()
+        assert pg.locks == {}
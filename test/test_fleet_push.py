@@ -0,0 +1,161 @@
+"""
+Unit tests for the fleet push:
+
+    cspawn/cs_github/fleetpush.py::resolve_targets
+    cspawn/cs_github/fleetpush.py::push_hosts (per-node masters, bounds, retries)
+    cspawn/cs_github/fleetpush.py::NodeMasters
+
+Docker is mocked with a SwarmSnapshot built from fake listings; `ssh` is
+mocked at `subprocess.run`.
+
+Run with::
+
+    uv run pytest test/test_fleet_push.py -v
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from unittest.mock import MagicMock, patch
+
+from cspawn.cs_docker.csmanager import CodeServerManager
+from cspawn.cs_docker.snapshot import SwarmSnapshot
+from cspawn.cs_github.fleetpush import push_hosts, resolve_targets
+from cspawn.models import CodeHost, User
+
+# service name: node id its task runs on
+PLACEMENT = {"alice": "n1", "bob": "n1", "carol": "n1", "dave": "n2", "erin": "gone"}
+
+
+def _node(node_id, hostname):
+    node = MagicMock()
+    node.id = node_id
+    node.attrs = {"Description": {"Hostname": hostname}}
+    return node
+
+
+def _service(name):
+    svc = MagicMock()
+    svc.id = f"svc-{name}"
+    svc.name = name
+    svc.attrs = {"Spec": {"Name": name, "TaskTemplate": {"ContainerSpec": {
+        "Env": [f"JTL_REPO=org/{name}-repo", "WORKSPACE_FOLDER=/w"]}}}}
+    return svc
+
+
+def _task(name, node_id):
+    return {"ID": f"t-{name}", "ServiceID": f"svc-{name}", "NodeID": node_id, "Slot": 1,
+            "DesiredState": "running",
+            "Status": {"State": "running", "ContainerStatus": {"ContainerID": f"c-{name}"}}}
+
+
+def _app(**config):
+    client = MagicMock()
+    client.nodes.list.return_value = [_node("n1", "swarm1"), _node("n2", "swarm2")]
+    client.services.list.return_value = [_service(n) for n in PLACEMENT]
+    client.api.tasks.return_value = [_task(n, node) for n, node in PLACEMENT.items()]
+
+    csm = CodeServerManager.__new__(CodeServerManager)
+    csm.client = client
+    csm.swarm_snapshot = lambda: SwarmSnapshot.build(client)
+
+    app = MagicMock()
+    app.csm = csm
+    app.logger = logging.getLogger("test.fleetpush")
+    app.app_config = {"GITHUB_TOKEN": "test-token", "NODE_HOSTNAME_TEMPLATE": "{nodename}.example.com",
+                      **config}
+    return app
+
+
+def _hosts(*names):
+    return [CodeHost(service_id=f"svc-{n}", service_name=n, user=User(username=n)) for n in names]
+
+
+class _FakeSSH:
+    """Stands in for `subprocess.run`: records masters, pushes and peak pushes per node."""
+
+    def __init__(self, *, fail=(), master_rc=0):
+        self.fail = set(fail)
+        self.master_rc = master_rc
+        self.masters, self.exits, self.pushes = [], [], []
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def __call__(self, argv, **kwargs):
+        dest = next(a for a in argv if a.startswith("root@"))
+        if argv[-1] == "true":
+            self.masters.append(dest)
+            return MagicMock(returncode=self.master_rc, stderr="")
+        if "-O" in argv:
+            self.exits.append(dest)
+            return MagicMock(returncode=0)
+
+        container = argv[argv.index("-i") + 1]
+        with self.lock:
+            self.pushes.append((dest, container, list(argv)))
+            self.active[dest] += 1
+            self.peak[dest] = max(self.peak[dest], self.active[dest])
+        time.sleep(0.02)
+        with self.lock:
+            self.active[dest] -= 1
+        if container in self.fail:
+            return MagicMock(returncode=1, stdout="", stderr="rejected")
+        return MagicMock(returncode=0, stdout="", stderr="")
+
+
+def _run(app, hosts, ssh, **kw):
+    with patch("shutil.which", return_value="/usr/bin/ssh"), patch("subprocess.run", side_effect=ssh):
+        return push_hosts(app, hosts, **kw)
+
+
+def test_resolve_targets_from_one_snapshot():
+    app = _app()
+    alice, erin, zed = resolve_targets(app, _hosts("alice", "erin", "zed"))
+
+    assert (alice.node_host, alice.container_id, alice.repo) == ("swarm1", "c-alice", "org/alice-repo")
+    assert alice.error is None and alice.username == "alice"
+    assert erin.error == "no running container"
+    assert zed.error == "no service in the Swarm"
+
+
+def test_one_master_per_node_and_per_node_bound():
+    app = _app()
+    ssh = _FakeSSH()
+    results = _run(app, _hosts("alice", "bob", "carol", "dave"), ssh, concurrency=8, per_node=2)
+
+    assert [r.service_name for r in results] == ["alice", "bob", "carol", "dave"]
+    assert all(r.ok and r.attempts == 1 for r in results)
+    assert sorted(ssh.masters) == ["root@swarm1.example.com", "root@swarm2.example.com"]
+    assert sorted(ssh.exits) == sorted(ssh.masters)
+    assert ssh.peak["root@swarm1.example.com"] == 2
+    for dest, _, argv in ssh.pushes:
+        assert argv.index("ControlMaster=auto") < argv.index(dest)
+        assert any(a.startswith("ControlPath=") for a in argv)
+
+
+def test_failures_are_isolated_and_retried_once():
+    app = _app()
+    ssh = _FakeSSH(fail={"c-bob"})
+    seen = []
+    results = _run(app, _hosts("alice", "bob", "erin"), ssh, on_result=seen.append)
+
+    alice, bob, erin = results
+    assert alice.ok
+    assert (bob.ok, bob.attempts) == (False, 2)
+    assert "rejected" in bob.error
+    assert (erin.ok, erin.attempts, erin.error) == (False, 0, "no running container")
+    assert sum(1 for _, c, _ in ssh.pushes if c == "c-bob") == 2
+    assert sorted(r.service_name for r in seen) == ["alice", "bob", "erin"]
+
+
+def test_master_failure_falls_back_to_plain_connections():
+    app = _app()
+    ssh = _FakeSSH(master_rc=255)
+    results = _run(app, _hosts("alice", "dave"), ssh)
+
+    assert all(r.ok for r in results)
+    assert len(ssh.masters) == 2
+    assert ssh.exits == []
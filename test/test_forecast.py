@@ -0,0 +1,190 @@
+"""
+Unit tests for schedule-driven demand forecasting:
+
+    cspawn/cs_docker/forecast.py::session_starts / learn_curve / forecast_demand
+    cspawn/cs_docker/forecast.py::DemandForecast.peak / build_forecast / backtest
+    cspawn/cs_docker/autoscale.py::estimate_demand (forecast term)
+    cspawn/cs_docker/autoscale.py::plan_scale_down (demand guard)
+    cspawn/cs_docker/autoscale.py::gather_demand_history
+
+Classes are plain dicts shaped like ``gather_demand_history`` output; the
+history test uses in-memory SQLite.
+
+Run with::
+
+    uv run pytest test/test_forecast.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from cspawn.cs_docker.autoscale import (
+    ClusterState,
+    NodeView,
+    estimate_demand,
+    gather_demand_history,
+    plan_scale_down,
+)
+from cspawn.cs_docker.forecast import (
+    DemandForecast,
+    backtest,
+    backtest_summary,
+    build_forecast,
+    forecast_demand,
+    learn_curve,
+    session_starts,
+)
+
+UTC = timezone.utc
+
+# Tuesdays 17:00 Los Angeles time, from the first Tuesday of September.
+TUESDAYS = {
+    "id": 1,
+    "start_date": datetime(2026, 9, 1, 17, 0, tzinfo=UTC) + timedelta(hours=7),  # 17:00 PDT
+    "end_date": None,
+    "recurrence_rule": "FREQ=WEEKLY;BYDAY=TU",
+    "timezone": "America/Los_Angeles",
+    "students": 20,
+}
+
+
+def _arrivals(session: datetime, offsets_min: list[int], class_id: int = 1) -> list[dict]:
+    return [
+        {"class_id": class_id, "user_id": i, "at": session + timedelta(minutes=m)}
+        for i, m in enumerate(offsets_min)
+    ]
+
+
+class TestSessionStarts:
+    def test_weekly_rule_keeps_wall_clock_across_dst(self):
+        starts = session_starts(
+            TUESDAYS,
+            after=datetime(2026, 10, 25, tzinfo=UTC),
+            before=datetime(2026, 11, 12, tzinfo=UTC),
+        )
+        # PDT until Nov 1, then PST: the same 17:00 local is an hour later in UTC.
+        assert starts == [
+            datetime(2026, 10, 28, 0, 0, tzinfo=UTC),
+            datetime(2026, 11, 4, 1, 0, tzinfo=UTC),
+            datetime(2026, 11, 11, 1, 0, tzinfo=UTC),
+        ]
+
+    def test_no_rule_bad_rule_or_ended_class(self):
+        window = {"after": datetime(2026, 9, 1, tzinfo=UTC), "before": datetime(2026, 10, 1, tzinfo=UTC)}
+        assert session_starts({**TUESDAYS, "recurrence_rule": None}, **window) == []
+        assert session_starts({**TUESDAYS, "recurrence_rule": "FREQ=SOMETIMES"}, **window) == []
+        ended = {**TUESDAYS, "end_date": datetime(2026, 9, 10, tzinfo=UTC)}
+        assert len(session_starts(ended, **window)) == 2
+
+
+class TestCurves:
+    def test_learned_curve_averages_sessions_and_skips_empty_ones(self):
+        s1 = datetime(2026, 9, 8, 0, 0, tzinfo=UTC)
+        s2 = s1 + timedelta(days=7)
+        s3 = s2 + timedelta(days=7)  # a holiday: nobody came
+        arrivals = _arrivals(s1, [-10, -2, 3, 3]) + _arrivals(s2, [-7, 1, 12, 40])
+        curve = learn_curve([s1, s2, s3], arrivals, roster=4, session_min=60)
+
+        assert curve.sessions == 2
+        assert curve.at(-31) == 0.0
+        assert curve.at(-10) == 0.25   # one of four in each session
+        assert curve.at(-3) == 0.375
+        assert curve.at(4) == 0.75
+        assert curve.at(59) == 1.0
+        assert learn_curve([s3], arrivals, roster=4, session_min=60).fractions[-1] == 0.0
+        assert learn_curve([], arrivals, roster=4, session_min=60) is None
+
+    def test_forecast_series_and_peak_within_lead(self):
+        session = datetime(2026, 10, 28, 0, 0, tzinfo=UTC)  # Tuesday 17:00 PDT
+        now = session - timedelta(minutes=60)
+        series = forecast_demand([TUESDAYS], {}, start=now, horizon_min=180,
+                                 session_min=90, default_fraction=0.8)
+        by_time = dict(series)
+        assert by_time[session - timedelta(minutes=5)] == 0
+        assert by_time[session] == 16  # flat default: ceil(20 * 0.8)
+        assert by_time[session + timedelta(minutes=95)] == 0  # session over
+
+        assert DemandForecast(series, lead=timedelta(minutes=15)).peak(now) == 0
+        assert DemandForecast(series, lead=timedelta(minutes=60)).peak(now) == 16
+
+    def test_build_forecast_uses_history_and_measured_lead(self):
+        now = datetime(2026, 10, 27, 23, 40, tzinfo=UTC)  # 20 minutes before a session
+        past = [datetime(2026, 10, 21, 0, 0, tzinfo=UTC), datetime(2026, 10, 14, 0, 0, tzinfo=UTC)]
+        arrivals = [a for s in past for a in _arrivals(s, [-5] * 10)]  # half the roster, early
+
+        fc = build_forecast([TUESDAYS], arrivals, [1500, 1200, 1300], {}, now)
+        assert fc.lead == timedelta(seconds=1300)
+        assert fc.peak(now) == 10
+        assert build_forecast([TUESDAYS], arrivals, [], {"AUTOSCALE_FORECAST_LEAD_MIN": "5"}, now).peak(now) == 0
+
+
+class TestAutoscaleSeam:
+    def test_estimate_demand_takes_forecast_peak(self):
+        now = datetime(2026, 10, 26, 23, 40, tzinfo=UTC)
+        fc = DemandForecast([(now + timedelta(minutes=10), 12)], lead=timedelta(minutes=15))
+        hosts = [{"app_state": "ready"}] * 3
+        assert estimate_demand([], hosts, {}, now=now) == 5
+        assert estimate_demand([], hosts, {}, forecast=fc, now=now) == 14
+
+    def test_scale_down_keeps_capacity_the_forecast_needs(self):
+        now = datetime(2026, 10, 26, 23, 40, tzinfo=UTC)
+        nodes = [
+            NodeView(f"swarm{i}", f"swarm{i}.x", None, 6, 0, False, False, i) for i in (2, 3, 4)
+        ]
+        state = ClusterState(nodes=nodes, pending_hosts=0)
+        empty = {n.fqdn: now - timedelta(hours=1) for n in nodes}
+        assert [n.fqdn for n in plan_scale_down(state, 2, {}, now, empty)] == ["swarm4.x"]
+        assert plan_scale_down(state, 14, {}, now, empty) == []
+
+
+def test_backtest_replays_sessions_against_earlier_history():
+    sessions = [datetime(2026, 9, 1, 0, 0, tzinfo=UTC) + timedelta(days=7 * w) for w in range(1, 5)]
+    arrivals = [a for s in sessions for a in _arrivals(s, [0] * 10)]
+    cls = {**TUESDAYS, "start_date": sessions[0], "timezone": "UTC"}
+
+    rows = backtest([cls], arrivals, {"AUTOSCALE_FORECAST_SESSION_MIN": "60"},
+                    start=sessions[0], end=sessions[-1] + timedelta(hours=2))
+    assert [r.learned_from for r in rows] == [0, 1, 2, 3]
+    assert [r.predicted for r in rows] == [16, 10, 10, 10]
+    assert all(r.actual == 10 for r in rows)
+    summary = backtest_summary(rows)
+    assert summary["mae"] == 1.5 and summary["baseline_mae"] == 6.0 and summary["under"] == 0
+
+
+def test_gather_demand_history_reads_hosts_jobs_and_expand_ops():
+    from flask import Flask
+
+    from cspawn.models import Class, ClassProto, CodeHost, NodeOp, StartJob, User
+    from cspawn.models import db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-forecast"
+    db.init_app(app)
+    now = datetime(2026, 10, 26, 12, 0, tzinfo=UTC)
+    with app.app_context():
+        db.create_all()
+        user = User(user_id="uid-1", username="u1")
+        proto = ClassProto(name="proto", image_uri="img:1")
+        db.session.add_all([user, proto])
+        db.session.flush()
+        scheduled = Class(name="Tue", start_date=TUESDAYS["start_date"], recurrence_rule="FREQ=WEEKLY;BYDAY=TU",
+                          class_code="TUE", proto_id=proto.id)
+        one_off = Class(name="Once", start_date=TUESDAYS["start_date"], class_code="ONCE", proto_id=proto.id)
+        scheduled.students.append(user)
+        db.session.add_all([scheduled, one_off])
+        db.session.flush()
+        db.session.add_all([
+            CodeHost(user_id=user.id, class_id=scheduled.id, service_id="s", service_name="u1",
+                     created_at=(now - timedelta(days=1)).replace(tzinfo=None)),
+            StartJob(user_id=user.id, class_id=scheduled.id, proto_id=proto.id, created_at=now - timedelta(days=8)),
+            StartJob(user_id=user.id, class_id=scheduled.id, proto_id=proto.id, created_at=now - timedelta(days=90)),
+            NodeOp(kind="expand", status="done", started_at=now - timedelta(minutes=20), finished_at=now),
+            NodeOp(kind="expand", status="failed", started_at=now - timedelta(minutes=50), finished_at=now),
+        ])
+        db.session.commit()
+
+    classes, arrivals, durations = gather_demand_history(app, {}, now)
+    assert [(c["recurrence_rule"], c["students"]) for c in classes] == [("FREQ=WEEKLY;BYDAY=TU", 1)]
+    assert sorted(a["at"] for a in arrivals) == [now - timedelta(days=8), now - timedelta(days=1)]
+    assert durations == [1200.0]
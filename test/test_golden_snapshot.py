@@ -0,0 +1,172 @@
+"""
+Unit tests for golden-snapshot node provisioning:
+
+    cspawn/cs_docker/golden.py::select_snapshot / GoldenManifest
+    cspawn/cli/node.py::_resolve_node_image / _read_golden_manifest
+    cspawn/cli/node.py::_verify_node_provisioning (manifest short-circuit)
+    cspawn/cs_docker/autoscale.py::apply_plan (boot image, cloud-init, pre-pull)
+
+Snapshots are plain namespaces with the attributes python-digitalocean's
+``Image`` has; SSH is patched at ``cspawn.cli.node._ssh_exec``.
+
+Run with::
+
+    uv run pytest test/test_golden_snapshot.py -v
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from cspawn.cli.node import _read_golden_manifest, _resolve_node_image, _verify_node_provisioning
+from cspawn.cs_docker.autoscale import ScalePlan, apply_plan
+from cspawn.cs_docker.golden import (
+    GoldenManifest,
+    golden_snapshots,
+    parse_snapshot_name,
+    select_snapshot,
+    snapshot_name,
+)
+
+
+def _snap(name, id=1, regions=("sfo3",)):
+    return SimpleNamespace(name=name, id=id, regions=list(regions))
+
+
+SNAPS = [
+    _snap("swarm-node-golden-docker29.6.1-20260701-120000", 1),
+    _snap("swarm-node-golden-docker29.7.2-20260901-120000", 2, regions=("nyc1",)),
+    _snap("swarm-node-golden-docker29.7.0-20260801-120000", 3),
+    _snap("swarm-node-golden-docker30.0.1-20261001-120000", 4),
+    _snap("hand-made-backup", 5),
+]
+
+
+class TestSelection:
+    def test_name_round_trip(self):
+        from datetime import datetime, timezone
+
+        name = snapshot_name("29.6.1", datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc))
+        assert name == "swarm-node-golden-docker29.6.1-20260701-120000"
+        assert parse_snapshot_name(name) == "29.6.1"
+        assert parse_snapshot_name("hand-made-backup") is None
+
+    def test_newest_with_matching_major_in_region(self):
+        assert [s.id for s in golden_snapshots(SNAPS)] == [4, 2, 3, 1]
+        assert select_snapshot(SNAPS, docker_version="29.6.1", region="sfo3").id == 3
+        assert select_snapshot(SNAPS, docker_version="30.0.0", region="sfo3").id == 4
+        assert select_snapshot(SNAPS, docker_version="28.1.0", region="sfo3") is None
+        assert select_snapshot(SNAPS, docker_version=None, region="sfo3") is None
+
+
+class TestManifest:
+    def test_round_trip_and_missing_images(self):
+        m = GoldenManifest("29.6.1", {"img:a": "img@sha256:aa"}, "swarm-node-golden-x", "2026-10-01")
+        back = GoldenManifest.from_json(m.to_json())
+        assert back == m
+        assert back.missing_images(["img:b", "img:a", "img:c"]) == ["img:b", "img:c"]
+        assert GoldenManifest.from_json("cat: no such file") is None
+        assert GoldenManifest.from_json(json.dumps({"images": {}})) is None
+
+    def test_read_from_node(self):
+        m = GoldenManifest("29.6.1", {"img:a": "img@sha256:aa"})
+        with patch("cspawn.cli.node._ssh_exec", return_value=(0, m.to_json(), "")):
+            assert _read_golden_manifest("10.0.0.5", Path("/fake/id_rsa")) == m
+        with patch("cspawn.cli.node._ssh_exec", return_value=(1, "", "No such file")):
+            assert _read_golden_manifest("10.0.0.5", Path("/fake/id_rsa")) is None
+        with patch("cspawn.cli.node._ssh_exec", side_effect=OSError("refused")):
+            assert _read_golden_manifest("10.0.0.5", Path("/fake/id_rsa")) is None
+
+    def test_verify_skips_docker_check_satisfied_by_manifest(self):
+        cmds = []
+
+        def ssh(ip, user, key, cmd, **kw):
+            cmds.append(cmd)
+            return 0, "status: done" if "cloud-init" in cmd else "", ""
+
+        with patch("cspawn.cli.node._ssh_exec", side_effect=ssh):
+            failures = _verify_node_provisioning(
+                "10.0.0.5", Path("/fake/id_rsa"), expected_docker_version="29.7.2",
+                retry_delay=0, manifest=GoldenManifest("29.6.1"),
+            )
+        assert failures == []
+        assert "docker --version" not in cmds
+
+        cmds.clear()
+        with patch("cspawn.cli.node._ssh_exec", side_effect=ssh):
+            failures = _verify_node_provisioning(
+                "10.0.0.5", Path("/fake/id_rsa"), expected_docker_version="30.0.1",
+                retry_delay=0, manifest=GoldenManifest("29.6.1"),
+            )
+        assert "docker --version" in cmds  # different major: the manifest proves nothing
+        assert len(failures) == 1 and "docker version mismatch" in failures[0]
+
+
+class TestResolveNodeImage:
+    def _mgr(self, snaps):
+        mgr = MagicMock()
+        mgr.get_droplet_snapshots.return_value = snaps
+        return mgr
+
+    def _client(self, version):
+        client = MagicMock()
+        client.version.return_value = {"Version": version}
+        return client
+
+    def test_picks_compatible_snapshot(self):
+        image, golden = _resolve_node_image(
+            {}, self._mgr(SNAPS), self._client("29.6.1"), do_image="235956540", do_region="sfo3",
+        )
+        assert (image, golden) == ("3", "swarm-node-golden-docker29.7.0-20260801-120000")
+
+    def test_falls_back_to_do_image(self):
+        fallbacks = [
+            ({"NODE_GOLDEN_SNAPSHOT": "false"}, self._mgr(SNAPS), self._client("29.6.1")),
+            ({}, self._mgr(SNAPS), self._client("27.0.0")),
+            ({}, MagicMock(get_droplet_snapshots=MagicMock(side_effect=RuntimeError("401"))),
+             self._client("29.6.1")),
+        ]
+        for cfg, mgr, client in fallbacks:
+            assert _resolve_node_image(cfg, mgr, client, do_image="docker-20-04",
+                                       do_region="sfo3") == ("docker-20-04", None)
+
+
+def test_apply_plan_boots_from_golden_and_pulls_only_missing_images():
+    cfg = {
+        "NODE_TIERS": json.dumps([{"name": "small", "slug": "s-4vcpu-8gb-amd", "capacity": 6}]),
+        "DO_TOKEN": "tok",
+        "DO_NAMES": "swarm{serial}.example.com",
+        "DOCKER_URI": "ssh://fake",
+        "NODE_PREPULL_IMAGES": "img:a img:b",
+    }
+    plan = ScalePlan(add_large=0, add_small=1, remove_nodes=[], reason="test")
+    manifest = GoldenManifest("29.6.1", {"img:a": "img@sha256:aa"})
+
+    with (
+        patch("cspawn.cli.node._resolve_node_image", return_value=("777", "swarm-node-golden-x")),
+        patch("cspawn.cli.node._read_golden_manifest", return_value=manifest),
+        patch(
+            "cspawn.cli.node._create_droplet",
+            return_value=(MagicMock(), "10.0.0.1", "swarm1.example.com", "swarm1"),
+        ) as mock_create,
+        patch("cspawn.cli.node._configure_node"),
+        patch("cspawn.cli.node._join_swarm"),
+        patch("cspawn.cli.node._ensure_priv_key", return_value=(Path("/fake/id_rsa"), None)),
+        patch("cspawn.cli.node._verify_node_provisioning", return_value=[]) as mock_verify,
+        patch("cspawn.cli.node._find_swarm_node"),
+        patch("cspawn.cli.node._drain_swarm_node"),
+        patch("cspawn.cli.node._check_docker_staleness"),
+        patch("cspawn.cli.node._prepull_images", return_value={}) as mock_prepull,
+        patch("cspawn.cli.node._activate_swarm_node"),
+        patch("digitalocean.Manager"),
+    ):
+        result = apply_plan(MagicMock(), plan, cfg, dry_run=False, manager_client=MagicMock())
+
+    assert result.added == 1
+    kwargs = mock_create.call_args.kwargs
+    assert kwargs["do_image"] == "777"
+    assert kwargs["cloud_init"] == "swarm-node-init-golden.yaml"
+    assert mock_verify.call_args.kwargs["manifest"] is manifest
+    assert mock_prepull.call_args.args[2] == ["img:b"]
@@ -0,0 +1,264 @@
+"""
+Unit tests for the event-driven host state watcher:
+
+    cspawn/cs_docker/watcher.py::HostStateWatcher
+    cspawn/cs_docker/watcher.py::watcher_alive
+
+Events are fed straight into `handle_event()` / `step()`; the Docker client is
+a MagicMock and the DB is in-memory SQLite, following test/test_node_missing.py.
+
+Run with::
+
+    uv run pytest test/test_host_watcher.py -v
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from docker.errors import NotFound
+
+from cspawn.cs_docker.csmanager import CodeServerManager
+from cspawn.cs_docker.watcher import HostStateWatcher, watcher_alive
+from cspawn.models import HostState
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-host-watcher-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _labels(username):
+    return {
+        "jtl.codeserver": "true",
+        "jtl.codeserver.username": username,
+        "jtl.codeserver.password": "pw",
+        "jtl.codeserver.public_url": "https://example.com/",
+        "jtl.codeserver.start_time": "2024-01-01T00:00:00-08:00",
+    }
+
+
+def _raw_service(service_id, name):
+    raw = MagicMock()
+    raw.id = service_id
+    raw.attrs = {"Spec": {"Name": name, "Labels": _labels(name)}}
+    return raw
+
+
+def _node(node_id, hostname):
+    n = MagicMock()
+    n.id = node_id
+    n.attrs = {"Description": {"Hostname": hostname}}
+    return n
+
+
+def _task(service_id, node_id, container_id, state="running"):
+    return {
+        "ID": f"t-{service_id}",
+        "ServiceID": service_id,
+        "NodeID": node_id,
+        "Slot": 1,
+        "DesiredState": "running",
+        "Status": {"State": state, "Timestamp": "2024-01-01T00:00:00Z",
+                   "ContainerStatus": {"ContainerID": container_id}},
+    }
+
+
+class Harness:
+    def __init__(self, data_dir=None):
+        self.flask, self.db = _make_flask_app()
+        self.client = MagicMock()
+        self.services = {}
+        self.tasks = {}
+        self.client.services.get.side_effect = self._get_service
+        self.client.api.tasks.side_effect = lambda filters: self.tasks.get(filters["service"], [])
+        self.client.nodes.list.return_value = [_node("n1", "swarm1.example.com")]
+
+        csm = CodeServerManager.__new__(CodeServerManager)
+        csm.client = self.client
+        csm._docker_sem = threading.BoundedSemaphore(4)
+
+        self.app = SimpleNamespace(
+            csm=csm,
+            app_config={"DATA_DIR": data_dir or tempfile.mkdtemp()},
+            app_context=self.flask.app_context,
+        )
+        self.clock = SimpleNamespace(t=0.0)
+        self.watcher = HostStateWatcher(self.app, client_factory=MagicMock(),
+                                        clock=lambda: self.clock.t)
+        self.watcher.refresh_nodes()
+
+    def _get_service(self, sid):
+        if sid not in self.services:
+            raise NotFound("gone")
+        return self.services[sid]
+
+    def add_host(self, sid, name, **kw):
+        from cspawn.models import CodeHost, User
+
+        user = User(user_id=f"uid-{name}", email=f"{name}@example.com",
+                    username=name, is_active=True)
+        self.db.session.add(user)
+        self.db.session.commit()
+        ch = CodeHost(service_id=sid, service_name=name, user_id=user.id, **kw)
+        self.db.session.add(ch)
+        self.db.session.commit()
+        return ch
+
+
+def _row(sid):
+    from cspawn.models import CodeHost
+
+    return CodeHost.query.filter_by(service_id=sid).first()
+
+
+class TestServiceEvents:
+    def test_update_event_syncs_only_that_service(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.add_host("svc-1", "alice", state="unknown")
+            h.services["svc-1"] = _raw_service("svc-1", "alice")
+            h.tasks["svc-1"] = [_task("svc-1", "n1", "c1")]
+
+            h.watcher.handle_event({"Type": "service", "Action": "update",
+                                    "Actor": {"ID": "svc-1"}, "time": 100})
+
+            row = _row("svc-1")
+            assert row.state == "running"
+            assert row.node_name == "swarm1.example.com"
+            assert row.container_id == "c1"
+            assert "svc-1" in h.watcher.pending
+            h.client.services.list.assert_not_called()
+            h.client.api.tasks.assert_called_once_with(filters={"service": "svc-1"})
+
+    def test_remove_event_marks_mia(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.add_host("svc-1", "bob", state="running", app_state="ready")
+            h.watcher.handle_event({"Type": "service", "Action": "remove",
+                                    "Actor": {"ID": "svc-1"}})
+            row = _row("svc-1")
+            assert row.state == HostState.MIA.value
+            assert row.app_state == HostState.MIA.value
+
+    def test_create_event_does_not_insert_row(self):
+        """new_cs() owns the insert; the watcher must not race it."""
+        h = Harness()
+        with h.flask.app_context():
+            h.services["svc-new"] = _raw_service("svc-new", "carol")
+            h.watcher.handle_event({"Type": "service", "Action": "create",
+                                    "Actor": {"ID": "svc-new"}})
+            assert _row("svc-new") is None
+            assert "svc-new" in h.watcher.pending
+
+    def test_unlabelled_service_is_ignored(self):
+        h = Harness()
+        with h.flask.app_context():
+            caddy = MagicMock()
+            caddy.attrs = {"Spec": {"Name": "caddy", "Labels": {}}}
+            h.services["svc-caddy"] = caddy
+            h.watcher.handle_event({"Type": "service", "Action": "update",
+                                    "Actor": {"ID": "svc-caddy"}})
+            assert "svc-caddy" not in h.watcher.pending
+
+    def test_handler_errors_are_contained(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.client.services.get.side_effect = RuntimeError("boom")
+            h.watcher.handle_event({"Type": "service", "Action": "update",
+                                    "Actor": {"ID": "svc-x"}})
+            assert h.watcher.events_handled == 1
+
+
+class TestNodeEvents:
+    def test_node_removal_marks_its_hosts_mia(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.add_host("svc-1", "dave", state="running", app_state="ready",
+                       node_id="n-dead")
+            h.services["svc-1"] = _raw_service("svc-1", "dave")
+            h.tasks["svc-1"] = [_task("svc-1", "n-dead", "c1")]
+
+            h.watcher.handle_event({"Type": "node", "Action": "remove",
+                                    "Actor": {"ID": "n-dead"}})
+
+            assert _row("svc-1").state == HostState.MIA.value
+
+
+class TestPendingAndResync:
+    def test_pending_dropped_once_ready(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.add_host("svc-1", "erin", state="unknown")
+            h.services["svc-1"] = _raw_service("svc-1", "erin")
+            h.tasks["svc-1"] = [_task("svc-1", "n1", "c1")]
+            h.watcher.pending["svc-1"] = 0.0
+
+            with patch("cspawn.cs_docker.csmanager.CSMService.is_ready",
+                       new_callable=lambda: property(lambda self: True)):
+                h.watcher.poll_pending()
+
+            assert _row("svc-1").app_state == HostState.READY.value
+            assert h.watcher.pending == {}
+
+    def test_pending_expires_after_ttl(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.watcher.pending["svc-ghost"] = 0.0
+            h.clock.t = h.watcher.pending_ttl_s + 1
+            h.watcher.poll_pending()
+            assert h.watcher.pending == {}
+
+    def test_step_resyncs_when_due_and_writes_heartbeat(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.watcher.pending_interval_s = 0
+            h.app.csm.swarm_snapshot = MagicMock(return_value=SimpleNamespace(nodes={}))
+            h.app.csm.sync = MagicMock()
+
+            h.watcher.step()
+            h.watcher.step()  # not due again yet
+            assert h.app.csm.sync.call_count == 1
+
+            h.clock.t = h.watcher.resync_interval_s + 1
+            h.watcher.step()
+            assert h.app.csm.sync.call_count == 2
+            assert watcher_alive(h.app.app_config)
+
+    def test_step_runs_readiness_pass_and_contains_its_errors(self):
+        h = Harness()
+        with h.flask.app_context():
+            h.watcher.pending_interval_s = 0
+            h.app.csm.swarm_snapshot = MagicMock(return_value=SimpleNamespace(nodes={}))
+            h.app.csm.sync = MagicMock()
+            h.watcher.readiness = MagicMock(interval_s=2.0)
+            h.watcher.readiness.track.side_effect = [1, RuntimeError("probe pool died")]
+
+            h.watcher.step()
+            h.watcher.step()
+            assert h.watcher.readiness.track.call_count == 2
+
+
+class TestWatcherAlive:
+    def test_false_without_heartbeat(self):
+        assert not watcher_alive({"DATA_DIR": tempfile.mkdtemp()})
+
+    def test_stale_heartbeat(self):
+        d = tempfile.mkdtemp()
+        p = os.path.join(d, ".watcher_heartbeat")
+        open(p, "w").close()
+        assert watcher_alive({"DATA_DIR": d})
+        assert not watcher_alive({"DATA_DIR": d}, max_age_s=60, now=time.time() + 3600)
@@ -0,0 +1,191 @@
+"""
+Unit tests for the per-node Docker client pool:
+
+    cspawn/cs_docker/pool.py::NodeClientPool
+    cspawn/cs_docker/manager.py::ServicesManager._node_manager (pooled)
+    cspawn/cs_docker/manager.py::ContainersManager.get (pool-owned rebuild)
+
+No Docker daemon or SSH involved — factories return MagicMocks and the clock
+is injected so idle/age expiry is deterministic.
+
+Run with::
+
+    uv run pytest test/test_node_client_pool.py -v
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cspawn.cs_docker.manager import ContainersManager, ServicesManager
+from cspawn.cs_docker.pool import NodeClientPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _pool(clock=None, **kw):
+    built = []
+
+    def factory(key):
+        v = MagicMock(name=f"client-{key}-{len(built)}")
+        built.append(v)
+        return v
+
+    closer = MagicMock()
+    pool = NodeClientPool(factory, closer=closer, clock=clock or FakeClock(), **kw)
+    return pool, built, closer
+
+
+class TestNodeClientPool:
+    def test_reuses_entry_per_key(self):
+        pool, built, _ = _pool()
+        a1 = pool.get("swarm1")
+        a2 = pool.get("swarm1")
+        b = pool.get("swarm2")
+        assert a1 is a2
+        assert a1 is not b
+        assert len(built) == 2
+        assert pool.stats().reused == 1
+
+    def test_idle_entries_are_evicted_and_closed(self):
+        clock = FakeClock()
+        pool, built, closer = _pool(clock, max_idle_s=60, max_age_s=10_000)
+        first = pool.get("swarm1")
+        clock.t = 61
+        second = pool.get("swarm1")
+        assert first is not second
+        closer.assert_called_once_with(first)
+        assert pool.stats().evicted_idle == 1
+
+    def test_old_entries_are_recycled_even_if_busy(self):
+        clock = FakeClock()
+        pool, built, closer = _pool(clock, max_idle_s=60, max_age_s=100,
+                                    health_interval_s=1_000)
+        first = pool.get("swarm1")
+        for t in (50, 99):
+            clock.t = t
+            assert pool.get("swarm1") is first
+        clock.t = 101
+        assert pool.get("swarm1") is not first
+        assert pool.stats().recycled_age == 1
+
+    def test_failed_health_check_rebuilds(self):
+        clock = FakeClock()
+        pinger = MagicMock(side_effect=[OSError("broken pipe")])
+        pool, built, closer = _pool(clock, health_interval_s=10)
+        pool._pinger = pinger
+        first = pool.get("swarm1")
+        clock.t = 11
+        second = pool.get("swarm1")
+        assert second is not first
+        closer.assert_called_once_with(first)
+        assert pool.stats().failed_health == 1
+
+    def test_call_rebuilds_stale_tunnel_and_retries_once(self):
+        pool, built, closer = _pool()
+        calls = []
+
+        def op(client):
+            calls.append(client)
+            if len(calls) == 1:
+                raise BrokenPipeError("half-open tunnel")
+            return "ok"
+
+        assert pool.call("swarm1", op) == "ok"
+        assert len(built) == 2
+        assert calls == built
+        closer.assert_called_once_with(built[0])
+
+    def test_call_does_not_swallow_api_errors(self):
+        from docker.errors import NotFound
+
+        pool, built, _ = _pool()
+
+        def op(client):
+            raise NotFound("no such container")
+
+        with pytest.raises(NotFound):
+            pool.call("swarm1", op)
+        assert len(built) == 1  # a healthy daemon's 404 is not a stale tunnel
+
+    def test_factory_error_propagates_and_is_not_cached(self):
+        pool = NodeClientPool(MagicMock(side_effect=OSError("ssh refused")))
+        with pytest.raises(OSError):
+            pool.get("swarm1")
+        assert "swarm1" not in pool
+
+    def test_close_all(self):
+        pool, built, closer = _pool()
+        pool.get("a")
+        pool.get("b")
+        pool.close_all()
+        assert len(pool) == 0
+        assert closer.call_count == 2
+
+
+def _services_manager(n_nodes=2):
+    client = MagicMock()
+    client.info.return_value = {"Name": "manager"}
+    client.nodes.list.return_value = [MagicMock() for _ in range(n_nodes)]
+    return ServicesManager(client, hostname_f=lambda n: f"{n}.example.com"), client
+
+
+class TestServicesManagerNodeManager:
+    def test_one_ssh_client_per_node_across_calls(self):
+        sm, _ = _services_manager()
+        with patch("cspawn.cs_docker.manager.docker.DockerClient") as DC:
+            DC.side_effect = lambda **kw: MagicMock(name=kw["base_url"])
+            m1 = sm._node_manager("swarm2")
+            m2 = sm._node_manager("swarm2")
+            m3 = sm._node_manager("swarm3")
+
+        assert m1 is m2
+        assert m1 is not m3
+        assert DC.call_count == 2
+        assert DC.call_args_list[0].kwargs["base_url"] == "ssh://root@swarm2.example.com"
+
+    def test_single_node_shares_manager_client_and_never_closes_it(self):
+        sm, client = _services_manager(n_nodes=1)
+        cm = sm._node_manager("swarm1")
+        assert cm.client is client
+        sm.node_clients.close_all()
+        client.close.assert_not_called()
+
+    def test_returns_none_when_client_cannot_be_built(self):
+        sm, _ = _services_manager()
+        with patch("cspawn.cs_docker.manager.docker.DockerClient",
+                   side_effect=OSError("no route")):
+            assert sm._node_manager("swarm9") is None
+
+    def test_pooled_get_replaces_stale_entry(self):
+        sm, _ = _services_manager()
+        stale = MagicMock()
+        stale.info.return_value = {"Name": "swarm2"}
+        stale.containers.get.side_effect = BrokenPipeError("stale")
+        fresh = MagicMock()
+        fresh.info.return_value = {"Name": "swarm2"}
+        fresh.containers.get.return_value = MagicMock(id="cont-1")
+
+        with patch("cspawn.cs_docker.manager.docker.DockerClient",
+                   side_effect=[stale, fresh]):
+            cm = sm._node_manager("swarm2")
+            cont = cm.get("cont-1")
+            assert cont.id == "cont-1"
+            assert sm._node_manager("swarm2").client is fresh
+
+        stale.close.assert_called_once()
+
+    def test_unpooled_containers_manager_keeps_close_and_retry(self):
+        client = MagicMock()
+        client.info.return_value = {"Name": "local"}
+        client.containers.get.side_effect = [OSError("reset"), MagicMock(id="c")]
+        cm = ContainersManager(client)
+        assert cm.get("c").id == "c"
+        client.close.assert_called_once()
@@ -18,7 +18,7 @@ Covers:
   with retry+backoff and a loud ERROR on exhausted retries.
 - `_get_prepull_images`: DB-derived `class_proto.image_uri` list unioned with
   the optional `NODE_PREPULL_IMAGES` config allowlist.
-- `_prepull_images`: best-effort per-image `docker pull` over SSH.
+- `_prepull_images`: best-effort `docker pull` of every image over one SSH session.
 - `_ssh_exec`'s extended `command_timeout` parameter.
 - `expand()`'s new drain-before-verify and pre-pull-then-activate wiring.
 - `_check_docker_staleness`: purely diagnostic WARNING when a node's
@@ -35,6 +35,8 @@ Follows `test/test_node_cloud_init.py`'s `find_parent_dir`-patch /
 from __future__ import annotations
 
 import contextlib
+import json
+import shlex
 from pathlib import Path
 from unittest.mock import ANY, MagicMock, patch
 
@@ -968,37 +970,71 @@ class TestGetPrepullImages:
 # _prepull_images
 # ---------------------------------------------------------------------------
 
+class _FakeSession:
+    """Stands in for `_SshSession`: answers the layer inspect, then streams
+    one RESULT line per image from `outcome(image)` ("ok"/"fail"/None to
+    report nothing)."""
+
+    def __init__(self, outcome, inspect_out="", raise_on_stream=None):
+        self.outcome = outcome
+        self.inspect_out = inspect_out
+        self.raise_on_stream = raise_on_stream
+        self.scripts = []
+
+    def __call__(self, host, username, key_path, **kwargs):
+        self.host = host
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, cmd, command_timeout=None):
+        self.scripts.append(cmd)
+        return 0, self.inspect_out, ""
+
+    def stream(self, cmd, on_line, idle_timeout=None):
+        self.scripts.append(cmd)
+        self.idle_timeout = idle_timeout
+        if self.raise_on_stream:
+            raise self.raise_on_stream
+        for line in cmd.splitlines():
+            if line.startswith("run "):
+                image = shlex.split(line)[1]
+                status = self.outcome(image)
+                if status:
+                    on_line(f"RESULT {status} {image} 3")
+        return 0
+
+
 class TestPrepullImagesHelper:
     """Direct unit coverage for `_prepull_images` (sprint-013 ticket-001):
-    best-effort per-image `docker pull` over SSH, never raising, never
-    aborting the batch over one bad image.
+    best-effort `docker pull` of every image over one SSH session, never
+    raising, never aborting the batch over one bad image.
     """
 
-    def test_all_images_pulled_successfully(self, monkeypatch):
-        calls = []
-
-        def _fake_ssh_exec(host, username, key_path, cmd, **kwargs):
-            calls.append((host, username, key_path, cmd, kwargs))
-            return (0, "Pulling ok", "")
-
-        monkeypatch.setattr("cspawn.cli.node._ssh_exec", _fake_ssh_exec)
+    def test_all_images_pulled_in_one_session(self, monkeypatch):
+        fake = _FakeSession(lambda image: "ok")
+        monkeypatch.setattr("cspawn.cli.node._SshSession", fake)
 
         result = _prepull_images(
-            "10.0.0.5", Path("/fake/id_rsa"), ["img:a", "img:b"], timeout=42.0
+            "10.0.0.5", Path("/fake/id_rsa"), ["img:a", "img:b"], timeout=42.0, concurrency=2
         )
 
         assert result == {"img:a": True, "img:b": True}
-        assert len(calls) == 2
-        assert calls[0][3] == "docker pull img:a"
-        assert calls[0][4]["command_timeout"] == 42.0
+        assert fake.host == "10.0.0.5"
+        inspect_cmd, pull_cmd = fake.scripts
+        assert "docker manifest inspect -v img:a" in inspect_cmd
+        assert "timeout 42 docker pull" in pull_cmd
+        assert "run img:a ''" in pull_cmd and "run img:b ''" in pull_cmd
 
-    def test_per_image_nonzero_exit_logs_warning_and_continues(self, monkeypatch):
-        def _fake_ssh_exec(host, username, key_path, cmd, **kwargs):
-            if "bad" in cmd:
-                return (1, "", "no such image")
-            return (0, "ok", "")
-
-        monkeypatch.setattr("cspawn.cli.node._ssh_exec", _fake_ssh_exec)
+    def test_per_image_failure_logs_warning_and_continues(self, monkeypatch):
+        monkeypatch.setattr(
+            "cspawn.cli.node._SshSession",
+            _FakeSession(lambda image: "fail" if "bad" in image else "ok"),
+        )
         log = MagicMock()
 
         result = _prepull_images(
@@ -1009,13 +1045,11 @@ class TestPrepullImagesHelper:
         log.warning.assert_called_once()
         assert "img:bad" in log.warning.call_args[0][0]
 
-    def test_per_image_exception_or_timeout_logs_warning_and_continues(self, monkeypatch):
-        def _fake_ssh_exec(host, username, key_path, cmd, **kwargs):
-            if "wedged" in cmd:
-                raise TimeoutError("simulated wedged pull")
-            return (0, "ok", "")
-
-        monkeypatch.setattr("cspawn.cli.node._ssh_exec", _fake_ssh_exec)
+    def test_unreported_image_counts_as_failed(self, monkeypatch):
+        monkeypatch.setattr(
+            "cspawn.cli.node._SshSession",
+            _FakeSession(lambda image: None if "wedged" in image else "ok"),
+        )
         log = MagicMock()
 
         result = _prepull_images(
@@ -1025,14 +1059,51 @@ class TestPrepullImagesHelper:
         assert result == {"img:wedged": False, "img:fine": True}
         log.warning.assert_called_once()
 
+    def test_session_timeout_marks_all_failed_without_raising(self, monkeypatch):
+        monkeypatch.setattr(
+            "cspawn.cli.node._SshSession",
+            _FakeSession(lambda image: "ok", raise_on_stream=TimeoutError("simulated wedged pull")),
+        )
+        log = MagicMock()
+
+        result = _prepull_images(
+            "10.0.0.5", Path("/fake/id_rsa"), ["img:a", "img:b"], log=log
+        )
+
+        assert result == {"img:a": False, "img:b": False}
+        assert "failed/timed out" in log.warning.call_args_list[0][0][0]
+
+    def test_layer_sharing_images_pulled_leader_first_through_mirror(self, monkeypatch):
+        def manifest(*digests):
+            return json.dumps({"SchemaV2Manifest": {"layers": [{"digest": d} for d in digests]}})
+
+        inspect_out = "\n".join([
+            "@@ ghcr.io/org/java:1", manifest("base", "jdk"),
+            "@@ ghcr.io/org/base:1", manifest("base"),
+            "@@ ghcr.io/org/python:1", manifest("base", "py"),
+        ])
+        fake = _FakeSession(lambda image: "ok", inspect_out=inspect_out)
+        monkeypatch.setattr("cspawn.cli.node._SshSession", fake)
+
+        _prepull_images(
+            "10.0.0.5", Path("/fake/id_rsa"),
+            ["ghcr.io/org/java:1", "ghcr.io/org/base:1", "ghcr.io/org/python:1"],
+            mirrors={"ghcr.io": "10.124.0.2:5000"},
+        )
+
+        runs = [line for line in fake.scripts[1].splitlines() if line.startswith(("run ", "wait"))]
+        assert runs[0] == "run ghcr.io/org/java:1 10.124.0.2:5000/org/java:1"
+        assert runs[1] == "wait"
+        assert {r.split()[1] for r in runs[2:4]} == {"ghcr.io/org/base:1", "ghcr.io/org/python:1"}
+
     def test_empty_image_list_returns_empty_dict_without_ssh(self, monkeypatch):
-        mock_ssh = MagicMock()
-        monkeypatch.setattr("cspawn.cli.node._ssh_exec", mock_ssh)
+        mock_session = MagicMock()
+        monkeypatch.setattr("cspawn.cli.node._SshSession", mock_session)
 
         result = _prepull_images("10.0.0.5", Path("/fake/id_rsa"), [])
 
         assert result == {}
-        mock_ssh.assert_not_called()
+        mock_session.assert_not_called()
 
     def test_default_timeout_matches_ticket_spec(self):
         import inspect
@@ -0,0 +1,143 @@
+"""
+Unit tests for bin-packing placement:
+
+    cspawn/cs_docker/placement.py::pin_constraints
+    cspawn/cs_docker/placement.py::node_rooms / choose_node / host_memory_estimate
+    cspawn/cs_docker/placement.py::BinPacker.pick
+
+Swarm nodes are raw attr dicts; `pick` runs against a MagicMock client with
+the CodeHost memory query patched out.
+
+Run with::
+
+    uv run pytest test/test_placement.py -v
+"""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from cspawn.cs_docker.placement import (
+    MB,
+    BinPacker,
+    NodeRoom,
+    choose_node,
+    host_memory_estimate,
+    node_rooms,
+    pin_constraints,
+)
+
+GB = 1024 * MB
+CFG = {"DEFAULT_CAPACITY": "6"}
+
+
+def _attrs(hostname: str, *, mem_gb: float = 8, cpus: int = 4, capacity: int = 6, role: str = "worker",
+           availability: str = "active", state: str = "ready") -> dict:
+    return {
+        "ID": hostname.split(".")[0],
+        "Spec": {"Role": role, "Availability": availability, "Labels": {"cs.capacity": str(capacity)}},
+        "Description": {"Hostname": hostname,
+                        "Resources": {"MemoryBytes": int(mem_gb * GB), "NanoCPUs": cpus * 10**9}},
+        "Status": {"State": state},
+    }
+
+
+def test_pin_constraints_replaces_any_earlier_pin():
+    assert pin_constraints(["node.role==worker", "node.hostname == swarm2.x"], "swarm3.x") == [
+        "node.role==worker", "node.hostname==swarm3.x",
+    ]
+    assert pin_constraints(None, "swarm3.x") == ["node.hostname==swarm3.x"]
+
+
+class TestNodeRooms:
+    def test_skips_managers_drained_and_down_nodes(self):
+        nodes = [_attrs("swarm1.x", role="manager"), _attrs("swarm2.x"),
+                 _attrs("swarm3.x", availability="drain"), _attrs("swarm4.x", state="down")]
+        assert [r.fqdn for r in node_rooms(nodes, {}, {}, CFG, host_mem=GB)] == ["swarm2.x"]
+
+    def test_memory_from_reports_then_estimate(self):
+        [room] = node_rooms([_attrs("swarm2.x", mem_gb=16)], {"swarm2": 3},
+                            {"swarm2": [2 * GB, GB, None]}, CFG, host_mem=GB // 2)
+        assert room.hosts == 3 and room.slots == 6 and room.cpus == 4.0
+        assert room.mem_total == 16 * GB
+        assert room.mem_used == 2 * GB + GB + GB // 2
+
+        # More reports than hosts: stale rows are dropped, largest kept
+        [room] = node_rooms([_attrs("swarm2.x")], {"swarm2": 1}, {"swarm2": [GB, 3 * GB]}, CFG, host_mem=GB)
+        assert room.mem_used == 3 * GB
+
+    def test_host_memory_estimate_needs_enough_samples(self):
+        assert host_memory_estimate([GB, 2 * GB], 1536 * MB) == 1536 * MB
+        assert host_memory_estimate([GB, GB, 2 * GB, 3 * GB, 4 * GB, 0], 1536 * MB) == 2 * GB
+
+
+class TestChooseNode:
+    def test_packs_onto_the_fullest_node_that_fits(self):
+        rooms = [
+            NodeRoom("swarm2.x", slots=6, hosts=1, mem_total=8 * GB, mem_used=GB),
+            NodeRoom("swarm3.x", slots=6, hosts=4, mem_total=8 * GB, mem_used=4 * GB),
+            NodeRoom("swarm4.x", slots=6, hosts=0, mem_total=8 * GB),
+        ]
+        assert choose_node(rooms, mem=GB, cpus_per_host=0.5, reserve=GB) == "swarm3.x"
+
+    def test_memory_not_slots_decides_when_hosts_are_heavy(self):
+        rooms = [
+            NodeRoom("swarm2.x", slots=6, hosts=2, mem_total=8 * GB, mem_used=6 * GB),  # heavy hosts
+            NodeRoom("swarm3.x", slots=6, hosts=3, mem_total=8 * GB, mem_used=3 * GB),
+        ]
+        # swarm2 is fuller by memory, but one more host would eat the reserve.
+        assert choose_node(rooms, mem=1536 * MB, cpus_per_host=0.5, reserve=GB) == "swarm3.x"
+        assert choose_node(rooms, mem=GB // 2, cpus_per_host=0.5, reserve=GB) == "swarm2.x"
+
+    def test_slots_and_cpus_are_hard_limits(self):
+        full = NodeRoom("swarm2.x", slots=6, hosts=6, mem_total=64 * GB)
+        few_cpus = NodeRoom("swarm3.x", slots=6, hosts=3, mem_total=64 * GB, cpus=2.0)
+        assert choose_node([full, few_cpus], mem=GB, cpus_per_host=0.5, reserve=GB) == "swarm3.x"
+        assert choose_node([full, few_cpus], mem=GB, cpus_per_host=1.0, reserve=GB) is None
+
+    def test_unknown_memory_falls_back_to_slots(self):
+        rooms = [NodeRoom("swarm2.x", slots=6, hosts=2), NodeRoom("swarm3.x", slots=14, hosts=2)]
+        assert choose_node(rooms, mem=GB, cpus_per_host=0.5, reserve=GB) == "swarm2.x"
+
+
+class TestBinPacker:
+    def _csm(self, *node_attrs, tasks=()):
+        client = MagicMock()
+        client.services.list.return_value = []
+        client.api.tasks.return_value = list(tasks)
+        client.nodes.list.return_value = [MagicMock(id=a["ID"], attrs=a) for a in node_attrs]
+        csm = MagicMock(client=client, config={"PLACEMENT_BINPACK": "true"}, standby=None)
+        return csm
+
+    @staticmethod
+    def _task(node_id: str) -> dict:
+        return {"ServiceID": "svc", "NodeID": node_id, "DesiredState": "running",
+                "Status": {"State": "running"}}
+
+    def test_pick_packs_and_reserves_in_flight_slots(self):
+        csm = self._csm(_attrs("swarm2.x", capacity=3), _attrs("swarm3.x", capacity=3),
+                        tasks=[self._task("swarm2")])
+        packer = BinPacker(csm)
+        with patch.object(packer, "_memory_samples", return_value={}):
+            picks = [packer.pick() for _ in range(6)]
+        # swarm2 fills first (one running + two picks), then swarm3, then nothing.
+        assert picks == ["swarm2.x", "swarm2.x", "swarm3.x", "swarm3.x", "swarm3.x", None]
+
+    def test_burst_reads_cluster_load_once_per_ttl(self):
+        csm = self._csm(_attrs("swarm2.x", capacity=6))
+        csm.config["PLACEMENT_LOAD_TTL_S"] = "5"
+        now = [100.0]
+        packer = BinPacker(csm, clock=lambda: now[0])
+        with patch.object(packer, "_memory_samples", return_value={}) as samples:
+            picks = [packer.pick() for _ in range(4)]
+            assert picks == ["swarm2.x"] * 4
+            assert csm.client.nodes.list.call_count == 1 and samples.call_count == 1
+
+            now[0] += 6
+            packer.pick()
+        assert csm.client.nodes.list.call_count == 2
+
+    def test_pick_never_raises(self):
+        csm = self._csm()
+        csm.client.services.list.side_effect = RuntimeError("manager unreachable")
+        assert BinPacker(csm).pick() is None
+        assert BinPacker.enabled({"PLACEMENT_BINPACK": "true"}) and not BinPacker.enabled({})
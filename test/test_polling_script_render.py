@@ -0,0 +1,155 @@
+"""
+Render tests for the pages that include elements/polling_script.html:
+
+    cspawn/main/routes/main.py::index (student)
+    cspawn/main/routes/classes.py::detail_class
+    cspawn/main/routes/main.py::add_template_filters (active_start_job and
+        ready_events_url Jinja globals)
+    cspawn/main/routes/hosts.py::start_job_status (failure flash)
+
+Each page is rendered with and without an active StartJob, and with
+READY_SSE on and off. The DB is in-memory SQLite.
+
+Run with::
+
+    uv run pytest test/test_polling_script_render.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from flask import Blueprint, Flask
+from flask_login import LoginManager
+from sqlalchemy import event
+
+from cspawn.models import Class, ClassProto, CodeHost, StartJob, User, db
+
+
+def _make_auth_stub():
+    """Minimal auth blueprint, as in test/test_admin_nodes_template.py."""
+    auth_stub = Blueprint("auth", __name__)
+    for name in ("profile", "logout", "login"):
+        auth_stub.add_url_rule(f"/{name}", name, lambda: name)
+    return auth_stub
+
+
+@pytest.fixture()
+def flask_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["TESTING"] = True
+    app.config["SECRET_KEY"] = "test-polling-secret"
+
+    from flask_bootstrap import Bootstrap5
+    from flask_font_awesome import FontAwesome
+    Bootstrap5(app)
+    FontAwesome(app)
+    db.init_app(app)
+
+    # url_for('auth.*') and url_for('admin.*') in the navbar must resolve.
+    app.register_blueprint(_make_auth_stub(), url_prefix="/auth")
+    from cspawn.admin import admin_bp
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+
+    from cspawn.main import main_bp
+    app.register_blueprint(main_bp)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return User.query.get(int(user_id))
+
+    # SQLite drops the tzinfo that PostgreSQL keeps; Class.can_start compares
+    # start_date with an aware now(), so put it back on load.
+    def _aware(target, _ctx):
+        if target.start_date is not None and target.start_date.tzinfo is None:
+            target.start_date = target.start_date.replace(tzinfo=timezone.utc)
+
+    event.listen(Class, "load", _aware)
+    app.app_config = {}
+    try:
+        with app.app_context():
+            db.create_all()
+            yield app
+            db.session.remove()
+            db.drop_all()
+    finally:
+        event.remove(Class, "load", _aware)
+
+
+def _seed(*, role, job, app_state="starting"):
+    """A user in `role` with a starting host and a class; optionally an active StartJob."""
+    user = User(user_id=f"uid-{role}", username=role, is_active=True,
+                is_student=role == "student", is_instructor=role == "instructor")
+    proto = ClassProto(name="proto", hash="h", image_uri="img")
+    db.session.add_all([user, proto])
+    db.session.flush()
+    class_ = Class(name="Python 1", proto_id=proto.id, start_date=datetime.now(timezone.utc))
+    class_.instructors.append(user) if role == "instructor" else class_.students.append(user)
+    db.session.add(class_)
+    db.session.add(CodeHost(user_id=user.id, service_id="svc-1", service_name=role, app_state=app_state))
+    if job:
+        db.session.add(StartJob(user_id=user.id, class_id=None, proto_id=proto.id, status="running"))
+    db.session.commit()
+    return user.id, class_.id
+
+
+def _login(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    return client
+
+
+def _get(app, path_for, *, role, job, sse=False):
+    app.app_config["READY_SSE"] = "true" if sse else "false"
+    user_id, class_id = _seed(role=role, job=job)
+    return _login(app, user_id).get(path_for(class_id))
+
+
+PAGES = {
+    "student": lambda class_id: "/",
+    "instructor": lambda class_id: f"/class/{class_id}/details",
+}
+
+
+@pytest.mark.parametrize("role", list(PAGES))
+@pytest.mark.parametrize("job", [False, True])
+def test_page_renders_start_job_poller_only_with_active_job(flask_app, role, job):
+    resp = _get(flask_app, PAGES[role], role=role, job=job)
+
+    assert resp.status_code == 200, resp.get_data(as_text=True)[:500]
+    body = resp.get_data(as_text=True)
+    assert ("pollStartJob" in body) is job
+
+
+@pytest.mark.parametrize("role", list(PAGES))
+@pytest.mark.parametrize("sse", [False, True])
+def test_ready_watch_uses_event_stream_only_when_ready_sse_on(flask_app, role, sse):
+    resp = _get(flask_app, PAGES[role], role=role, job=False, sse=sse)
+
+    assert resp.status_code == 200, resp.get_data(as_text=True)[:500]
+    body = resp.get_data(as_text=True)
+    assert ("watchServer(`/host/ready_events" in body) is sse
+    assert "pollServer();" in body
+
+
+def test_failed_start_job_message_is_shown_after_reload(flask_app):
+    flask_app.app_config["READY_SSE"] = "false"
+    user_id, _ = _seed(role="student", job=True)
+    job = StartJob.query.filter_by(user_id=user_id).one()
+    client = _login(flask_app, user_id)
+
+    assert client.get(f"/host/start_job/{job.id}").get_json()["status"] == "running"
+    job.status, job.message = "failed", "fork: github said no"
+    db.session.commit()
+    assert client.get(f"/host/start_job/{job.id}").get_json()["status"] == "failed"
+
+    body = client.get("/").get_data(as_text=True)
+    assert "Failed to start host: fork: github said no" in body
+    assert "pollStartJob" not in body
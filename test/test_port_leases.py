@@ -0,0 +1,196 @@
+"""
+Unit tests for host port leases:
+
+    cspawn/cs_docker/ports.py::lease_ports / release_ports / release_orphaned_ports
+    cspawn/cs_docker/ports.py::reserve_ports
+    cspawn/cs_docker/csmanager.py::CodeServerManager._reserve_published_ports
+    cspawn/models.py::_release_port_leases (CodeHost delete releases ports)
+    cspawn/cs_docker/csmanager.py::CodeServerManager.get_unused_port
+    migrations/versions/v011_add_port_lease_table.py
+
+The DB is in-memory SQLite; the ports are seeded lazily on first lease.
+
+Run with::
+
+    uv run pytest test/test_port_leases.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+import sqlalchemy as sa
+
+from cspawn.cs_docker.ports import (
+    PORT_MAX,
+    PORT_MIN,
+    PortsExhausted,
+    lease_ports,
+    release_orphaned_ports,
+    release_ports,
+    reserve_ports,
+    seed_ports,
+)
+from cspawn.models import CodeHost, PortLease, User
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-port-lease-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _users(db, n, prefix="user"):
+    users = [User(user_id=f"uid-{prefix}{i}", username=f"{prefix}{i}") for i in range(n)]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+class TestLease:
+    def test_distinct_lowest_ports_and_idempotent(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            a, b = _users(db, 2)
+            pa = lease_ports(a.id, 2)
+            pb = lease_ports(b.id, 2)
+            assert pa == [PORT_MIN, PORT_MIN + 1]
+            assert pb == [PORT_MIN + 2, PORT_MIN + 3]
+            assert lease_ports(a.id, 2) == pa  # a retried start gets the same ports
+            assert PortLease.query.count() == PORT_MAX - PORT_MIN + 1
+
+    def test_release_reuses_ports(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            a, b = _users(db, 2)
+            pa = lease_ports(a.id, 2)
+            lease_ports(b.id, 2)
+            assert release_ports(a.id) == 2
+            c = _users(db, 1, "late")[0]
+            assert lease_ports(c.id, 2) == pa
+
+    def test_exhausted_raises_without_retry_storm(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            seed_ports()
+            a, b = _users(db, 2)
+            PortLease.query.filter(PortLease.port < PORT_MAX).update({"user_id": a.id})
+            db.session.commit()
+            assert lease_ports(b.id, 1) == [PORT_MAX]
+            with pytest.raises(PortsExhausted):
+                lease_ports(_users(db, 1, "late")[0].id, 1)
+
+    def test_manager_get_unused_port(self):
+        from cspawn.cs_docker.csmanager import CodeServerManager
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            a = _users(db, 1)[0]
+            csm = CodeServerManager.__new__(CodeServerManager)
+            assert csm.get_unused_port(2, user_id=a.id) == [PORT_MIN, PORT_MIN + 1]
+            assert csm.get_unused_port(1, user_id=a.id) == PORT_MIN
+
+
+def _service(username, *published):
+    ports = [{"Protocol": "tcp", "PublishedPort": p, "TargetPort": t}
+             for p, t in zip(published, (8080, 6080))]
+    return SimpleNamespace(attrs={"Spec": {"Labels": {"jtl.codeserver.username": username},
+                                           "EndpointSpec": {"Ports": ports}}})
+
+
+class TestReserve:
+    def test_free_ports_are_leased_and_held_ones_left(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            a, b = _users(db, 2)
+            taken = lease_ports(b.id, 1)[0]
+            assert reserve_ports({PORT_MIN + 10: a.id, taken: a.id, PORT_MAX + 1: a.id}) == 1
+            assert lease_ports(a.id, 2) == [PORT_MIN + 1, PORT_MIN + 10]
+            assert reserve_ports({PORT_MIN + 10: a.id}) == 0
+
+    def test_sync_leases_vnc_port_of_existing_host(self):
+        from cspawn.cs_docker.csmanager import CodeServerManager
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            a, b = _users(db, 2)
+            # Started before leases: the migration backfilled only the
+            # code-server port (from public_url); the VNC port was random.
+            seed_ports()
+            PortLease.query.filter_by(port=PORT_MIN + 500).update({"user_id": a.id})
+            db.session.commit()
+
+            snap = SimpleNamespace(services={
+                "svc-a": _service("user0", PORT_MIN + 500, PORT_MIN),
+                "svc-x": _service("nobody", PORT_MIN + 1),
+                "svc-p": SimpleNamespace(attrs={"Spec": {"Labels": {"jtl.codeserver.username": "user1"}}}),
+            })
+            csm = CodeServerManager.__new__(CodeServerManager)
+            assert csm._reserve_published_ports(snap) == 1
+
+            assert lease_ports(a.id, 2) == [PORT_MIN, PORT_MIN + 500]
+            assert lease_ports(b.id, 2) == [PORT_MIN + 1, PORT_MIN + 2]
+
+
+class TestRelease:
+    def test_deleting_code_host_frees_its_ports(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            a = _users(db, 1)[0]
+            lease_ports(a.id, 2)
+            ch = CodeHost(user_id=a.id, service_id="svc", service_name="user0")
+            db.session.add(ch)
+            db.session.commit()
+
+            db.session.delete(ch)
+            db.session.commit()
+            assert PortLease.query.filter(PortLease.user_id.isnot(None)).count() == 0
+
+    def test_orphans_released_after_grace(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            a, b = _users(db, 2)
+            now = datetime.now(timezone.utc)
+            lease_ports(a.id, 2, now=now - timedelta(hours=2))  # host row lost
+            lease_ports(b.id, 2, now=now - timedelta(hours=2))
+            db.session.add(CodeHost(user_id=b.id, service_id="svc-b", service_name="user1"))
+            db.session.commit()
+            c = _users(db, 1, "late")[0]
+            lease_ports(c.id, 2, now=now)  # start in flight: no row yet
+
+            assert release_orphaned_ports(now=now) == 2
+            held = {u for (u,) in db.session.query(PortLease.user_id).filter(PortLease.user_id.isnot(None))}
+            assert held == {b.id, c.id}
+
+
+def test_v011_migration_upgrade_idempotent_and_downgrade():
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    from migrations.versions.v011_add_port_lease_table import downgrade, upgrade
+
+    engine = sa.create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT)"))
+
+    def run(fn):
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                fn()
+
+    run(upgrade)
+    run(upgrade)
+    insp = sa.inspect(engine)
+    assert {c["name"] for c in insp.get_columns("port_leases")} == {"port", "user_id", "leased_at"}
+    assert "ix_port_leases_free" in {i["name"] for i in insp.get_indexes("port_leases")}
+    run(downgrade)
+    assert "port_leases" not in sa.inspect(engine).get_table_names()
@@ -0,0 +1,246 @@
+"""
+Unit tests for forking student repos ahead of time:
+
+    cspawn/cs_github/prefork.py::get_or_fork
+    cspawn/cs_github/prefork.py::prefork_class
+    cspawn/cs_github/prefork.py::classes_due_for_prefork
+    cspawn/cs_github/prefork.py::ForkBudget
+    cspawn/cs_github/repo.py::GithubOrg.remove (drops the cache row, even if the repo is gone)
+    migrations/versions/v009_add_student_fork_table.py
+
+The GitHub org is a MagicMock; the DB is in-memory SQLite.
+
+Run with::
+
+    uv run pytest test/test_prefork.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+import sqlalchemy as sa
+from github import GithubException
+
+from cspawn.cs_github.prefork import (
+    ForkBudget,
+    RateLimited,
+    classes_due_for_prefork,
+    get_or_fork,
+    lookup_fork,
+    prefork_class,
+)
+from cspawn.cs_github.repo import GithubOrg, StudentRepo
+
+UPSTREAM = "https://github.com/league-curriculum/Python-Apprentice"
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-prefork-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _seed_class(db, usernames, *, purge_after=None, purge_by=None):
+    from cspawn.models import Class, ClassProto, User
+
+    proto = ClassProto(name="Proto", image_uri="img:latest", hash="h", repo_uri=UPSTREAM)
+    db.session.add(proto)
+    db.session.flush()
+    cls = Class(name="Class", proto_id=proto.id, purge_after=purge_after, purge_by=purge_by,
+                start_date=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    for name in usernames:
+        cls.students.append(User(user_id=f"uid-{name}", username=name, is_active=True, is_student=True))
+    db.session.add(cls)
+    db.session.commit()
+    return cls
+
+
+def _org():
+    org = MagicMock()
+    org.fork.side_effect = lambda url, username: StudentRepo(
+        None, None, "students", f"Python-Apprentice-{username}", "Python-Apprentice", url, username)
+    return org
+
+
+def _budget():
+    gh = SimpleNamespace(rate_limiting=(5000, 5000))
+    return ForkBudget(gh, min_interval_s=0, sleep=lambda s: None)
+
+
+class TestGetOrFork:
+    def test_forks_once_then_looks_up(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice"])
+            alice = cls.students[0]
+            org = _org()
+            factory = MagicMock(return_value=org)
+
+            first = get_or_fork(None, alice, UPSTREAM, org_factory=factory)
+            second = get_or_fork(None, alice, UPSTREAM, org_factory=factory)
+
+            assert org.fork.call_count == 1
+            assert second.full_name == first.full_name == "students/Python-Apprentice-alice"
+            assert second.upstream_name == "Python-Apprentice"
+            assert second.username == "alice"
+
+
+class TestPreforkClass:
+    def test_forks_roster_and_skips_cached(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice", "bob", "carol"])
+            org = _org()
+            get_or_fork(None, cls.students[0], UPSTREAM, org_factory=lambda app: org)
+            org.fork.reset_mock()
+
+            report = prefork_class(None, cls, org=org, budget=_budget())
+
+            assert sorted(report.forked) == ["bob", "carol"]
+            assert report.cached == ["alice"]
+            assert org.fork.call_count == 2
+            assert all(lookup_fork(None, s, UPSTREAM) for s in cls.students)
+
+    def test_dry_run_forks_nothing(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice", "bob"])
+            org = _org()
+            report = prefork_class(None, cls, org=org, dry_run=True)
+            assert sorted(report.pending) == ["alice", "bob"]
+            org.fork.assert_not_called()
+
+    def test_stops_when_quota_below_reserve(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice", "bob"])
+            org = _org()
+            budget = ForkBudget(SimpleNamespace(rate_limiting=(10, 5000)), reserve=100)
+            report = prefork_class(None, cls, org=org, budget=budget)
+            assert report.stopped and report.forked == []
+            org.fork.assert_not_called()
+
+    def test_rate_limit_error_ends_pass_other_errors_do_not(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice", "bob", "carol"])
+            org = _org()
+            good = org.fork.side_effect
+            calls = []
+
+            def fork(url, username):
+                calls.append(username)
+                if len(calls) == 1:
+                    raise RuntimeError("boom")
+                if len(calls) == 2:
+                    raise GithubException(403, {"message": "API rate limit exceeded"}, None)
+                return good(url, username)
+
+            org.fork.side_effect = fork
+            report = prefork_class(None, cls, org=org, budget=_budget())
+            assert len(report.failed) == 2
+            assert report.stopped
+            assert len(calls) == 2
+
+
+class TestForkBudget:
+    def test_paces_forks(self):
+        clock = SimpleNamespace(t=0.0)
+        slept = []
+        b = ForkBudget(SimpleNamespace(rate_limiting=(5000, 5000)), min_interval_s=2.0,
+                       sleep=slept.append, clock=lambda: clock.t)
+        b.acquire()
+        clock.t = 0.5
+        b.acquire()
+        assert slept == [1.5]
+
+    def test_unknown_quota_does_not_block(self):
+        b = ForkBudget(SimpleNamespace(rate_limiting=(-1, -1)), min_interval_s=0)
+        b.acquire()
+
+    def test_low_quota_raises(self):
+        b = ForkBudget(SimpleNamespace(rate_limiting=(1, 5000)), reserve=2)
+        with pytest.raises(RateLimited):
+            b.acquire()
+
+
+class TestDue:
+    def test_window_open_or_opening_within_lead(self):
+        now = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            soon = _seed_class(db, ["a"], purge_after=now + timedelta(hours=3),
+                               purge_by=now + timedelta(hours=6))
+            due = classes_due_for_prefork(now, timedelta(hours=24))
+            assert [c.id for c in due] == [soon.id]
+            assert classes_due_for_prefork(now, timedelta(hours=1)) == []
+            assert classes_due_for_prefork(now + timedelta(hours=7)) == []
+
+
+class TestRemoveForgetsFork:
+    def test_remove_drops_cache_row(self):
+        from cspawn.models import StudentFork
+
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice"])
+            get_or_fork(None, cls.students[0], UPSTREAM, org_factory=lambda app: _org())
+            assert StudentFork.query.count() == 1
+
+            org = GithubOrg.__new__(GithubOrg)
+            org.gh = MagicMock()
+            org.org = "students"
+            org.app = None
+            assert org.remove("students/Python-Apprentice-alice")
+            assert StudentFork.query.count() == 0
+
+    def test_remove_of_missing_repo_drops_cache_row(self):
+        from cspawn.models import StudentFork
+
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            cls = _seed_class(db, ["alice"])
+            get_or_fork(None, cls.students[0], UPSTREAM, org_factory=lambda app: _org())
+
+            org = GithubOrg.__new__(GithubOrg)
+            org.gh = MagicMock()
+            org.gh.get_repo.side_effect = GithubException(404, {"message": "Not Found"}, None)
+            org.org = "students"
+            org.app = None
+            assert org.remove("students/Python-Apprentice-alice") is False
+            assert StudentFork.query.count() == 0
+            assert lookup_fork(None, cls.students[0], UPSTREAM) is None
+
+
+def test_v009_migration_upgrade_idempotent_and_downgrade():
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    from migrations.versions.v009_add_student_fork_table import downgrade, upgrade
+
+    engine = sa.create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT)"))
+
+    def run(fn):
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                fn()
+
+    run(upgrade)
+    run(upgrade)
+    cols = {c["name"] for c in sa.inspect(engine).get_columns("student_forks")}
+    assert {"user_id", "upstream_url", "org", "name"} <= cols
+    run(downgrade)
+    assert "student_forks" not in sa.inspect(engine).get_table_names()
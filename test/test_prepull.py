@@ -0,0 +1,99 @@
+"""
+Unit tests for node image pre-pull planning:
+
+    cspawn/cs_docker/prepull.py::image_layers / plan_waves
+    cspawn/cs_docker/prepull.py::parse_mirrors / mirror_ref
+    cspawn/cs_docker/prepull.py::pull_script / PullProgress
+
+Everything here is pure; `_prepull_images` itself is covered in
+test_node_provisioning_verify.py.
+
+Run with::
+
+    uv run pytest test/test_prepull.py -v
+"""
+from __future__ import annotations
+
+import json
+
+from cspawn.cs_docker.prepull import (
+    PullProgress,
+    image_layers,
+    mirror_ref,
+    parse_inspect,
+    parse_mirrors,
+    plan_waves,
+    pull_script,
+)
+
+
+def _manifest(*digests, arch=None):
+    entry = {"SchemaV2Manifest": {"layers": [{"digest": d} for d in digests]}}
+    if arch:
+        entry["Descriptor"] = {"platform": {"architecture": arch, "os": "linux"}}
+    return entry
+
+
+class TestLayers:
+    def test_single_and_multi_platform(self):
+        assert image_layers(json.dumps(_manifest("a", "b"))) == ["a", "b"]
+        multi = [_manifest("arm", arch="arm64"), _manifest("x86", arch="amd64")]
+        assert image_layers(json.dumps(multi)) == ["x86"]
+        assert image_layers("") == []
+        assert image_layers("no such manifest") == []
+
+    def test_parse_inspect(self):
+        out = "@@ img:a\n" + json.dumps(_manifest("l1")) + "\n@@ img:b\n\n"
+        assert parse_inspect(out) == {"img:a": ["l1"], "img:b": []}
+
+
+class TestPlanWaves:
+    def test_family_leader_first_then_followers(self):
+        layers = {
+            "java": ["base", "jdk", "java"],
+            "python": ["base", "py"],
+            "kotlin": ["base", "jdk", "kt"],
+            "solo": ["other"],
+        }
+        waves = plan_waves(["python", "java", "kotlin", "solo", "unknown"], layers)
+        assert waves == [["java", "solo", "unknown"], ["kotlin", "python"]]
+
+    def test_unrelated_or_unknown_images_single_wave(self):
+        assert plan_waves(["a", "b"], {"a": ["x"], "b": ["y"]}) == [["a", "b"]]
+        assert plan_waves(["a", "b"], {}) == [["a", "b"]]
+        assert plan_waves([], {}) == []
+
+
+class TestMirrors:
+    def test_parse_and_map(self):
+        mirrors = parse_mirrors("ghcr.io=10.124.0.2:5000/, docker.io=hub.local bogus")
+        assert mirrors == {"ghcr.io": "10.124.0.2:5000", "docker.io": "hub.local"}
+        assert mirror_ref("ghcr.io/org/img:1", mirrors) == "10.124.0.2:5000/org/img:1"
+        assert mirror_ref("python:3.12", mirrors) == "hub.local/library/python:3.12"
+        assert mirror_ref("quay.io/x/y", mirrors) is None
+        assert parse_mirrors(None) == {}
+
+
+class TestPullScript:
+    def test_waves_bounded_and_mirrored(self):
+        script = pull_script([["a:1"], ["ghcr.io/o/b:1"]], concurrency=2, timeout=300,
+                             mirrors={"ghcr.io": "m:5000"})
+        lines = script.splitlines()
+        assert lines.index("run a:1 ''") < lines.index("wait") < lines.index("run ghcr.io/o/b:1 m:5000/o/b:1")
+        assert "-ge 2 ]" in script and "timeout 300 docker pull" in script
+        assert lines[-1] == "echo PREPULL_DONE"
+
+
+class TestPullProgress:
+    def test_layer_progress_and_results(self):
+        p = PullProgress(layers={"img:a": ["l1", "l2"]})
+        assert p.feed("PROGRESS img:a l1: Pulling fs layer") is None
+        assert p.feed("PROGRESS img:a l1: Pull complete") == "img:a: layer 1/2 pull complete"
+        assert p.feed("PROGRESS img:a l2: Already exists") == "img:a: layer 2/2 already exists"
+        assert p.feed("PROGRESS img:b Status: Downloaded newer image for img:b") == (
+            "img:b: Status: Downloaded newer image for img:b"
+        )
+        assert p.feed("RESULT ok img:a 12 mirror") == "img:a: pulled (12 mirror)"
+        assert p.feed("RESULT fail img:b 300 exit=124") == "img:b: FAILED (300 exit=124)"
+        assert p.feed("PREPULL_DONE") is None
+        assert p.results == {"img:a": True, "img:b": False}
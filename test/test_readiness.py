@@ -0,0 +1,294 @@
+"""
+Unit tests for batch readiness probing:
+
+    cspawn/cs_docker/readiness.py::ReadinessProber.probe_all
+    cspawn/cs_docker/readiness.py::ReadinessProber.wait_all
+    cspawn/cs_docker/csmanager.py::CodeServerManager.sync (check_ready=True)
+    cspawn/cs_docker/readiness.py::ReadinessTracker
+    cspawn/cs_docker/readiness.py::host_ready_status / probe_cached
+
+HTTP is a fake session; sync runs against in-memory SQLite and a MagicMock
+snapshot, following test/test_swarm_snapshot.py.
+
+Run with::
+
+    uv run pytest test/test_readiness.py -v
+"""
+from __future__ import annotations
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import requests
+
+from cspawn.cs_docker.csmanager import CodeServerManager, CSMService
+from cspawn.cs_docker.readiness import ReadinessProber, ReadinessTracker, host_ready_status
+from cspawn.models import CodeHost, HostState
+
+
+class _FakeSession:
+    """Answers from a {url: status | Exception} map, tracking concurrency."""
+
+    def __init__(self, answers, delay=0.0):
+        self.answers = answers
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout):
+        with self._lock:
+            self.calls.append((url, timeout))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            a = self.answers[url]
+            if isinstance(a, Exception):
+                raise a
+            return SimpleNamespace(status_code=a)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class TestProbeAll:
+    def test_statuses_and_errors(self):
+        session = _FakeSession({
+            "https://a": 200,
+            "https://b": 302,
+            "https://c": 502,
+            "https://d": requests.exceptions.ConnectTimeout("slow"),
+        })
+        p = ReadinessProber(concurrency=4, timeout_s=3, session=session)
+        assert p.probe_all(["https://a", "https://b", "https://c", "https://d", None, "https://a"]) == {
+            "https://a": True, "https://b": True, "https://c": False, "https://d": False,
+        }
+        assert sorted(u for u, _ in session.calls) == ["https://a", "https://b", "https://c", "https://d"]
+        assert all(t == 3 for _, t in session.calls)
+
+    def test_runs_concurrently_within_cap(self):
+        urls = [f"https://h{i}" for i in range(12)]
+        session = _FakeSession({u: 200 for u in urls}, delay=0.05)
+        p = ReadinessProber(concurrency=4, session=session)
+        t0 = time.monotonic()
+        p.probe_all(urls)
+        assert session.max_in_flight == 4
+        assert time.monotonic() - t0 < 12 * 0.05
+
+
+class TestWaitAll:
+    def test_reprobes_only_pending_until_ready(self):
+        clock = SimpleNamespace(t=0.0)
+        rounds = iter([{"https://a": True, "https://b": False},
+                       {"https://b": True}])
+        p = ReadinessProber(session=MagicMock())
+        p.probe_all = MagicMock(side_effect=lambda urls: next(rounds))
+
+        def sleep(s):
+            clock.t += s
+
+        ready_at = p.wait_all(["https://a", "https://b"], timeout_s=30, interval_s=2,
+                              clock=lambda: clock.t, sleep=sleep)
+        assert ready_at == {"https://a": 0.0, "https://b": 2.0}
+        assert p.probe_all.call_args_list[1].args[0] == ["https://b"]
+
+    def test_gives_up_at_deadline(self):
+        clock = SimpleNamespace(t=0.0)
+        p = ReadinessProber(session=MagicMock())
+        p.probe_all = MagicMock(return_value={"https://a": False})
+
+        def sleep(s):
+            clock.t += s
+
+        assert p.wait_all(["https://a"], timeout_s=5, interval_s=2,
+                          clock=lambda: clock.t, sleep=sleep) == {}
+        assert p.probe_all.call_count == 4  # t = 0, 2, 4, 5
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-readiness-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _fake_service(i):
+    s = MagicMock(spec=CSMService)
+    s.id = f"svc{i}"
+    s.name = f"h{i}"
+    s.public_url = f"https://h{i}"
+    s.labels = {"jtl.codeserver.username": "u"}
+    s.model_kwargs.return_value = dict(user_id=1, service_id=s.id, service_name=s.name,
+                                       state=HostState.RUNNING.value)
+    return s
+
+
+class TestSyncBatchesProbes:
+    def test_one_batch_feeds_db_update(self):
+        from cspawn.models import User
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            db.session.add(User(id=1, user_id="uid-u", username="u"))
+            for i in range(3):
+                db.session.add(CodeHost(user_id=1, service_id=f"svc{i}", service_name=f"h{i}",
+                                        state=HostState.RUNNING.value, app_state=HostState.UNKNOWN.value))
+            db.session.commit()
+
+            csm = CodeServerManager.__new__(CodeServerManager)
+            services = {f"svc{i}": _fake_service(i) for i in range(3)}
+            snapshot = MagicMock()
+            snapshot.service_ids = set(services)
+            csm.from_snapshot = lambda snap, sid: services.get(sid)
+            prober = MagicMock()
+            prober.probe_all.return_value = {"https://h0": True, "https://h1": False}
+            csm._prober = prober
+
+            csm.sync(check_ready=True, snapshot=snapshot)
+
+            prober.probe_all.assert_called_once()
+            assert sorted(prober.probe_all.call_args.args[0]) == ["https://h0", "https://h1", "https://h2"]
+            app_state = dict(db.session.query(CodeHost.service_id, CodeHost.app_state))
+            assert app_state == {"svc0": HostState.READY.value, "svc1": HostState.UNKNOWN.value,
+                                 "svc2": HostState.UNKNOWN.value}
+
+    def test_no_probe_without_check_ready(self):
+        from cspawn.models import User
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            db.session.add(User(id=1, user_id="uid-u", username="u"))
+            db.session.add(CodeHost(user_id=1, service_id="svc0", service_name="h0",
+                                    state=HostState.UNKNOWN.value, app_state=HostState.UNKNOWN.value))
+            db.session.commit()
+
+            csm = CodeServerManager.__new__(CodeServerManager)
+            s = _fake_service(0)
+            snapshot = MagicMock()
+            snapshot.service_ids = {"svc0"}
+            csm.from_snapshot = lambda snap, sid: s
+            csm._prober = MagicMock()
+
+            stats = csm.sync(snapshot=snapshot)
+
+            csm._prober.probe_all.assert_not_called()
+            assert stats.updated == 1
+            assert CodeHost.query.one().state == HostState.RUNNING.value
+
+
+def _seed_hosts(db, specs):
+    """specs: [(service_id, state, app_state)]; user i+1 owns host i."""
+    from cspawn.models import User
+
+    for i, (sid, state, app_state) in enumerate(specs, start=1):
+        db.session.add(User(id=i, user_id=f"uid-{i}", username=f"u{i}"))
+        db.session.add(CodeHost(user_id=i, service_id=sid, service_name=sid, public_url=f"https://{sid}",
+                                state=state, app_state=app_state))
+    db.session.commit()
+
+
+class TestReadinessTracker:
+    def test_probes_starting_hosts_once_and_marks_ready(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_hosts(db, [
+                ("a", HostState.RUNNING.value, HostState.UNKNOWN.value),
+                ("b", HostState.RUNNING.value, HostState.UNKNOWN.value),
+                ("done", HostState.RUNNING.value, HostState.READY.value),
+                ("gone", HostState.MIA.value, HostState.MIA.value),
+            ])
+            prober = MagicMock()
+            prober.probe_all.return_value = {"https://a": True, "https://b": False}
+            tracker = ReadinessTracker(prober, interval_s=2.0, clock=lambda: 0.0)
+
+            assert tracker.track() == 1
+            assert sorted(prober.probe_all.call_args.args[0]) == ["https://a", "https://b"]
+            app_state = dict(db.session.query(CodeHost.service_id, CodeHost.app_state))
+            assert app_state["a"] == HostState.READY.value
+            assert app_state["b"] == HostState.UNKNOWN.value
+
+    def test_one_pass_per_interval(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_hosts(db, [("a", HostState.RUNNING.value, HostState.UNKNOWN.value)])
+            prober = MagicMock()
+            prober.probe_all.return_value = {}
+            clock = SimpleNamespace(t=0.0)
+            tracker = ReadinessTracker(prober, interval_s=2.0, clock=lambda: clock.t)
+
+            tracker.track()
+            clock.t = 1.0
+            tracker.track()
+            clock.t = 2.5
+            tracker.track()
+            assert prober.probe_all.call_count == 2
+
+    def test_stops_following_after_ttl(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_hosts(db, [("a", HostState.RUNNING.value, HostState.UNKNOWN.value)])
+            prober = MagicMock()
+            prober.probe_all.return_value = {}
+            clock = SimpleNamespace(t=0.0)
+            tracker = ReadinessTracker(prober, interval_s=1.0, ttl_s=10.0, clock=lambda: clock.t)
+
+            tracker.track()
+            clock.t = 11.0
+            tracker.track()
+            assert prober.probe_all.call_count == 1
+
+
+class TestHostReadyStatus:
+    def test_ready_row_answers_without_probing(self, tmp_path, monkeypatch):
+        app, db = _make_flask_app()
+        prober = MagicMock()
+        monkeypatch.setattr("cspawn.cs_docker.readiness.default_prober", lambda: prober)
+        with app.app_context():
+            _seed_hosts(db, [("st-ready", HostState.RUNNING.value, HostState.READY.value)])
+            status = host_ready_status(CodeHost.query.one(), {"DATA_DIR": str(tmp_path)})
+            assert status == {"status": "ready", "hostname_url": "https://st-ready"}
+            prober.probe.assert_not_called()
+
+    def test_live_watcher_means_row_is_authoritative(self, tmp_path, monkeypatch):
+        app, db = _make_flask_app()
+        prober = MagicMock()
+        monkeypatch.setattr("cspawn.cs_docker.readiness.default_prober", lambda: prober)
+        (tmp_path / ".watcher_heartbeat").touch()
+        with app.app_context():
+            _seed_hosts(db, [("st-live", HostState.RUNNING.value, HostState.UNKNOWN.value)])
+            assert host_ready_status(CodeHost.query.one(), {"DATA_DIR": str(tmp_path)}) == {"status": "not_ready"}
+            prober.probe.assert_not_called()
+
+    def test_without_watcher_probes_once_per_interval_and_records_ready(self, tmp_path, monkeypatch):
+        app, db = _make_flask_app()
+        prober = MagicMock()
+        prober.probe.side_effect = [False, True]
+        monkeypatch.setattr("cspawn.cs_docker.readiness.default_prober", lambda: prober)
+        cfg = {"DATA_DIR": str(tmp_path), "READY_TRACK_INTERVAL_S": "60"}
+        with app.app_context():
+            _seed_hosts(db, [("st-nowatch", HostState.RUNNING.value, HostState.UNKNOWN.value)])
+            host = CodeHost.query.one()
+            assert host_ready_status(host, cfg)["status"] == "not_ready"
+            assert host_ready_status(host, cfg)["status"] == "not_ready"  # cached
+            assert prober.probe.call_count == 1
+
+            cfg["READY_TRACK_INTERVAL_S"] = "0"
+            assert host_ready_status(host, cfg)["status"] == "ready"
+            assert CodeHost.query.one().app_state == HostState.READY.value
+
+    def test_mia_host_is_an_error(self, tmp_path):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_hosts(db, [("st-mia", HostState.MIA.value, HostState.MIA.value)])
+            assert host_ready_status(CodeHost.query.one(), {"DATA_DIR": str(tmp_path)})["status"] == "error"
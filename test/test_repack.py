@@ -0,0 +1,159 @@
+"""
+Unit tests for repacking idle hosts off sparse nodes:
+
+    cspawn/cs_docker/repack.py::plan_repack
+    cspawn/cs_docker/repack.py::apply_repack / run_repack_cycle / repack_due
+    cspawn/cs_docker/autoscale.py::protected_node_fqdns
+
+Nodes are raw Swarm attr dicts; the apply tests use a fake snapshot and an
+in-memory SQLite app.
+
+Run with::
+
+    uv run pytest test/test_repack.py -v
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from cspawn.cs_docker.autoscale import protected_node_fqdns
+from cspawn.cs_docker.repack import RepackHost, apply_repack, plan_repack, repack_due, run_repack_cycle
+
+NOW = datetime(2026, 10, 5, 20, 0, tzinfo=timezone.utc)
+CFG = {
+    "NODE_TIERS": json.dumps([
+        {"name": "small", "slug": "s-4vcpu-8gb-amd", "capacity": 6, "price_hourly": 0.063},
+        {"name": "large", "slug": "s-8vcpu-16gb-amd", "capacity": 14, "price_hourly": 0.125},
+    ]),
+}
+
+
+def _attrs(hostname: str, capacity: int = 6, slug: str = "s-4vcpu-8gb-amd") -> dict:
+    return {
+        "ID": hostname.split(".")[0],
+        "Spec": {"Role": "worker", "Availability": "active",
+                 "Labels": {"cs.capacity": str(capacity), "cs.size_slug": slug}},
+        "Description": {"Hostname": hostname, "Resources": {"MemoryBytes": 16 * 1024**3, "NanoCPUs": 8 * 10**9}},
+        "Status": {"State": "ready"},
+    }
+
+
+def _hosts(node: str, n: int, *, quiescent: bool = True, prefix: str = "") -> list[RepackHost]:
+    return [RepackHost(f"{prefix or node}-u{i}", f"{prefix or node}-s{i}", node, quiescent) for i in range(n)]
+
+
+NODES = [_attrs("swarm2.x"), _attrs("swarm3.x"), _attrs("swarm4.x")]
+
+
+class TestPlanRepack:
+    def test_sparse_idle_nodes_empty_onto_the_fullest(self):
+        hosts = _hosts("swarm2", 3) + _hosts("swarm3", 1) + _hosts("swarm4", 2)
+        plan = plan_repack(NODES, hosts, CFG)
+
+        assert plan.emptied == ["swarm3.x", "swarm4.x"]
+        assert [(h.node, t) for h, t in plan.moves] == [
+            ("swarm3", "swarm2.x"), ("swarm4", "swarm2.x"), ("swarm4", "swarm2.x"),
+        ]
+        assert plan.saving_hourly == 0.126
+        assert "emptied=['swarm3.x', 'swarm4.x'] saving_hourly=0.126" in plan.summary()
+
+    def test_active_hosts_protected_nodes_and_full_targets_block(self):
+        active = _hosts("swarm2", 4) + _hosts("swarm3", 1, quiescent=False)
+        assert plan_repack(NODES[:2], active, CFG).moves == []
+
+        idle = _hosts("swarm2", 4) + _hosts("swarm3", 1)
+        assert plan_repack(NODES[:2], idle, CFG, frozenset({"swarm3.x"})).moves == []
+
+        # swarm2 is full, and swarm4 is no fuller than swarm3.
+        crowded = _hosts("swarm2", 6) + _hosts("swarm3", 1) + _hosts("swarm4", 1)
+        plan = plan_repack(NODES, crowded, CFG)
+        assert plan.emptied == ["swarm4.x"] and [t for _, t in plan.moves] == ["swarm3.x"]
+
+    def test_move_budget_is_per_whole_node(self):
+        hosts = _hosts("swarm2", 3) + _hosts("swarm3", 2) + _hosts("swarm4", 2)
+        plan = plan_repack(NODES, hosts, {**CFG, "AUTOSCALE_REPACK_MAX_MOVES": "3"})
+        assert plan.emptied == ["swarm4.x"] and len(plan.moves) == 2
+        assert plan_repack(NODES, hosts, CFG, max_moves=1).moves == []
+
+
+def test_protected_node_fqdns_accepts_short_and_fqdn_node_names():
+    classes = [{"id": 1, "purge_after": NOW + timedelta(hours=1)}, {"id": 2, "purge_after": NOW - timedelta(hours=1)}]
+    hosts = [{"class_id": 1, "node_name": "swarm2"}, {"class_id": 1, "node_name": "swarm3.x"},
+             {"class_id": 2, "node_name": "swarm4.x"}, {"class_id": 1, "node_name": None}]
+    assert protected_node_fqdns(NODES, classes, hosts, NOW) == {"swarm2.x", "swarm3.x"}
+
+
+def _app_with_hosts(*service_ids: str):
+    from flask import Flask
+
+    from cspawn.models import CodeHost, User, db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-repack"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(user_id="uid-r", username="r")
+        db.session.add(user)
+        db.session.flush()
+        for sid in service_ids:
+            db.session.add(CodeHost(user_id=user.id, service_id=sid, service_name=sid, node_name="swarm3.x"))
+        db.session.commit()
+    return app
+
+
+class TestApply:
+    def test_moves_push_then_pin_and_record_node(self):
+        from cspawn.models import CodeHost
+
+        app = _app_with_hosts("swarm3-s0", "swarm3-s1")
+        plan = plan_repack(NODES[:2], _hosts("swarm2", 3) + _hosts("swarm3", 2), CFG)
+        snap = SimpleNamespace(services={"swarm3-s0": MagicMock(), "swarm3-s1": MagicMock()})
+        calls = []
+        with patch("cspawn.cs_github.repo.CodeHostRepo.new_codehostrepo",
+                   side_effect=lambda app, user: MagicMock(push=lambda: calls.append(("push", user)))), \
+             patch("cspawn.cli.node._pin_service_to_node",
+                   side_effect=lambda svc, fqdn: calls.append(("pin", fqdn))):
+            result = apply_repack(app, snap, plan, dry_run=False)
+
+        assert result.moved == 2 and not result.failed
+        assert calls == [("push", "swarm3-u0"), ("pin", "swarm2.x"), ("push", "swarm3-u1"), ("pin", "swarm2.x")]
+        with app.app_context():
+            assert {h.node_name for h in CodeHost.query.all()} == {"swarm2.x"}
+
+    def test_cycle_is_rate_limited_and_starts_cooldown(self, tmp_path):
+        cfg = {**CFG, "AUTOSCALE_REPACK": "true", "DATA_DIR": str(tmp_path)}
+        plan = plan_repack(NODES[:2], _hosts("swarm2", 3) + _hosts("swarm3", 1), CFG)
+        empty_since: dict = {}
+        kwargs = dict(node_dicts=NODES[:2], protected=frozenset(), empty_since=empty_since, dry_run=False)
+
+        with patch("cspawn.cs_docker.snapshot.SwarmSnapshot.build"), \
+             patch("cspawn.cs_docker.repack.gather_repack_hosts"), \
+             patch("cspawn.cs_docker.repack.plan_repack", return_value=plan), \
+             patch("cspawn.cs_docker.repack.apply_repack",
+                   side_effect=lambda app, snap, plan, dry_run: SimpleNamespace(failed=set(), plan=plan)):
+            assert run_repack_cycle(None, None, cfg, now=NOW, **kwargs) is not None
+            assert empty_since == {"swarm3.x": NOW}
+            assert not repack_due(str(tmp_path), cfg, NOW + timedelta(minutes=10))
+            assert run_repack_cycle(None, None, cfg, now=NOW + timedelta(minutes=10), **kwargs) is None
+            assert repack_due(str(tmp_path), cfg, NOW + timedelta(minutes=20))
+            assert run_repack_cycle(None, None, CFG, now=NOW + timedelta(hours=1), **kwargs) is None  # off
+
+    def test_cycle_without_moves_still_waits_out_the_interval(self, tmp_path):
+        cfg = {**CFG, "AUTOSCALE_REPACK": "true", "DATA_DIR": str(tmp_path)}
+        kwargs = dict(node_dicts=NODES[:2], protected=frozenset(), empty_since={}, dry_run=False)
+
+        with patch("cspawn.cs_docker.snapshot.SwarmSnapshot.build") as build, \
+             patch("cspawn.cs_docker.repack.gather_repack_hosts", return_value=[]), \
+             patch("cspawn.cs_docker.repack.apply_repack") as apply:
+            result = run_repack_cycle(None, None, cfg, now=NOW, **kwargs)
+            assert result is not None and not result.plan.moves
+            assert run_repack_cycle(None, None, cfg, now=NOW + timedelta(minutes=10), **kwargs) is None
+
+        assert build.call_count == 1
+        apply.assert_not_called()
+        assert repack_due(str(tmp_path), cfg, NOW + timedelta(minutes=20))
@@ -377,6 +377,7 @@ class TestHostPurgeSelectsStaleNodeMiaRow:
                 )
 
             app.csm.stop_host.side_effect = _stop_host
+            app.csm.stop_hosts.side_effect = lambda hosts, **kw: [app.csm.stop_host(ch, **kw) for ch in hosts]
 
             with patch("cspawn.cli.host.get_app", return_value=app):
                 result = CliRunner().invoke(host_purge_cmd, [], catch_exceptions=False)
@@ -0,0 +1,324 @@
+"""
+Unit tests for the warm standby pool:
+
+    cspawn/cs_docker/standby.py::StandbyPool.claim
+    cspawn/cs_docker/standby.py::StandbyPool.target_sizes
+    cspawn/cs_docker/standby.py::StandbyPool.refill
+    cspawn/cs_docker/standby.py::latency_report
+    cspawn/cs_docker/csmanager.py::CodeServerManager._new_cs_inner (claim path)
+    migrations/versions/v010_add_start_job_path.py
+
+Docker objects are MagicMocks and the DB is in-memory SQLite, following
+test/test_csmanager_pin.py.
+
+Run with::
+
+    uv run pytest test/test_standby.py -v
+"""
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import docker.errors
+import sqlalchemy as sa
+
+from cspawn.cs_docker.csmanager import CodeServerManager, CSMService
+from cspawn.cs_docker.standby import (
+    STANDBY_LABEL,
+    STANDBY_PROTO_LABEL,
+    StandbyPool,
+    latency_report,
+    pinned_node,
+)
+from cspawn.models import ClassProto, CodeHost, User
+from cspawn.util.config import Config
+
+NOW = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-standby-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _make_manager(app, **cfg):
+    csm = CodeServerManager.__new__(CodeServerManager)
+    csm.app = app
+    csm.config = Config({
+        "HOSTNAME_TEMPLATE": "{username}.example.com",
+        "USER_DIRS": "",
+        "PIN_HOSTS_TO_NODE": True,
+        **cfg,
+    })
+    csm.client = MagicMock()
+    csm._docker_sem = threading.BoundedSemaphore(4)
+    return csm
+
+
+def _standby(name, proto_id, node="swarm2.example.com", created="2026-10-17T00:00:00"):
+    raw = MagicMock()
+    raw.name = name
+    raw.id = f"id-{name}"
+    raw.attrs = {"Spec": {
+        "Name": name,
+        "Labels": {STANDBY_LABEL: "true", STANDBY_PROTO_LABEL: str(proto_id),
+                   "jtl.standby.created": created},
+        "TaskTemplate": {"Placement": {"Constraints": ["node.role==worker",
+                                                       f"node.hostname=={node}"]}},
+    }}
+    return raw
+
+
+def _container_def(username="alice"):
+    return {
+        "name": username,
+        "image": "img",
+        "labels": {"jtl.codeserver": "true", "jtl.codeserver.username": username,
+                   "caddy": f"{username}.example.com"},
+        "environment": {"JTL_USERNAME": username, "PASSWORD": "pw"},
+        "mounts": [f"/users/{username}:/workspace"],
+    }
+
+
+def _node(hostname, role="worker", capacity=None):
+    n = MagicMock()
+    n.id = f"n-{hostname}"
+    labels = {"cs.capacity": str(capacity)} if capacity is not None else {}
+    n.attrs = {"Spec": {"Role": role, "Availability": "active", "Labels": labels},
+               "Status": {"State": "ready"},
+               "Description": {"Hostname": hostname}}
+    return n
+
+
+def _task(service_id, node_id):
+    return {"ID": f"t-{service_id}", "ServiceID": service_id, "NodeID": node_id,
+            "DesiredState": "running", "Status": {"State": "running"}}
+
+
+class TestClaim:
+    def test_claim_relabels_oldest_standby_in_one_update(self):
+        app, db = _make_flask_app()
+        csm = _make_manager(app)
+        old = _standby("standby-1-old", 1, created="2026-10-16T00:00:00")
+        new = _standby("standby-1-new", 1)
+        csm.client.services.list.return_value = [new, old]
+
+        s = StandbyPool(csm).claim(MagicMock(id=1), _container_def())
+
+        assert isinstance(s, CSMService) and s.o is old
+        old.update.assert_called_once_with(
+            labels=_container_def()["labels"],
+            env=_container_def()["environment"],
+            mounts=["/users/alice:/workspace"],
+        )
+        new.update.assert_not_called()
+        csm.client.services.list.assert_called_once_with(filters={"label": f"{STANDBY_PROTO_LABEL}=1"})
+
+    def test_lost_race_tries_next(self):
+        app, db = _make_flask_app()
+        csm = _make_manager(app)
+        a = _standby("standby-1-a", 1, created="1")
+        b = _standby("standby-1-b", 1, created="2")
+        a.update.side_effect = docker.errors.APIError("update out of sequence")
+        csm.client.services.list.return_value = [a, b]
+
+        s = StandbyPool(csm).claim(MagicMock(id=1), _container_def())
+        assert s.o is b
+
+    def test_already_claimed_is_skipped_and_empty_pool_returns_none(self):
+        app, db = _make_flask_app()
+        csm = _make_manager(app)
+        a = _standby("standby-1-a", 1)
+        a.reload.side_effect = lambda: a.attrs["Spec"].__setitem__("Labels", {"jtl.codeserver": "true"})
+        csm.client.services.list.return_value = [a]
+
+        assert StandbyPool(csm).claim(MagicMock(id=1), _container_def()) is None
+        a.update.assert_not_called()
+
+    def test_pinned_node(self):
+        assert pinned_node(_standby("s", 1, node="swarm4.example.com")) == "swarm4.example.com"
+
+
+def _seed_class(db, n_students, n_started, *, purge_after, purge_by):
+    from cspawn.models import Class
+
+    proto = ClassProto(name="p", hash="h", image_uri="img:1")
+    db.session.add(proto)
+    db.session.flush()
+    cls = Class(name="c", proto_id=proto.id, purge_after=purge_after, purge_by=purge_by,
+                start_date=NOW)
+    for i in range(n_students):
+        u = User(user_id=f"uid-{i}", username=f"s{i}", is_active=True, is_student=True)
+        cls.students.append(u)
+    db.session.add(cls)
+    db.session.flush()
+    for u in cls.students[:n_started]:
+        db.session.add(CodeHost(user_id=u.id, service_id=f"svc-{u.id}", service_name=u.username))
+    db.session.commit()
+    return proto
+
+
+class TestSizingAndRefill:
+    def test_target_from_unstarted_roster(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            proto = _seed_class(db, 10, 2, purge_after=NOW + timedelta(minutes=10),
+                                purge_by=NOW + timedelta(hours=2))
+            pool = StandbyPool(_make_manager(app, STANDBY_FRACTION=0.2, STANDBY_MAX_PER_PROTO=5))
+            assert pool.target_sizes(NOW) == {proto.id: 2}  # ceil(8 * 0.2)
+            # Window opens beyond the lead time: nothing wanted yet.
+            assert pool.target_sizes(NOW - timedelta(hours=2)) == {}
+
+    def test_refill_places_on_emptiest_worker_and_removes_surplus(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            proto = _seed_class(db, 10, 0, purge_after=NOW, purge_by=NOW + timedelta(hours=2))
+            csm = _make_manager(app, STANDBY_FRACTION=0.2)
+            stray = _standby("standby-99-x", 99)
+
+            def services_list(filters):
+                label = filters["label"]
+                if label == STANDBY_LABEL:
+                    return [stray]
+                return []
+
+            csm.client.services.list.side_effect = services_list
+            csm.client.nodes.list.return_value = [
+                _node("swarm1.example.com", role="manager"),
+                _node("swarm2.example.com", capacity=6),
+                _node("swarm3.example.com", capacity=6),
+            ]
+            csm.client.api.tasks.side_effect = lambda filters: (
+                [_task("busy1", "n-swarm2.example.com"), _task("busy2", "n-swarm2.example.com")]
+                if filters["label"] == "jtl.codeserver" else []
+            )
+            csm.run = MagicMock(side_effect=lambda **spec: MagicMock(name=spec["name"]))
+
+            result = StandbyPool(csm).refill(now=NOW)
+
+            assert result.targets == {proto.id: 2}
+            assert result.removed == ["standby-99-x"]
+            stray.remove.assert_called_once()
+            nodes = [node for _, node, _ in result.created]
+            assert nodes[0] == "swarm3.example.com"
+            spec = csm.run.call_args_list[0].kwargs
+            assert "node.hostname==swarm3.example.com" in spec["constraints"]
+            assert "jtl.codeserver" not in spec["labels"]
+            assert spec["labels"][STANDBY_PROTO_LABEL] == str(proto.id)
+
+    def test_refill_reports_no_capacity(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_class(db, 10, 0, purge_after=NOW, purge_by=NOW + timedelta(hours=2))
+            csm = _make_manager(app, STANDBY_FRACTION=0.2)
+            csm.client.services.list.return_value = []
+            csm.client.nodes.list.return_value = [_node("swarm2.example.com", capacity=0)]
+            csm.client.api.tasks.return_value = []
+            csm.run = MagicMock()
+            result = StandbyPool(csm).refill(now=NOW)
+            assert result.no_capacity == 2
+            csm.run.assert_not_called()
+
+
+class TestNewCsInnerClaim:
+    def _run(self, app, db, claim_result):
+        user = User(user_id="uid-a", username="alice", is_active=True)
+        proto = ClassProto(name="p", hash="h", image_uri="img:1",
+                           repo_uri="https://github.com/example/repo.git")
+        db.session.add_all([user, proto])
+        db.session.commit()
+
+        csm = _make_manager(app)
+        csm.standby = MagicMock()
+        csm.standby.claim.return_value = claim_result
+        cold = MagicMock()
+        cold.to_model.return_value = CodeHost(user_id=user.id, service_id="svc-cold",
+                                              service_name="alice", state="running")
+        csm.run = MagicMock(return_value=cold)
+        stages = []
+        with patch("cspawn.cs_docker.csmanager.define_cs_container",
+                   return_value=_container_def()), \
+             patch("cspawn.cli.node._resolve_task_node_fqdn", return_value="swarm9.example.com"), \
+             patch("cspawn.cli.node._pin_service_to_node") as pin:
+            s, ch = csm._new_cs_inner(user, proto, None, student_repo=MagicMock(),
+                                      progress=stages.append)
+        return csm, s, ch, stages, pin
+
+    def test_claimed_standby_skips_create_and_pin(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            claimed = MagicMock()
+            claimed.o = _standby("standby-1-a", 1, node="swarm2.example.com")
+            claimed.to_model.return_value = CodeHost(user_id=1, service_id="svc-warm",
+                                                     service_name="standby-1-a", state="running")
+            csm, s, ch, stages, pin = self._run(app, db, claimed)
+
+            assert s is claimed
+            assert stages == ["claim", "record"]
+            csm.run.assert_not_called()
+            pin.assert_not_called()
+            assert ch.node_name == "swarm2.example.com"
+            csm.standby.refill_async.assert_called_once()
+
+    def test_no_standby_falls_back_to_cold_start(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            csm, s, ch, stages, pin = self._run(app, db, None)
+            assert stages == ["claim", "create", "pin", "record"]
+            csm.run.assert_called_once()
+            assert ch.service_id == "svc-cold"
+
+
+class TestLatencyReport:
+    def test_groups_by_path(self):
+        from cspawn.models import StartJob, db
+
+        app, _ = _make_flask_app()
+        with app.app_context():
+            user = User(user_id="uid", username="u", is_active=True)
+            proto = ClassProto(name="p", hash="h", image_uri="i")
+            db.session.add_all([user, proto])
+            db.session.flush()
+            t = datetime.now(timezone.utc)
+            for path, secs in [("warm", 2), ("warm", 4), ("cold", 30)]:
+                db.session.add(StartJob(user_id=user.id, proto_id=proto.id, status="done",
+                                        path=path, started_at=t,
+                                        finished_at=t + timedelta(seconds=secs)))
+            db.session.commit()
+
+            r = latency_report()
+            assert r["warm"]["count"] == 2 and r["cold"]["count"] == 1
+            assert r["cold"]["p50_s"] == 30
+
+
+def test_v010_migration_adds_and_drops_path():
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    from migrations.versions.v010_add_start_job_path import downgrade, upgrade
+
+    engine = sa.create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE start_jobs (id VARCHAR(36) PRIMARY KEY)"))
+
+    def run(fn):
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                fn()
+
+    run(upgrade)
+    run(upgrade)
+    assert "path" in {c["name"] for c in sa.inspect(engine).get_columns("start_jobs")}
+    run(downgrade)
+    assert "path" not in {c["name"] for c in sa.inspect(engine).get_columns("start_jobs")}
@@ -0,0 +1,400 @@
+"""
+Unit tests for asynchronous host creation:
+
+    cspawn/cs_docker/startjobs.py::enqueue_start
+    cspawn/cs_docker/startjobs.py::claim_next_job
+    cspawn/cs_docker/startjobs.py::run_start_job
+    cspawn/cs_docker/startjobs.py::requeue_stale_jobs
+    cspawn/cs_docker/startjobs.py::StartWorkerPool (incl. heartbeats and the periodic sweep)
+    cspawn/models.py::Class.host_class_state ("starting" while a job is queued)
+    migrations/versions/v008_add_start_job_table.py
+    migrations/versions/v014_add_start_job_heartbeat.py
+
+`app.csm` is a MagicMock; the DB is in-memory SQLite, following
+test/test_host_watcher.py.
+
+Run with::
+
+    uv run pytest test/test_start_jobs.py -v
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import sqlalchemy as sa
+
+from cspawn.cs_docker.startjobs import (
+    StartWorkerPool,
+    claim_next_job,
+    enqueue_start,
+    requeue_stale_jobs,
+    run_start_job,
+)
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-start-jobs-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _seed(db, name="alice"):
+    from cspawn.models import Class, ClassProto, User
+
+    proto = ClassProto(name=f"Proto-{name}", image_uri="img:latest", hash=f"hash-{name}")
+    db.session.add(proto)
+    user = User(user_id=f"uid-{name}", email=f"{name}@example.com",
+                username=name, is_active=True, is_student=True)
+    db.session.add(user)
+    db.session.flush()
+    cls = Class(name=f"Class-{name}", proto_id=proto.id, running=True,
+                start_date=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    db.session.add(cls)
+    db.session.commit()
+    return user, proto, cls
+
+
+def _app_with_csm(flask_app):
+    csm = MagicMock()
+    csm.get_by_username.return_value = None
+    return SimpleNamespace(csm=csm, app_context=flask_app.app_context)
+
+
+class TestEnqueue:
+    def test_second_enqueue_returns_active_job(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            a = enqueue_start(user, proto, cls)
+            b = enqueue_start(user, proto, cls)
+            assert a.id == b.id
+            assert a.status == "queued"
+            assert a.class_id == cls.id
+
+    def test_new_job_after_previous_finished(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            a = enqueue_start(user, proto, cls)
+            a.status = "failed"
+            db.session.commit()
+            assert enqueue_start(user, proto, cls).id != a.id
+
+    def test_host_class_state_starting_while_queued(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            assert cls.host_class_state(user, None) == "stopped"
+            enqueue_start(user, proto, cls)
+            assert cls.host_class_state(user, None) == "starting"
+
+
+class TestClaim:
+    def test_claim_marks_running_once(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            job = enqueue_start(user, proto, cls)
+
+            claimed = claim_next_job("w/0")
+            assert claimed.id == job.id
+            assert claimed.status == "running"
+            assert claimed.worker == "w/0"
+            assert claimed.attempts == 1
+            assert claim_next_job("w/1") is None
+
+    def test_claim_oldest_first(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            u1, p1, c1 = _seed(db, "alice")
+            u2, p2, c2 = _seed(db, "bob")
+            first = enqueue_start(u1, p1, c1)
+            first.created_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+            db.session.commit()
+            enqueue_start(u2, p2, c2)
+            assert claim_next_job("w").id == first.id
+
+
+class TestRun:
+    def test_success_records_service_and_class(self):
+        flask_app, db = _make_flask_app()
+        app = _app_with_csm(flask_app)
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("w")
+
+            stages = []
+            ch = SimpleNamespace(class_id=None)
+
+            def new_cs(user, proto, class_, progress):
+                for st in ("fork", "create"):
+                    progress(st)
+                    stages.append(job.stage)
+                return SimpleNamespace(id="svc-1", name="alice"), ch
+
+            app.csm.new_cs.side_effect = new_cs
+            run_start_job(app, job)
+
+            assert stages == ["fork", "create"]
+            assert job.status == "done"
+            assert job.service_id == "svc-1"
+            assert job.finished_at is not None
+            assert ch.class_id == cls.id
+            assert cls.host_class_state(user, None) == "stopped"
+
+    def test_exception_marks_failed_with_stage(self):
+        flask_app, db = _make_flask_app()
+        app = _app_with_csm(flask_app)
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("w")
+
+            def new_cs(user, proto, class_, progress):
+                progress("fork")
+                raise RuntimeError("github said no")
+
+            app.csm.new_cs.side_effect = new_cs
+            run_start_job(app, job)
+
+            assert job.status == "failed"
+            assert "fork" in job.message and "github said no" in job.message
+
+    def test_none_service_marks_failed(self):
+        flask_app, db = _make_flask_app()
+        app = _app_with_csm(flask_app)
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("w")
+            app.csm.new_cs.return_value = (None, None)
+            run_start_job(app, job)
+            assert job.status == "failed"
+
+    def test_existing_service_is_adopted(self):
+        flask_app, db = _make_flask_app()
+        app = _app_with_csm(flask_app)
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("w")
+            svc = MagicMock(id="svc-old")
+            app.csm.get_by_username.return_value = svc
+
+            run_start_job(app, job)
+
+            svc.sync_to_db.assert_called_once_with(check_ready=True)
+            app.csm.new_cs.assert_not_called()
+            assert job.status == "done"
+            assert job.service_id == "svc-old"
+
+
+class TestStale:
+    def test_requeue_then_give_up(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("dead")
+            job.heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+            db.session.commit()
+
+            assert requeue_stale_jobs(stale_after_s=60, max_attempts=2) == 1
+            assert job.status == "queued"
+
+            job = claim_next_job("dead")
+            job.heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+            db.session.commit()
+            requeue_stale_jobs(stale_after_s=60, max_attempts=2)
+            assert job.status == "failed"
+
+    def test_fresh_heartbeat_keeps_long_job(self):
+        flask_app, db = _make_flask_app()
+        with flask_app.app_context():
+            user, proto, cls = _seed(db)
+            enqueue_start(user, proto, cls)
+            job = claim_next_job("slow")
+            job.started_at = datetime.now(timezone.utc) - timedelta(hours=1)
+            db.session.commit()
+
+            assert requeue_stale_jobs(stale_after_s=60) == 0
+            assert job.status == "running"
+
+
+def _file_app(tmp_path):
+    # File-backed DB: the worker threads need their own connections.
+    from flask import Flask
+    from cspawn.models import db
+
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path}/jobs.db"
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        db.create_all()
+    return flask_app
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestWorkerPool:
+    def test_pool_runs_queued_jobs(self, tmp_path):
+        from cspawn.models import StartJob, db
+
+        flask_app = _file_app(tmp_path)
+        with flask_app.app_context():
+            for name in ("alice", "bob", "carol"):
+                enqueue_start(*_seed(db, name))
+
+        ran = []
+
+        def on_job(app, job):
+            ran.append(job.id)
+            job.status = "done"
+            db.session.commit()
+
+        pool = StartWorkerPool(_app_with_csm(flask_app), workers=2,
+                               poll_interval_s=0.01, on_job=on_job)
+        pool.start()
+        _wait_for(lambda: pool.jobs_run >= 3)
+        pool.stop(timeout=2)
+
+        assert len(ran) == 3 and len(set(ran)) == 3
+        with flask_app.app_context():
+            assert StartJob.query.filter_by(status="done").count() == 3
+
+    def test_job_of_dead_worker_is_requeued_without_restart(self, tmp_path):
+        from cspawn.models import StartJob, db
+
+        flask_app = _file_app(tmp_path)
+        ran = []
+
+        def on_job(app, job):
+            ran.append(job.id)
+            job.status = "done"
+            db.session.commit()
+
+        pool = StartWorkerPool(_app_with_csm(flask_app), workers=1, poll_interval_s=0.01,
+                               heartbeat_s=0.05, stale_after_s=0.3, on_job=on_job)
+        pool.start()
+        try:
+            # Another worker process claimed this job after `pool` started,
+            # then was killed: its heartbeat never moves again.
+            with flask_app.app_context():
+                user, proto, cls = _seed(db)
+                now = datetime.now(timezone.utc)
+                job = StartJob(user_id=user.id, proto_id=proto.id, class_id=cls.id, status="running",
+                               stage="fork", worker="other:99/0", attempts=1,
+                               started_at=now, heartbeat_at=now)
+                db.session.add(job)
+                db.session.commit()
+                job_id = job.id
+            _wait_for(lambda: pool.jobs_run >= 1)
+        finally:
+            pool.stop(timeout=2)
+
+        assert ran == [job_id]
+        with flask_app.app_context():
+            job = db.session.get(StartJob, job_id)
+            assert (job.status, job.attempts) == ("done", 2)
+            assert job.worker.startswith(pool.name)
+
+    def test_running_job_keeps_its_heartbeat(self, tmp_path):
+        from cspawn.models import StartJob, db
+
+        flask_app = _file_app(tmp_path)
+        with flask_app.app_context():
+            enqueue_start(*_seed(db))
+        ran = []
+
+        def on_job(app, job):
+            ran.append(job.id)
+            time.sleep(1.0)  # several times stale_after_s
+            job.status = "done"
+            db.session.commit()
+
+        pool = StartWorkerPool(_app_with_csm(flask_app), workers=2, poll_interval_s=0.01,
+                               heartbeat_s=0.05, stale_after_s=0.3, on_job=on_job)
+        pool.start()
+        _wait_for(lambda: pool.jobs_run >= 1)
+        pool.stop(timeout=2)
+
+        assert len(ran) == 1
+        with flask_app.app_context():
+            job = StartJob.query.one()
+            assert (job.status, job.attempts) == ("done", 1)
+
+
+class TestMigration:
+    def _base_tables(self, conn):
+        for ddl in (
+            "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT)",
+            "CREATE TABLE classes (id INTEGER PRIMARY KEY AUTOINCREMENT)",
+            "CREATE TABLE class_proto (id INTEGER PRIMARY KEY AUTOINCREMENT)",
+        ):
+            conn.execute(sa.text(ddl))
+
+    def _run(self, engine, fn):
+        from alembic.operations import Operations
+        from alembic.runtime.migration import MigrationContext
+
+        with engine.begin() as conn:
+            ctx = MigrationContext.configure(conn)
+            with Operations.context(ctx):
+                fn()
+
+    def test_upgrade_is_idempotent_and_downgrade_drops(self):
+        from migrations.versions.v008_add_start_job_table import downgrade, upgrade
+
+        engine = sa.create_engine("sqlite:///:memory:")
+        with engine.begin() as conn:
+            self._base_tables(conn)
+
+        self._run(engine, upgrade)
+        self._run(engine, upgrade)
+        cols = {c["name"] for c in sa.inspect(engine).get_columns("start_jobs")}
+        assert {"id", "user_id", "class_id", "proto_id", "status", "stage",
+                "service_id", "attempts", "started_at"} <= cols
+
+        self._run(engine, downgrade)
+        assert "start_jobs" not in sa.inspect(engine).get_table_names()
+
+    def test_heartbeat_column_added_and_dropped(self):
+        from migrations.versions.v014_add_start_job_heartbeat import downgrade, upgrade
+
+        engine = sa.create_engine("sqlite:///:memory:")
+        with engine.begin() as conn:
+            conn.execute(sa.text("CREATE TABLE start_jobs (id VARCHAR(36) PRIMARY KEY)"))
+
+        self._run(engine, upgrade)
+        self._run(engine, upgrade)
+        assert "heartbeat_at" in {c["name"] for c in sa.inspect(engine).get_columns("start_jobs")}
+        self._run(engine, downgrade)
+        assert "heartbeat_at" not in {c["name"] for c in sa.inspect(engine).get_columns("start_jobs")}
+
+
+def test_deleting_user_deletes_their_jobs():
+    from cspawn.models import StartJob
+
+    flask_app, db = _make_flask_app()
+    with flask_app.app_context():
+        user, proto, cls = _seed(db)
+        enqueue_start(user, proto, cls)
+        db.session.delete(user)
+        db.session.commit()
+        assert StartJob.query.count() == 0
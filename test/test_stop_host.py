@@ -1,7 +1,7 @@
 """
 Unit tests for the push-on-stop orchestrator:
 
-    cspawn/cs_docker/csmanager.py::CodeServerManager.stop_host / remove_all
+    cspawn/cs_docker/csmanager.py::CodeServerManager.stop_host / stop_hosts / remove_all
     cspawn/cs_github/repo.py::CodeHostRepo.push / _get_service_container
 
 No live Docker, GitHub, or network access in any test here. Follows the
@@ -15,6 +15,8 @@ Run with::
 from __future__ import annotations
 
 import subprocess
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -326,12 +328,129 @@ class TestStopHost:
             assert result.deleted is False
 
 
+# ---------------------------------------------------------------------------
+# CodeServerManager.stop_hosts
+# ---------------------------------------------------------------------------
+
+def _make_hosts(app, db, n, *, node_name=None):
+    """`n` persisted hosts, optionally all on `node_name`. Returns their ids."""
+    from cspawn.models import CodeHost
+
+    ids = [_make_user_and_host(app, db)[1] for _ in range(n)]
+    with app.app_context():
+        for i, host_id in enumerate(ids):
+            CodeHost.query.get(host_id).node_name = node_name or f"node{i}"
+        db.session.commit()
+    return ids
+
+
+class _PeakCounter:
+    """A push side effect that records how many pushes ran at once."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return 0
+
+
+class TestStopHosts:
+    def test_runs_concurrently_up_to_global_bound(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        _make_hosts(app, db, 6)
+        csm = _make_manager(app)
+        counter = _PeakCounter()
+
+        with app.app_context():
+            csm.get = MagicMock(return_value=None)
+            hosts = CodeHost.query.order_by(CodeHost.id).all()
+            names = [h.service_name for h in hosts]
+            with patch.object(CodeHostRepo, "push", side_effect=counter):
+                results = csm.stop_hosts(hosts, concurrency=3)
+
+            assert counter.peak == 3
+            assert [r.service_name for r in results] == names
+            assert all(r.pushed and r.stopped and r.deleted for r in results)
+            assert CodeHost.query.count() == 0
+
+    def test_per_node_bound_limits_hosts_on_one_node(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        _make_hosts(app, db, 4, node_name="swarm3")
+        csm = _make_manager(app)
+        counter = _PeakCounter()
+
+        with app.app_context():
+            csm.get = MagicMock(return_value=None)
+            with patch.object(CodeHostRepo, "push", side_effect=counter):
+                csm.stop_hosts(CodeHost.query.all(), concurrency=4, per_node=1)
+
+        assert counter.peak == 1
+
+    def test_rows_deleted_in_one_commit(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        _make_hosts(app, db, 3)
+        csm = _make_manager(app)
+
+        with app.app_context():
+            csm.get = MagicMock(return_value=None)
+            with patch.object(db.session, "commit", wraps=db.session.commit) as commit:
+                csm.stop_hosts(CodeHost.query.all(), push=False)
+
+            assert commit.call_count == 1
+            assert CodeHost.query.count() == 0
+
+    def test_failed_bulk_commit_falls_back_to_one_row_at_a_time(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        _make_hosts(app, db, 3)
+        csm = _make_manager(app)
+        real_commit = db.session.commit
+        calls = []
+
+        def flaky_commit():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("deadlock detected")
+            return real_commit()
+
+        with app.app_context():
+            csm.get = MagicMock(return_value=None)
+            with patch.object(db.session, "commit", side_effect=flaky_commit):
+                results = csm.stop_hosts(CodeHost.query.all(), push=False)
+
+            assert len(calls) == 4
+            assert all(r.deleted for r in results)
+            assert CodeHost.query.count() == 0
+
+    def test_empty_batch_returns_empty_list(self):
+        app, db = _make_flask_app()
+        csm = _make_manager(app)
+
+        with app.app_context():
+            assert csm.stop_hosts([]) == []
+
+
 # ---------------------------------------------------------------------------
 # CodeServerManager.remove_all
 # ---------------------------------------------------------------------------
 
 class TestRemoveAll:
-    def test_remove_all_calls_stop_host_once_per_row(self):
+    def test_remove_all_stops_every_row_in_one_bulk_call(self):
         from cspawn.models import CodeHost
 
         app, db = _make_flask_app()
@@ -344,10 +463,11 @@ class TestRemoveAll:
             csm.get = MagicMock(return_value=None)
 
             with patch.object(CodeHostRepo, "push", return_value=0):
-                with patch.object(csm, "stop_host", wraps=csm.stop_host) as spy:
+                with patch.object(csm, "stop_hosts", wraps=csm.stop_hosts) as spy:
                     results = csm.remove_all()
 
-            assert spy.call_count == 3
+            spy.assert_called_once()
+            assert len(spy.call_args.args[0]) == 3
             assert len(results) == 3
             assert all(isinstance(r, StopResult) for r in results)
             assert CodeHost.query.count() == 0
@@ -0,0 +1,263 @@
+"""
+Unit tests for the batched Swarm snapshot:
+
+    cspawn/cs_docker/snapshot.py::SwarmSnapshot
+    cspawn/cs_docker/proc.py::Service (snapshot-backed tasks/nodes/placement)
+    cspawn/cs_docker/csmanager.py::CSMService.to_model() (snapshot path)
+    cspawn/cs_docker/csmanager.py::CodeServerManager.sync() (one snapshot/pass)
+    cspawn/cli/node.py::count_hosts_per_node(snapshot=...)
+
+Everything is mocked; the point is to verify that a snapshot-backed pass makes
+exactly one services/tasks/nodes listing and never calls per-service
+`tasks()`, per-task `nodes.get()` or the per-node SSH `_node_manager()`.
+
+Run with::
+
+    uv run pytest test/test_swarm_snapshot.py -v
+"""
+from __future__ import annotations
+
+import threading
+from unittest.mock import MagicMock
+
+from cspawn.cli.node import count_hosts_per_node
+from cspawn.cs_docker.csmanager import CodeServerManager, CSMService
+from cspawn.cs_docker.proc import Service
+from cspawn.cs_docker.snapshot import SwarmSnapshot, task_container_name
+from cspawn.models import HostState
+
+
+def _task(task_id, service_id, node_id, container_id, *, slot=1, state="running",
+          desired="running", ts="2024-01-01T00:00:00Z"):
+    status = {"State": state, "Timestamp": ts}
+    if container_id is not None:
+        status["ContainerStatus"] = {"ContainerID": container_id}
+    return {
+        "ID": task_id,
+        "ServiceID": service_id,
+        "NodeID": node_id,
+        "Slot": slot,
+        "DesiredState": desired,
+        "Status": status,
+    }
+
+
+def _raw_service(service_id, name, labels=None):
+    raw = MagicMock()
+    raw.id = service_id
+    raw.name = name
+    raw.attrs = {"Spec": {"Name": name, "Labels": labels or {}}}
+    return raw
+
+
+def _node(node_id, hostname):
+    node = MagicMock()
+    node.id = node_id
+    node.attrs = {"Description": {"Hostname": hostname}}
+    return node
+
+
+def _labels(username):
+    return {
+        "jtl.codeserver.username": username,
+        "jtl.codeserver.password": "pw",
+        "jtl.codeserver.public_url": "https://example.com/",
+        "jtl.codeserver.start_time": "2024-01-01T00:00:00-08:00",
+    }
+
+
+def _client(services, tasks, nodes):
+    client = MagicMock()
+    client.services.list.return_value = services
+    client.api.tasks.return_value = tasks
+    client.nodes.list.return_value = nodes
+    return client
+
+
+class TestSwarmSnapshotBuild:
+    def test_three_listings_and_indexes(self):
+        svc_a = _raw_service("svc-a", "alice")
+        svc_b = _raw_service("svc-b", "bob")
+        tasks = [
+            _task("t-a", "svc-a", "n1", "c-a"),
+            _task("t-b", "svc-b", "n2", "c-b"),
+        ]
+        client = _client([svc_a, svc_b], tasks,
+                         [_node("n1", "swarm1.example.com"), _node("n2", "swarm2.example.com")])
+
+        snap = SwarmSnapshot.build(client)
+
+        client.services.list.assert_called_once_with(filters={"label": "jtl.codeserver"})
+        client.api.tasks.assert_called_once_with(filters={"label": "jtl.codeserver"})
+        client.nodes.list.assert_called_once_with()
+        assert snap.service_ids == {"svc-a", "svc-b"}
+        assert [t["ID"] for t in snap.tasks_for("svc-a")] == ["t-a"]
+        assert snap.tasks_for("missing") == []
+        assert snap.node_name("n2") == "swarm2.example.com"
+        assert snap.node("gone") is None
+
+    def test_running_hosts_per_node_matches_count_hosts_per_node(self):
+        tasks = [
+            _task("t1", "s1", "n1", "c1"),
+            _task("t2", "s2", "n1", "c2"),
+            _task("t3", "s3", "n2", "c3"),
+            _task("t4", "s4", "n2", "c4", state="shutdown", desired="shutdown"),
+            _task("t5", "s5", "n-dead", "c5"),
+        ]
+        client = _client([], tasks,
+                         [_node("n1", "swarm1.example.com"), _node("n2", "swarm2.example.com")])
+        snap = SwarmSnapshot.build(client)
+
+        counts = count_hosts_per_node(client, snapshot=snap)
+
+        assert counts == {"swarm1": 2, "swarm2": 1, "n-dead": 1}
+        # The snapshot path never falls back to per-service tasks().
+        assert client.services.list.call_count == 1
+
+
+class TestSnapshotBackedService:
+    def _service(self, tasks, nodes, cls=Service, labels=None):
+        raw = _raw_service("svc-1", "alice", labels=labels)
+        client = _client([raw], tasks, nodes)
+        snap = SwarmSnapshot.build(client)
+        manager = MagicMock()
+        return cls(manager, raw, snapshot=snap), manager, raw
+
+    def test_tasks_and_node_missing_come_from_snapshot(self):
+        svc, manager, raw = self._service(
+            [_task("t1", "svc-1", "n-dead", "c1")],
+            [_node("n1", "swarm1.example.com")],
+        )
+
+        assert [t["ID"] for t in svc.container_tasks] == ["t1"]
+        assert svc.node_missing is True
+        raw.tasks.assert_not_called()
+        manager.client.nodes.list.assert_not_called()
+
+    def test_placement_resolves_without_node_inspect(self):
+        svc, manager, _ = self._service(
+            [
+                _task("t-old", "svc-1", "n1", "c-old", state="shutdown",
+                      desired="shutdown", ts="2024-01-01T00:00:00Z"),
+                _task("t-new", "svc-1", "n2", "c-new", slot=1, ts="2024-01-01T00:01:00Z"),
+            ],
+            [_node("n1", "swarm1.example.com"), _node("n2", "swarm2.example.com")],
+        )
+
+        p = svc.placement
+
+        assert p.task_id == "t-new"
+        assert p.container_id == "c-new"
+        assert p.container_name == "alice.1.t-new"
+        assert p.node_name == "swarm2.example.com"
+        manager._node_manager.assert_not_called()
+        manager.client.nodes.get.assert_not_called()
+
+    def test_placement_none_without_snapshot(self):
+        raw = _raw_service("svc-1", "alice")
+        assert Service(MagicMock(), raw).placement is None
+
+    def test_container_name_for_global_task_uses_node_id(self):
+        t = _task("t9", "svc", "node-xyz", "c9", slot=None)
+        assert task_container_name("svc", t) == "svc.node-xyz.t9"
+
+
+def _make_flask_app():
+    """Create a minimal in-memory Flask app wired to cspawn models."""
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-swarm-snapshot-secret"
+    app.config["TESTING"] = True
+
+    _db.init_app(app)
+
+    with app.app_context():
+        _db.create_all()
+
+    return app, _db
+
+
+def _make_user(db, username):
+    from cspawn.models import User
+
+    user = User(
+        user_id=f"uid-{username}",
+        email=f"{username}@example.com",
+        username=username,
+        is_active=True,
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+class TestSnapshotToModelAndSync:
+    def test_to_model_uses_snapshot_placement(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _make_user(db, "snapalice")
+            raw = _raw_service("svc-1", "snapalice", labels=_labels("snapalice"))
+            client = _client([raw], [_task("t1", "svc-1", "n1", "c1")],
+                             [_node("n1", "swarm1.example.com")])
+            snap = SwarmSnapshot.build(client)
+            manager = MagicMock()
+
+            m = CSMService(manager, raw, snapshot=snap).to_model()
+
+            assert m.container_id == "c1"
+            assert m.container_name == "snapalice.1.t1"
+            assert m.node_id == "n1"
+            assert m.node_name == "swarm1.example.com"
+            assert m.state == "running"
+            assert "app_state" not in m.__dict__
+            manager._node_manager.assert_not_called()
+
+    def test_to_model_marks_mia_when_snapshot_node_gone(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _make_user(db, "snapbob")
+            raw = _raw_service("svc-1", "snapbob", labels=_labels("snapbob"))
+            client = _client([raw], [_task("t1", "svc-1", "n-dead", "c1")], [])
+            snap = SwarmSnapshot.build(client)
+
+            m = CSMService(MagicMock(), raw, snapshot=snap).to_model()
+
+            assert m.state == HostState.MIA.value
+            assert m.app_state == HostState.MIA.value
+            assert m.container_id is None
+
+    def test_sync_builds_one_snapshot_and_never_gets_per_host(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            user = _make_user(db, "snapcarol")
+            db.session.add(CodeHost(service_id="svc-gone", service_name="gone",
+                                    user_id=user.id, state="running", app_state="ready"))
+            db.session.commit()
+
+            raw = _raw_service("svc-1", "snapcarol", labels=_labels("snapcarol"))
+            client = _client([raw], [_task("t1", "svc-1", "n1", "c1")],
+                             [_node("n1", "swarm1.example.com")])
+
+            mgr = CodeServerManager.__new__(CodeServerManager)
+            mgr.client = client
+            mgr._docker_sem = threading.BoundedSemaphore(4)
+            mgr.get = MagicMock()
+
+            mgr.sync()
+
+            mgr.get.assert_not_called()
+            client.services.list.assert_called_once()
+            client.api.tasks.assert_called_once()
+            client.nodes.list.assert_called_once()
+
+            gone = CodeHost.query.filter_by(service_id="svc-gone").first()
+            assert gone.state == HostState.MIA.value
+            new = CodeHost.query.filter_by(service_id="svc-1").first()
+            assert new is not None
+            assert new.node_name == "swarm1.example.com"
+            assert new.container_id == "c1"
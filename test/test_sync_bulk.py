@@ -0,0 +1,169 @@
+"""
+Unit tests for the diff-and-apply sync:
+
+    cspawn/cs_docker/csmanager.py::CodeServerManager.sync (bulk apply, fallback)
+    cspawn/cs_docker/csmanager.py::CSMService.model_kwargs (prefetched lookups)
+
+Docker is a MagicMock client behind a real `SwarmSnapshot`; the DB is
+in-memory SQLite with a statement counter, so the tests can check that a pass
+issues a fixed number of statements however many hosts change.
+
+Run with::
+
+    uv run pytest test/test_sync_bulk.py -v
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import event
+
+from cspawn.cs_docker.csmanager import CodeServerManager, CSMService
+from cspawn.models import Class, ClassProto, CodeHost, HostState, User
+
+
+def _make_flask_app():
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-sync-bulk-secret"
+    app.config["TESTING"] = True
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _raw_service(n, class_id=None):
+    raw = MagicMock()
+    raw.id = f"svc-{n}"
+    raw.name = f"user{n}"
+    labels = {
+        "jtl.codeserver": "true",
+        "jtl.codeserver.username": f"user{n}",
+        "jtl.codeserver.password": "pw",
+        "jtl.codeserver.public_url": f"https://user{n}.example.com/",
+        "jtl.codeserver.start_time": "2026-01-01T00:00:00-08:00",
+    }
+    if class_id is not None:
+        labels["jtl.codeserver.class_id"] = str(class_id)
+    raw.attrs = {"Spec": {"Name": raw.name, "Labels": labels}}
+    return raw
+
+
+def _task(n, node_id="n1"):
+    return {"ID": f"t-{n}", "ServiceID": f"svc-{n}", "NodeID": node_id, "Slot": 1,
+            "DesiredState": "running",
+            "Status": {"State": "running", "Timestamp": "2026-01-01T00:00:00Z",
+                       "ContainerStatus": {"ContainerID": f"c-{n}"}}}
+
+
+def _manager(services, tasks):
+    node = MagicMock()
+    node.id = "n1"
+    node.attrs = {"Description": {"Hostname": "swarm1.example.com"}}
+    client = MagicMock()
+    client.services.list.return_value = services
+    client.api.tasks.return_value = tasks
+    client.nodes.list.return_value = [node]
+
+    mgr = CodeServerManager.__new__(CodeServerManager)
+    mgr.client = client
+    mgr._docker_sem = threading.BoundedSemaphore(4)
+    return mgr
+
+
+@contextmanager
+def _count_statements(db):
+    seen = []
+
+    def before(conn, cursor, statement, *args):
+        seen.append(statement.split()[0].upper())
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", before)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+
+
+def _seed_users(db, n):
+    db.session.add(User(id=0, user_id="root", username="root"))
+    for i in range(n):
+        db.session.add(User(user_id=f"uid-{i}", username=f"user{i}", is_active=True))
+    db.session.commit()
+
+
+class TestBulkApply:
+    def test_statement_count_is_independent_of_host_count(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_users(db, 20)
+            proto = ClassProto(name="p", hash="h", image_uri="img")
+            db.session.add(proto)
+            db.session.flush()
+            cls = Class(name="c", proto_id=proto.id, start_date=datetime(2026, 1, 1))
+            db.session.add(cls)
+            # 5 stale rows to update, 3 gone from the swarm.
+            for i in range(5):
+                db.session.add(CodeHost(user_id=1, service_id=f"svc-{i}", service_name=f"user{i}",
+                                        state="unknown", app_state="unknown"))
+            for i in range(3):
+                db.session.add(CodeHost(user_id=1, service_id=f"gone-{i}", service_name=f"gone{i}",
+                                        state="running", app_state="ready"))
+            db.session.commit()
+
+            mgr = _manager([_raw_service(i, class_id=cls.id if i == 7 else 999) for i in range(20)],
+                           [_task(i) for i in range(20)])
+            with _count_statements(db) as seen:
+                stats = mgr.sync()
+
+            assert (stats.mia, stats.updated, stats.inserted, stats.skipped) == (3, 5, 15, 0)
+            # Rows, users, root, classes, then MIA + update + insert: no per-host queries.
+            assert seen.count("SELECT") == 4
+            assert seen.count("UPDATE") == 2
+            assert seen.count("INSERT") <= 15  # executemany may be split per row by the driver
+
+            assert CodeHost.query.count() == 23
+            assert {ch.state for ch in CodeHost.query.filter(CodeHost.service_id.like("gone-%"))} \
+                == {HostState.MIA.value}
+            row7 = CodeHost.query.filter_by(service_id="svc-7").one()
+            assert row7.user.username == "user7"
+            assert row7.class_id == cls.id
+            assert row7.node_name == "swarm1.example.com"
+            assert CodeHost.query.filter_by(service_id="svc-8").one().class_id is None
+
+    def test_unknown_user_maps_to_root(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_users(db, 0)
+            mgr = _manager([_raw_service(5)], [_task(5)])
+            mgr.sync()
+            assert CodeHost.query.one().user_id == 0
+
+    def test_failed_bulk_falls_back_per_host(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _seed_users(db, 3)
+            mgr = _manager([_raw_service(i) for i in range(3)], [_task(i) for i in range(3)])
+            with patch.object(db.session, "bulk_insert_mappings",
+                              side_effect=RuntimeError("duplicate key")):
+                stats = mgr.sync()
+            assert stats.inserted == 3
+            assert CodeHost.query.count() == 3
+
+
+def test_model_kwargs_uses_prefetched_lookups_without_queries():
+    app, db = _make_flask_app()
+    with app.app_context():
+        s = CSMService(MagicMock(), _raw_service(1, class_id=42))
+        with _count_statements(db) as seen:
+            kw = s.model_kwargs(no_container=True, users={"user1": 7}, class_ids={42})
+        assert seen == []
+        assert kw["user_id"] == 7 and kw["class_id"] == 42
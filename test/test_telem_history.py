@@ -0,0 +1,202 @@
+"""
+Unit tests for telemetry history:
+
+    cspawn/telem_history.py::record_samples
+    cspawn/telem_history.py::rollup_telemetry
+    cspawn/telem_history.py::apply_retention
+    cspawn/telem_history.py::series / summarize / pick_resolution
+    cspawn/telem_ingest.py (history written by the buffered flush and the direct path)
+    migrations/versions/v012_add_telemetry_samples_table.py
+
+The DB is in-memory SQLite, following test/test_start_jobs.py.
+
+Run with::
+
+    uv run pytest test/test_telem_history.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from cspawn.telem_history import (
+    apply_retention,
+    pick_resolution,
+    record_samples,
+    rollup_telemetry,
+    series,
+    summarize,
+)
+from cspawn.telemetry import TelemetryReport
+
+T0 = datetime(2026, 3, 2, 15, 0, 0)
+CFG = {"TELEM_ROLLUP_LAG_S": "0"}
+
+
+def _make_flask_app(**config):
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-telem-history-secret"
+    app.config["TESTING"] = True
+    app.app_config = config
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    return app, _db
+
+
+def _report(username, ts, *, memory=100, rate=1.0, class_id=1):
+    return TelemetryReport(
+        timestamp=ts, instanceId="i", keystrokes=0, average30m=0.0, average5m=0.0, average1m=rate,
+        sysMemory=memory, processMemory=0, reportingRate=30,
+        fileStats={"a.py": {"keystrokes": 1, "lastModified": ts}},
+        completions=[], image="img", repo="repo", syllabus="", class_id=class_id, username=username,
+    )
+
+
+def _record_every_30s(db, username, start, minutes, **kw):
+    reports = [_report(username, start + timedelta(seconds=30 * i), **kw) for i in range(minutes * 2)]
+    record_samples(reports)
+    db.session.commit()
+
+
+def _count(resolution):
+    from cspawn.models import TelemetrySample
+
+    return TelemetrySample.query.filter_by(resolution=resolution).count()
+
+
+class TestRollup:
+    def test_minute_buckets_average_and_max(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            record_samples([
+                _report("alice", T0, memory=100, rate=1.0),
+                _report("alice", T0 + timedelta(seconds=30), memory=300, rate=3.0),
+                _report("alice", T0 + timedelta(seconds=60), memory=500, rate=5.0),
+            ])
+            db.session.commit()
+
+            written = rollup_telemetry(CFG, now=T0 + timedelta(minutes=2))
+            assert written[60] == 2
+            first = series(CFG, "alice", T0, resolution=60)[0]
+            assert (first.ts, first.n, first.memory_avg, first.memory_max) == (T0, 2, 200, 300)
+            assert (first.activity_avg, first.activity_max) == (2.0, 3.0)
+            assert first.last_edit == T0 + timedelta(seconds=30)
+
+    def test_incomplete_buckets_wait_and_reruns_do_not_duplicate(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _record_every_30s(db, "alice", T0, 20)
+            rollup_telemetry(CFG, now=T0 + timedelta(minutes=10, seconds=20))
+            assert _count(60) == 10
+            assert _count(900) == 0
+
+            rollup_telemetry(CFG, now=T0 + timedelta(minutes=10, seconds=40))
+            assert _count(60) == 10
+            rollup_telemetry(CFG, now=T0 + timedelta(minutes=20))
+            assert _count(60) == 20
+            (quarter,) = series(CFG, "alice", T0, resolution=900)
+            assert quarter.n == 30
+
+    def test_lag_holds_back_recent_buckets(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _record_every_30s(db, "alice", T0, 5)
+            rollup_telemetry({"TELEM_ROLLUP_LAG_S": "120"}, now=T0 + timedelta(minutes=5))
+            assert _count(60) == 3
+
+    def test_hosts_roll_up_separately(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _record_every_30s(db, "alice", T0, 1, memory=100)
+            _record_every_30s(db, "bob", T0, 1, memory=900)
+            rollup_telemetry(CFG, now=T0 + timedelta(minutes=1))
+            assert series(CFG, "bob", T0, resolution=60)[0].memory_avg == 900
+
+
+class TestRetentionAndQueries:
+    def test_retention_deletes_each_level_at_its_own_age(self):
+        from cspawn.models import TelemetrySample
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            _record_every_30s(db, "alice", T0, 60)
+            rollup_telemetry(CFG, now=T0 + timedelta(hours=1))
+            assert _count(3600) == 1
+
+            deleted = apply_retention(CFG, now=T0 + timedelta(days=3))
+            assert deleted == 120 + 60
+            assert {r for (r,) in db.session.query(TelemetrySample.resolution).distinct()} == {900, 3600}
+
+    def test_pick_resolution_uses_finest_retained(self):
+        now = T0
+        assert pick_resolution(CFG, now - timedelta(hours=1), now) == 0
+        assert pick_resolution(CFG, now - timedelta(hours=12), now) == 60
+        assert pick_resolution(CFG, now - timedelta(days=7), now) == 900
+        assert pick_resolution(CFG, now - timedelta(days=400), now) == 3600
+
+    def test_summarize_reduces_window_per_host(self):
+        app, db = _make_flask_app()
+        with app.app_context():
+            _record_every_30s(db, "alice", T0, 2, rate=2.0, class_id=7)
+            _record_every_30s(db, "bob", T0, 2, rate=4.0, class_id=8)
+            out = summarize(CFG, T0, class_id=7, now=T0 + timedelta(minutes=5))
+            assert set(out) == {"alice"}
+            assert (out["alice"].n, out["alice"].activity_avg) == (4, 2.0)
+
+
+class TestIngestWritesHistory:
+    def test_buffered_flush_records_samples(self):
+        from cspawn.telem_ingest import TelemetryBuffer
+
+        app, db = _make_flask_app(TELEM_HISTORY="true", TELEM_FLUSH_INTERVAL_S="3600")
+        buf = TelemetryBuffer(app)
+        try:
+            with app.app_context():
+                buf.offer(_report("alice", T0))
+                buf.offer(_report("nohost", T0))
+                buf.flush()
+                assert _count(0) == 2
+        finally:
+            buf.stop()
+
+    def test_history_off_records_nothing(self):
+        from cspawn.telem_ingest import TelemetryBuffer
+
+        app, db = _make_flask_app(TELEM_FLUSH_INTERVAL_S="3600")
+        buf = TelemetryBuffer(app)
+        try:
+            with app.app_context():
+                buf.offer(_report("alice", T0))
+                buf.flush()
+                assert _count(0) == 0
+        finally:
+            buf.stop()
+
+
+def test_v012_migration_upgrade_idempotent_and_downgrade():
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+
+    from migrations.versions.v012_add_telemetry_samples_table import downgrade, upgrade
+
+    engine = sa.create_engine("sqlite:///:memory:")
+
+    def run(fn):
+        with engine.begin() as conn:
+            with Operations.context(MigrationContext.configure(conn)):
+                fn()
+
+    run(upgrade)
+    run(upgrade)
+    insp = sa.inspect(engine)
+    assert {"resolution", "username", "ts", "n", "memory_avg", "last_edit"} <= {
+        c["name"] for c in insp.get_columns("telemetry_samples")}
+    assert "ix_telemetry_samples_series" in {i["name"] for i in insp.get_indexes("telemetry_samples")}
+    run(downgrade)
+    assert "telemetry_samples" not in sa.inspect(engine).get_table_names()
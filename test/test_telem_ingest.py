@@ -0,0 +1,197 @@
+"""
+Unit tests for buffered telemetry ingestion:
+
+    cspawn/telem_ingest.py::TelemetryBuffer (coalescing, backpressure, bulk flush)
+    cspawn/telem_ingest.py::ingest_telemetry (buffered and direct /telem)
+    cspawn/telemetry.py::TelemetryReport.codehost_values
+
+The DB is in-memory SQLite, following test/test_start_jobs.py.
+
+Run with::
+
+    uv run pytest test/test_telem_ingest.py -v
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from cspawn.telem_ingest import TelemetryBuffer, ingest_telemetry
+from cspawn.telemetry import TelemetryReport
+
+T0 = datetime(2026, 3, 2, 15, 0, 0)
+
+
+def _make_flask_app(**config):
+    from flask import Flask
+    from cspawn.models import db as _db
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["SECRET_KEY"] = "test-telem-secret"
+    app.config["TESTING"] = True
+    app.app_config = {"TELEM_FLUSH_INTERVAL_S": "3600", **config}
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+    app.add_url_rule("/telem", "telem", ingest_telemetry, methods=["GET", "POST"])
+    return app, _db
+
+
+def _seed_host(db, username, service_name=None):
+    from cspawn.models import CodeHost, User
+
+    user = User(user_id=f"uid-{username}", email=f"{username}@example.com", username=username, is_active=True)
+    db.session.add(user)
+    db.session.flush()
+    host = CodeHost(user_id=user.id, service_id=f"svc-{username}", service_name=service_name or username)
+    db.session.add(host)
+    db.session.commit()
+    return host.id
+
+
+def _payload(username, *, memory=500_000_000, rate=1.5, timestamp=T0):
+    return {
+        "timestamp": timestamp.isoformat(),
+        "instanceId": "i-1",
+        "keystrokes": 10,
+        "average30m": 0.5,
+        "average5m": rate,
+        "average1m": 2.0,
+        "sysMemory": memory,
+        "processMemory": 1,
+        "reportingRate": 30,
+        "fileStats": {"main.py": {"keystrokes": 10, "lastModified": timestamp.isoformat()}},
+        "completions": [],
+        "image": "img",
+        "repo": "repo",
+        "syllabus": "",
+        "class_id": 1,
+        "username": username,
+    }
+
+
+def _report(username, **kw):
+    return TelemetryReport(**_payload(username, **kw))
+
+
+@pytest.fixture
+def buffered():
+    app, db = _make_flask_app(TELEM_BUFFER_MAX="2")
+    app.telem_buffer = TelemetryBuffer(app)
+    yield app, db, app.telem_buffer
+    app.telem_buffer.stop()
+
+
+class TestBuffer:
+    def test_keeps_latest_report_per_host(self, buffered):
+        _, _, buf = buffered
+        assert buf.offer(_report("alice", rate=1.0))
+        assert buf.offer(_report("alice", rate=3.0))
+        assert buf.pending() == 1
+        assert buf._pending["alice"].average5m == 3.0
+        assert (buf.stats.accepted, buf.stats.coalesced) == (2, 1)
+
+    def test_full_buffer_drops_new_hosts_but_updates_buffered_ones(self, buffered):
+        _, _, buf = buffered
+        assert buf.offer(_report("alice"))
+        assert buf.offer(_report("bob"))
+        assert not buf.offer(_report("carol"))
+        assert buf.offer(_report("alice", rate=9.0))
+        assert buf.stats.dropped == 1
+        assert set(buf._pending) == {"alice", "bob"}
+
+    def test_enabled_reads_telem_batch(self):
+        assert TelemetryBuffer.enabled({"TELEM_BATCH": "true"})
+        assert not TelemetryBuffer.enabled({})
+
+
+class TestFlush:
+    def test_bulk_update_matches_update_telemetry(self, buffered):
+        from cspawn.models import CodeHost
+
+        app, db, buf = buffered
+        with app.app_context():
+            alice = _seed_host(db, "alice")
+            # A host claimed from the standby pool keeps its standby-* service name.
+            bob = _seed_host(db, "bob", service_name="standby-abc123")
+            buf.offer(_report("alice", memory=700, rate=2.5))
+            buf.offer(_report("bob", memory=900))
+
+            assert buf.flush() == 2
+            db.session.expire_all()
+            a, b = db.session.get(CodeHost, alice), db.session.get(CodeHost, bob)
+            assert (a.memory_usage, a.user_activity_rate, a.last_heartbeat) == (700, 2.5, T0)
+            assert a.last_utilization == T0
+            assert b.memory_usage == 900
+            assert buf.pending() == 0
+            assert buf.stats.flushed == 2
+
+    def test_reports_without_a_host_are_counted_unmatched(self, buffered):
+        app, db, buf = buffered
+        with app.app_context():
+            _seed_host(db, "alice")
+            buf.offer(_report("alice"))
+            buf.offer(_report("ghost"))
+            assert buf.flush() == 1
+            assert buf.stats.unmatched == 1
+
+    def test_failed_flush_requeues_unless_superseded(self, buffered, monkeypatch):
+        app, db, buf = buffered
+        with app.app_context():
+            _seed_host(db, "alice")
+            _seed_host(db, "bob")
+            buf.offer(_report("alice", rate=1.0))
+            buf.offer(_report("bob", rate=1.0))
+
+            def boom(*a, **kw):
+                # A newer report arrives while the flush is in flight.
+                buf.offer(_report("alice", rate=7.0))
+                raise RuntimeError("db down")
+
+            monkeypatch.setattr(db.session, "execute", boom)
+            assert buf.flush() == 0
+            assert buf.stats.failed == 1
+            assert buf._pending["alice"].average5m == 7.0
+            assert buf._pending["bob"].average5m == 1.0
+
+
+class TestRoute:
+    def test_buffered_post_is_written_on_flush(self, buffered):
+        from cspawn.models import CodeHost
+
+        app, db, buf = buffered
+        with app.app_context():
+            host_id = _seed_host(db, "alice")
+        client = app.test_client()
+        resp = client.post("/telem", json=_payload("alice", memory=321))
+        assert resp.status_code == 200 and resp.get_json() == "OK"
+        with app.app_context():
+            assert db.session.get(CodeHost, host_id).memory_usage is None
+            buf.flush()
+            assert db.session.get(CodeHost, host_id).memory_usage == 321
+
+    def test_full_buffer_answers_503(self, buffered):
+        app, _, _ = buffered
+        client = app.test_client()
+        assert client.post("/telem", json=_payload("a")).status_code == 200
+        assert client.post("/telem", json=_payload("b")).status_code == 200
+        assert client.post("/telem", json=_payload("c")).status_code == 503
+
+    def test_unbuffered_post_writes_immediately(self):
+        from cspawn.models import CodeHost
+
+        app, db = _make_flask_app()
+        with app.app_context():
+            host_id = _seed_host(db, "alice")
+        resp = app.test_client().post("/telem", json=_payload("alice", memory=123))
+        assert resp.get_json() == "OK"
+        with app.app_context():
+            assert db.session.get(CodeHost, host_id).memory_usage == 123
+
+    def test_invalid_report_is_rejected(self, buffered):
+        app, _, buf = buffered
+        resp = app.test_client().post("/telem", json={"username": "alice"})
+        assert resp.get_json() == "Error"
+        assert buf.pending() == 0
@@ -0,0 +1,171 @@
+"""
+Unit tests for cost-aware scale-up and consolidation:
+
+    cspawn/cs_docker/tiers.py::load_tiers (price_hourly)
+    cspawn/cs_docker/autoscale.py::solve_tier_mix
+    cspawn/cs_docker/autoscale.py::plan_consolidation
+    cspawn/cs_docker/autoscale.py::build_plan (tier mix, consolidation, cost delta)
+    cspawn/cs_docker/autoscale.py::ScalePlan.nodes_to_add / summary
+
+Run with::
+
+    uv run pytest test/test_tier_mix.py -v
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from cspawn.cs_docker.autoscale import (
+    ClusterState,
+    NodeView,
+    ScalePlan,
+    build_plan,
+    plan_consolidation,
+    solve_tier_mix,
+)
+from cspawn.cs_docker.tiers import Tier, load_tiers
+
+NOW = datetime(2026, 10, 5, 16, 0, tzinfo=timezone.utc)
+SMALL = Tier("small", "s-4vcpu-8gb-amd", 6, 0.07)
+MEDIUM = Tier("medium", "s-6vcpu-12gb-amd", 10, 0.09)
+LARGE = Tier("large", "s-8vcpu-16gb-amd", 14, 0.125)
+
+
+def _cfg(*tiers: Tier, **overrides) -> dict:
+    return {
+        "NODE_TIERS": json.dumps([
+            {"name": t.name, "slug": t.slug, "capacity": t.capacity, "price_hourly": t.price_hourly}
+            for t in tiers
+        ]),
+        "AUTOSCALE_HEADROOM": "2",
+        "AUTOSCALE_MAX_REMOVE_PER_CYCLE": "1",
+        **overrides,
+    }
+
+
+def _node(serial: int, tier: Tier = SMALL, running: int = 0) -> NodeView:
+    return NodeView(f"swarm{serial}", f"swarm{serial}.x", tier.slug, tier.capacity, running, False, False, serial)
+
+
+class TestSolveTierMix:
+    def test_cheapest_mix_uses_a_middle_tier(self):
+        assert solve_tier_mix(10, [SMALL, MEDIUM, LARGE], 3) == {"medium": 1}
+        assert solve_tier_mix(20, [SMALL, MEDIUM, LARGE], 3) == {"medium": 2}
+        assert solve_tier_mix(24, [SMALL, MEDIUM, LARGE], 3) == {"medium": 1, "large": 1}
+
+    def test_cheap_small_nodes_beat_one_large(self):
+        cheap = Tier("small", "s", 6, 0.05)
+        assert solve_tier_mix(12, [cheap, LARGE], 2) == {"small": 2}
+
+    def test_max_add_clamps_to_most_capacity(self):
+        assert solve_tier_mix(100, [SMALL, MEDIUM, LARGE], 2) == {"large": 2}
+        assert solve_tier_mix(5, [SMALL, LARGE], 0) == {}
+
+    def test_unpriced_tiers_fall_back_to_fewest_nodes_least_overshoot(self):
+        small, large = Tier("small", "s", 6), Tier("large", "l", 14)
+        assert solve_tier_mix(6, [small, large], 2) == {"small": 1}
+        assert solve_tier_mix(20, [small, large], 2) == {"small": 1, "large": 1}
+        # One tier priced, one not: costs are not comparable, so ignored.
+        assert solve_tier_mix(12, [Tier("small", "s", 6, 0.01), large], 2) == {"large": 1}
+
+
+class TestBuildPlan:
+    def test_scale_up_carries_mix_and_cost(self):
+        cfg = _cfg(SMALL, MEDIUM, LARGE, AUTOSCALE_MAX_ADD_PER_CYCLE="3")
+        state = ClusterState(nodes=[_node(2, running=6)], pending_hosts=0)
+        plan = build_plan(state, 16, cfg, NOW, {})
+
+        assert plan.add_tiers == {"medium": 1}
+        assert (plan.add_large, plan.add_small) == (0, 0)
+        assert plan.reason.startswith("scale-up: deficit=10") and "add_tiers=medium:1" in plan.reason
+        assert [t.name for t in plan.nodes_to_add(load_tiers(cfg))] == ["medium"]
+        assert "add_tiers=medium:1 cost_delta_hourly=+0.090" in plan.summary()
+
+    def test_scale_down_reports_saving(self):
+        cfg = _cfg(SMALL, LARGE)
+        state = ClusterState(nodes=[_node(2, running=1), _node(3), _node(4)], pending_hosts=0)
+        empty = {"swarm3.x": NOW - timedelta(hours=1), "swarm4.x": NOW - timedelta(hours=1)}
+        plan = build_plan(state, 3, cfg, NOW, empty)
+
+        assert plan.remove_nodes == ["swarm4.x"] and not plan.consolidate
+        assert plan.cost_delta_hourly == pytest.approx(-0.07)
+
+    def test_consolidation_wins_when_it_saves_more_than_a_removal(self):
+        cfg = _cfg(SMALL, LARGE, AUTOSCALE_CONSOLIDATE="true")
+        nodes = [_node(2, running=5)] + [_node(s) for s in (3, 4, 5)]
+        empty = {n.fqdn: NOW - timedelta(hours=1) for n in nodes[1:]}
+        plan = build_plan(ClusterState(nodes=nodes, pending_hosts=0), 16, cfg, NOW, empty)
+
+        assert plan.consolidate and plan.purge_first
+        assert plan.remove_nodes == ["swarm5.x", "swarm4.x", "swarm3.x"]
+        assert plan.add_tiers == {"large": 1} and plan.add_large == 1
+        assert plan.cost_delta_hourly == pytest.approx(-0.085)
+        assert "consolidate=True cost_delta_hourly=-0.085" in plan.summary()
+
+        # Off by default: the same cluster just loses its highest serial.
+        plain = build_plan(ClusterState(nodes=nodes, pending_hosts=0), 16, _cfg(SMALL, LARGE), NOW, empty)
+        assert plain.remove_nodes == ["swarm5.x"] and not plain.consolidate
+
+
+class TestPlanConsolidation:
+    def _state(self, *nodes: NodeView) -> ClusterState:
+        return ClusterState(nodes=list(nodes), pending_hosts=0)
+
+    def test_needs_prices_cooldown_and_enough_capacity(self):
+        cfg = _cfg(SMALL, LARGE, AUTOSCALE_CONSOLIDATE="true")
+        nodes = [_node(2, running=5), _node(3), _node(4), _node(5)]
+        cooled = {n.fqdn: NOW - timedelta(hours=1) for n in nodes[1:]}
+
+        assert plan_consolidation(self._state(*nodes), 16, cfg, NOW, cooled) is not None
+        # Demand that even two small nodes' worth of idle capacity must stay for
+        assert plan_consolidation(self._state(*nodes), 27, cfg, NOW, cooled) is None
+        # Not cooled down yet
+        recent = {fqdn: NOW - timedelta(minutes=5) for fqdn in cooled}
+        assert plan_consolidation(self._state(*nodes), 16, cfg, NOW, recent) is None
+        # Protected nodes stay, and two small nodes barely save anything but still do
+        group, tier, saving = plan_consolidation(self._state(*nodes), 16, cfg, NOW, cooled,
+                                                 frozenset({"swarm5.x"}))
+        assert [n.fqdn for n in group] == ["swarm4.x", "swarm3.x"] and saving == pytest.approx(0.015)
+        # Unpriced tiers
+        unpriced = {**cfg, "NODE_TIERS": json.dumps([{"name": "small", "slug": SMALL.slug, "capacity": 6},
+                                                      {"name": "large", "slug": LARGE.slug, "capacity": 14}])}
+        assert plan_consolidation(self._state(*nodes), 16, unpriced, NOW, cooled) is None
+
+    def test_saving_below_minimum_does_not_qualify(self):
+        nodes = [_node(2, running=5), _node(3), _node(4)]
+        cooled = {n.fqdn: NOW - timedelta(hours=1) for n in nodes[1:]}
+        state = self._state(*nodes)
+
+        # Two small nodes save 0.015/h against one large: over the default 0.01.
+        cfg = _cfg(SMALL, LARGE, AUTOSCALE_CONSOLIDATE="true")
+        assert plan_consolidation(state, 10, cfg, NOW, cooled)[2] == pytest.approx(0.015)
+        raised = {**cfg, "AUTOSCALE_CONSOLIDATE_MIN_SAVING_HOURLY": "0.02"}
+        assert plan_consolidation(state, 10, raised, NOW, cooled) is None
+
+        # The prod prices: two smalls at 0.063 against a large at 0.125 save 0.001/h.
+        prod = _cfg(Tier("small", SMALL.slug, 6, 0.063), LARGE, AUTOSCALE_CONSOLIDATE="true")
+        assert plan_consolidation(state, 10, prod, NOW, cooled) is None
+
+    def test_never_replaces_with_a_smaller_or_dearer_node(self):
+        pricey = Tier("large", LARGE.slug, 14, 0.2)
+        cfg = _cfg(SMALL, pricey, AUTOSCALE_CONSOLIDATE="true")
+        nodes = [_node(2, running=5), _node(3), _node(4)]
+        cooled = {n.fqdn: NOW - timedelta(hours=1) for n in nodes[1:]}
+        assert plan_consolidation(self._state(*nodes), 10, cfg, NOW, cooled) is None
+
+
+def test_load_tiers_parses_optional_price():
+    tiers = load_tiers(_cfg(SMALL, LARGE))
+    assert [t.price_hourly for t in tiers] == [0.07, 0.125]
+    with pytest.raises(ValueError, match="price_hourly"):
+        load_tiers({"NODE_TIERS": json.dumps([{"name": "s", "slug": "s", "capacity": 6, "price_hourly": "x"}])})
+
+
+def test_scale_plan_without_mix_keeps_two_tier_adds():
+    plan = ScalePlan(add_large=1, add_small=2)
+    assert plan.add_count == 3
+    assert [t.name for t in plan.nodes_to_add([SMALL, MEDIUM, LARGE])] == ["large", "small", "small"]
+    assert "cost_delta_hourly" not in plan.summary()